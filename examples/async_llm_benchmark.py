@@ -0,0 +1,93 @@
+# examples/async_llm_benchmark.py
+"""
+异步LLM调用负载测试
+
+在本地启动一个模拟的 OpenAI 兼容补全服务（每个请求固定延迟），
+用 N 个并发会话比较：
+- blocking: 旧做法，在 async 函数中直接调用同步的 generate_response，事件循环被阻塞
+- async: generate_response_async，共享异步HTTP客户端并限制并发数
+
+用法:
+    python examples/async_llm_benchmark.py --sessions 1 4 16 --latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.ai.openai_service import OpenAIService
+
+
+def start_fake_server(latency):
+    """启动模拟补全服务，返回 (server, base_url)"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency)
+            payload = json.dumps({
+                "id": "completion", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "模拟回复"}}]
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 128
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+async def blocking_session(service, i):
+    return service.generate_response([{"role": "user", "content": f"问题{i}"}])
+
+
+async def async_session(service, i):
+    return await service.generate_response_async([{"role": "user", "content": f"问题{i}"}])
+
+
+def run(session, service, sessions):
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*[session(service, i) for i in range(sessions)])
+        return time.perf_counter() - start
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="异步LLM调用负载测试")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency", type=float, default=0.2, help="模拟的补全延迟(秒)")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(args.latency)
+    service = OpenAIService(api_key="benchmark", base_url=base_url, max_concurrency=args.max_concurrency)
+
+    print(f"{'并发会话':>8} | {'blocking(s)':>11} | {'async(s)':>9}")
+    print("-" * 36)
+    for sessions in args.sessions:
+        blocking = run(blocking_session, service, sessions)
+        concurrent = run(async_session, service, sessions)
+        print(f"{sessions:8d} | {blocking:11.3f} | {concurrent:9.3f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# examples/embedding_pipeline_benchmark.py
+"""
+嵌入向量写入路径性能基准
+
+使用本地伪嵌入后端（模拟网络往返延迟）比较：
+- 逐条保存：每轮对话分别为用户输入和助手回复各发起一次嵌入请求（旧版 EnhancedMemory.save）
+- 批量保存：每轮对话合并为一次批量请求，并在同一事务中写入
+- 批量 + 缓存：重复出现的文本直接命中内容哈希缓存
+
+用法:
+    python examples/embedding_pipeline_benchmark.py --turns 50 --latency 0.05
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.memory.embedding_service import EmbeddingCache, EmbeddingService, FakeEmbeddingBackend
+from rainbow_agent.memory.relevance_retrieval import RelevanceRetrieval
+
+
+def make_turns(count, repeat_ratio):
+    """生成测试对话，其中一部分助手回复是重复的常见回复"""
+    turns = []
+    for i in range(count):
+        response = "好的，我明白了。" if i % max(1, int(1 / repeat_ratio)) == 0 else f"这是第{i}条回复"
+        turns.append((f"这是第{i}个问题", response))
+    return turns
+
+
+def run_case(name, turns, backend, cache_capacity, batched, db_dir):
+    service = EmbeddingService(backend, EmbeddingCache(capacity=cache_capacity))
+    retrieval = RelevanceRetrieval(
+        db_path=os.path.join(db_dir, f"{name}.db"),
+        llm_client=MagicMock(),
+        embedding_service=service
+    )
+
+    start = time.perf_counter()
+    for memory_id, (user_input, response) in enumerate(turns, 1):
+        timestamp = "2024-01-01T00:00:00"
+        if batched:
+            retrieval.save_embeddings(
+                memory_id,
+                [(user_input, "user_input"), (response, "assistant_response")],
+                timestamp
+            )
+        else:
+            retrieval.save_embedding(memory_id, user_input, "user_input", timestamp)
+            retrieval.save_embedding(memory_id, response, "assistant_response", timestamp)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name:>14} | {elapsed * 1000 / len(turns):12.2f} | "
+        f"{backend.request_count:8d} | {backend.text_count:8d}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="嵌入向量写入路径性能基准")
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟的单次嵌入请求延迟(秒)")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3, help="重复助手回复的比例")
+    args = parser.parse_args()
+
+    turns = make_turns(args.turns, args.repeat_ratio)
+    print(f"{'模式':>14} | {'每轮耗时(ms)':>12} | {'请求次数':>8} | {'嵌入文本':>8}")
+    print("-" * 52)
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        run_case("per-text", turns, FakeEmbeddingBackend(latency=args.latency), 0, False, db_dir)
+        run_case("batched", turns, FakeEmbeddingBackend(latency=args.latency), 0, True, db_dir)
+        run_case("batched+cache", turns, FakeEmbeddingBackend(latency=args.latency), 10000, True, db_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# examples/hierarchical_retrieval_benchmark.py
+"""
+分层记忆检索性能基准
+
+比较 HierarchicalMemory.retrieve 的两种模式在各层记忆数量增长时的查询延迟：
+- recent: 读取工作记忆和短期记忆全部内容，合并后按时间排序取最近的记录
+- ranked: 通过共享的BM25索引只访问查询词的倒排列表，按相关性返回前k条
+
+用法:
+    python examples/hierarchical_retrieval_benchmark.py --sizes 1000 10000 50000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.memory.hierarchical_memory import HierarchicalMemory
+
+TOPICS = ["天气", "科幻小说", "人工智能", "旅游景点", "Python", "篮球", "电影", "美食", "音乐", "历史"]
+
+
+def populate(memory, size, rng):
+    for i in range(size):
+        topic = rng.choice(TOPICS)
+        memory.save(f"关于{topic}的第{i}个问题", f"这是关于{topic}的回答{i}", importance=rng.random())
+
+
+def time_queries(memory, queries, limit, ranked):
+    """返回每次查询的平均延迟（毫秒）"""
+    memory.retrieve(queries[0], limit=limit, ranked=ranked)
+    start = time.perf_counter()
+    for query in queries:
+        memory.retrieve(query, limit=limit, ranked=ranked)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分层记忆检索性能基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    queries = [f"{rng.choice(TOPICS)}的第{rng.randrange(max(args.sizes))}个问题" for _ in range(args.queries)]
+
+    print(f"{'记忆数量':>10} | {'recent(ms)':>10} | {'ranked(ms)':>10}")
+    print("-" * 38)
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        for size in args.sizes:
+            memory = HierarchicalMemory(
+                working_memory_capacity=size // 10,
+                short_term_capacity=size,
+                long_term_capacity=size,
+                db_path=os.path.join(db_dir, f"memory_{size}.db")
+            )
+            populate(memory, size, rng)
+            recent_ms = time_queries(memory, queries, args.limit, ranked=False)
+            ranked_ms = time_queries(memory, queries, args.limit, ranked=True)
+            print(f"{size:>10} | {recent_ms:10.3f} | {ranked_ms:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
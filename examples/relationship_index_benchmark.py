@@ -0,0 +1,79 @@
+# examples/relationship_index_benchmark.py
+"""
+关系索引查找基准
+
+创建大量关系并随机设置互动数据，统计以下操作的平均耗时：
+- find_relationship: 实体对索引查找，与逐个扫描所有关系对比
+- find_by_ris: RIS范围查找（±delta）
+- can_execute: 关系任务按缓存的RIS判断是否可执行
+
+用法:
+    python examples/relationship_index_benchmark.py --relationships 1000000 --lookups 10000
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.relationship.models import RelationshipManager
+from rainbow_agent.relationship.tasks import RelationshipTask
+
+
+def linear_find(manager, entity_id, connected_to_id):
+    """原先的查找方式：逐个扫描所有关系"""
+    for rel_id, rel in manager.relationships.items():
+        if (rel.entity_id == entity_id and rel.connected_to_id == connected_to_id) or \
+           (rel.entity_id == connected_to_id and rel.connected_to_id == entity_id):
+            return rel_id
+    return None
+
+
+def timed(label, count, fn):
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed / count * 1e6:>10.2f} µs/次  ({count} 次)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="关系索引查找基准")
+    parser.add_argument("--relationships", type=int, default=200000, help="关系数量")
+    parser.add_argument("--lookups", type=int, default=10000, help="索引查找次数")
+    parser.add_argument("--scans", type=int, default=5, help="线性扫描次数")
+    parser.add_argument("--delta", type=float, default=0.02, help="RIS范围查找的半径")
+    args = parser.parse_args()
+
+    logging.getLogger("rainbow_agent.relationship.models").setLevel(logging.WARNING)
+    rng = random.Random(0)
+    manager = RelationshipManager()
+    pairs = []
+
+    start = time.perf_counter()
+    for i in range(args.relationships):
+        pair = (f"ai-{i % 1000}", f"human-{i}")
+        rel_id = manager.create_relationship(pair[0], "AI", pair[1], "Human")
+        manager.update_interaction(rel_id, rounds=rng.randint(1, 200), emotional_resonance=rng.random() < 0.3)
+        pairs.append(pair)
+    print(f"创建 {args.relationships} 个关系: {time.perf_counter() - start:.1f}s")
+
+    samples = [rng.choice(pairs) for _ in range(args.lookups)]
+    timed("find_relationship (索引)", args.lookups, lambda i: manager.find_relationship(*samples[i]))
+    timed("find_relationship (线性扫描)", args.scans, lambda i: linear_find(manager, *samples[i]))
+
+    centers = [rng.random() for _ in range(args.lookups)]
+    timed(f"find_by_ris (±{args.delta})", args.lookups,
+          lambda i: manager.find_by_ris(centers[i] - args.delta, centers[i] + args.delta))
+
+    tasks = [RelationshipTask(title="问候", description="", relationship_intensity_threshold=0.2,
+                              relationship_id=manager.find_relationship(*samples[i]))
+             for i in range(args.lookups)]
+    timed("can_execute (缓存RIS)", args.lookups, lambda i: tasks[i].can_execute(manager))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# examples/streaming_benchmark.py
+"""
+流式响应延迟基准
+
+在本地启动一个模拟的 OpenAI 兼容补全服务（首个片段前有固定延迟，之后每个片段间隔固定时间），
+分别统计首个片段延迟(TTFT)、总耗时和生成速度(片段/秒)：
+- llm-call: LLMCaller.call，生成完毕后一次性返回
+- llm-stream: LLMCaller.stream，逐段返回
+- sse: /api/dialogue/input/stream 接口，经 DialogueManager 逐段发送 SSE 事件
+
+用法:
+    python examples/streaming_benchmark.py --tokens 50 --first-token-latency 0.3 --token-interval 0.02
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from flask import Flask
+from openai import OpenAI
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.ai.openai_service import OpenAIService
+from rainbow_agent.api import unified_routes
+from rainbow_agent.api.unified_dialogue_processor import UnifiedDialogueProcessor
+from rainbow_agent.core.dialogue_manager import DialogueManager
+from rainbow_agent.core.llm_caller import LLMCaller
+
+
+def start_fake_server(tokens, first_token_latency, token_interval):
+    """启动模拟补全服务，返回 (server, base_url)"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(first_token_latency)
+            if not body.get("stream"):
+                time.sleep(token_interval * (tokens - 1))
+                payload = json.dumps({
+                    "id": "completion", "object": "chat.completion", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "字" * tokens}}]
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for i in range(tokens):
+                if i:
+                    time.sleep(token_interval)
+                self.wfile.write(("data: " + json.dumps({
+                    "id": "chunk", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": "字"}, "finish_reason": None}]
+                }) + "\n\n").encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def measure(deltas):
+    """消费片段迭代器，返回 (TTFT, 总耗时, 片段数)"""
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in deltas:
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    return first, time.perf_counter() - start, count
+
+
+def llm_call(caller, context):
+    yield caller.call(context)
+
+
+def sse_tokens(client):
+    response = client.post("/api/dialogue/input/stream", buffered=False,
+                           json={"input": "问题", "userId": "bench", "sessionId": "s1"})
+    for chunk in response.response:
+        if chunk.startswith(b"event: token"):
+            yield chunk
+    response.close()
+
+
+def sse_client(base_url):
+    """构造使用模拟服务的流式对话接口测试客户端"""
+    storage = AsyncMock()
+    storage.create_turn_async.side_effect = lambda session_id, role, content, metadata=None: {
+        "id": f"{role}-turn", "session_id": session_id, "role": role, "content": content
+    }
+    storage.get_session_async.return_value = {"id": "s1", "metadata": {"dialogue_type": "human_ai_private"}}
+    storage.get_recent_turns_async.return_value = []
+    manager = DialogueManager(storage=storage, ai_service=OpenAIService(api_key="benchmark", base_url=base_url))
+    processor = UnifiedDialogueProcessor(storage=storage, dialogue_manager=manager)
+
+    app = Flask(__name__)
+    app.register_blueprint(unified_routes.api)
+    return app.test_client(), processor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式响应延迟基准")
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--first-token-latency", type=float, default=0.3, help="首个片段前的延迟(秒)")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="片段间隔(秒)")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(args.tokens, args.first_token_latency, args.token_interval)
+    llm_client = OpenAI(api_key="benchmark", base_url=base_url, max_retries=0, http_client=httpx.Client())
+    caller = LLMCaller(model="gpt-test", llm_client=llm_client)
+    context = {"messages": [{"role": "user", "content": "问题"}]}
+    client, processor = sse_client(base_url)
+
+    modes = (
+        ("llm-call", lambda: llm_call(caller, context)),
+        ("llm-stream", lambda: caller.stream(context)),
+        ("sse", lambda: sse_tokens(client)),
+    )
+
+    print(f"{'模式':>10} | {'TTFT(ms)':>9} | {'总耗时(ms)':>10} | {'生成速度(片段/s)':>15}")
+    print("-" * 56)
+    with patch.object(unified_routes, "get_unified_processor", return_value=processor):
+        for name, deltas in modes:
+            results = [measure(deltas()) for _ in range(args.rounds)]
+            ttft = sum(r[0] for r in results) / len(results)
+            total = sum(r[1] for r in results) / len(results)
+            # 生成速度按首个片段之后的时间计算；一次性返回时等于总片段数/总耗时
+            generation = total - ttft
+            rate = args.tokens / (generation if generation > 0.001 else total)
+            print(f"{name:>10} | {ttft * 1000:9.1f} | {total * 1000:10.1f} | {rate:15.1f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
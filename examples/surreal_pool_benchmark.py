@@ -0,0 +1,91 @@
+# examples/surreal_pool_benchmark.py
+"""
+SurrealDB连接池性能基准
+
+使用进程内模拟服务（模拟握手认证和查询的网络延迟）比较对话轮次写入：
+- per-call: 旧版做法，每条记录新建连接并 signin/use
+- pooled: 同步接口，复用连接池中已认证的连接
+- pooled-async: 异步接口并发写入，连接数受连接池上限约束
+
+用法:
+    python examples/surreal_pool_benchmark.py --turns 200 --handshake 0.02 --latency 0.002
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.storage.models import TurnModel
+from rainbow_agent.storage.surreal.mock_server import MockSurrealServer
+from rainbow_agent.storage.surreal.unified_client import UnifiedSurrealClient
+from rainbow_agent.storage.unified_turn_manager import UnifiedTurnManager
+
+
+def run_per_call(server, turns):
+    """旧版 get_connection() 的逐条连接方式"""
+    async def write():
+        for i in range(turns):
+            db = server.connect("ws://mock/rpc")
+            await db.connect()
+            await db.signin({"username": "root", "password": "root"})
+            await db.use("bench", "bench")
+            await db.create("turns", TurnModel(session_id="s1", role="human", content=f"消息{i}").to_dict())
+            await db.close()
+
+    asyncio.run(write())
+
+
+def make_manager(server, pool_size):
+    client = UnifiedSurrealClient(
+        "ws://mock/rpc", "bench", "bench", "root", "root",
+        pool_size=pool_size, connection_factory=server.connect
+    )
+    return UnifiedTurnManager(client=client)
+
+
+def run_pooled(server, turns, pool_size):
+    manager = make_manager(server, pool_size)
+    for i in range(turns):
+        manager.create_turn("s1", "human", f"消息{i}")
+    manager.client.close()
+
+
+def run_pooled_async(server, turns, pool_size):
+    manager = make_manager(server, pool_size)
+
+    async def write():
+        await asyncio.gather(*[manager.create_turn_async("s1", "human", f"消息{i}") for i in range(turns)])
+
+    asyncio.run(write())
+    manager.client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SurrealDB连接池性能基准")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--handshake", type=float, default=0.02, help="模拟的握手认证延迟(秒)")
+    parser.add_argument("--latency", type=float, default=0.002, help="模拟的单次请求延迟(秒)")
+    parser.add_argument("--pool-size", type=int, default=8)
+    args = parser.parse_args()
+
+    cases = [
+        ("per-call", lambda server: run_per_call(server, args.turns)),
+        ("pooled", lambda server: run_pooled(server, args.turns, args.pool_size)),
+        ("pooled-async", lambda server: run_pooled_async(server, args.turns, args.pool_size)),
+    ]
+
+    print(f"{'模式':>14} | {'每轮耗时(ms)':>12} | {'握手次数':>8}")
+    print("-" * 42)
+    for name, run in cases:
+        server = MockSurrealServer(handshake_latency=args.handshake, query_latency=args.latency)
+        start = time.perf_counter()
+        run(server)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>14} | {elapsed * 1000 / args.turns:12.3f} | {server.handshakes:8d}")
+
+
+if __name__ == "__main__":
+    main()
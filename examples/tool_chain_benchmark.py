@@ -0,0 +1,151 @@
+# examples/tool_chain_benchmark.py
+"""
+工具链并行执行基准测试
+
+用带模拟延迟的工具比较：
+- 顺序执行：ToolChain按拓扑顺序依次执行所有步骤，耗时为所有步骤之和
+- 按依赖并行：ParallelToolChain并发执行互不依赖的步骤，耗时接近关键路径
+- 流式传递：读取步骤逐块产生数据，解析步骤边接收边处理，与先读完再解析比较
+
+用法:
+    python examples/tool_chain_benchmark.py --scale 1.0 --repeat 3 --chunks 20
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.tools.base import BaseTool, CachePolicy
+from rainbow_agent.tools.tool_chain import ParallelToolChain, ToolChain
+
+# (步骤ID, 模拟延迟秒数, 依赖的步骤) —— 一个典型的数据分析流程
+ANALYSIS_STEPS = [
+    ("fetch_data", 0.20, []),
+    ("fetch_schema", 0.15, []),
+    ("profile", 0.30, ["fetch_data"]),
+    ("stats", 0.25, ["fetch_data"]),
+    ("validate", 0.10, ["fetch_data", "fetch_schema"]),
+    ("chart", 0.20, ["stats"]),
+    ("report", 0.10, ["profile", "chart", "validate"]),
+]
+
+
+class SimulatedTool(BaseTool):
+    """等待固定延迟后返回结果的模拟工具"""
+    cache_policy = CachePolicy.NEVER
+
+    def __init__(self, name: str, latency: float):
+        super().__init__(name=name, description=f"模拟延迟 {latency:.2f} 秒的工具")
+        self.latency = latency
+
+    def run(self, args):
+        time.sleep(self.latency)
+        return f"{self.name} 完成"
+
+
+class SimulatedReader(BaseTool):
+    """逐块读取数据的模拟工具，每个数据块有固定的读取延迟"""
+    cache_policy = CachePolicy.NEVER
+
+    def __init__(self, chunks: int, latency: float):
+        super().__init__(name="read_file", description="模拟分块读取大文件")
+        self.chunks = chunks
+        self.latency = latency
+
+    def run(self, args):
+        return "".join(self.run_stream(args))
+
+    def run_stream(self, args):
+        for i in range(self.chunks):
+            time.sleep(self.latency)
+            yield f"{i},{i * 2}\n"
+
+
+class SimulatedParser(BaseTool):
+    """逐行处理数据的模拟工具，输入可以是完整文本或数据块迭代器"""
+    cache_policy = CachePolicy.NEVER
+
+    def __init__(self, latency: float):
+        super().__init__(name="csv_analysis", description="模拟逐行解析CSV")
+        self.latency = latency
+
+    def run(self, args):
+        chunks = args.splitlines() if isinstance(args, str) else args
+        rows = 0
+        for _ in chunks:
+            time.sleep(self.latency)
+            rows += 1
+        return f"共 {rows} 行"
+
+
+def critical_path(steps) -> float:
+    """计算依赖图中最长路径的延迟之和"""
+    finish = {}
+    for step_id, latency, depends_on in steps:
+        finish[step_id] = latency + max((finish[dep] for dep in depends_on), default=0.0)
+    return max(finish.values())
+
+
+def timed(func, repeat: int) -> float:
+    """返回多次执行的平均耗时"""
+    start = time.time()
+    for _ in range(repeat):
+        result = func()
+        if "error" in result:
+            raise RuntimeError(result["error"])
+    return (time.time() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="工具链并行执行基准测试")
+    parser.add_argument("--scale", type=float, default=1.0, help="模拟延迟的缩放比例")
+    parser.add_argument("--repeat", type=int, default=3, help="每种方式的执行次数")
+    parser.add_argument("--chunks", type=int, default=20, help="流式读取的数据块数量")
+    args = parser.parse_args()
+
+    logging.getLogger("rainbow_agent.tools.tool_chain").setLevel(logging.WARNING)
+
+    steps = [(step_id, latency * args.scale, depends_on) for step_id, latency, depends_on in ANALYSIS_STEPS]
+    tools = {step_id: SimulatedTool(step_id, latency) for step_id, latency, _ in steps}
+
+    sequential = ToolChain("analysis_sequential", "顺序执行", tools=list(tools.values()), use_cache=False)
+    parallel = ParallelToolChain("analysis_parallel", "按依赖并行执行", use_cache=False)
+    for step_id, _, depends_on in steps:
+        parallel.add_step(step_id, tools[step_id], depends_on=depends_on)
+
+    total = sum(latency for _, latency, _ in steps)
+    expected = critical_path(steps)
+    sequential_time = timed(lambda: sequential.execute("data.csv"), args.repeat)
+    parallel_time = timed(lambda: parallel.execute("data.csv"), args.repeat)
+
+    print(f"数据分析流程: {len(steps)} 个步骤，延迟之和 {total:.3f}s，关键路径 {expected:.3f}s")
+    print(f"  顺序执行:     {sequential_time:.3f}s")
+    print(f"  按依赖并行:   {parallel_time:.3f}s  (加速 {sequential_time / parallel_time:.2f}x，"
+          f"关键路径的 {parallel_time / expected:.0%})")
+
+    read_latency = 0.02 * args.scale
+    parse_latency = 0.02 * args.scale
+    reader = SimulatedReader(args.chunks, read_latency)
+    parser_tool = SimulatedParser(parse_latency)
+
+    buffered = ParallelToolChain("read_then_parse", "读完再解析", use_cache=False)
+    buffered.add_step("read", reader)
+    buffered.add_step("parse", parser_tool, depends_on=["read"])
+    streamed = ParallelToolChain("stream_parse", "边读边解析", use_cache=False)
+    streamed.add_step("read", reader, stream=True)
+    streamed.add_step("parse", parser_tool, depends_on=["read"])
+
+    buffered_time = timed(lambda: buffered.execute("data.csv"), args.repeat)
+    streamed_time = timed(lambda: streamed.execute("data.csv"), args.repeat)
+
+    print(f"\n读取并解析 {args.chunks} 个数据块 (每块读取 {read_latency * 1000:.0f}ms，"
+          f"解析 {parse_latency * 1000:.0f}ms)")
+    print(f"  读完再解析:   {buffered_time:.3f}s")
+    print(f"  流式传递:     {streamed_time:.3f}s  (加速 {buffered_time / streamed_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
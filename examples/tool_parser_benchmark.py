@@ -0,0 +1,107 @@
+# examples/tool_parser_benchmark.py
+"""
+工具调用解析基准
+
+按不同的工具数量统计 ToolExecutor.parse_tool_call 的平均耗时，
+与原先逐个工具格式化并匹配六个正则的解析方式对比。
+每轮解析一组典型的LLM回复：直接指示、函数式、JSON、OpenAI结构化调用和不含调用的文本。
+
+用法:
+    python examples/tool_parser_benchmark.py --tools 10 100 500 --rounds 200
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.tools.base import BaseTool
+from rainbow_agent.tools.tool_executor import ToolExecutor
+
+
+class NoopTool(BaseTool):
+    def __init__(self, name):
+        super().__init__(name=name, description="", usage="")
+
+    def run(self, args):
+        return args
+
+
+def legacy_parse(tools_by_name, text):
+    """原先的解析方式：对每个工具格式化六个正则，再依次尝试函数式、JSON和简单文本格式"""
+    for tool_name in tools_by_name:
+        direct_patterns = [
+            rf'我需要使用工具[:：]?\s*{tool_name}\s+(.*)',
+            rf'使用工具[:：]?\s*{tool_name}\s+(.*)',
+            rf'调用工具[:：]?\s*{tool_name}\s+(.*)',
+            rf'工具\s*{tool_name}\s+(.*)',
+            rf'[Uu]se\s+tool\s*[:：]?\s*{tool_name}\s+(.*)',
+            rf'[Cc]all\s+tool\s*[:：]?\s*{tool_name}\s+(.*)'
+        ]
+        for pattern in direct_patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                return {"tool_name": tool_name, "tool_args": match.group(1).strip()}
+
+    func_match = re.search(r'(\w+)\s*\((.*?)\)', text)
+    if func_match and func_match.group(1) in tools_by_name:
+        return {"tool_name": func_match.group(1), "tool_args": func_match.group(2).strip()}
+
+    for match in re.finditer(r'\{[\s\S]*?\}', text):
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            continue
+        if isinstance(data, dict) and data.get("name") in tools_by_name:
+            args = data.get("args")
+            return {"tool_name": data["name"], "tool_args": json.dumps(args) if isinstance(args, dict) else ""}
+    return None
+
+
+def sample_replies(tool_count):
+    last = f"tool_{tool_count - 1}"
+    return [
+        f"我需要使用工具：{last} 查询今天的天气",
+        f"好的，我来计算 {last}(1, 2, 3)",
+        f'{{"name": "{last}", "args": {{"query": "彩虹"}}}}',
+        "这个问题不需要使用任何工具，我直接回答：彩虹有七种颜色。",
+    ]
+
+
+def timed(label, count, fn):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / count * 1e6:>12.2f} µs/轮  ({count} 轮)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="工具调用解析基准")
+    parser.add_argument("--tools", type=int, nargs="+", default=[10, 100, 500], help="工具数量")
+    parser.add_argument("--rounds", type=int, default=200, help="每种解析方式的轮数")
+    args = parser.parse_args()
+
+    logging.getLogger("rainbow_agent.tools.tool_executor").setLevel(logging.WARNING)
+
+    for tool_count in args.tools:
+        executor = ToolExecutor([NoopTool(f"tool_{i}") for i in range(tool_count)])
+        replies = sample_replies(tool_count)
+        structured = {"function_call": {"name": f"tool_{tool_count - 1}", "arguments": "{}"}}
+        # 先构建一次解析器，之后的轮次复用
+        executor.parse_tool_call(replies[0])
+
+        print(f"\n工具数量: {tool_count}")
+        timed("预编译解析器", args.rounds, lambda: [executor.parse_tool_call(r) for r in replies])
+        timed("结构化调用", args.rounds, lambda: executor.parse_tool_call(structured))
+        legacy_rounds = max(1, args.rounds * 10 // tool_count)
+        timed("原先的逐工具正则", legacy_rounds,
+              lambda: [legacy_parse(executor.tools_by_name, r) for r in replies])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# examples/tool_retrieval_benchmark.py
+"""
+工具检索评估
+
+在固定的 (查询, 期望工具) 评估集上比较：
+- 原先的规则打分：按空格分词的名称/描述匹配，对所有工具逐个打分取最高
+- 本地检索：支持中文的BM25（可加 --fake-embedding 混入向量得分）
+输出每种方式的准确率、平均延迟，以及检索置信度达到阈值（即跳过LLM）的查询比例和其中的准确率。
+
+用法:
+    python examples/tool_retrieval_benchmark.py --threshold 0.6 --padding-tools 200
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.core.optimized_tool_selector import OptimizedToolSelector, SelectionStrategy
+from rainbow_agent.tools.base import BaseTool
+
+TOOLS = [
+    ("calculator", "执行数学计算，支持加减乘除、乘方和常用函数 calculate math expressions"),
+    ("weather", "查询城市的天气预报、气温和空气质量 weather forecast"),
+    ("web_search", "在互联网上搜索信息、新闻和网页 search the web"),
+    ("translate", "在中文、英文、日文等语言之间翻译文本 translate text"),
+    ("file_read", "读取本地文件的内容 read a file"),
+    ("file_write", "把内容写入或保存到本地文件 write a file"),
+    ("code_execution", "运行Python代码并返回输出结果 execute python code"),
+    ("generate_image", "根据文字描述生成图片或插画 generate an image"),
+    ("text_to_speech", "把文本转换成语音朗读 text to speech audio"),
+    ("send_email", "给联系人发送电子邮件 send an email"),
+    ("calendar", "查看和创建日程、会议安排和提醒 calendar events"),
+    ("stock_price", "查询股票的实时价格和涨跌 stock quotes"),
+]
+
+EVALUATION_SET = [
+    ("帮我算一下 37 乘以 48 等于多少", "calculator"),
+    ("计算 2 的 10 次方", "calculator"),
+    ("what is 15 percent of 240, calculate it", "calculator"),
+    ("北京明天天气怎么样", "weather"),
+    ("上海今天的气温和空气质量", "weather"),
+    ("will it rain tomorrow? check the weather forecast", "weather"),
+    ("搜索一下最近的人工智能新闻", "web_search"),
+    ("在网上查找彩虹的形成原理", "web_search"),
+    ("search the web for python asyncio tutorials", "web_search"),
+    ("把这句话翻译成英文：今天很开心", "translate"),
+    ("translate 'good morning' into Japanese", "translate"),
+    ("这段日文是什么意思，帮我翻译", "translate"),
+    ("读取 config.yaml 文件的内容", "file_read"),
+    ("read the file notes.txt", "file_read"),
+    ("把会议纪要保存到文件里", "file_write"),
+    ("write this summary to a file", "file_write"),
+    ("运行这段Python代码看看输出", "code_execution"),
+    ("execute this python snippet", "code_execution"),
+    ("生成一张夕阳下的海边图片", "generate_image"),
+    ("画一幅猫咪的插画", "generate_image"),
+    ("generate an image of a mountain lake", "generate_image"),
+    ("把这段文本转换成语音读出来", "text_to_speech"),
+    ("朗读这篇文章", "text_to_speech"),
+    ("给张经理发一封邮件说明进度", "send_email"),
+    ("send an email to the team about the release", "send_email"),
+    ("帮我安排明天下午三点的会议", "calendar"),
+    ("查看我下周的日程", "calendar"),
+    ("create a calendar event for friday", "calendar"),
+    ("腾讯的股票现在多少钱", "stock_price"),
+    ("查询苹果公司股价的涨跌", "stock_price"),
+]
+
+
+class EvalTool(BaseTool):
+    def __init__(self, name, description):
+        super().__init__(name=name, description=description, usage=f"{name}(args)")
+
+    def run(self, args):
+        return args
+
+
+def fake_embedder(dimension=64):
+    """按字符哈希生成向量的嵌入函数，只用于测量融合向量得分后的延迟"""
+    def embed(texts):
+        vectors = []
+        for text in texts:
+            vector = [0.0] * dimension
+            for char in text.lower():
+                vector[hash(char) % dimension] += 1.0
+            vectors.append(vector)
+        return vectors
+    return embed
+
+
+def evaluate(label, select, repeat):
+    correct = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        correct = sum(1 for query, expected in EVALUATION_SET if select(query) == expected)
+    elapsed = (time.perf_counter() - start) / (repeat * len(EVALUATION_SET))
+    print(f"{label:<24} 准确率 {correct / len(EVALUATION_SET):>6.1%}   {elapsed * 1e6:>9.1f} µs/查询")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="工具检索评估")
+    parser.add_argument("--threshold", type=float, default=0.6, help="跳过LLM的检索置信度阈值")
+    parser.add_argument("--padding-tools", type=int, default=0, help="额外添加的无关工具数量")
+    parser.add_argument("--repeat", type=int, default=20, help="重复次数（用于测量延迟）")
+    parser.add_argument("--fake-embedding", action="store_true", help="融合伪向量得分")
+    args = parser.parse_args()
+
+    logging.getLogger("rainbow_agent.core.optimized_tool_selector").setLevel(logging.WARNING)
+
+    tools = [EvalTool(name, description) for name, description in TOOLS]
+    tools += [EvalTool(f"plugin_{i}", f"第三方插件 {i} 的专用操作 plugin operation {i}")
+              for i in range(args.padding_tools)]
+    selector = OptimizedToolSelector(
+        tools=tools,
+        strategy=SelectionStrategy.HYBRID,
+        llm_client=object(),
+        retrieval_threshold=args.threshold,
+        embedder=fake_embedder() if args.fake_embedding else None
+    )
+    print(f"工具数量: {len(tools)}，评估查询: {len(EVALUATION_SET)}\n")
+
+    def rule_select(query):
+        scores = [(selector._calculate_tool_match_confidence(tool, query, {}), tool.name) for tool in tools]
+        best_score, best_name = max(scores)
+        return best_name if best_score > 0 else None
+
+    def retrieval_select(query):
+        candidates, _ = selector.retriever.retrieve(query, 1)
+        return candidates[0][0].name if candidates else None
+
+    evaluate("原先的规则打分", rule_select, max(1, args.repeat // 10))
+    evaluate("本地检索 (top-1)", retrieval_select, args.repeat)
+
+    confident = correct = 0
+    for query, expected in EVALUATION_SET:
+        candidates, confidence = selector.retriever.retrieve(query, 3)
+        if confidence >= args.threshold:
+            confident += 1
+            correct += candidates[0][0].name == expected
+    print(f"\n检索置信度 ≥ {args.threshold}（跳过LLM）: {confident}/{len(EVALUATION_SET)} 个查询，"
+          f"其中准确率 {correct / confident if confident else 0:.1%}")
+
+
+if __name__ == "__main__":
+    main()
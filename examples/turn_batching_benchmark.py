@@ -0,0 +1,66 @@
+# examples/turn_batching_benchmark.py
+"""
+对话轮次批量写入性能基准
+
+使用进程内模拟服务（模拟单次请求的网络延迟）比较对话轮次写入：
+- per-turn: 每条轮次单独 create 一次
+- write-behind: 轮次进入写缓冲，按批大小/延迟合并为单个事务写入
+
+用法:
+    python examples/turn_batching_benchmark.py --turns 500 --latency 0.002 --batch-size 32
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.storage.surreal.mock_server import MockSurrealServer
+from rainbow_agent.storage.surreal.unified_client import UnifiedSurrealClient
+from rainbow_agent.storage.unified_turn_manager import UnifiedTurnManager
+from rainbow_agent.storage.write_behind import TurnWriteBuffer
+
+
+def run(server, turns, sessions, batch_size, flush_interval, batched):
+    client = UnifiedSurrealClient(
+        "ws://mock/rpc", "bench", "bench", "root", "root", connection_factory=server.connect
+    )
+    buffer = TurnWriteBuffer(client, max_batch_size=batch_size, max_delay=flush_interval) if batched else None
+    manager = UnifiedTurnManager(client=client, write_buffer=buffer)
+    requests = server.requests
+
+    start = time.perf_counter()
+    for i in range(turns):
+        manager.create_turn(f"s{i % sessions}", "human", f"消息{i}")
+    accepted = time.perf_counter() - start
+    if buffer:
+        buffer.close()
+    elapsed = time.perf_counter() - start
+
+    client.close()
+    return accepted, elapsed, server.requests - requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对话轮次批量写入性能基准")
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.002, help="模拟的单次请求延迟(秒)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--flush-interval", type=float, default=0.05, help="最长缓冲时间(秒)")
+    args = parser.parse_args()
+
+    print(f"{'模式':>12} | {'受理耗时(ms/轮)':>14} | {'落盘耗时(ms/轮)':>14} | {'请求数':>6}")
+    print("-" * 60)
+    for name, batched in (("per-turn", False), ("write-behind", True)):
+        server = MockSurrealServer(query_latency=args.latency)
+        accepted, elapsed, requests = run(
+            server, args.turns, args.sessions, args.batch_size, args.flush_interval, batched
+        )
+        print(f"{name:>12} | {accepted * 1000 / args.turns:14.3f} | "
+              f"{elapsed * 1000 / args.turns:14.3f} | {requests:6d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# examples/vector_memory_benchmark.py
+"""
+向量记忆检索性能基准
+
+比较旧版逐条计算余弦相似度的检索方式与新的向量索引后端
+（exact / ivf / hnsw）在记忆数量从1k增长到1M时的查询延迟。
+
+用法:
+    python examples/vector_memory_benchmark.py
+    python examples/vector_memory_benchmark.py --sizes 1000 10000 100000 --dimension 384
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.memory.vector_index import HNSW_SUPPORT, create_vector_index
+
+
+def legacy_search(vectors, query, limit):
+    """旧版 VectorMemory.search 的逐条计算方式"""
+    similarities = []
+    for i, vector in enumerate(vectors):
+        vec1 = np.array(query)
+        vec2 = np.array(vector)
+        similarity = float(np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)))
+        similarities.append((i, similarity))
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return similarities[:limit]
+
+
+def time_queries(search, queries, limit):
+    """返回每次查询的平均延迟（毫秒）"""
+    start = time.perf_counter()
+    for query in queries:
+        search(query, limit)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def run(sizes, dimension, queries_per_size, limit, legacy_max):
+    rng = np.random.default_rng(0)
+    backends = ["exact", "ivf"] + (["hnsw"] if HNSW_SUPPORT else [])
+
+    header = f"{'记忆数量':>10} | {'legacy(ms)':>10} | " + " | ".join(f"{b + '(ms)':>10}" for b in backends)
+    print(header)
+    print("-" * len(header))
+
+    for size in sizes:
+        vectors = rng.standard_normal((size, dimension)).astype(np.float32)
+        queries = rng.standard_normal((queries_per_size, dimension)).astype(np.float32)
+
+        if size <= legacy_max:
+            legacy_vectors = [v.tolist() for v in vectors]
+            legacy_ms = f"{time_queries(lambda q, k: legacy_search(legacy_vectors, q.tolist(), k), queries[:3], limit):10.2f}"
+        else:
+            legacy_ms = f"{'-':>10}"
+
+        cells = []
+        for backend in backends:
+            options = {"dimension": dimension, "initial_capacity": size}
+            if backend == "ivf":
+                options["n_lists"] = max(16, int(np.sqrt(size)))
+            index = create_vector_index(backend, **options)
+            for i in range(size):
+                index.add(f"m{i}", vectors[i])
+            cells.append(f"{time_queries(index.search, queries, limit):10.3f}")
+
+        print(f"{size:>10} | {legacy_ms} | " + " | ".join(cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="向量记忆检索性能基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--legacy-max", type=int, default=50000, help="旧版检索的最大测试规模")
+    args = parser.parse_args()
+
+    run(args.sizes, args.dimension, args.queries, args.limit, args.legacy_max)
@@ -6,7 +6,7 @@ Rainbow Agent 的核心代理类 - 重构版
 from typing import List, Dict, Any, Optional, Union
 import time
 import re
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from concurrent.futures import TimeoutError
 
 # 导入新组件
 from .core.input_hub import InputHub
@@ -22,6 +22,7 @@ from .tools.tool_executor import ToolExecutor
 from .tools.tool_invoker import ToolInvoker
 from .utils.llm import get_llm_client
 from .utils.logger import get_logger
+from .utils.runtime import PoolType, get_runtime
 
 logger = get_logger(__name__)
 
@@ -94,13 +95,15 @@ class RainbowAgent:
         self.llm_client = self.llm_caller.llm_client
         self.tool_executor = ToolExecutor(self.tools)
         self.tools_by_name = {tool.name: tool for tool in self.tools}
-        self.executor = ThreadPoolExecutor(max_workers=10)  # 用于并行执行工具
+        # 用于执行工具，借用进程内共享的工具线程池
+        self.executor = get_runtime().executor(PoolType.TOOL, owner=f"agent:{self.name}")
         
         # 初始化新组件
         self.tool_invoker = ToolInvoker(
             tools=self.tools,
             llm_client=self.llm_client,
-            timeout=timeout
+            timeout=timeout,
+            owner=f"agent:{self.name}"
         )
         self.context_builder = ContextBuilder(self.memory)
         self.response_mixer = ResponseMixer()
@@ -2,13 +2,26 @@
 OpenAI service module.
 
 Provides functionality for interacting with the OpenAI API.
+
+Besides the blocking ``generate_response``, the service offers native async
+calls (``generate_response_async`` and ``stream_response``) for use from
+event loops. They share one ``AsyncOpenAI`` client per event loop, backed by
+a pooled ``httpx.AsyncClient``, and a semaphore that bounds the number of
+concurrent completions. The clients are closed when their event loop shuts
+down its async generators (``asyncio.run`` does this), or by ``aclose``.
+Streaming errors are raised as ``OpenAIServiceError`` instead of being
+yielded as text.
 """
 import os
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+import weakref
+from typing import Dict, Any, List, Optional, AsyncIterator, Callable
+
+import httpx
 
 # Import the new version of the OpenAI client
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
 # Import the centralized configuration system
 try:
@@ -21,16 +34,40 @@ except ImportError:
 # Configure logging
 logger = logging.getLogger(__name__)
 
+NO_API_KEY_RESPONSE = "Sorry, I cannot generate a response because the OpenAI API key is not set."
+
+
+class OpenAIServiceError(Exception):
+    """Raised when a streamed completion fails or times out."""
+
+
 class OpenAIService:
     """OpenAI service class for interacting with the OpenAI API."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 base_url: Optional[str] = None,
+                 max_concurrency: int = 16,
+                 timeout: float = 60.0,
+                 http_client_factory: Optional[Callable[[], httpx.AsyncClient]] = None):
         """
         Initialize the OpenAI service.
         
         Args:
             api_key: OpenAI API key, if not provided uses environment variable or config.
+            base_url: Optional OpenAI-compatible API base URL.
+            max_concurrency: Maximum number of concurrent async completions per event loop.
+            timeout: Default per-call timeout in seconds for async calls.
+            http_client_factory: Creates the shared async HTTP client, defaults to a pooled
+                ``httpx.AsyncClient`` sized to ``max_concurrency``.
         """
+        self.base_url = base_url
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.http_client_factory = http_client_factory or self._default_http_client
+        # Event loop -> (AsyncOpenAI client, concurrency semaphore, client lifetime generator)
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+        
         if USE_CENTRAL_CONFIG:
             # Use the centralized configuration system
             self.api_key = api_key or config.openai.api_key
@@ -43,7 +80,7 @@ class OpenAIService:
             self.client = None
         else:
             # Create OpenAI client
-            self.client = OpenAI(api_key=self.api_key)
+            self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
             logger.info("OpenAI service initialized successfully")
     
     def generate_response(self, 
@@ -66,18 +103,9 @@ class OpenAIService:
         try:
             if not self.client:
                 logger.warning("API key not set, returning default response")
-                return "Sorry, I cannot generate a response because the OpenAI API key is not set."
+                return NO_API_KEY_RESPONSE
             
-            # Set default values from config if available
-            if USE_CENTRAL_CONFIG:
-                model = model or config.openai.default_model
-                temperature = temperature if temperature is not None else config.openai.temperature
-                max_tokens = max_tokens or config.openai.max_tokens
-            else:
-                # Legacy defaults
-                model = model or "gpt-3.5-turbo"
-                temperature = temperature if temperature is not None else 0.7
-                max_tokens = max_tokens or 1000
+            model, temperature, max_tokens = self._resolve_params(model, temperature, max_tokens)
             
             logger.info(f"Calling OpenAI API, model: {model}, messages: {len(messages)}")
             
@@ -99,6 +127,173 @@ class OpenAIService:
             # Return error message
             return f"Sorry, an error occurred while generating a response: {str(e)}"
     
+    @staticmethod
+    def _resolve_params(model: Optional[str], temperature: Optional[float], max_tokens: Optional[int]) -> tuple:
+        # Set default values from config if available
+        if USE_CENTRAL_CONFIG:
+            model = model or config.openai.default_model
+            temperature = temperature if temperature is not None else config.openai.temperature
+            max_tokens = max_tokens or config.openai.max_tokens
+        else:
+            # Legacy defaults
+            model = model or "gpt-3.5-turbo"
+            temperature = temperature if temperature is not None else 0.7
+            max_tokens = max_tokens or 1000
+        return model, temperature, max_tokens
+    
+    def _default_http_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        return httpx.AsyncClient(limits=limits, timeout=self.timeout)
+    
+    async def _async_client(self) -> tuple:
+        """Get the shared async client and semaphore of the running event loop."""
+        loop = asyncio.get_running_loop()
+        entry = self._async_clients.get(loop)
+        if entry is None:
+            client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=self.http_client_factory(),
+                max_retries=0
+            )
+            lifetime = self._client_lifetime(client)
+            await lifetime.__anext__()
+            entry = (client, asyncio.Semaphore(self.max_concurrency), lifetime)
+            self._async_clients[loop] = entry
+        return entry[0], entry[1]
+    
+    @staticmethod
+    async def _client_lifetime(client: AsyncOpenAI) -> AsyncIterator[None]:
+        """Suspended until the loop shuts down its async generators, then closes the client."""
+        try:
+            yield
+        finally:
+            await client.close()
+    
+    async def generate_response_async(self,
+                                      messages: List[Dict[str, str]],
+                                      model: str = None,
+                                      temperature: float = None,
+                                      max_tokens: int = None,
+                                      timeout: Optional[float] = None) -> str:
+        """
+        Generate AI response without blocking the event loop.
+        
+        Waits for a concurrency slot, then awaits the completion on the shared
+        async client. Cancelling the calling task cancels the request.
+        
+        Args:
+            messages: List of conversation messages.
+            model: Model name to use.
+            temperature: Temperature parameter to control randomness.
+            max_tokens: Maximum number of tokens to generate.
+            timeout: Per-call timeout in seconds, defaults to the service timeout.
+            
+        Returns:
+            Generated response text.
+        """
+        if not self.api_key:
+            logger.warning("API key not set, returning default response")
+            return NO_API_KEY_RESPONSE
+        
+        model, temperature, max_tokens = self._resolve_params(model, temperature, max_tokens)
+        client, semaphore = await self._async_client()
+        try:
+            async with semaphore:
+                logger.info(f"Calling OpenAI API asynchronously, model: {model}, messages: {len(messages)}")
+                response = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens
+                    ),
+                    timeout=timeout or self.timeout
+                )
+            
+            reply = (response.choices[0].message.content or "").strip()
+            logger.info(f"Successfully generated response, length: {len(reply)}")
+            return reply
+        except asyncio.TimeoutError:
+            logger.error(f"OpenAI API call timed out after {timeout or self.timeout}s")
+            return "Sorry, generating a response took too long. Please try again."
+        except Exception as e:
+            logger.error(f"Failed to generate response: {e}")
+            return f"Sorry, an error occurred while generating a response: {str(e)}"
+    
+    async def stream_response(self,
+                              messages: List[Dict[str, str]],
+                              model: str = None,
+                              temperature: float = None,
+                              max_tokens: int = None,
+                              timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Stream the AI response as text deltas.
+        
+        The concurrency slot is held until the stream ends. ``timeout`` bounds
+        the whole stream. Closing the generator early closes the underlying
+        HTTP response.
+        
+        Args:
+            messages: List of conversation messages.
+            model: Model name to use.
+            temperature: Temperature parameter to control randomness.
+            max_tokens: Maximum number of tokens to generate.
+            timeout: Timeout in seconds for the whole stream, defaults to the service timeout.
+            
+        Yields:
+            Text deltas in order.
+            
+        Raises:
+            OpenAIServiceError: The request failed or the stream timed out, possibly
+                after some deltas were already yielded.
+        """
+        if not self.api_key:
+            logger.warning("API key not set, returning default response")
+            yield NO_API_KEY_RESPONSE
+            return
+        
+        model, temperature, max_tokens = self._resolve_params(model, temperature, max_tokens)
+        client, semaphore = await self._async_client()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        async with semaphore:
+            stream = None
+            try:
+                stream = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        stream=True
+                    ),
+                    timeout=max(0.0, deadline - loop.time())
+                )
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(0.0, deadline - loop.time()))
+                    except StopAsyncIteration:
+                        break
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except asyncio.TimeoutError:
+                logger.error(f"OpenAI API stream timed out after {timeout or self.timeout}s")
+                raise OpenAIServiceError(f"Stream timed out after {timeout or self.timeout}s") from None
+            except Exception as e:
+                logger.error(f"Failed to stream response: {e}")
+                raise OpenAIServiceError(str(e)) from e
+            finally:
+                if stream is not None:
+                    await stream.close()
+    
+    async def aclose(self) -> None:
+        """Close the async client of the running event loop."""
+        entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry:
+            await entry[2].aclose()
+    
     def format_dialogue_history(self, turns: List[Dict[str, Any]]) -> List[Dict[str, str]]:
         """
         Format dialogue turns for the OpenAI API.
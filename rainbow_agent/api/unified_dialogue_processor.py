@@ -6,9 +6,11 @@ with a simple, SurrealDB-based implementation using unified storage.
 """
 
 import uuid
+import asyncio
 import logging
+import threading
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional
 from rainbow_agent.core.dialogue_manager import DialogueManager, DIALOGUE_TYPES
 from rainbow_agent.storage.unified_dialogue_storage import UnifiedDialogueStorage
 
@@ -37,6 +39,10 @@ class UnifiedDialogueProcessor:
         self.storage = storage or UnifiedDialogueStorage()
         self.dialogue_manager = dialogue_manager or DialogueManager(storage=self.storage)
         
+        # 同步流式接口使用的后台事件循环，按需启动
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        
         logger.info("UnifiedDialogueProcessor initialized")
     
     async def process_input(self, 
@@ -115,6 +121,94 @@ class UnifiedDialogueProcessor:
             context=context
         ))
     
+    async def process_input_stream(self,
+                                   user_input: str,
+                                   user_id: str = "default_user",
+                                   session_id: Optional[str] = None,
+                                   input_type: str = "text",
+                                   context: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        处理用户输入并以事件流的形式返回响应
+        
+        Args:
+            user_input: 用户输入内容
+            user_id: 用户ID
+            session_id: 会话ID，如果不提供则自动创建
+            input_type: 输入类型（text, image, audio等）
+            context: 额外上下文信息
+            
+        Yields:
+            {"type": "token", "content": 文本片段}，最后是 {"type": "done", ...}，
+            其余字段与 process_input 的返回值相同；生成失败时先返回 {"type": "error", ...}
+        """
+        try:
+            if not session_id:
+                session_id = await self._get_or_create_session(user_id, context)
+        except Exception as e:
+            logger.error(f"Failed to process input: {e}")
+            yield {
+                "type": "done",
+                "id": str(uuid.uuid4()),
+                "input": user_input,
+                "response": f"处理输入时出现错误: {str(e)}",
+                "sessionId": "unknown",
+                "timestamp": datetime.now().isoformat(),
+                "error": str(e)
+            }
+            return
+        
+        events = await self.dialogue_manager.process_input(
+            session_id=session_id,
+            user_id=user_id,
+            content=user_input,
+            input_type=input_type,
+            metadata=context,
+            stream=True
+        )
+        async for event in events:
+            yield event
+        logger.info(f"Successfully streamed input for user {user_id} in session {session_id}")
+    
+    def iter_input_stream(self,
+                          user_input: str,
+                          user_id: str = "default_user",
+                          session_id: Optional[str] = None,
+                          input_type: str = "text",
+                          context: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        process_input_stream 的同步版本，供 WSGI 流式响应使用
+        
+        事件流在处理器的后台事件循环中运行，每个事件生成后立即返回；
+        提前关闭迭代器（例如客户端断开）会关闭底层的事件流。
+        
+        Args:
+            user_input: 用户输入内容
+            user_id: 用户ID
+            session_id: 会话ID，如果不提供则自动创建
+            input_type: 输入类型（text, image, audio等）
+            context: 额外上下文信息
+            
+        Yields:
+            与 process_input_stream 相同的事件
+        """
+        loop = self._background_loop()
+        events = self.process_input_stream(user_input, user_id, session_id, input_type, context)
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(events.__anext__(), loop).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            asyncio.run_coroutine_threadsafe(events.aclose(), loop).result()
+    
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="dialogue-stream-loop", daemon=True).start()
+            return self._loop
+    
     async def _get_or_create_session(self, 
                                     user_id: str, 
                                     context: Optional[Dict[str, Any]] = None) -> str:
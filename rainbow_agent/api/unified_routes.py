@@ -12,7 +12,7 @@ import threading
 from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
 from werkzeug.utils import secure_filename
 
 from rainbow_agent.core.dialogue_manager import DialogueManager, DIALOGUE_TYPES
@@ -302,6 +302,39 @@ def process_input():
             "id": str(uuid.uuid4())
         }), 500
 
+def _stream_request_args(data: Dict[str, Any]) -> Dict[str, Any]:
+    """从请求数据中提取流式处理参数"""
+    return {
+        "user_input": data.get("input", ""),
+        "user_id": data.get("userId", "default_user"),
+        "session_id": data.get("sessionId"),
+        "input_type": data.get("type", "text"),
+        "context": data.get("context")
+    }
+
+def _sse_event(event: Dict[str, Any]) -> str:
+    """将处理事件编码为 Server-Sent Events 格式"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+@api.route('/dialogue/input/stream', methods=['POST'])
+def process_input_stream():
+    """处理用户输入，以 Server-Sent Events 逐段返回响应
+
+    每个文本片段生成后立即作为 ``token`` 事件发送，最后发送包含完整结果的
+    ``done`` 事件；AI轮次在生成结束后保存一次。生成失败时先发送 ``error`` 事件。
+    """
+    data = request.get_json(silent=True) or {}
+    args = _stream_request_args(data)
+    if not args["user_input"]:
+        return jsonify({"success": False, "error": "缺少输入内容"}), 400
+
+    events = get_unified_processor().iter_input_stream(**args)
+    return Response(
+        stream_with_context(_sse_event(event) for event in events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # 多模态API
 @api.route('/dialogue/upload/image', methods=['POST'])
 def upload_image():
@@ -766,6 +799,34 @@ def trigger_expression():
             "error": str(e)
         }), 500
 
+# WebSocket事件处理
+def register_socketio_events(socketio):
+    """注册对话流式处理的Socket.IO事件
+
+    客户端发送 ``dialogue_input`` 事件（字段与 /dialogue/input/stream 的请求体相同），
+    服务端逐段发送 ``dialogue_token`` 事件，最后发送 ``dialogue_done`` 事件；
+    生成失败时先发送 ``dialogue_error`` 事件。
+
+    Args:
+        socketio: Flask-SocketIO实例
+    """
+    from flask_socketio import emit
+
+    @socketio.on('dialogue_input')
+    def handle_dialogue_input(data):
+        """处理流式对话输入事件"""
+        args = _stream_request_args(data or {})
+        if not args["user_input"]:
+            emit('error', {'message': 'Missing input'}, room=request.sid)
+            return
+
+        try:
+            for event in get_unified_processor().iter_input_stream(**args):
+                emit(f"dialogue_{event['type']}", event, room=request.sid)
+        except Exception as e:
+            logger.error(f"流式处理对话输入失败: {e}")
+            emit('error', {'message': str(e)}, room=request.sid)
+
 # 注册API路由
 def register_api_routes(app):
     """注册API路由到Flask应用"""
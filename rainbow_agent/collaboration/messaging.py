@@ -3,7 +3,12 @@
 
 实现代理之间的消息传递和通信功能
 """
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, Callable, Deque, Iterable, Tuple
+from collections import deque
+import asyncio
+import heapq
+import itertools
+import threading
 import time
 import uuid
 from enum import Enum
@@ -93,29 +98,92 @@ class Message:
         return f"消息 [{self.msg_type.value}] 从 {self.sender_id} 到 {recipient}: {self.content[:30]}..."
 
 
+class _Inbox:
+    """代理的收件箱：按序号保存最近的消息（环形缓冲区）"""
+
+    def __init__(self, message_types: List[str], size: int, callback: Optional[Callable] = None,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.message_types = set(message_types)
+        self.entries: Deque[Tuple[int, Message]] = deque(maxlen=size)
+        self.dropped = 0
+        self.callback = callback
+        self.loop = loop
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def accepts(self, message: Message) -> bool:
+        return message.msg_type.value in self.message_types
+
+    def append(self, seq: int, message: Message) -> None:
+        if len(self.entries) == self.entries.maxlen:
+            self.dropped += 1
+        self.entries.append((seq, message))
+
+    def read(self, cursor: int, limit: Optional[int]) -> Tuple[List[Message], int]:
+        # 新消息在尾部，从后往前找到游标位置即可
+        pending = []
+        for seq, message in reversed(self.entries):
+            if seq <= cursor:
+                break
+            pending.append((seq, message))
+        pending.reverse()
+        if limit is not None:
+            pending = pending[:limit]
+        if not pending:
+            return [], cursor
+        return [message for _, message in pending], pending[-1][0]
+
+
 class MessageBus:
     """
     消息总线
     
-    处理代理之间的消息路由和传递
+    处理代理之间的消息路由和传递。
+
+    消息按接收者和任务建立索引，查询只访问相关的消息；保留的消息数量和时间有上限，
+    超出的最早消息被移除。每个订阅的代理有一个有界收件箱，可以用游标增量读取
+    （read_messages），或在异步代码中等待新消息（wait_for_messages）。
     """
     
-    def __init__(self):
-        """初始化消息总线"""
-        self.messages: List[Message] = []
+    def __init__(self,
+                 max_messages: Optional[int] = 10000,
+                 retention_seconds: Optional[float] = None,
+                 inbox_size: int = 1000):
+        """
+        初始化消息总线
+
+        Args:
+            max_messages: 保留的最大消息数，None表示不限制
+            retention_seconds: 消息的保留时间（秒），None表示不限制
+            inbox_size: 每个代理收件箱保留的最大消息数
+        """
+        self.messages: Deque[Message] = deque()
         self.subscribers: Dict[str, List[str]] = {}  # agent_id -> 订阅的消息类型列表
+        self.max_messages = max_messages
+        self.retention_seconds = retention_seconds
+        self.inbox_size = inbox_size
+
+        self._seq = itertools.count(1)
+        self._by_recipient: Dict[Optional[str], Deque[Tuple[int, Message]]] = {}  # recipient_id（None为广播） -> 消息
+        self._by_task: Dict[str, Deque[Message]] = {}
+        self._inboxes: Dict[str, _Inbox] = {}
+        self._lock = threading.RLock()
+        self.stats = {"published": 0, "evicted": 0, "delivered": 0}
     
-    def subscribe(self, agent_id: str, message_types: Optional[List[Union[MessageType, str]]] = None):
+    def subscribe(self,
+                  agent_id: str,
+                  message_types: Optional[List[Union[MessageType, str]]] = None,
+                  callback: Optional[Callable[[Message], Any]] = None):
         """
         订阅消息
         
         Args:
             agent_id: 代理ID
             message_types: 要订阅的消息类型列表，None表示所有类型
+            callback: 有新消息进入该代理收件箱时调用；协程函数会被调度到订阅时正在运行的事件循环
         """
         if message_types is None:
             # 订阅所有消息类型
-            self.subscribers[agent_id] = [msg_type.value for msg_type in MessageType]
+            subscribed_types = [msg_type.value for msg_type in MessageType]
         else:
             # 订阅指定消息类型
             subscribed_types = []
@@ -124,8 +192,23 @@ class MessageBus:
                     subscribed_types.append(msg_type.value)
                 else:
                     subscribed_types.append(msg_type)
-                    
+
+        loop = None
+        if callback is not None and asyncio.iscoroutinefunction(callback):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                raise ValueError("异步回调需要在事件循环中订阅")
+
+        with self._lock:
             self.subscribers[agent_id] = subscribed_types
+            inbox = self._inboxes.get(agent_id)
+            if inbox is None:
+                self._inboxes[agent_id] = _Inbox(subscribed_types, self.inbox_size, callback, loop)
+            else:
+                inbox.message_types = set(subscribed_types)
+                inbox.callback = callback
+                inbox.loop = loop
     
     def unsubscribe(self, agent_id: str):
         """
@@ -134,8 +217,12 @@ class MessageBus:
         Args:
             agent_id: 代理ID
         """
-        if agent_id in self.subscribers:
-            del self.subscribers[agent_id]
+        with self._lock:
+            self.subscribers.pop(agent_id, None)
+            inbox = self._inboxes.pop(agent_id, None)
+        if inbox is not None:
+            # 唤醒仍在等待的协程，它们会读到空结果
+            self._wake(inbox.waiters)
     
     def publish(self, message: Message):
         """
@@ -144,10 +231,36 @@ class MessageBus:
         Args:
             message: 要发布的消息
         """
-        self.messages.append(message)
-        logger.info(f"发布消息: {message}")
-        
-        # 消息路由处理可以在这里添加
+        with self._lock:
+            seq = next(self._seq)
+            self.messages.append(message)
+            self._by_recipient.setdefault(message.recipient_id, deque()).append((seq, message))
+            if message.related_task_id is not None:
+                self._by_task.setdefault(message.related_task_id, deque()).append(message)
+            self.stats["published"] += 1
+            self._evict(message.timestamp)
+
+            # 投递到接收者（广播时为所有订阅者）的收件箱
+            if message.recipient_id is None:
+                inboxes = list(self._inboxes.values())
+            else:
+                inbox = self._inboxes.get(message.recipient_id)
+                inboxes = [inbox] if inbox is not None else []
+
+            delivered = []
+            for inbox in inboxes:
+                if inbox.accepts(message):
+                    inbox.append(seq, message)
+                    delivered.append((inbox, inbox.waiters))
+                    inbox.waiters = []
+            self.stats["delivered"] += len(delivered)
+
+        logger.debug(f"发布消息: {message}")
+
+        for inbox, waiters in delivered:
+            self._wake(waiters)
+            if inbox.callback is not None:
+                self._notify(inbox, message)
     
     def get_messages_for_agent(self, agent_id: str, since_timestamp: Optional[float] = None) -> List[Message]:
         """
@@ -160,22 +273,16 @@ class MessageBus:
         Returns:
             消息列表
         """
-        result = []
-        for message in self.messages:
-            # 消息是发给这个代理的，或者是广播消息
-            is_recipient = message.recipient_id == agent_id or message.recipient_id is None
-            
-            # 检查代理是否订阅了这种消息类型
-            is_subscribed = (agent_id in self.subscribers and 
-                            message.msg_type.value in self.subscribers[agent_id])
-            
-            # 检查时间戳
-            is_recent = since_timestamp is None or message.timestamp > since_timestamp
-            
-            if is_recipient and is_subscribed and is_recent:
-                result.append(message)
-                
-        return result
+        with self._lock:
+            subscribed = set(self.subscribers.get(agent_id, ()))
+            if not subscribed:
+                return []
+            # 发给这个代理的消息和广播消息，按发布顺序合并
+            direct = self._since(self._by_recipient.get(agent_id, ()), since_timestamp)
+            broadcast = self._since(self._by_recipient.get(None, ()), since_timestamp)
+
+        return [message for _, message in heapq.merge(direct, broadcast, key=lambda entry: entry[0])
+                if message.msg_type.value in subscribed]
     
     def get_messages_by_task(self, task_id: str) -> List[Message]:
         """
@@ -187,7 +294,83 @@ class MessageBus:
         Returns:
             消息列表
         """
-        return [msg for msg in self.messages if msg.related_task_id == task_id]
+        with self._lock:
+            return list(self._by_task.get(task_id, ()))
+
+    def read_messages(self, agent_id: str, cursor: int = 0,
+                      limit: Optional[int] = None) -> Tuple[List[Message], int]:
+        """
+        从代理的收件箱读取游标之后的消息
+
+        收件箱只保存订阅之后投递的最近 inbox_size 条消息。
+
+        Args:
+            agent_id: 代理ID
+            cursor: 上一次读取返回的游标，0表示从头读取
+            limit: 最多读取的消息数
+
+        Returns:
+            (消息列表, 新的游标)
+        """
+        with self._lock:
+            inbox = self._inboxes.get(agent_id)
+            if inbox is None:
+                return [], cursor
+            return inbox.read(cursor, limit)
+
+    async def wait_for_messages(self, agent_id: str, cursor: int = 0,
+                                timeout: Optional[float] = None,
+                                limit: Optional[int] = None) -> Tuple[List[Message], int]:
+        """
+        等待代理的收件箱中出现游标之后的消息
+
+        消息可以在任意线程中发布；超时后返回空列表和原游标。
+
+        Args:
+            agent_id: 代理ID
+            cursor: 上一次读取返回的游标
+            timeout: 最长等待时间（秒），None表示一直等待
+            limit: 最多读取的消息数
+
+        Returns:
+            (消息列表, 新的游标)
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            inbox = self._inboxes.get(agent_id)
+            if inbox is None:
+                return [], cursor
+            messages, next_cursor = inbox.read(cursor, limit)
+            if messages:
+                return messages, next_cursor
+            waiter = (loop, loop.create_future())
+            inbox.waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                if waiter in inbox.waiters:
+                    inbox.waiters.remove(waiter)
+        return self.read_messages(agent_id, cursor, limit)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取消息总线的统计信息
+
+        Returns:
+            当前保留的消息数、发布/移除/投递数，以及各收件箱的消息数和溢出丢弃数
+        """
+        with self._lock:
+            return {
+                **self.stats,
+                "messages": len(self.messages),
+                "tasks": len(self._by_task),
+                "inboxes": {agent_id: {"size": len(inbox.entries), "dropped": inbox.dropped}
+                            for agent_id, inbox in self._inboxes.items()}
+            }
     
     def clear_messages(self, older_than: Optional[float] = None):
         """
@@ -196,7 +379,78 @@ class MessageBus:
         Args:
             older_than: 清除早于该时间戳的消息，None表示清除所有消息
         """
-        if older_than is None:
-            self.messages = []
-        else:
-            self.messages = [msg for msg in self.messages if msg.timestamp >= older_than]
+        with self._lock:
+            if older_than is None:
+                kept = []
+            else:
+                kept = [msg for msg in self.messages if msg.timestamp >= older_than]
+            kept_ids = {id(message) for message in kept}
+
+            self.messages = deque(kept)
+            self._by_recipient = {
+                recipient_id: deque(entry for entry in entries if id(entry[1]) in kept_ids)
+                for recipient_id, entries in self._by_recipient.items()
+            }
+            self._by_task = {
+                task_id: deque(message for message in messages if id(message) in kept_ids)
+                for task_id, messages in self._by_task.items()
+            }
+            for index in (self._by_recipient, self._by_task):
+                for key in [key for key, entries in index.items() if not entries]:
+                    del index[key]
+            for inbox in self._inboxes.values():
+                inbox.entries = deque((entry for entry in inbox.entries if id(entry[1]) in kept_ids),
+                                      maxlen=inbox.entries.maxlen)
+
+    def _evict(self, now: float) -> None:
+        """按数量和时间移除最早的消息，同步更新索引（需持有锁）"""
+        cutoff = now - self.retention_seconds if self.retention_seconds is not None else None
+        while self.messages and (
+                (self.max_messages is not None and len(self.messages) > self.max_messages) or
+                (cutoff is not None and self.messages[0].timestamp < cutoff)):
+            message = self.messages.popleft()
+            # 消息按发布顺序进入各个索引，最早的消息总在索引的最前面
+            self._pop_front(self._by_recipient, message.recipient_id)
+            if message.related_task_id is not None:
+                self._pop_front(self._by_task, message.related_task_id)
+            self.stats["evicted"] += 1
+
+    @staticmethod
+    def _pop_front(index: Dict[Any, deque], key: Any) -> None:
+        entries = index.get(key)
+        if entries:
+            entries.popleft()
+            if not entries:
+                del index[key]
+
+    @staticmethod
+    def _since(entries: Iterable[Tuple[int, Message]], since_timestamp: Optional[float]) -> List[Tuple[int, Message]]:
+        """返回时间戳之后的索引项；新消息在尾部，从后往前扫描"""
+        if since_timestamp is None:
+            return list(entries)
+        recent = []
+        for entry in reversed(entries):
+            if entry[1].timestamp <= since_timestamp:
+                break
+            recent.append(entry)
+        recent.reverse()
+        return recent
+
+    @staticmethod
+    def _wake(waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]) -> None:
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    @staticmethod
+    def _notify(inbox: _Inbox, message: Message) -> None:
+        try:
+            if inbox.loop is not None:
+                asyncio.run_coroutine_threadsafe(inbox.callback(message), inbox.loop)
+            else:
+                inbox.callback(message)
+        except Exception as e:
+            logger.error(f"消息回调出错: {e}")
@@ -31,20 +31,33 @@ class ResultAggregator:
     def aggregate(self, 
                   main_task_description: str, 
                   subtask_results: List[Dict[str, Any]], 
-                  max_output_size: Optional[int] = None) -> Dict[str, Any]:
+                  max_output_size: Optional[int] = None,
+                  missing_subtasks: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         汇总子任务结果
         
+        也可以只汇总部分结果：截止时间到达或部分子任务失败时，已完成的结果照常聚合，
+        未完成的子任务通过 missing_subtasks 告知协调者，结果中标记为部分结果。
+        
         Args:
             main_task_description: 主任务描述
-            subtask_results: 子任务结果列表，每个元素包含任务描述和结果
+            subtask_results: 已完成的子任务结果列表，每个元素包含任务描述和结果
             max_output_size: 最大输出大小（字符数）
+            missing_subtasks: 未完成的子任务列表，每个元素包含任务描述和原因
             
         Returns:
             聚合后的结果
         """
+        if not subtask_results:
+            return {
+                "final_result": "无法完成任务，所有子任务都未能成功完成。",
+                "team_contributions": [],
+                "partial": True,
+                "missing_subtasks": missing_subtasks or []
+            }
+        
         # 创建聚合提示
-        prompt = self._create_aggregation_prompt(main_task_description, subtask_results)
+        prompt = self._create_aggregation_prompt(main_task_description, subtask_results, missing_subtasks)
         
         # 调用协调者进行结果聚合
         logger.info(f"使用协调者聚合来自 {len(subtask_results)} 个子任务的结果")
@@ -52,6 +65,9 @@ class ResultAggregator:
         
         # 解析和格式化聚合结果
         aggregated_result = self._format_aggregation_result(response, subtask_results)
+        if missing_subtasks:
+            aggregated_result["partial"] = True
+            aggregated_result["missing_subtasks"] = missing_subtasks
         
         # 如果设置了最大输出大小，进行截断
         if max_output_size and isinstance(aggregated_result.get("final_result"), str):
@@ -70,7 +86,10 @@ class ResultAggregator:
         
         return aggregated_result
     
-    def _create_aggregation_prompt(self, main_task_description: str, subtask_results: List[Dict[str, Any]]) -> str:
+    def _create_aggregation_prompt(self,
+                                   main_task_description: str,
+                                   subtask_results: List[Dict[str, Any]],
+                                   missing_subtasks: Optional[List[Dict[str, Any]]] = None) -> str:
         """创建聚合提示"""
         # 格式化子任务结果
         subtasks_content = ""
@@ -83,6 +102,11 @@ class ResultAggregator:
             subtasks_content += f"执行者: {agent_name}\n"
             subtasks_content += f"结果:\n{task_result}\n"
         
+        if missing_subtasks:
+            subtasks_content += "\n以下子任务未能完成，请基于已有结果作答，并说明缺少的部分:\n"
+            for missing in missing_subtasks:
+                subtasks_content += f"- {missing.get('task_description', '未提供描述')}（{missing.get('reason', '未完成')}）\n"
+        
         return f"""作为一个任务协调者，你需要将多个子任务的结果整合为一个连贯、全面的最终结果。
 
 主任务:
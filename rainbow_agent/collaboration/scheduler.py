@@ -0,0 +1,249 @@
+"""
+子任务调度器
+
+按依赖关系（DAG）并发执行子任务：
+- 没有未完成依赖的子任务立即提交到线程池
+- 每个代理同时执行的子任务数受限，超出的子任务等待该代理空闲
+- 全局截止时间到达后不再等待，未完成的子任务标记为超时
+- 结果按完成顺序逐个返回，调用方可以边执行边汇总
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import time
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SubtaskOutcome:
+    """
+    子任务的执行结果
+    """
+
+    COMPLETED = "completed"  # 已完成
+    FAILED = "failed"        # 执行出错
+    SKIPPED = "skipped"      # 依赖的子任务未完成，跳过
+    TIMEOUT = "timeout"      # 截止时间前未完成
+
+    def __init__(self,
+                 subtask_id: Any,
+                 status: str,
+                 result: Any = None,
+                 error: Optional[str] = None,
+                 started_at: Optional[float] = None,
+                 finished_at: Optional[float] = None):
+        """
+        初始化执行结果
+
+        Args:
+            subtask_id: 子任务ID
+            status: 执行状态
+            result: 子任务结果
+            error: 错误信息
+            started_at: 开始时间
+            finished_at: 结束时间
+        """
+        self.subtask_id = subtask_id
+        self.status = status
+        self.result = result
+        self.error = error
+        self.started_at = started_at
+        self.finished_at = finished_at
+
+    @property
+    def ok(self) -> bool:
+        """是否成功完成"""
+        return self.status == self.COMPLETED
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        """执行耗时（秒）"""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为字典表示
+
+        Returns:
+            执行结果的字典表示
+        """
+        return {
+            "subtask_id": self.subtask_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "elapsed": self.elapsed
+        }
+
+
+class SubtaskScheduler:
+    """
+    子任务调度器
+
+    子任务以字典描述：``id`` 为子任务ID，``agent`` 为执行代理的标识（用于并发限制，
+    为None时不限制），``depends_on`` 为依赖的子任务ID列表。
+    """
+
+    def __init__(self, max_workers: int = 4, max_concurrency_per_agent: int = 1):
+        """
+        初始化调度器
+
+        Args:
+            max_workers: 同时执行的最大子任务数
+            max_concurrency_per_agent: 每个代理同时执行的最大子任务数
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_concurrency_per_agent = max(1, max_concurrency_per_agent)
+        self.peak_concurrency = 0
+
+    @staticmethod
+    def _validate(subtasks: List[Dict[str, Any]]) -> Dict[Any, List[Any]]:
+        """检查依赖关系，返回 子任务ID -> 依赖列表；存在未知依赖或环时抛出ValueError"""
+        dependencies = {subtask["id"]: list(subtask.get("depends_on") or []) for subtask in subtasks}
+        if len(dependencies) != len(subtasks):
+            raise ValueError("子任务ID重复")
+
+        for subtask_id, depends_on in dependencies.items():
+            for dependency in depends_on:
+                if dependency not in dependencies:
+                    raise ValueError(f"子任务 {subtask_id} 依赖未知的子任务 {dependency}")
+
+        # Kahn算法检测环
+        remaining = {subtask_id: len(set(depends_on)) for subtask_id, depends_on in dependencies.items()}
+        dependents: Dict[Any, List[Any]] = {subtask_id: [] for subtask_id in dependencies}
+        for subtask_id, depends_on in dependencies.items():
+            for dependency in set(depends_on):
+                dependents[dependency].append(subtask_id)
+        queue = deque(subtask_id for subtask_id, count in remaining.items() if count == 0)
+        visited = 0
+        while queue:
+            subtask_id = queue.popleft()
+            visited += 1
+            for dependent in dependents[subtask_id]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    queue.append(dependent)
+        if visited != len(dependencies):
+            raise ValueError("子任务依赖关系中存在环")
+        return dependencies
+
+    def run(self,
+            subtasks: List[Dict[str, Any]],
+            execute: Callable[[Dict[str, Any], Dict[Any, Any]], Any],
+            deadline: Optional[float] = None,
+            on_start: Optional[Callable[[Dict[str, Any]], None]] = None) -> Iterator[SubtaskOutcome]:
+        """
+        执行子任务，按完成顺序返回结果
+
+        ``execute`` 在线程池中执行；``on_start`` 和迭代本身都在调用方线程中进行，
+        因此调用方可以在循环中安全地更新自身状态。截止时间到达后仍在运行的
+        子任务无法被中断，它们的结果会被丢弃。
+
+        Args:
+            subtasks: 子任务列表
+            execute: 执行函数，参数为子任务和 依赖ID -> 依赖结果
+            deadline: 截止时间（time.time() 时间戳），为None时不限制
+            on_start: 子任务提交执行时的回调
+
+        Yields:
+            SubtaskOutcome，每个子任务恰好一个
+        """
+        dependencies = self._validate(subtasks)
+        specs = {subtask["id"]: subtask for subtask in subtasks}
+        waiting = {subtask_id: set(depends_on) for subtask_id, depends_on in dependencies.items()}
+        dependents: Dict[Any, List[Any]] = {subtask_id: [] for subtask_id in specs}
+        for subtask_id, depends_on in dependencies.items():
+            for dependency in set(depends_on):
+                dependents[dependency].append(subtask_id)
+
+        ready = deque(subtask["id"] for subtask in subtasks if not waiting[subtask["id"]])
+        for subtask_id in ready:
+            del waiting[subtask_id]
+        running: Dict[Future, Any] = {}
+        started: Dict[Any, float] = {}
+        agent_load: Counter = Counter()
+        results: Dict[Any, Any] = {}
+        self.peak_concurrency = 0
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(specs) or 1),
+                                      thread_name_prefix="subtask")
+        try:
+            while ready or running:
+                # 提交所有可以执行的子任务
+                deferred = deque()
+                while ready:
+                    subtask_id = ready.popleft()
+                    agent = specs[subtask_id].get("agent")
+                    if len(running) >= self.max_workers or \
+                            (agent is not None and agent_load[agent] >= self.max_concurrency_per_agent):
+                        deferred.append(subtask_id)
+                        continue
+
+                    spec = specs[subtask_id]
+                    if on_start:
+                        on_start(spec)
+                    dependency_results = {dependency: results[dependency] for dependency in dependencies[subtask_id]}
+                    started[subtask_id] = time.time()
+                    running[executor.submit(execute, spec, dependency_results)] = subtask_id
+                    if agent is not None:
+                        agent_load[agent] += 1
+                ready = deferred
+                self.peak_concurrency = max(self.peak_concurrency, len(running))
+
+                timeout = None if deadline is None else deadline - time.time()
+                if timeout is not None and timeout <= 0:
+                    break
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+
+                for future in done:
+                    subtask_id = running.pop(future)
+                    agent = specs[subtask_id].get("agent")
+                    if agent is not None:
+                        agent_load[agent] -= 1
+
+                    error = future.exception()
+                    if error is None:
+                        results[subtask_id] = future.result()
+                        yield SubtaskOutcome(subtask_id, SubtaskOutcome.COMPLETED, results[subtask_id],
+                                             started_at=started[subtask_id], finished_at=time.time())
+                        for dependent in dependents[subtask_id]:
+                            pending = waiting.get(dependent)
+                            if pending is None:
+                                continue
+                            pending.discard(subtask_id)
+                            if not pending:
+                                del waiting[dependent]
+                                ready.append(dependent)
+                    else:
+                        logger.error(f"子任务 {subtask_id} 执行失败: {error}")
+                        yield SubtaskOutcome(subtask_id, SubtaskOutcome.FAILED, error=str(error),
+                                             started_at=started[subtask_id], finished_at=time.time())
+                        yield from self._skip_dependents(subtask_id, dependents, waiting)
+
+            # 截止时间已到：未完成的子任务标记为超时
+            unfinished = list(running.values()) + list(ready) + list(waiting)
+            if unfinished:
+                logger.warning(f"到达截止时间，{len(unfinished)} 个子任务未完成")
+            for subtask_id in unfinished:
+                yield SubtaskOutcome(subtask_id, SubtaskOutcome.TIMEOUT, error="执行超时",
+                                     started_at=started.get(subtask_id))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _skip_dependents(subtask_id: Any,
+                         dependents: Dict[Any, List[Any]],
+                         waiting: Dict[Any, set]) -> Iterator[SubtaskOutcome]:
+        """跳过（传递地）依赖失败子任务的所有子任务"""
+        queue = deque([subtask_id])
+        while queue:
+            for dependent in dependents[queue.popleft()]:
+                if waiting.pop(dependent, None) is not None:
+                    yield SubtaskOutcome(dependent, SubtaskOutcome.SKIPPED, error=f"依赖的子任务 {subtask_id} 未完成")
+                    queue.append(dependent)
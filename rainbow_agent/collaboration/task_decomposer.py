@@ -75,24 +75,28 @@ class TaskDecomposer:
 请将这个任务分解为2-5个子任务。对于每个子任务，提供:
 1. 子任务描述: 详细说明需要完成什么
 2. 所需技能: 完成这个子任务所需的技能列表
+3. 依赖: 需要先完成的子任务编号列表（从1开始），没有依赖则为空列表
 
 返回格式:
 ```json
 [
   {{
     "description": "子任务1描述",
-    "skills": ["技能1", "技能2"]
+    "skills": ["技能1", "技能2"],
+    "depends_on": []
   }},
   {{
     "description": "子任务2描述",
-    "skills": ["技能3", "技能4"]
+    "skills": ["技能3", "技能4"],
+    "depends_on": [1]
   }}
 ]
 ```
 
 注意:
 - 确保每个子任务都是自包含的，可以由一个专业代理独立完成
-- 子任务应遵循逻辑顺序，前一个任务可能为后一个任务提供输入
+- 子任务应遵循逻辑顺序，只有确实需要其他子任务结果作为输入时才填写依赖
+- 没有依赖关系的子任务会并行执行
 - 技能应该具体且相关，如"数据分析"、"文本处理"、"代码生成"等
 """
     
@@ -189,14 +193,17 @@ class TaskDecomposer:
         return [
             {
                 "description": f"分析任务: 分析并理解以下任务的需求和上下文: '{task_description}'",
-                "skills": ["分析", "理解", "规划"]
+                "skills": ["分析", "理解", "规划"],
+                "depends_on": []
             },
             {
                 "description": f"执行任务: 执行所需的操作来完成任务: '{task_description}'",
-                "skills": ["执行", "问题解决", "创造"]
+                "skills": ["执行", "问题解决", "创造"],
+                "depends_on": [1]
             },
             {
                 "description": f"总结任务结果: 汇总所完成工作并提供结论: '{task_description}'",
-                "skills": ["总结", "写作", "评估"]
+                "skills": ["总结", "写作", "评估"],
+                "depends_on": [2]
             }
         ]
@@ -11,6 +11,7 @@ from enum import Enum
 
 from ..agent import RainbowAgent
 from ..utils.logger import get_logger
+from .scheduler import SubtaskScheduler
 
 logger = get_logger(__name__)
 
@@ -60,6 +61,8 @@ class Task:
         self.completed_at = None
         self.result = None
         self.subtasks = []
+        self.dependencies: List[str] = []  # 需要先完成的同级子任务ID
+        self.abandoned = False  # 超时后不再等待的任务，忽略之后到达的结果
     
     def complete(self, result: Any) -> None:
         """
@@ -68,6 +71,9 @@ class Task:
         Args:
             result: 任务结果
         """
+        if self.abandoned:
+            logger.warning(f"任务 {self.task_id} 已被放弃，忽略迟到的结果")
+            return
         self.status = TaskStatus.COMPLETED
         self.completed_at = time.time()
         self.result = result
@@ -80,11 +86,26 @@ class Task:
         Args:
             reason: 失败原因
         """
+        if self.abandoned:
+            return
         self.status = TaskStatus.FAILED
         self.completed_at = time.time()
         self.result = {"error": reason}
         logger.error(f"任务 {self.task_id} 失败: {reason}")
     
+    def abandon(self, reason: str) -> None:
+        """
+        放弃任务并标记为失败，仍在执行的代理之后返回的结果会被忽略
+        
+        Args:
+            reason: 放弃原因
+        """
+        self.abandoned = True
+        self.status = TaskStatus.FAILED
+        self.completed_at = time.time()
+        self.result = {"error": reason}
+        logger.error(f"任务 {self.task_id} 已放弃: {reason}")
+    
     def to_dict(self) -> Dict[str, Any]:
         """
         转换为字典表示
@@ -102,6 +123,7 @@ class Task:
             "created_at": self.created_at,
             "completed_at": self.completed_at,
             "result": self.result,
+            "dependencies": self.dependencies,
             "subtasks": [subtask.to_dict() for subtask in self.subtasks],
         }
     
@@ -129,6 +151,7 @@ class Task:
         task.created_at = data["created_at"]
         task.completed_at = data.get("completed_at")
         task.result = data.get("result")
+        task.dependencies = data.get("dependencies", [])
         
         # 递归创建子任务
         for subtask_data in data.get("subtasks", []):
@@ -150,6 +173,8 @@ class AgentTeam:
         max_output_size: int = 50000,
         max_execution_time: int = 60,
         max_decomposition_depth: int = 2,
+        max_workers: int = 4,
+        max_concurrency_per_agent: int = 1,
     ):
         """
         初始化代理团队
@@ -160,6 +185,8 @@ class AgentTeam:
             max_output_size: 最大输出大小（字符数）
             max_execution_time: 最大执行时间（秒）
             max_decomposition_depth: 最大任务分解深度
+            max_workers: 同时执行的最大子任务数
+            max_concurrency_per_agent: 每个代理同时执行的最大子任务数
         """
         self.name = name
         
@@ -181,6 +208,7 @@ class AgentTeam:
         self.max_execution_time = max_execution_time
         self.max_decomposition_depth = max_decomposition_depth
         self.start_time = None  # 用于跟踪执行时间
+        self.scheduler = SubtaskScheduler(max_workers=max_workers, max_concurrency_per_agent=max_concurrency_per_agent)
         
         # 任务管理
         self.tasks = {}  # task_id -> Task
@@ -330,9 +358,11 @@ class AgentTeam:
 如果需要分解，请严格使用以下格式:
 子任务1: <简单直接的子任务描述，不超过20个字>
 所需技能: <从这些技能中选择一个: {skills_text}>
+依赖: 无
 
 子任务2: <简单直接的子任务描述，不超过20个字>
 所需技能: <从这些技能中选择一个: {skills_text}>
+依赖: <需要先完成的子任务编号，如 1；不需要其他子任务的结果时填"无"，会与其他子任务并行执行>
 
 重要提示: 如果任务简单，请直接回复"无需分解"。
 """
@@ -363,12 +393,12 @@ class AgentTeam:
             # 使用正则表达式提取子任务和所需技能
             import re
             pattern = r'子任务(\d+)\s*:\s*([^\n]+)\n\s*所需技能\s*:\s*([^\n]+)'
-            matches = re.findall(pattern, response)
+            matches = list(re.finditer(pattern, response))
             
             if not matches:
                 # 尝试其他可能的格式
                 pattern2 = r'(\d+)[\.:)\s]+([^\n]+)\n\s*技能\s*:?\s*([^\n]+)'
-                matches = re.findall(pattern2, response)
+                matches = list(re.finditer(pattern2, response))
             
             if not matches:
                 logger.warning(f"无法从协调者响应中解析子任务，跳过分解")
@@ -379,14 +409,26 @@ class AgentTeam:
                 logger.warning(f"子任务数量过多 ({len(matches)}), 只使用前2个")
                 matches = matches[:2]
             
+            # 子任务编号 -> 子任务ID，用于解析依赖
+            number_to_id = {}
+            
             # 处理每个子任务
-            for match in matches:
+            for index, match in enumerate(matches):
                 # 查看匹配结果是否有三个元素
-                if len(match) >= 3:
-                    _, subtask_desc, skills_text = match
+                if len(match.groups()) >= 3:
+                    number, subtask_desc, skills_text = match.groups()[:3]
                 else:
                     continue  # 跳过格式不匹配的行
                 
+                # 解析到下一个子任务之前的"依赖"行；没有给出依赖时依赖上一个子任务，保持按顺序执行
+                section_end = matches[index + 1].start() if index + 1 < len(matches) else len(response)
+                dependency_match = re.search(r'依赖\s*:\s*([^\n]*)', response[match.end():section_end])
+                if dependency_match:
+                    dependencies = [number_to_id[n] for n in re.findall(r'\d+', dependency_match.group(1))
+                                    if n in number_to_id]
+                else:
+                    dependencies = subtask_ids[-1:]
+                
                 # 清理并更严格限制子任务描述长度
                 subtask_desc = subtask_desc.strip()
                 if len(subtask_desc) > 100:  # 降低字符限制
@@ -429,9 +471,11 @@ class AgentTeam:
                     context={"parent_task": task.description[:100]}
                 )
                 
-                # 更新子任务所需技能
+                # 更新子任务所需技能和依赖
                 subtask = self.tasks[subtask_id]
                 subtask.requires_skills = valid_skills
+                subtask.dependencies = list(dict.fromkeys(dependencies))
+                number_to_id[number] = subtask_id
                 
                 # 将子任务添加到父任务
                 task.subtasks.append(subtask)
@@ -525,6 +569,15 @@ class AgentTeam:
         
         # 标记任务为处理中
         task.status = TaskStatus.PROCESSING
+        
+        # 依赖的子任务都已完成，把它们的结果提供给当前子任务
+        for dependency_id in task.dependencies:
+            dependency = self.tasks.get(dependency_id)
+            if dependency and dependency.status == TaskStatus.COMPLETED:
+                dependency_result = dependency.result
+                if isinstance(dependency_result, dict):
+                    dependency_result = dependency_result.get("final_result", dependency_result)
+                task.context.setdefault("dependency_results", {})[dependency.description] = str(dependency_result)
     
         try:
             # 构建任务提示
@@ -603,6 +656,21 @@ class AgentTeam:
             logger.error(f"执行任务 {task_id} 时出错: {e}")
             task.fail(str(e))
     
+    def _execute_subtask(self, task_id: str) -> None:
+        """
+        供调度器执行子任务，子任务失败时抛出异常，使调度器跳过依赖它的子任务
+        
+        Args:
+            task_id: 要执行的子任务ID
+            
+        Raises:
+            RuntimeError: 子任务执行失败
+        """
+        self._execute_task(task_id)
+        task = self.tasks[task_id]
+        if task.status == TaskStatus.FAILED:
+            raise RuntimeError((task.result or {}).get("error", "子任务执行失败"))
+    
     def _aggregate_results(self, task_id: str) -> Dict[str, Any]:
         """
         聚合子任务结果
@@ -805,15 +873,23 @@ class AgentTeam:
                 logger.warning(f"子任务过多 ({len(subtask_ids)})，只执行前5个")
                 subtask_ids = subtask_ids[:5]
             
-            # 分配和执行所有子任务，每次传递递增的深度值
-            for subtask_id in subtask_ids:
-                # 再次检查执行时间，避免循环中超时
-                if self.start_time is not None and (time.time() - self.start_time) > self.max_execution_time:
-                    logger.warning(f"在执行子任务前检测到超时，跳过子任务处理")
-                    break
-                
-                if self._assign_task(subtask_id):
-                    self._execute_task(subtask_id)
+            # 分配所有子任务后按依赖关系执行，没有依赖关系的子任务并发执行，
+            # 同一代理的子任务受并发上限约束，到达最大执行时间后不再等待未完成的子任务
+            assigned = [subtask_id for subtask_id in subtask_ids if self._assign_task(subtask_id)]
+            scheduled = [
+                {
+                    "id": subtask_id,
+                    "agent": self.tasks[subtask_id].assigned_to,
+                    "depends_on": [dep for dep in self.tasks[subtask_id].dependencies if dep in assigned]
+                }
+                for subtask_id in assigned
+            ]
+            deadline = self.start_time + self.max_execution_time if self.start_time is not None else None
+            for outcome in self.scheduler.run(scheduled, lambda spec, _: self._execute_subtask(spec["id"]), deadline):
+                subtask = self.tasks[outcome.subtask_id]
+                if not outcome.ok and subtask.status != TaskStatus.FAILED:
+                    # 超时的子任务可能仍在执行，放弃后忽略它之后返回的结果；被跳过的子任务也标记为失败
+                    subtask.abandon(outcome.error or "子任务未完成")
             
             # 聚合子任务结果
             result = self._aggregate_results(task_id)
@@ -11,11 +11,11 @@ import json
 import asyncio
 import threading
 from enum import Enum
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from ..agent import RainbowAgent
 from ..agent_updated import RainbowAgent as EnhancedAgent
 from ..utils.logger import get_logger
+from ..utils.runtime import PoolType, get_runtime
 from ..memory.memory import Memory, SimpleMemory
 
 logger = get_logger(__name__)
@@ -246,7 +246,8 @@ class EnhancedAgentTeam:
         
         # 执行状态跟踪
         self.start_time = None
-        self.executor = ThreadPoolExecutor(max_workers=max_parallel_tasks)
+        # 借用共享的LLM线程池，团队内最多同时执行 max_parallel_tasks 个任务
+        self.executor = get_runtime().executor(PoolType.LLM, owner=f"team:{name}", limit=max_parallel_tasks)
         self.task_locks = {}  # 任务ID -> 锁，用于并发控制
         
         logger.info(f"增强型代理团队 '{name}' 已初始化，最大并行任务数: {max_parallel_tasks}")
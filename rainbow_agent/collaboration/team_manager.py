@@ -11,6 +11,7 @@ from ..agent import RainbowAgent
 from .task_decomposer import TaskDecomposer
 from .messaging import MessageBus, Message, MessageType
 from .result_aggregator import ResultAggregator, ConsensusBuilder
+from .scheduler import SubtaskScheduler
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -23,13 +24,21 @@ class TeamManager:
     管理代理团队的协作流程，包括任务分解、分配和结果聚合
     """
     
-    def __init__(self, team_name: str, coordinator: RainbowAgent):
+    def __init__(self,
+                 team_name: str,
+                 coordinator: RainbowAgent,
+                 max_execution_time: Optional[float] = 60,
+                 max_workers: int = 4,
+                 max_concurrency_per_agent: int = 1):
         """
         初始化团队管理器
         
         Args:
             team_name: 团队名称
             coordinator: 协调者代理
+            max_execution_time: 子任务执行的最长时间（秒），为None时不限制
+            max_workers: 同时执行的最大子任务数
+            max_concurrency_per_agent: 每个代理同时执行的最大子任务数
         """
         self.team_name = team_name
         self.coordinator = coordinator
@@ -38,6 +47,8 @@ class TeamManager:
         self.task_decomposer = TaskDecomposer(coordinator)
         self.result_aggregator = ResultAggregator(coordinator)
         self.consensus_builder = ConsensusBuilder(coordinator)
+        self.max_execution_time = max_execution_time
+        self.scheduler = SubtaskScheduler(max_workers=max_workers, max_concurrency_per_agent=max_concurrency_per_agent)
     
     def add_agent(self, agent: RainbowAgent, skills: List[str], agent_id: Optional[str] = None) -> str:
         """
@@ -196,64 +207,75 @@ class TeamManager:
         
         logger.info(f"任务 {task_id} 已分解为 {len(subtasks)} 个子任务")
         
-        # 3. 执行子任务
-        subtask_results = []
-        
+        # 3. 按依赖关系并发执行子任务
+        assignments = []
+        scheduled = []
         for i, subtask in enumerate(subtasks):
-            subtask_desc = subtask["description"]
-            subtask_skills = subtask["skills"]
-            
             # 查找适合的代理
-            suitable_agents = self.find_suitable_agents(subtask_skills)
+            suitable_agents = self.find_suitable_agents(subtask["skills"])
             
             if not suitable_agents:
                 logger.warning(f"子任务 {i+1} 未找到合适的代理，使用协调者")
-                agent = self.coordinator
-                agent_id = "coordinator"
+                assignments.append(("coordinator", self.coordinator))
             else:
-                agent_id = suitable_agents[0]
-                agent = self.agents[agent_id]["agent"]
-            
+                assignments.append((suitable_agents[0], self.agents[suitable_agents[0]]["agent"]))
+            scheduled.append({"id": i, "agent": assignments[i][0], "depends_on": self._dependencies(subtask, i)})
+        
+        def publish_assignment(spec: Dict[str, Any]) -> None:
             # 创建并发布任务分配消息
-            task_msg = Message(
-                content=subtask_desc,
+            agent_id, agent = assignments[spec["id"]]
+            self.message_bus.publish(Message(
+                content=subtasks[spec["id"]]["description"],
                 msg_type=MessageType.TASK_ASSIGNMENT,
                 sender_id="system",
                 recipient_id=agent_id,
                 related_task_id=task_id,
-                metadata={"subtask_index": i}
-            )
-            self.message_bus.publish(task_msg)
-            
-            # 执行子任务
-            logger.info(f"子任务 {i+1} 由代理 '{agent.name}' 执行")
-            subtask_result = agent.run(subtask_desc)
+                metadata={"subtask_index": spec["id"]}
+            ))
+            logger.info(f"子任务 {spec['id']+1} 由代理 '{agent.name}' 执行")
+        
+        def run_subtask(spec: Dict[str, Any], dependency_results: Dict[int, Any]) -> Any:
+            _, agent = assignments[spec["id"]]
+            return agent.run(self._subtask_prompt(subtasks, spec["id"], dependency_results))
+        
+        deadline = start_time + self.max_execution_time if self.max_execution_time else None
+        completed: Dict[int, Dict[str, Any]] = {}
+        missing: Dict[int, Dict[str, Any]] = {}
+        for outcome in self.scheduler.run(scheduled, run_subtask, deadline, on_start=publish_assignment):
+            i = outcome.subtask_id
+            agent_id, agent = assignments[i]
+            if not outcome.ok:
+                missing[i] = {"task_description": subtasks[i]["description"], "reason": outcome.error}
+                continue
             
-            # 记录和发布结果
-            result_msg = Message(
+            # 记录和发布结果，结果按完成顺序到达
+            self.message_bus.publish(Message(
                 content="子任务完成",
                 msg_type=MessageType.TASK_RESULT,
                 sender_id=agent_id,
                 recipient_id="system",
                 related_task_id=task_id,
-                metadata={"result": subtask_result, "subtask_index": i}
-            )
-            self.message_bus.publish(result_msg)
-            
-            # 添加到结果列表
-            subtask_results.append({
-                "task_description": subtask_desc,
+                metadata={"result": outcome.result, "subtask_index": i}
+            ))
+            completed[i] = {
+                "task_description": subtasks[i]["description"],
                 "agent_id": agent_id,
                 "agent_name": agent.name,
-                "result": subtask_result
-            })
+                "result": outcome.result
+            }
+        
+        subtask_results = [completed[i] for i in sorted(completed)]
+        missing_subtasks = [missing[i] for i in sorted(missing)]
+        if missing_subtasks:
+            logger.warning(f"任务 {task_id} 有 {len(missing_subtasks)} 个子任务未完成，聚合部分结果")
         
         # 4. 聚合结果
         logger.info(f"任务 {task_id} 开始聚合结果")
         aggregated_result = self.result_aggregator.aggregate(
             main_task_description=task_description,
             subtask_results=subtask_results,
-            max_output_size=max_output_size
+            max_output_size=max_output_size,
+            missing_subtasks=missing_subtasks or None
         )
         
         execution_time = time.time() - start_time
@@ -266,10 +288,46 @@ class TeamManager:
             "decomposed": True,
             "subtasks": subtasks,
             "subtask_results": subtask_results,
+            "missing_subtasks": missing_subtasks,
             "result": aggregated_result,
             "execution_time": execution_time
         }
     
+    @staticmethod
+    def _dependencies(subtask: Dict[str, Any], index: int) -> List[int]:
+        """
+        解析子任务的依赖（从1开始的子任务编号），只保留排在它前面的子任务，保证无环
+        
+        Args:
+            subtask: 子任务
+            index: 子任务序号（从0开始）
+            
+        Returns:
+            依赖的子任务序号列表（从0开始）
+        """
+        dependencies = []
+        for number in subtask.get("depends_on") or []:
+            try:
+                dependency = int(number) - 1
+            except (TypeError, ValueError):
+                continue
+            if 0 <= dependency < index and dependency not in dependencies:
+                dependencies.append(dependency)
+        return dependencies
+    
+    @staticmethod
+    def _subtask_prompt(subtasks: List[Dict[str, Any]], index: int, dependency_results: Dict[int, Any]) -> str:
+        """构建子任务提示，附带依赖的子任务结果"""
+        description = subtasks[index]["description"]
+        if not dependency_results:
+            return description
+        
+        inputs = "\n".join(
+            f"- {subtasks[i]['description']}: {str(dependency_results[i])[:500]}"
+            for i in sorted(dependency_results)
+        )
+        return f"{description}\n\n前置子任务结果:\n{inputs}"
+    
     def build_team_consensus(self, question: str) -> Dict[str, Any]:
         """
         构建团队共识
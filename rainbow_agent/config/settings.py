@@ -51,6 +51,9 @@ class Settings:
                 "timeout": 60,  # 请求超时时间（秒）
                 "proxy": None,  # HTTP代理
                 "max_retries": 3,  # 最大重试次数
+                "max_connections": 32,  # 共享连接池最大连接数
+                "model_concurrency": 8,  # 每个模型同时进行的最大请求数
+                "coalesce_requests": True,  # 合并参数相同的并发请求
             },
             
             # LLM设置
@@ -60,6 +63,21 @@ class Settings:
                 "max_tokens": 2000,
             },
             
+            # 上下文打包设置
+            "context": {
+                "max_tokens": 3000,  # 提示词的token预算
+                "recent_turns": 10,  # 完整保留的最近轮次数
+                "summary_tokens": 300,  # 滚动摘要的最大token数
+            },
+            
+            # 共享执行运行时设置
+            "runtime": {
+                "llm_workers": 32,  # LLM和网络I/O线程数
+                "tool_workers": 32,  # 工具执行线程数，内置工具多为网络I/O
+                "io_workers": 16,  # 阻塞的文件/数据库I/O线程数
+                "owner_concurrency": None,  # 每个代理/租户默认的最大并发任务数，None表示不限制
+            },
+
             # 记忆系统设置
             "memory": {
                 "type": "simple",  # 'simple' 或 'sqlite'
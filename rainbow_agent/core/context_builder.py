@@ -5,6 +5,7 @@ from datetime import datetime
 
 from ..memory.memory import Memory
 from ..utils.logger import get_logger
+from .context_packer import ContextPacker, history_items
 
 logger = get_logger(__name__)
 
@@ -13,7 +14,8 @@ class ContextBuilder:
     上下文构建器，负责构建LLM所需的上下文
     """
     
-    def __init__(self, memory: Memory, max_context_items: int = 10, max_history_turns: int = 10):
+    def __init__(self, memory: Memory, max_context_items: int = 10, max_history_turns: int = 10,
+                 context_packer: Optional[ContextPacker] = None):
         """
         初始化上下文构建器
         
@@ -21,10 +23,12 @@ class ContextBuilder:
             memory: 记忆系统
             max_context_items: 最大上下文项数量
             max_history_turns: 最大历史轮次数量
+            context_packer: 上下文打包器，提供时消息列表按token预算打包
         """
         self.memory = memory
         self.max_context_items = max_context_items
         self.max_history_turns = max_history_turns
+        self.context_packer = context_packer
         
     async def build_async(self, user_input: str, session_id: str, user_id: str, input_type: str = "text") -> Dict[str, Any]:
         """
@@ -52,6 +56,10 @@ class ContextBuilder:
         # 确定关系阶段
         relationship_stage = self._determine_relationship_stage(user_info)
         
+        messages, context_tokens = self._pack_messages(
+            session_id, user_input, relevant_memories, conversation_history, user_info, relationship_stage
+        )
+        
         # 构建上下文字典
         context = {
             "user_input": user_input,
@@ -63,8 +71,10 @@ class ContextBuilder:
             "conversation_history": conversation_history,
             "user_info": user_info,
             "relationship_stage": relationship_stage,
-            "messages": self._format_as_messages(user_input, relevant_memories, conversation_history, user_info, relationship_stage)
+            "messages": messages
         }
+        if context_tokens:
+            context["context_tokens"] = context_tokens
         
         logger.info(f"上下文构建完成，包含 {len(relevant_memories)} 条相关记忆，{len(conversation_history)} 轮对话历史")
         return context
@@ -83,13 +93,17 @@ class ContextBuilder:
         # 获取相关记忆
         relevant_memories = self.memory.retrieve(user_input, limit=self.max_context_items)
         
+        messages, context_tokens = self._pack_messages(None, user_input, relevant_memories)
+        
         # 构建上下文字典
         context = {
             "user_input": user_input,
             "input_type": input_type,
             "relevant_memories": relevant_memories,
-            "messages": self._format_as_messages(user_input, relevant_memories)
+            "messages": messages
         }
+        if context_tokens:
+            context["context_tokens"] = context_tokens
         
         logger.info(f"上下文构建完成，包含 {len(relevant_memories)} 条相关记忆")
         return context
@@ -230,6 +244,38 @@ class ContextBuilder:
         else:
             return "close"
     
+    def _pack_messages(self, session_id: Optional[str], user_input: str, memories: List[str],
+                       conversation_history: List[Dict[str, Any]] = None,
+                       user_info: Dict[str, Any] = None,
+                       relationship_stage: str = None) -> Tuple[List[Dict[str, str]], Optional[Dict[str, Any]]]:
+        """
+        构建消息列表，配置了上下文打包器时按token预算打包
+        
+        Returns:
+            (消息列表, 各部分的token数，未配置打包器时为None)
+        """
+        if not self.context_packer:
+            return self._format_as_messages(user_input, memories, conversation_history, user_info, relationship_stage), None
+        
+        return self.context_packer.pack(
+            session_id,
+            [{"role": "system", "content": self._system_content(user_info, relationship_stage)}],
+            history_items(conversation_history or []),
+            {"role": "user", "content": user_input},
+            memories
+        )
+    
+    def _system_content(self, user_info: Dict[str, Any] = None, relationship_stage: str = None) -> str:
+        """构建系统消息内容"""
+        system_content = "你是Rainbow Agent，一个智能助手。请根据提供的上下文和用户输入提供有帮助的回答。"
+        
+        # 添加用户信息和关系阶段
+        if user_info and relationship_stage:
+            user_name = user_info.get("name", "用户")
+            interaction_count = user_info.get("interaction_count", 0)
+            system_content += f"\n\n当前用户: {user_name}\n互动次数: {interaction_count}\n关系阶段: {relationship_stage}"
+        return system_content
+    
     def _format_as_messages(self, user_input: str, memories: List[str], 
                            conversation_history: List[Dict[str, Any]] = None,
                            user_info: Dict[str, Any] = None,
@@ -250,17 +296,9 @@ class ContextBuilder:
         messages = []
         
         # 添加系统消息
-        system_content = "你是Rainbow Agent，一个智能助手。请根据提供的上下文和用户输入提供有帮助的回答。"
-        
-        # 添加用户信息和关系阶段
-        if user_info and relationship_stage:
-            user_name = user_info.get("name", "用户")
-            interaction_count = user_info.get("interaction_count", 0)
-            system_content += f"\n\n当前用户: {user_name}\n互动次数: {interaction_count}\n关系阶段: {relationship_stage}"
-        
         messages.append({
             "role": "system",
-            "content": system_content
+            "content": self._system_content(user_info, relationship_stage)
         })
         
         # 添加记忆相关信息
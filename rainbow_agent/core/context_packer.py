@@ -0,0 +1,359 @@
+"""
+上下文打包模块
+
+按token预算组装发送给LLM的消息列表：系统消息和当前输入、最近的对话轮次、
+会话的滚动摘要和相关记忆。超出最近窗口的轮次被压缩成滚动摘要中的一行。
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from collections import OrderedDict, deque
+import threading
+
+from ..utils.logger import get_logger
+from ..utils.tokens import MESSAGE_OVERHEAD, REPLY_OVERHEAD, TokenCounter
+
+logger = get_logger(__name__)
+
+# 对话历史项：(原始轮次, 格式化后的消息)
+HistoryItem = Tuple[Dict[str, Any], Dict[str, str]]
+
+MEMORY_HEADER = "以下是与当前查询相关的信息:\n\n"
+SUMMARY_HEADER = "此前对话摘要:\n"
+ROLE_LABELS = {"user": "用户", "assistant": "AI", "system": "系统"}
+
+
+def turn_message(turn: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """
+    将对话轮次转换为消息，空内容或未知角色返回None
+
+    Args:
+        turn: 对话轮次
+
+    Returns:
+        消息字典
+    """
+    content = turn.get("content", "")
+    if not content:
+        return None
+    role = turn.get("role", "")
+    if role == "human":
+        return {"role": "user", "content": content}
+    if role == "ai":
+        return {"role": "assistant", "content": content}
+    return None
+
+
+def history_items(turns: Iterable[Dict[str, Any]],
+                  format_turn: Callable[[Dict[str, Any]], Optional[Dict[str, str]]] = turn_message) -> List[HistoryItem]:
+    """
+    将对话轮次转换为打包器使用的历史项
+
+    Args:
+        turns: 对话轮次，按时间从旧到新
+        format_turn: 轮次到消息的转换函数，返回None的轮次被忽略
+
+    Returns:
+        历史项列表
+    """
+    items = []
+    for turn in turns:
+        message = format_turn(turn)
+        if message:
+            items.append((turn, message))
+    return items
+
+
+class _SessionSummary:
+    """会话的滚动摘要：移出最近窗口的轮次被压缩为一行追加到摘要中"""
+
+    def __init__(self, max_lines: int):
+        self.lines: deque = deque(maxlen=max_lines)
+        self.folded: "OrderedDict[Any, None]" = OrderedDict()
+        self.window: List[Tuple[Any, Dict[str, str]]] = []
+        self.max_keys = max_lines * 4
+
+    def fold(self, key: Any, message: Dict[str, str], line_chars: int) -> None:
+        if key in self.folded:
+            return
+        self.folded[key] = None
+        if len(self.folded) > self.max_keys:
+            self.folded.popitem(last=False)
+
+        content = " ".join(message.get("content", "").split())
+        if len(content) > line_chars:
+            content = content[:line_chars] + "…"
+        self.lines.append(f"{ROLE_LABELS.get(message.get('role'), message.get('role'))}: {content}")
+
+
+class ContextPacker:
+    """
+    按token预算打包LLM上下文
+
+    上下文由以下部分组成，按优先级依次分配预算：
+    1. 系统消息和当前输入（必选）
+    2. 最近 recent_turns 轮对话，从最新的一轮开始保留
+    3. 会话的滚动摘要（不超过 summary_tokens）
+    4. 相关记忆，按得分从高到低填满剩余预算
+
+    较早的轮次不再逐条进入上下文，而是在移出最近窗口时压缩进该会话的滚动摘要。
+    摘要是有损的：每轮只保留一行“角色: 内容”，内容合并空白后截断到
+    summary_line_chars 个字符（默认80）并以“…”结尾，超出部分不会再进入上下文；
+    摘要超过 summary_tokens 或剩余预算时只保留最新的行。
+    每次打包返回各部分的token数，同时累计到 stats 中。
+    """
+
+    def __init__(self,
+                 max_tokens: int = 3000,
+                 recent_turns: int = 10,
+                 summary_tokens: int = 300,
+                 seed_turns: int = 100,
+                 model: str = "gpt-3.5-turbo",
+                 counter: Optional[TokenCounter] = None,
+                 max_sessions: int = 1000,
+                 summary_line_chars: int = 80):
+        """
+        初始化上下文打包器
+
+        Args:
+            max_tokens: 提示词的token预算
+            recent_turns: 完整保留的最近轮次数
+            summary_tokens: 滚动摘要的最大token数
+            seed_turns: 打包器尚未见过的会话首次读取的历史轮次数，用于建立摘要
+            model: 模型名称，用于选择分词器
+            counter: token计数器，默认按模型创建
+            max_sessions: 保留滚动摘要的最大会话数
+            summary_line_chars: 摘要中每轮保留的最大字符数
+        """
+        self.max_tokens = max_tokens
+        self.recent_turns = max(1, recent_turns)
+        self.summary_tokens = summary_tokens
+        self.seed_turns = max(seed_turns, self.recent_turns)
+        self.counter = counter or TokenCounter(model)
+        self.max_sessions = max_sessions
+        self.summary_line_chars = summary_line_chars
+
+        self._sessions: "OrderedDict[str, _SessionSummary]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "prompt_tokens": 0,
+            "max_prompt_tokens": 0,
+            "turns_dropped": 0,
+            "memories_dropped": 0
+        }
+
+    def history_limit(self, session_id: Optional[str]) -> int:
+        """
+        获取本次请求需要读取的历史轮次数
+
+        已有摘要的会话只需要读取最近窗口（外加上一次请求新增的轮次和当前输入），
+        新会话读取 seed_turns 轮用于建立摘要。
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            历史轮次数
+        """
+        with self._lock:
+            known = session_id in self._sessions
+        return self.recent_turns + 3 if known else self.seed_turns
+
+    def pack(self,
+             session_id: Optional[str],
+             system_messages: List[Dict[str, str]],
+             history: List[HistoryItem],
+             user_message: Dict[str, str],
+             memories: Optional[List[Union[str, Dict[str, Any]]]] = None,
+             max_tokens: Optional[int] = None) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        在token预算内打包消息列表
+
+        Args:
+            session_id: 会话ID，为None时不维护滚动摘要
+            system_messages: 开头的系统消息（必选）
+            history: 对话历史项，按时间从旧到新
+            user_message: 当前输入消息（必选）
+            memories: 相关记忆，字符串或带 content/score 字段的字典
+            max_tokens: 本次请求的token预算，默认使用 max_tokens
+
+        Returns:
+            (消息列表, 各部分的token数)
+        """
+        budget = max_tokens or self.max_tokens
+        count = self.counter.count
+
+        system_tokens = sum(self.counter.count_message(m) for m in system_messages)
+        input_tokens = self.counter.count_message(user_message)
+        remaining = budget - system_tokens - input_tokens - REPLY_OVERHEAD
+
+        recent = history[-self.recent_turns:]
+        summary_text, summarized = self._summary(session_id, recent, history[:-self.recent_turns])
+
+        # 最近轮次：从最新的一轮开始保留，保持连续
+        included: List[Dict[str, str]] = []
+        history_tokens = 0
+        for _, message in reversed(recent):
+            tokens = self.counter.count_message(message)
+            if tokens > remaining:
+                break
+            included.append(message)
+            history_tokens += tokens
+            remaining -= tokens
+        included.reverse()
+
+        # 滚动摘要：保留最新的摘要行
+        summary_message = None
+        summary_tokens = 0
+        if summary_text and remaining > MESSAGE_OVERHEAD:
+            limit = min(self.summary_tokens, remaining - MESSAGE_OVERHEAD)
+            content = self._fit_summary(summary_text, limit)
+            if content:
+                summary_message = {"role": "system", "content": content}
+                summary_tokens = self.counter.count_message(summary_message)
+                remaining -= summary_tokens
+
+        # 相关记忆：按得分从高到低填满剩余预算
+        selected: List[str] = []
+        memory_tokens = 0
+        ranked = self._rank_memories(memories or [])
+        if ranked:
+            available = remaining - MESSAGE_OVERHEAD - count(MEMORY_HEADER)
+            for text in ranked:
+                # 每条记忆之间有一个分隔符
+                tokens = count(text) + 1
+                if tokens <= available:
+                    selected.append(text)
+                    available -= tokens
+            if selected:
+                memory_message = {"role": "system", "content": MEMORY_HEADER + "\n\n".join(selected)}
+                memory_tokens = self.counter.count_message(memory_message)
+
+        messages = list(system_messages)
+        if selected:
+            messages.append(memory_message)
+        if summary_message:
+            messages.append(summary_message)
+        messages.extend(included)
+        messages.append(user_message)
+
+        token_stats = {
+            "budget": budget,
+            "total": self.counter.count_messages(messages),
+            "system": system_tokens,
+            "summary": summary_tokens,
+            "history": history_tokens,
+            "memories": memory_tokens,
+            "input": input_tokens,
+            "turns_included": len(included),
+            "turns_dropped": len(recent) - len(included),
+            "turns_summarized": summarized,
+            "memories_included": len(selected),
+            "memories_dropped": len(ranked) - len(selected),
+            "exact": self.counter.exact
+        }
+        self._record(token_stats)
+        logger.debug(f"上下文打包完成: {token_stats['total']}/{budget} tokens，"
+                     f"{len(included)} 轮历史，{len(selected)} 条记忆")
+        return messages, token_stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取累计统计信息
+
+        Returns:
+            请求数、提示词token总数、平均值和最大值、丢弃的轮次数和记忆数，以及token计数缓存命中情况
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["sessions"] = len(self._sessions)
+        stats["avg_prompt_tokens"] = stats["prompt_tokens"] / stats["requests"] if stats["requests"] else 0
+        stats["counter_hits"] = self.counter.hits
+        stats["counter_misses"] = self.counter.misses
+        return stats
+
+    def forget(self, session_id: str) -> None:
+        """删除会话的滚动摘要"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _record(self, token_stats: Dict[str, Any]) -> None:
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += token_stats["total"]
+            self.stats["max_prompt_tokens"] = max(self.stats["max_prompt_tokens"], token_stats["total"])
+            self.stats["turns_dropped"] += token_stats["turns_dropped"]
+            self.stats["memories_dropped"] += token_stats["memories_dropped"]
+
+    @staticmethod
+    def _turn_key(turn: Dict[str, Any], message: Dict[str, str]) -> Any:
+        return turn.get("id") or (message.get("role"), message.get("content"))
+
+    def _summary(self,
+                 session_id: Optional[str],
+                 recent: List[HistoryItem],
+                 older: List[HistoryItem]) -> Tuple[str, int]:
+        """
+        更新会话的滚动摘要
+
+        早于最近窗口的轮次，以及上一次请求的窗口中本次已不再出现的轮次，
+        被压缩进摘要。
+
+        Returns:
+            (摘要文本, 已压缩的轮次数)
+        """
+        with self._lock:
+            if session_id is None:
+                state = _SessionSummary(max_lines=len(older) or 1)
+            else:
+                state = self._sessions.get(session_id)
+                if state is None:
+                    state = _SessionSummary(max_lines=self.seed_turns)
+                    self._sessions[session_id] = state
+                    if len(self._sessions) > self.max_sessions:
+                        self._sessions.popitem(last=False)
+                else:
+                    self._sessions.move_to_end(session_id)
+
+            window = [(self._turn_key(turn, message), message) for turn, message in recent]
+            current = {key for key, _ in window}
+            present = current | {self._turn_key(turn, message) for turn, message in older}
+
+            for key, message in state.window:
+                if key not in present:
+                    state.fold(key, message, self.summary_line_chars)
+            for turn, message in older:
+                state.fold(self._turn_key(turn, message), message, self.summary_line_chars)
+            state.window = window
+
+            return "\n".join(state.lines), len(state.folded)
+
+    def _fit_summary(self, summary_text: str, max_tokens: int) -> str:
+        """保留不超过 max_tokens 的最新摘要行"""
+        lines = summary_text.split("\n")
+        kept: List[str] = []
+        used = self.counter.count(SUMMARY_HEADER)
+        for line in reversed(lines):
+            tokens = self.counter.count(line) + 1
+            if used + tokens > max_tokens:
+                break
+            kept.append(line)
+            used += tokens
+        if not kept:
+            return ""
+        kept.reverse()
+        return SUMMARY_HEADER + "\n".join(kept)
+
+    @staticmethod
+    def _rank_memories(memories: List[Union[str, Dict[str, Any]]]) -> List[str]:
+        """按得分从高到低排序记忆；没有得分的记忆保持检索顺序"""
+        scored = []
+        for index, memory in enumerate(memories):
+            if isinstance(memory, dict):
+                text = memory.get("content") or memory.get("text") or str(memory)
+                score = memory.get("score", memory.get("relevance", memory.get("importance")))
+            else:
+                text, score = str(memory), None
+            if text:
+                scored.append((-(score if isinstance(score, (int, float)) else 0.0), index, text))
+        scored.sort()
+        return [text for _, _, text in scored]
@@ -13,12 +13,15 @@
 import logging
 import uuid
 import asyncio
-from typing import Dict, List, Any, Optional, Tuple, Union
+import inspect
+from typing import Dict, List, Any, Optional, Tuple, Union, AsyncIterator
 from datetime import datetime
 
 from rainbow_agent.ai.openai_service import OpenAIService
 from rainbow_agent.storage.unified_dialogue_storage import UnifiedDialogueStorage
 from rainbow_agent.core.context_builder import ContextBuilder
+from rainbow_agent.core.context_packer import ContextPacker, history_items
+from rainbow_agent.config.settings import get_settings
 from rainbow_agent.memory.memory import Memory
 from rainbow_agent.frequency.frequency_integrator import FrequencyIntegrator
 from rainbow_agent.frequency.frequency_sense_core import FrequencySenseCore
@@ -48,7 +51,8 @@ class DialogueManager:
                  storage: Optional[UnifiedDialogueStorage] = None,
                  ai_service: Optional[OpenAIService] = None,
                  memory: Optional[Memory] = None,
-                 frequency_integrator: Optional[FrequencyIntegrator] = None):
+                 frequency_integrator: Optional[FrequencyIntegrator] = None,
+                 context_packer: Optional[ContextPacker] = None):
         """初始化对话管理器
         
         Args:
@@ -56,14 +60,26 @@ class DialogueManager:
             ai_service: AI服务实例，如果不提供则创建新实例
             memory: 记忆系统实例，如果不提供则为None
             frequency_integrator: 频率集成器实例，如果不提供则创建新实例
+            context_packer: 上下文打包器，如果不提供则按配置创建
         """
         # 初始化组件
         self.storage = storage or UnifiedDialogueStorage()
         self.ai_service = ai_service or OpenAIService()
         self.memory = memory
         
+        # 初始化上下文打包器，所有对话类型的提示词都在token预算内打包
+        if context_packer is None:
+            settings = get_settings()
+            context_packer = ContextPacker(
+                max_tokens=settings.get("context.max_tokens", 3000),
+                recent_turns=settings.get("context.recent_turns", 10),
+                summary_tokens=settings.get("context.summary_tokens", 300),
+                model=settings.get("llm.model", "gpt-3.5-turbo")
+            )
+        self.context_packer = context_packer
+        
         # 初始化上下文构建器
-        self.context_builder = ContextBuilder(memory=self.memory) if self.memory else None
+        self.context_builder = ContextBuilder(memory=self.memory, context_packer=self.context_packer) if self.memory else None
         
         # 初始化频率感知系统
         if frequency_integrator:
@@ -161,7 +177,8 @@ class DialogueManager:
                            user_id: str, 
                            content: str,
                            input_type: str = "text",
-                           metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+                           metadata: Optional[Dict[str, Any]] = None,
+                           stream: bool = False) -> Union[Dict[str, Any], AsyncIterator[Dict[str, Any]]]:
         """处理用户输入并生成响应
         
         Args:
@@ -170,72 +187,175 @@ class DialogueManager:
             content: 用户输入内容
             input_type: 输入类型，如text、image等
             metadata: 附加元数据
+            stream: 是否以流的形式返回响应
             
         Returns:
-            处理结果，包含AI响应
+            处理结果，包含AI响应；stream为True时返回 process_input_stream 的事件流
         """
+        if stream:
+            return self.process_input_stream(session_id, user_id, content, input_type, metadata)
+        
         try:
-            # 确保session_id是字符串类型
-            str_session_id = session_id
-            if isinstance(session_id, dict):
-                str_session_id = session_id.get('id', str(session_id))
-                logger.info(f"Extracted session_id from dictionary in process_input: {str_session_id}")
-            
-            # 1. 创建用户轮次
-            user_turn = await self.create_turn(str_session_id, "human", content, metadata)
-            
-            # 2. 获取会话历史
-            session_info = await self.storage.get_session_async(str_session_id)
-            if session_info and isinstance(session_info, dict):
-                dialogue_type = session_info.get("metadata", {}).get("dialogue_type", DIALOGUE_TYPES["HUMAN_AI_PRIVATE"])
-            else:
-                logger.warning(f"无法获取会话信息，使用默认对话类型: {str_session_id}")
-                dialogue_type = DIALOGUE_TYPES["HUMAN_AI_PRIVATE"]
-            
-            # 3. 获取对话历史
-            turns = await self.storage.get_turns_async(str_session_id)
+            # 1-3. 创建用户轮次，获取对话类型和对话历史
+            str_session_id, dialogue_type, turns = await self._prepare_input(session_id, content, metadata)
             
             # 4. 根据对话类型处理输入
             response_content, response_metadata = await self._process_by_dialogue_type(
                 dialogue_type, str_session_id, user_id, content, turns, metadata
             )
             
-            # 5. 创建AI轮次
-            ai_turn = await self.create_turn(str_session_id, "ai", response_content, response_metadata)
+            # 5-7. 创建AI轮次，更新用户信息并返回结果
+            return await self._finish_input(str_session_id, user_id, content, response_content, response_metadata)
+        except Exception as e:
+            logger.error(f"处理输入失败: {e}")
+            return self._error_result(session_id, content, e)
+    
+    async def process_input_stream(self,
+                                   session_id: Union[str, Dict[str, Any]],
+                                   user_id: str,
+                                   content: str,
+                                   input_type: str = "text",
+                                   metadata: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """处理用户输入并以流的形式返回响应
+        
+        人类与AI私聊在AI服务支持流式输出时逐段返回生成的文本，其他对话类型
+        生成完整响应后一次性返回。
+        
+        Args:
+            session_id: 会话ID
+            user_id: 用户ID
+            content: 用户输入内容
+            input_type: 输入类型，如text、image等
+            metadata: 附加元数据
             
-            # 6. 更新用户信息（如果频率集成器可用）
-            if self.frequency_integrator and self.memory:
+        Yields:
+            {"type": "token", "content": 文本片段}，最后是 {"type": "done", ...}，
+            其余字段与 process_input 的返回值相同。流式生成失败时先返回
+            {"type": "error", "error": 错误信息}，再返回后备响应，done 事件带有 error 字段
+        """
+        try:
+            str_session_id, dialogue_type, turns = await self._prepare_input(session_id, content, metadata)
+            stream_error = None
+            
+            streaming = inspect.isasyncgenfunction(getattr(self.ai_service, "stream_response", None))
+            if dialogue_type == DIALOGUE_TYPES["HUMAN_AI_PRIVATE"] and streaming:
+                chunks = []
                 try:
-                    # 更新用户交互计数
-                    await self._update_user_interaction_count(user_id)
+                    messages, context_tokens = await self._build_private_messages(
+                        session_id=str_session_id, user_id=user_id, content=content, turns=turns, metadata=metadata
+                    )
+                    async for delta in self.ai_service.stream_response(messages):
+                        chunks.append(delta)
+                        yield {"type": "token", "content": delta}
+                    response_content = "".join(chunks)
+                    response_metadata = await self._private_response_metadata(str_session_id, user_id, context_tokens)
                 except Exception as e:
-                    logger.error(f"更新用户交互计数失败: {e}")
+                    logger.error(f"AI服务流式生成响应失败: {e}")
+                    stream_error = str(e)
+                    yield {"type": "error", "error": stream_error}
+                    response_content, response_metadata = self._private_fallback(content)
+                    if not chunks:
+                        yield {"type": "token", "content": response_content}
+            else:
+                response_content, response_metadata = await self._process_by_dialogue_type(
+                    dialogue_type, str_session_id, user_id, content, turns, metadata
+                )
+                yield {"type": "token", "content": response_content}
             
-            # 7. 返回结果
-            return {
-                "id": str(uuid.uuid4()),
-                "input": content,
-                "response": response_content,
-                "sessionId": str_session_id,
-                "timestamp": datetime.now().isoformat(),
-                "metadata": response_metadata
-            }
+            result = await self._finish_input(str_session_id, user_id, content, response_content, response_metadata)
+            if stream_error:
+                result["error"] = stream_error
+            yield {"type": "done", **result}
         except Exception as e:
             logger.error(f"处理输入失败: {e}")
-            # 确保session_id是字符串类型（即使在错误处理中）
-            str_session_id = session_id
-            if isinstance(session_id, dict):
-                str_session_id = session_id.get('id', str(session_id))
-            
-            # 返回错误信息
-            return {
-                "id": str(uuid.uuid4()),
-                "input": content,
-                "response": f"处理输入时出现错误: {str(e)}",
-                "sessionId": str_session_id,
-                "timestamp": datetime.now().isoformat(),
-                "error": str(e)
-            }
+            yield {"type": "done", **self._error_result(session_id, content, e)}
+    
+    async def _prepare_input(self,
+                             session_id: Union[str, Dict[str, Any]],
+                             content: str,
+                             metadata: Optional[Dict[str, Any]]) -> Tuple[str, str, List[Dict[str, Any]]]:
+        """创建用户轮次，返回 (会话ID, 对话类型, 对话历史)"""
+        # 确保session_id是字符串类型
+        str_session_id = session_id
+        if isinstance(session_id, dict):
+            str_session_id = session_id.get('id', str(session_id))
+            logger.info(f"Extracted session_id from dictionary in process_input: {str_session_id}")
+        
+        # 1. 创建用户轮次
+        user_turn = await self.create_turn(str_session_id, "human", content, metadata)
+        
+        # 2. 获取会话历史
+        session_info = await self.storage.get_session_async(str_session_id)
+        if session_info and isinstance(session_info, dict):
+            dialogue_type = session_info.get("metadata", {}).get("dialogue_type", DIALOGUE_TYPES["HUMAN_AI_PRIVATE"])
+        else:
+            logger.warning(f"无法获取会话信息，使用默认对话类型: {str_session_id}")
+            dialogue_type = DIALOGUE_TYPES["HUMAN_AI_PRIVATE"]
+        
+        # 3. 获取最近的对话历史（更早的轮次已进入打包器的滚动摘要），不包含刚创建的用户轮次
+        turns = await self.storage.get_recent_turns_async(
+            str_session_id, limit=self.context_packer.history_limit(str_session_id)
+        )
+        user_turn_id = user_turn.get("id") if isinstance(user_turn, dict) else None
+        if user_turn_id:
+            turns = [turn for turn in turns if turn.get("id") != user_turn_id]
+        return str_session_id, dialogue_type, turns
+    
+    async def _finish_input(self,
+                            str_session_id: str,
+                            user_id: str,
+                            content: str,
+                            response_content: str,
+                            response_metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """创建AI轮次并更新用户信息，返回处理结果"""
+        # 5. 创建AI轮次
+        ai_turn = await self.create_turn(str_session_id, "ai", response_content, response_metadata)
+        
+        # 6. 更新用户信息（如果频率集成器可用）
+        if self.frequency_integrator and self.memory:
+            try:
+                # 更新用户交互计数
+                await self._update_user_interaction_count(user_id)
+            except Exception as e:
+                logger.error(f"更新用户交互计数失败: {e}")
+        
+        # 7. 返回结果
+        return {
+            "id": str(uuid.uuid4()),
+            "input": content,
+            "response": response_content,
+            "sessionId": str_session_id,
+            "timestamp": datetime.now().isoformat(),
+            "metadata": response_metadata
+        }
+    
+    @staticmethod
+    def _error_result(session_id: Union[str, Dict[str, Any]], content: str, error: Exception) -> Dict[str, Any]:
+        # 确保session_id是字符串类型（即使在错误处理中）
+        str_session_id = session_id
+        if isinstance(session_id, dict):
+            str_session_id = session_id.get('id', str(session_id))
+        
+        # 返回错误信息
+        return {
+            "id": str(uuid.uuid4()),
+            "input": content,
+            "response": f"处理输入时出现错误: {str(error)}",
+            "sessionId": str_session_id,
+            "timestamp": datetime.now().isoformat(),
+            "error": str(error)
+        }
+    
+    async def _generate(self, messages: List[Dict[str, str]]) -> str:
+        """调用AI服务生成响应，不阻塞事件循环
+        
+        优先使用AI服务的原生异步接口；只提供同步接口的服务在线程池中执行。
+        """
+        if inspect.iscoroutinefunction(getattr(self.ai_service, "generate_response_async", None)):
+            return await self.ai_service.generate_response_async(messages)
+        if inspect.iscoroutinefunction(self.ai_service.generate_response):
+            return await self.ai_service.generate_response(messages)
+        return await asyncio.to_thread(self.ai_service.generate_response, messages)
     
     async def create_turn(self, 
                          session_id: str, 
@@ -351,62 +471,88 @@ class DialogueManager:
             (响应内容, 响应元数据)
         """
         try:
-            # 使用上下文构建器构建上下文（如果可用）
-            if self.context_builder:
-                context = await self.context_builder.build_async(
-                    user_input=content,
-                    session_id=session_id,
-                    user_id=user_id,
-                    input_type=metadata.get("input_type", "text") if metadata else "text"
-                )
-                messages = context["messages"]
-                
-                # 记录频率信息（如果频率集成器可用）
-                if self.frequency_integrator:
-                    await self.frequency_integrator.record_interaction(
-                        user_id=user_id,
-                        session_id=session_id,
-                        interaction_type="user_message",
-                        content=content,
-                        context=context
-                    )
-            else:
-                # 如果上下文构建器不可用，则使用传统方法
-                messages = self.ai_service.format_dialogue_history(turns)
-                messages.append({"role": "user", "content": content})
+            messages, context_tokens = await self._build_private_messages(session_id, user_id, content, turns, metadata)
             
             # 调用AI服务生成响应
-            response = self.ai_service.generate_response(messages)
+            response = await self._generate(messages)
             
-            # 构建响应元数据
-            response_metadata = {
-                "processed_at": datetime.now().isoformat(),
-                "dialogue_type": DIALOGUE_TYPES["HUMAN_AI_PRIVATE"],
-                "tools_used": [],
-                "model": self.ai_service.model_name if hasattr(self.ai_service, "model_name") else "gpt-3.5-turbo"
-            }
+            return response, await self._private_response_metadata(session_id, user_id, context_tokens)
+        except Exception as e:
+            logger.error(f"AI服务生成响应失败: {e}")
+            return self._private_fallback(content)
+    
+    async def _build_private_messages(self,
+                                      session_id: str,
+                                      user_id: str,
+                                      content: str,
+                                      turns: List[Dict[str, Any]],
+                                      metadata: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """构建人类与AI私聊的消息列表，返回 (消息列表, 各部分的token数)"""
+        # 使用上下文构建器构建上下文（如果可用）
+        if self.context_builder:
+            context = await self.context_builder.build_async(
+                user_input=content,
+                session_id=session_id,
+                user_id=user_id,
+                input_type=metadata.get("input_type", "text") if metadata else "text"
+            )
+            messages = context["messages"]
+            context_tokens = context.get("context_tokens", {})
             
-            # 如果频率集成器可用，添加频率相关元数据
+            # 记录频率信息（如果频率集成器可用）
             if self.frequency_integrator:
-                frequency_data = await self.frequency_integrator.analyze_interaction(
+                await self.frequency_integrator.record_interaction(
                     user_id=user_id,
-                    session_id=session_id
+                    session_id=session_id,
+                    interaction_type="user_message",
+                    content=content,
+                    context=context
                 )
-                response_metadata["frequency_data"] = frequency_data
-            
-            return response, response_metadata
-        except Exception as e:
-            logger.error(f"AI服务生成响应失败: {e}")
-            # 返回一个后备响应
-            fallback_response = f"我是一个AI助手。由于技术原因，我现在无法提供智能回复，但我收到了您的消息: '{content}'"
-            fallback_metadata = {
-                "processed_at": datetime.now().isoformat(),
-                "dialogue_type": DIALOGUE_TYPES["HUMAN_AI_PRIVATE"],
-                "tools_used": [],
-                "model": "fallback",
-                "error": "AI service unavailable"
-            }
-            return fallback_response, fallback_metadata
+        else:
+            # 如果上下文构建器不可用，则使用AI服务的系统提示和会话历史
+            messages, context_tokens = self.context_packer.pack(
+                session_id,
+                self.ai_service.format_dialogue_history([]),
+                history_items(turns),
+                {"role": "user", "content": content}
+            )
+        return messages, context_tokens
+    
+    async def _private_response_metadata(self,
+                                         session_id: str,
+                                         user_id: str,
+                                         context_tokens: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """构建人类与AI私聊的响应元数据"""
+        response_metadata = {
+            "processed_at": datetime.now().isoformat(),
+            "dialogue_type": DIALOGUE_TYPES["HUMAN_AI_PRIVATE"],
+            "tools_used": [],
+            "model": self.ai_service.model_name if hasattr(self.ai_service, "model_name") else "gpt-3.5-turbo"
+        }
+        if context_tokens:
+            response_metadata["context_tokens"] = context_tokens
+        
+        # 如果频率集成器可用，添加频率相关元数据
+        if self.frequency_integrator:
+            frequency_data = await self.frequency_integrator.analyze_interaction(
+                user_id=user_id,
+                session_id=session_id
+            )
+            response_metadata["frequency_data"] = frequency_data
+        return response_metadata
+    
+    @staticmethod
+    def _private_fallback(content: str) -> Tuple[str, Dict[str, Any]]:
+        # 返回一个后备响应
+        fallback_response = f"我是一个AI助手。由于技术原因，我现在无法提供智能回复，但我收到了您的消息: '{content}'"
+        fallback_metadata = {
+            "processed_at": datetime.now().isoformat(),
+            "dialogue_type": DIALOGUE_TYPES["HUMAN_AI_PRIVATE"],
+            "tools_used": [],
+            "model": "fallback",
+            "error": "AI service unavailable"
+        }
+        return fallback_response, fallback_metadata
     
     async def _process_ai_self_reflection(self,
                                         session_id: str,
@@ -424,39 +570,27 @@ class DialogueManager:
         Returns:
             (响应内容, 响应元数据)
         """
-        # 构建自我反思的系统提示
-        reflection_messages = [
-            {
+        # 构建自我反思的系统提示、对话历史和反思提示
+        reflection_messages, context_tokens = self.context_packer.pack(
+            session_id,
+            [{
                 "role": "system",
                 "content": "你正在进行自我反思。请分析你之前的回答，考虑其准确性、完整性和有用性，并提出改进建议。"
-            }
-        ]
-        
-        # 添加对话历史
-        for turn in turns:
-            role = turn.get("role", "")
-            turn_content = turn.get("content", "")
-            
-            if role == "human":
-                reflection_messages.append({"role": "user", "content": turn_content})
-            elif role == "ai":
-                reflection_messages.append({"role": "assistant", "content": turn_content})
-        
-        # 添加反思提示
-        reflection_messages.append({
-            "role": "user",
-            "content": f"请对以上对话进行反思: {content}"
-        })
+            }],
+            history_items(turns),
+            {"role": "user", "content": f"请对以上对话进行反思: {content}"}
+        )
         
         # 调用AI服务生成反思
-        reflection = self.ai_service.generate_response(reflection_messages)
+        reflection = await self._generate(reflection_messages)
         
         # 构建响应元数据
         response_metadata = {
             "processed_at": datetime.now().isoformat(),
             "dialogue_type": DIALOGUE_TYPES["AI_SELF_REFLECTION"],
             "tools_used": [],
-            "model": "gpt-3.5-turbo"  # 可以从配置中获取
+            "model": "gpt-3.5-turbo",  # 可以从配置中获取
+            "context_tokens": context_tokens
         }
         
         return reflection, response_metadata
@@ -491,38 +625,28 @@ class DialogueManager:
         else:  # AI_MULTI_HUMAN
             system_prompt = f"你是一个AI助手，正在与多个人类用户进行对话。参与者包括: {', '.join(participants)}。请根据对话上下文和发言者的身份提供合适的回复。"
         
-        # 构建群聊消息
-        group_messages = [
-            {
-                "role": "system",
-                "content": system_prompt
-            }
-        ]
-        
-        # 添加对话历史，包含发言者信息
-        for turn in turns:
+        def format_turn(turn: Dict[str, Any]) -> Optional[Dict[str, str]]:
             role = turn.get("role", "")
             turn_content = turn.get("content", "")
-            turn_metadata = turn.get("metadata", {})
-            speaker_id = turn_metadata.get("user_id", "unknown")
+            speaker_id = (turn.get("metadata") or {}).get("user_id", "unknown")
             
             if role == "human":
                 # 在人类消息中添加发言者信息
-                group_messages.append({
-                    "role": "user", 
-                    "content": f"[{speaker_id}]: {turn_content}"
-                })
-            elif role == "ai":
-                group_messages.append({"role": "assistant", "content": turn_content})
-        
-        # 添加当前用户的消息
-        group_messages.append({
-            "role": "user",
-            "content": f"[{user_id}]: {content}"
-        })
+                return {"role": "user", "content": f"[{speaker_id}]: {turn_content}"}
+            if role == "ai":
+                return {"role": "assistant", "content": turn_content}
+            return None
+        
+        # 构建群聊消息：系统提示、包含发言者信息的对话历史和当前用户的消息
+        group_messages, context_tokens = self.context_packer.pack(
+            session_id,
+            [{"role": "system", "content": system_prompt}],
+            history_items(turns, format_turn),
+            {"role": "user", "content": f"[{user_id}]: {content}"}
+        )
         
         # 调用AI服务生成响应
-        response = self.ai_service.generate_response(group_messages)
+        response = await self._generate(group_messages)
         
         # 构建响应元数据
         response_metadata = {
@@ -530,7 +654,8 @@ class DialogueManager:
             "dialogue_type": dialogue_type,
             "tools_used": [],
             "model": "gpt-3.5-turbo",  # 可以从配置中获取
-            "user_id": user_id  # 记录发言者ID
+            "user_id": user_id,  # 记录发言者ID
+            "context_tokens": context_tokens
         }
         
         # 更新用户交互计数
@@ -582,47 +707,28 @@ class DialogueManager:
         # 构建AI对话系统提示
         system_prompt = f"这是一个AI之间的对话。你现在扮演{next_ai}，正在与{current_ai}进行对话。请根据对话上下文和你的角色提供合适的回复。"
         
-        # 构建AI对话消息
-        ai_dialogue_messages = [
-            {
-                "role": "system",
-                "content": system_prompt
-            }
-        ]
-        
-        # 添加对话历史
-        for turn in turns:
+        # 将所有消息转换为交替的user/assistant格式，当前内容总是作为user
+        history = []
+        for index, turn in enumerate(turns):
             role = turn.get("role", "")
             turn_content = turn.get("content", "")
             turn_metadata = turn.get("metadata", {})
             ai_role = turn_metadata.get("ai_role", ai_roles[0] if role == "ai" else "用户")
-            
-            # 将所有消息转换为user/assistant格式
-            if len(ai_dialogue_messages) % 2 == 1:  # 奇数条消息，作为user
-                ai_dialogue_messages.append({
-                    "role": "user", 
-                    "content": f"[{ai_role}]: {turn_content}"
-                })
-            else:  # 偶数条消息，作为assistant
-                ai_dialogue_messages.append({
-                    "role": "assistant", 
-                    "content": f"[{ai_role}]: {turn_content}"
-                })
-        
-        # 添加当前内容
-        if len(ai_dialogue_messages) % 2 == 1:  # 奇数条消息，作为user
-            ai_dialogue_messages.append({
-                "role": "user", 
-                "content": f"[{current_ai}]: {content}"
-            })
-        else:  # 偶数条消息，作为assistant
-            ai_dialogue_messages.append({
-                "role": "assistant", 
-                "content": f"[{current_ai}]: {content}"
-            })
+            history.append((turn, {
+                "role": "user" if (len(turns) - index) % 2 == 0 else "assistant",
+                "content": f"[{ai_role}]: {turn_content}"
+            }))
+        
+        # 构建AI对话消息
+        ai_dialogue_messages, context_tokens = self.context_packer.pack(
+            session_id,
+            [{"role": "system", "content": system_prompt}],
+            history,
+            {"role": "user", "content": f"[{current_ai}]: {content}"}
+        )
         
         # 调用AI服务生成响应
-        raw_response = self.ai_service.generate_response(ai_dialogue_messages)
+        raw_response = await self._generate(ai_dialogue_messages)
         
         # 处理响应，移除可能的角色前缀
         response = raw_response
@@ -639,7 +745,8 @@ class DialogueManager:
             "model": "gpt-3.5-turbo",  # 可以从配置中获取
             "ai_role": next_ai,
             "ai_roles": ai_roles,
-            "current_ai": next_ai  # 更新当前AI角色
+            "current_ai": next_ai,  # 更新当前AI角色
+            "context_tokens": context_tokens
         }
         
         return response, response_metadata
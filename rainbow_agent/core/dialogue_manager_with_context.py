@@ -94,7 +94,7 @@ class EnhancedDialogueManager(DialogueManager, DialogueManagerContextMixin):
                 messages = self.build_messages_with_context(turns, processed_context)
                 
                 # 调用AI服务
-                response = await self.ai_service.generate_response(messages)
+                response = await self._generate(messages)
                 
                 # 添加上下文元数据
                 context_metadata = self.get_context_metadata(processed_context)
@@ -174,7 +174,7 @@ class EnhancedDialogueManager(DialogueManager, DialogueManagerContextMixin):
             messages = self.build_messages_with_context(turns, processed_context)
             
             # 调用AI服务
-            response = await self.ai_service.generate_response(messages)
+            response = await self._generate(messages)
             
             # 构建响应元数据
             response_metadata = {
@@ -1,11 +1,15 @@
 # rainbow_agent/core/llm_caller.py
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 import time
 from ..utils.llm import get_llm_client
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+class LLMStreamError(Exception):
+    """流式调用LLM失败：重试次数用尽或输出部分内容后流中断"""
+
+
 class LLMCaller:
     """
     LLM调用器，负责调用语言模型API
@@ -17,7 +21,8 @@ class LLMCaller:
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
         timeout: int = 60,
-        retry_attempts: int = 2
+        retry_attempts: int = 2,
+        llm_client: Any = None
     ):
         """
         初始化LLM调用器
@@ -28,80 +33,151 @@ class LLMCaller:
             max_tokens: 最大生成token数
             timeout: 超时时间（秒）
             retry_attempts: 重试次数
+            llm_client: LLM客户端，默认使用共享客户端
         """
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.timeout = timeout
         self.retry_attempts = retry_attempts
-        self.llm_client = get_llm_client()
+        self.llm_client = llm_client or get_llm_client()
         
         # 记录上次调用信息
         self.last_processing_time = 0
+        self.last_first_token_time = 0
+        self.last_chunk_count = 0
         self.last_token_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
     
+    def _completion_args(self, messages: List[Dict[str, str]], stream: bool) -> Dict[str, Any]:
+        completion_args = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "stream": stream,
+        }
+        
+        if self.max_tokens:
+            completion_args["max_tokens"] = self.max_tokens
+        return completion_args
+    
+    def _retry_or_fail(self, attempt: int, error: Exception) -> Optional[str]:
+        """记录调用错误并在需要时等待重试，重试次数用尽时返回错误提示"""
+        logger.error(f"LLM调用错误 (尝试 {attempt+1}/{self.retry_attempts+1}): {error}")
+        if attempt < self.retry_attempts:
+            # 指数退避重试
+            retry_delay = 2 ** attempt
+            logger.info(f"将在 {retry_delay} 秒后重试...")
+            time.sleep(retry_delay)
+            return None
+        return f"抱歉，我遇到了技术问题: {str(error)}"
+    
     def call(self, context: Dict[str, Any], stream: bool = False) -> str:
         """
         调用LLM获取响应
         
         Args:
             context: 上下文信息
-            stream: 是否使用流式输出
+            stream: 是否使用流式输出（片段拼接后返回，需要逐段输出时使用 stream()）
             
         Returns:
-            LLM生成的响应文本
+            LLM生成的响应文本，重试次数用尽时为错误提示
+            
+        Raises:
+            LLMStreamError: 流式输出部分内容后中断，不返回不完整的文本
         """
+        if stream:
+            chunks = []
+            try:
+                for chunk in self.stream(context):
+                    chunks.append(chunk)
+            except LLMStreamError as e:
+                if chunks:
+                    raise
+                return f"抱歉，我遇到了技术问题: {str(e.__cause__ or e)}"
+            return "".join(chunks)
+        
         messages = context["messages"]
         start_time = time.time()
-        
-        # 准备API调用参数
-        completion_args = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": self.temperature,
-            "stream": stream,
-        }
-        
-        if self.max_tokens:
-            completion_args["max_tokens"] = self.max_tokens
+        completion_args = self._completion_args(messages, stream=False)
         
         # 重试机制
         for attempt in range(self.retry_attempts + 1):
             try:
                 logger.info(f"调用LLM，模型: {self.model}，尝试: {attempt+1}/{self.retry_attempts+1}")
                 
-                # 处理流式输出
-                if stream:
-                    response_chunks = []
-                    for chunk in self.llm_client.chat.completions.create(**completion_args):
-                        if chunk.choices and chunk.choices[0].delta.content:
-                            response_chunks.append(chunk.choices[0].delta.content)
-                    response_text = "".join(response_chunks)
-                else:
-                    # 非流式处理
-                    response = self.llm_client.chat.completions.create(**completion_args)
-                    response_text = response.choices[0].message.content
-                    
-                    # 记录token使用情况
-                    if hasattr(response, 'usage'):
-                        self.last_token_usage = {
-                            "prompt_tokens": response.usage.prompt_tokens,
-                            "completion_tokens": response.usage.completion_tokens,
-                            "total_tokens": response.usage.total_tokens
-                        }
+                response = self.llm_client.chat.completions.create(**completion_args)
+                response_text = response.choices[0].message.content
+                
+                # 记录token使用情况
+                if getattr(response, 'usage', None):
+                    self.last_token_usage = {
+                        "prompt_tokens": response.usage.prompt_tokens,
+                        "completion_tokens": response.usage.completion_tokens,
+                        "total_tokens": response.usage.total_tokens
+                    }
                 
                 # 记录处理时间
                 self.last_processing_time = time.time() - start_time
+                self.last_first_token_time = self.last_processing_time
                 
                 logger.info(f"LLM响应成功，用时: {self.last_processing_time:.2f}秒")
                 return response_text
                 
             except Exception as e:
-                logger.error(f"LLM调用错误 (尝试 {attempt+1}/{self.retry_attempts+1}): {e}")
-                if attempt < self.retry_attempts:
-                    # 指数退避重试
-                    retry_delay = 2 ** attempt
-                    logger.info(f"将在 {retry_delay} 秒后重试...")
-                    time.sleep(retry_delay)
-                else:
-                    return f"抱歉，我遇到了技术问题: {str(e)}"
\ No newline at end of file
+                error_text = self._retry_or_fail(attempt, e)
+                if error_text is not None:
+                    return error_text
+    
+    def stream(self, context: Dict[str, Any]) -> Iterator[str]:
+        """
+        以流式方式调用LLM，逐段返回生成的文本
+        
+        只在收到第一个片段之前重试；已经输出部分内容后出错不会重试，
+        以免重复输出。结束后 last_first_token_time 为首个片段的延迟，
+        last_processing_time 为总耗时。
+        
+        Args:
+            context: 上下文信息
+            
+        Yields:
+            文本片段
+            
+        Raises:
+            LLMStreamError: 重试次数用尽，或输出部分内容后流中断
+        """
+        messages = context["messages"]
+        start_time = time.time()
+        completion_args = self._completion_args(messages, stream=True)
+        self.last_first_token_time = 0
+        self.last_chunk_count = 0
+        
+        for attempt in range(self.retry_attempts + 1):
+            try:
+                logger.info(f"流式调用LLM，模型: {self.model}，尝试: {attempt+1}/{self.retry_attempts+1}")
+                
+                for chunk in self.llm_client.chat.completions.create(**completion_args):
+                    if getattr(chunk, "usage", None):
+                        self.last_token_usage = {
+                            "prompt_tokens": chunk.usage.prompt_tokens,
+                            "completion_tokens": chunk.usage.completion_tokens,
+                            "total_tokens": chunk.usage.total_tokens
+                        }
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if not self.last_chunk_count:
+                            self.last_first_token_time = time.time() - start_time
+                        self.last_chunk_count += 1
+                        yield chunk.choices[0].delta.content
+                
+                self.last_processing_time = time.time() - start_time
+                logger.info(f"LLM流式响应完成，首个片段: {self.last_first_token_time:.2f}秒，"
+                            f"总用时: {self.last_processing_time:.2f}秒")
+                return
+                
+            except Exception as e:
+                if self.last_chunk_count:
+                    logger.error(f"LLM流式响应中断: {e}")
+                    self.last_processing_time = time.time() - start_time
+                    raise LLMStreamError(f"LLM流式响应中断: {e}") from e
+                if self._retry_or_fail(attempt, e) is not None:
+                    self.last_processing_time = time.time() - start_time
+                    raise LLMStreamError(f"LLM流式调用失败: {e}") from e
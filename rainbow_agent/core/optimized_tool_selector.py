@@ -12,6 +12,7 @@ import hashlib
 from enum import Enum
 from collections import OrderedDict
 
+from .tool_retriever import ToolRetriever, Embedder
 from ..tools.base import BaseTool
 from ..utils.llm import get_llm_client
 from ..utils.logger import get_logger
@@ -94,7 +95,11 @@ class OptimizedToolSelector:
         use_batching: bool = True,
         batch_size: int = 5,
         timeout: int = 10,
-        verbose: bool = False
+        verbose: bool = False,
+        embedder: Optional[Embedder] = None,
+        retrieval_threshold: float = 0.6,
+        retrieval_top_k: int = 3,
+        shortlist_size: int = 10
     ):
         """
         初始化优化的工具选择器
@@ -111,6 +116,10 @@ class OptimizedToolSelector:
             batch_size: 批处理大小
             timeout: 超时时间（秒）
             verbose: 是否输出详细日志
+            embedder: 工具检索使用的嵌入函数，为None时只使用BM25
+            retrieval_threshold: 本地检索置信度达到该值时直接采用检索结果，不调用LLM
+            retrieval_top_k: 多工具选择时本地检索返回的工具数量
+            shortlist_size: 调用LLM时提示词中最多列出的候选工具数量
         """
         self.tools = tools or []
         self.strategy = strategy
@@ -122,6 +131,9 @@ class OptimizedToolSelector:
         self.batch_size = batch_size
         self.timeout = timeout
         self.verbose = verbose
+        self.retrieval_threshold = retrieval_threshold
+        self.retrieval_top_k = retrieval_top_k
+        self.shortlist_size = shortlist_size
         
         # 工具名称到工具对象的映射
         self.tool_map = {tool.name: tool for tool in self.tools}
@@ -130,32 +142,12 @@ class OptimizedToolSelector:
         self.selection_cache = LRUCache(cache_capacity)
         self.timestamp_cache = {}  # 缓存时间戳
         
-        # 关键词索引
-        self._build_keyword_index()
+        # 工具检索索引（支持中文的BM25，可选向量）
+        self.retriever = ToolRetriever(self.tools, embedder=embedder)
+        self.stats = {"retrieval_selections": 0, "llm_selections": 0}
         
         logger.info(f"OptimizedToolSelector初始化完成，策略: {strategy.value}")
     
-    def _build_keyword_index(self) -> None:
-        """构建工具关键词索引，加速基于规则的选择"""
-        self.keyword_index = {}
-        
-        for tool in self.tools:
-            # 从工具名称中提取关键词
-            name_parts = tool.name.lower().split('_')
-            for part in name_parts:
-                if part not in self.keyword_index:
-                    self.keyword_index[part] = []
-                self.keyword_index[part].append(tool)
-            
-            # 从工具描述中提取关键词
-            desc_words = set(tool.description.lower().split())
-            for word in desc_words:
-                if len(word) > 3:  # 只索引长度大于3的词，避免噪音
-                    if word not in self.keyword_index:
-                        self.keyword_index[word] = []
-                    if tool not in self.keyword_index[word]:
-                        self.keyword_index[word].append(tool)
-    
     def add_tool(self, tool: BaseTool) -> None:
         """
         添加工具
@@ -165,21 +157,7 @@ class OptimizedToolSelector:
         """
         self.tools.append(tool)
         self.tool_map[tool.name] = tool
-        
-        # 更新关键词索引
-        name_parts = tool.name.lower().split('_')
-        for part in name_parts:
-            if part not in self.keyword_index:
-                self.keyword_index[part] = []
-            self.keyword_index[part].append(tool)
-        
-        desc_words = set(tool.description.lower().split())
-        for word in desc_words:
-            if len(word) > 3:
-                if word not in self.keyword_index:
-                    self.keyword_index[word] = []
-                if tool not in self.keyword_index[word]:
-                    self.keyword_index[word].append(tool)
+        self.retriever.add_tool(tool)
     
     def add_tools(self, tools: List[BaseTool]) -> None:
         """
@@ -188,8 +166,10 @@ class OptimizedToolSelector:
         Args:
             tools: 要添加的工具列表
         """
-        for tool in tools:
-            self.add_tool(tool)
+        tools = list(tools)
+        self.tools.extend(tools)
+        self.tool_map.update((tool.name, tool) for tool in tools)
+        self.retriever.add_tools(tools)
     
     def select_tool(self, query: str, context: Dict[str, Any] = None) -> Tuple[Optional[BaseTool], float, str]:
         """
@@ -218,29 +198,37 @@ class OptimizedToolSelector:
                 logger.info(f"从缓存中获取工具选择结果: {tool.name}")
                 return tool, confidence, reason
         
-        # 根据策略选择工具
-        if self.strategy == SelectionStrategy.RULE_BASED:
-            result = self._rule_based_selection(query, context)
-        elif self.strategy == SelectionStrategy.LLM_BASED:
-            result = self._llm_based_selection(query, context)
-        elif self.strategy == SelectionStrategy.CONFIDENCE:
-            result = self._confidence_based_selection(query, context)
-        elif self.strategy == SelectionStrategy.CACHED:
-            # 先尝试规则选择，如果置信度不够再使用LLM
-            tool, confidence, reason = self._rule_based_selection(query, context)
-            if confidence >= self.confidence_threshold:
-                result = (tool, confidence, reason)
-            else:
-                result = self._llm_based_selection(query, context)
-        elif self.strategy == SelectionStrategy.ENSEMBLE:
-            result = self._ensemble_selection(query, context)
-        else:  # HYBRID
-            # 先尝试规则选择，如果置信度不够再使用LLM
-            tool, confidence, reason = self._rule_based_selection(query, context)
-            if confidence >= self.confidence_threshold:
-                result = (tool, confidence, reason)
-            else:
+        # 除纯规则和纯LLM策略外，本地检索置信度足够高时直接采用检索结果
+        result = None
+        if self.strategy not in (SelectionStrategy.RULE_BASED, SelectionStrategy.LLM_BASED):
+            retrieved = self._retrieval_selection(query, context)
+            if retrieved[0] is not None:
+                result = retrieved
+        
+        if result is None:
+            # 根据策略选择工具
+            if self.strategy == SelectionStrategy.RULE_BASED:
+                result = self._rule_based_selection(query, context)
+            elif self.strategy == SelectionStrategy.LLM_BASED:
                 result = self._llm_based_selection(query, context)
+            elif self.strategy == SelectionStrategy.CONFIDENCE:
+                result = self._confidence_based_selection(query, context)
+            elif self.strategy == SelectionStrategy.CACHED:
+                # 先尝试规则选择，如果置信度不够再使用LLM
+                tool, confidence, reason = self._rule_based_selection(query, context)
+                if confidence >= self.confidence_threshold:
+                    result = (tool, confidence, reason)
+                else:
+                    result = self._llm_based_selection(query, context)
+            elif self.strategy == SelectionStrategy.ENSEMBLE:
+                result = self._ensemble_selection(query, context)
+            else:  # HYBRID
+                # 先尝试规则选择，如果置信度不够再使用LLM
+                tool, confidence, reason = self._rule_based_selection(query, context)
+                if confidence >= self.confidence_threshold:
+                    result = (tool, confidence, reason)
+                else:
+                    result = self._llm_based_selection(query, context)
         
         # 添加到缓存
         tool, confidence, reason = result
@@ -281,8 +269,19 @@ class OptimizedToolSelector:
                 logger.info(f"从缓存中获取多工具选择结果: {len(results)}个工具")
                 return results
         
+        # 混合和集成策略在本地检索置信度足够高时不调用LLM
+        retrieved = []
+        if self.strategy in (SelectionStrategy.HYBRID, SelectionStrategy.ENSEMBLE):
+            candidates, confidence = self.retriever.retrieve(query, top_k)
+            if confidence >= self.retrieval_threshold:
+                self.stats["retrieval_selections"] += 1
+                retrieved = [(tool, score, f"本地检索: 工具 {tool.name} 与查询的匹配度: {score:.2f}")
+                             for tool, score in candidates]
+        
         # 根据策略选择工具
-        if self.strategy == SelectionStrategy.LLM_BASED or self.strategy == SelectionStrategy.HYBRID:
+        if retrieved:
+            results = retrieved
+        elif self.strategy == SelectionStrategy.LLM_BASED or self.strategy == SelectionStrategy.HYBRID:
             results = self._llm_based_multi_selection(query, context, top_k)
         elif self.strategy == SelectionStrategy.ENSEMBLE:
             results = self._ensemble_multi_selection(query, context, top_k)
@@ -367,6 +366,44 @@ class OptimizedToolSelector:
         self.selection_cache.put(cache_key, result)
         self.timestamp_cache[cache_key] = time.time()
     
+    def _retrieval_selection(self, query: str, context: Dict[str, Any]) -> Tuple[Optional[BaseTool], float, str]:
+        """
+        基于本地检索的工具选择，不调用LLM
+        
+        Args:
+            query: 用户查询
+            context: 上下文信息
+            
+        Returns:
+            (选择的工具, 置信度, 选择理由)的元组，置信度低于检索阈值时工具为None
+        """
+        candidates, confidence = self.retriever.retrieve(query, self.retrieval_top_k)
+        if not candidates:
+            return None, 0.0, "本地检索没有匹配的工具"
+        
+        best_tool = candidates[0][0]
+        if confidence < self.retrieval_threshold:
+            return None, confidence, f"本地检索置信度 {confidence:.2f} 低于阈值，最佳匹配: {best_tool.name}"
+        
+        self.stats["retrieval_selections"] += 1
+        logger.info(f"本地检索选择的工具: {best_tool.name}, 置信度: {confidence:.2f}")
+        return best_tool, confidence, f"本地检索: 工具 {best_tool.name} 与查询的匹配度: {confidence:.2f}"
+    
+    def _shortlist(self, query: str) -> List[BaseTool]:
+        """
+        调用LLM前按本地检索缩小候选工具范围
+        
+        Args:
+            query: 用户查询
+            
+        Returns:
+            候选工具列表，工具较少或检索没有结果时返回所有工具
+        """
+        if len(self.tools) <= self.shortlist_size:
+            return self.tools
+        candidates, _ = self.retriever.retrieve(query, self.shortlist_size)
+        return [tool for tool, _ in candidates] or self.tools
+    
     def _rule_based_selection(self, query: str, context: Dict[str, Any]) -> Tuple[Optional[BaseTool], float, str]:
         """
         基于规则的工具选择
@@ -378,16 +415,9 @@ class OptimizedToolSelector:
         Returns:
             (选择的工具, 置信度, 选择理由)的元组
         """
-        # 1. 使用关键词索引快速筛选可能的工具
-        query_lower = query.lower()
-        candidate_tools = set()
-        
-        # 从查询中提取词语
-        words = query_lower.split()
-        for word in words:
-            if word in self.keyword_index:
-                for tool in self.keyword_index[word]:
-                    candidate_tools.add(tool)
+        # 1. 使用检索索引快速筛选可能的工具
+        candidates, _ = self.retriever.retrieve(query, self.shortlist_size)
+        candidate_tools = [tool for tool, _ in candidates]
         
         # 如果没有候选工具，使用所有工具
         if not candidate_tools:
@@ -499,7 +529,8 @@ class OptimizedToolSelector:
             (选择的工具, 置信度, 选择理由)的元组
         """
         # 构建工具描述
-        tools_description = self._format_tools_description()
+        self.stats["llm_selections"] += 1
+        tools_description = self._format_tools_description(self._shortlist(query))
         
         # 构建提示词
         prompt = f"""
@@ -588,7 +619,8 @@ class OptimizedToolSelector:
             (选择的工具, 置信度, 选择理由)的元组
         """
         # 构建工具描述
-        tools_description = self._format_tools_description()
+        self.stats["llm_selections"] += 1
+        tools_description = self._format_tools_description(self._shortlist(query))
         
         # 构建提示词
         prompt = f"""
@@ -683,7 +715,8 @@ class OptimizedToolSelector:
             (工具, 置信度, 选择理由)元组的列表
         """
         # 构建工具描述
-        tools_description = self._format_tools_description()
+        self.stats["llm_selections"] += 1
+        tools_description = self._format_tools_description(self._shortlist(query))
         
         # 构建提示词
         prompt = f"""
@@ -872,14 +905,17 @@ class OptimizedToolSelector:
         
         return results[:top_k]
     
-    def _format_tools_description(self) -> str:
+    def _format_tools_description(self, tools: Optional[List[BaseTool]] = None) -> str:
         """
         格式化工具描述
         
+        Args:
+            tools: 要描述的工具，默认为所有工具
+            
         Returns:
             格式化后的工具描述字符串
         """
         descriptions = []
-        for i, tool in enumerate(self.tools):
+        for i, tool in enumerate(self.tools if tools is None else tools):
             descriptions.append(f"{i+1}. {tool.name}: {tool.description}\n   用法: {tool.usage}")
         return "\n\n".join(descriptions)
@@ -0,0 +1,181 @@
+"""
+工具检索器 - 本地的工具候选检索
+
+为每个工具的名称、描述、用法、标签和示例查询建立支持中文的BM25索引，
+可选地预先计算这些文本的向量并与BM25得分融合。
+检索在本地完成，不调用LLM；置信度足够高时工具选择器可以直接采用检索结果。
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import re
+import threading
+
+try:
+    import numpy as np
+    NUMPY_SUPPORT = True
+except ImportError:
+    NUMPY_SUPPORT = False
+
+from ..tools.base import BaseTool
+from ..utils.text_index import BM25Index
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 嵌入函数：文本列表 -> 向量列表（如 EmbeddingService.embed_many）
+Embedder = Callable[[Sequence[str]], Sequence[Sequence[float]]]
+
+
+def tool_document(tool: BaseTool) -> str:
+    """
+    生成工具的检索文本
+
+    名称按下划线拆分后重复一次，使名称中的词比描述中的词权重更高。
+
+    Args:
+        tool: 工具
+
+    Returns:
+        检索文本
+    """
+    name_words = re.sub(r"[_\-]+", " ", tool.name)
+    parts = [tool.name, name_words, name_words, tool.description, tool.usage or ""]
+    parts.extend(getattr(tool, "tags", None) or [])
+    parts.extend(getattr(tool, "examples", None) or [])
+    return "\n".join(part for part in parts if part)
+
+
+class ToolRetriever:
+    """
+    工具检索器
+
+    retrieve 返回按得分排序的候选工具及整体置信度：
+    置信度 = 最佳得分占查询可达得分的比例 × (0.5 + 0.5 × 第一名领先第二名的幅度)，
+    即查询中的关键词大部分命中了同一个工具、且没有其他工具接近时置信度才高。
+    """
+
+    def __init__(self, tools: Optional[Iterable[BaseTool]] = None, embedder: Optional[Embedder] = None,
+                 embedding_weight: float = 0.5):
+        """
+        初始化工具检索器
+
+        Args:
+            tools: 工具列表
+            embedder: 嵌入函数，为None时只使用BM25
+            embedding_weight: 向量相似度在融合得分中的权重
+        """
+        if embedder is not None and not NUMPY_SUPPORT:
+            logger.warning("未安装numpy，工具检索只使用BM25")
+            embedder = None
+        self.embedder = embedder
+        self.embedding_weight = embedding_weight
+        self.index = BM25Index()
+        self.tools: Dict[str, BaseTool] = {}
+        self._vectors: Dict[str, "np.ndarray"] = {}
+        # 归一化后的工具向量矩阵，工具变化后在下次检索时重建
+        self._matrix = None
+        self._matrix_names: List[str] = []
+        self._lock = threading.RLock()
+        self.add_tools(tools or [])
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    def add_tool(self, tool: BaseTool) -> None:
+        """
+        添加工具，同名工具会被替换
+
+        Args:
+            tool: 工具
+        """
+        self.add_tools([tool])
+
+    def add_tools(self, tools: Iterable[BaseTool]) -> None:
+        """
+        批量添加工具，启用向量时一次计算所有新工具的向量
+
+        Args:
+            tools: 工具列表
+        """
+        tools = list(tools)
+        if not tools:
+            return
+        documents = [tool_document(tool) for tool in tools]
+        vectors = self._embed(documents) if self.embedder else None
+
+        with self._lock:
+            for i, tool in enumerate(tools):
+                self.tools[tool.name] = tool
+                self.index.add(tool.name, documents[i])
+                if vectors is not None:
+                    self._vectors[tool.name] = vectors[i]
+            self._matrix = None
+
+    def remove_tool(self, name: str) -> bool:
+        """
+        删除工具
+
+        Args:
+            name: 工具名称
+
+        Returns:
+            工具是否存在
+        """
+        with self._lock:
+            self._vectors.pop(name, None)
+            self._matrix = None
+            self.index.remove(name)
+            return self.tools.pop(name, None) is not None
+
+    def retrieve(self, query: str, top_k: int = 5) -> Tuple[List[Tuple[BaseTool, float]], float]:
+        """
+        检索与查询最相关的工具
+
+        Args:
+            query: 用户查询
+            top_k: 返回的候选数量
+
+        Returns:
+            ([(工具, 得分)], 置信度)，得分在0-1之间，按得分降序排列
+        """
+        if not self.tools or top_k <= 0:
+            return [], 0.0
+        # 查询向量在锁外计算，嵌入服务较慢时不阻塞其他检索
+        query_vector = self._embed([query])[0] if self.embedder else None
+
+        with self._lock:
+            bound = self.index.idf_sum(query)
+            # 多取一个候选用于计算领先幅度
+            ranked = self.index.search(query, limit=top_k + 1) if bound > 0 else []
+            scores = {name: min(1.0, score / bound) for name, score in ranked}
+
+            if query_vector is not None and self._vectors:
+                weight = self.embedding_weight
+                similarities = self._similarities(query_vector)
+                scores = {name: (1 - weight) * scores.get(name, 0.0) + weight * max(0.0, similarity)
+                          for name, similarity in similarities.items()}
+
+            ordered = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            ordered = [(name, score) for name, score in ordered if score > 0]
+            if not ordered:
+                return [], 0.0
+
+            best = ordered[0][1]
+            runner_up = ordered[1][1] if len(ordered) > 1 else 0.0
+            confidence = best * (0.5 + 0.5 * (best - runner_up) / best)
+            return [(self.tools[name], score) for name, score in ordered[:top_k]], confidence
+
+    def _similarities(self, query_vector: "np.ndarray") -> Dict[str, float]:
+        # 需持有锁
+        if self._matrix is None:
+            self._matrix_names = list(self._vectors)
+            matrix = np.vstack([self._vectors[name] for name in self._matrix_names])
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._matrix = matrix / np.where(norms == 0, 1.0, norms)
+        norm = np.linalg.norm(query_vector)
+        if not norm:
+            return {name: 0.0 for name in self._matrix_names}
+        similarities = self._matrix @ (query_vector / norm)
+        return dict(zip(self._matrix_names, similarities.tolist()))
+
+    def _embed(self, texts: Sequence[str]) -> List["np.ndarray"]:
+        return [np.asarray(vector, dtype=np.float32) for vector in self.embedder(list(texts))]
@@ -6,6 +6,7 @@ from rainbow_agent.human_chat.models import ChatSessionModel, ChatMessageModel
 from rainbow_agent.human_chat.cache_manager import CacheManager
 from rainbow_agent.human_chat.websocket_optimizer import WebSocketOptimizer
 from rainbow_agent.human_chat.db_query_optimizer import DBQueryOptimizer
+from rainbow_agent.human_chat.session_summary import SessionSummaryIndex
 
 # 现在已经修复了缩进问题，可以导入HumanChatManager
 from rainbow_agent.human_chat.chat_manager import HumanChatManager
@@ -19,7 +20,8 @@ __all__ = [
     'ChatMessageModel',
     'CacheManager',
     'WebSocketOptimizer',
-    'DBQueryOptimizer'
+    'DBQueryOptimizer',
+    'SessionSummaryIndex'
     # 'HumanChatManager',
     # 'human_chat_bp',
     # 'register_socketio_events'
@@ -1,195 +1,355 @@
-from typing import Dict, Any, List, Optional, Union
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Iterable, Callable, Set
+from collections import OrderedDict
+import heapq
+import json
 import logging
+import sys
 import threading
 import time
 
 logger = logging.getLogger(__name__)
 
+
+def estimate_size(value: Any) -> int:
+    """
+    估算缓存值占用的内存（字节）
+
+    按JSON序列化后的长度估算，无法序列化时退回 sys.getsizeof
+    """
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+class _CacheEntry:
+    """缓存项"""
+
+    __slots__ = ("value", "expires_at", "tags", "size", "version")
+
+    def __init__(self, value: Any, expires_at: Optional[float], tags: Set[str], size: int, version: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.tags = tags
+        self.size = size
+        self.version = version
+
+
 class CacheManager:
-    """缓存管理器，用于缓存频繁访问的数据，减少数据库查询"""
-    
-    def __init__(self, ttl_seconds: int = 300):
+    """
+    缓存管理器，用于缓存频繁访问的数据，减少数据库查询
+
+    所有缓存项存放在一个按访问顺序排列的LRU表中：
+    - 每项有独立的过期时间，过期时间统一放在一个最小堆里，
+      每次读写时弹出堆顶已过期的项，不需要后台扫描线程
+    - 超出数量上限或内存预算时淘汰最久未访问的项
+    - 缓存项可以带标签，按标签一次性失效相关的所有键
+      （例如会话收到新消息时失效该会话的消息列表、最后一条消息和未读数）
+    - 所有操作持有同一把锁，可以在多个线程和事件循环中共享
+    """
+
+    def __init__(self, ttl_seconds: int = 300, max_entries: int = 10000,
+                 max_bytes: Optional[int] = 64 * 1024 * 1024,
+                 size_estimator: Optional[Callable[[Any], int]] = None):
         """
         初始化缓存管理器
-        
+
         Args:
-            ttl_seconds: 缓存项的生存时间（秒）
+            ttl_seconds: 缓存项的默认生存时间（秒），0或None表示不过期
+            max_entries: 缓存项数量上限
+            max_bytes: 缓存值估算大小的总上限（字节），None表示不限制
+            size_estimator: 估算缓存值大小的函数，默认按JSON序列化长度估算
         """
         self.ttl_seconds = ttl_seconds
-        self.session_cache: Dict[str, Dict[str, Any]] = {}  # 会话缓存
-        self.message_cache: Dict[str, Dict[str, Any]] = {}  # 消息缓存
-        self.user_sessions_cache: Dict[str, List[Dict[str, Any]]] = {}  # 用户会话列表缓存
-        self.session_messages_cache: Dict[str, List[Dict[str, Any]]] = {}  # 会话消息列表缓存
-        
-        self.cache_timestamps: Dict[str, Dict[str, float]] = {
-            "session": {},
-            "message": {},
-            "user_sessions": {},
-            "session_messages": {}
-        }
-        
-        # 启动缓存清理线程
-        self._start_cleanup_thread()
-        
-        logger.info(f"缓存管理器初始化成功，TTL={ttl_seconds}秒")
-    
-    def _start_cleanup_thread(self):
-        """启动缓存清理线程"""
-        def cleanup_task():
-            while True:
-                try:
-                    self._cleanup_expired_cache()
-                    time.sleep(60)  # 每分钟清理一次
-                except Exception as e:
-                    logger.error(f"缓存清理线程异常: {str(e)}")
-        
-        cleanup_thread = threading.Thread(target=cleanup_task, daemon=True)
-        cleanup_thread.start()
-        logger.info("缓存清理线程已启动")
-    
-    def _cleanup_expired_cache(self):
-        """清理过期的缓存项"""
-        now = time.time()
-        
-        # 清理会话缓存
-        expired_sessions = []
-        for session_id, timestamp in self.cache_timestamps["session"].items():
-            if now - timestamp > self.ttl_seconds:
-                expired_sessions.append(session_id)
-        
-        for session_id in expired_sessions:
-            if session_id in self.session_cache:
-                del self.session_cache[session_id]
-            del self.cache_timestamps["session"][session_id]
-        
-        # 清理消息缓存
-        expired_messages = []
-        for message_id, timestamp in self.cache_timestamps["message"].items():
-            if now - timestamp > self.ttl_seconds:
-                expired_messages.append(message_id)
-        
-        for message_id in expired_messages:
-            if message_id in self.message_cache:
-                del self.message_cache[message_id]
-            del self.cache_timestamps["message"][message_id]
-        
-        # 清理用户会话列表缓存
-        expired_user_sessions = []
-        for user_id, timestamp in self.cache_timestamps["user_sessions"].items():
-            if now - timestamp > self.ttl_seconds:
-                expired_user_sessions.append(user_id)
-        
-        for user_id in expired_user_sessions:
-            if user_id in self.user_sessions_cache:
-                del self.user_sessions_cache[user_id]
-            del self.cache_timestamps["user_sessions"][user_id]
-        
-        # 清理会话消息列表缓存
-        expired_session_messages = []
-        for session_id, timestamp in self.cache_timestamps["session_messages"].items():
-            if now - timestamp > self.ttl_seconds:
-                expired_session_messages.append(session_id)
-        
-        for session_id in expired_session_messages:
-            if session_id in self.session_messages_cache:
-                del self.session_messages_cache[session_id]
-            del self.cache_timestamps["session_messages"][session_id]
-        
-        if any([expired_sessions, expired_messages, expired_user_sessions, expired_session_messages]):
-            logger.debug(f"已清理过期缓存: {len(expired_sessions)}个会话, {len(expired_messages)}个消息, "
-                        f"{len(expired_user_sessions)}个用户会话列表, {len(expired_session_messages)}个会话消息列表")
-    
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._estimate_size = size_estimator or estimate_size
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._expiry_heap: List[tuple] = []  # (过期时间, 版本号, 键)
+        self._tag_index: Dict[str, Set[str]] = {}
+        self._namespace_sizes: Dict[str, int] = {}
+        self._version = 0
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        logger.info(f"缓存管理器初始化成功，TTL={ttl_seconds}秒，容量={max_entries}项")
+
+    # ---- 通用接口 ----
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        获取缓存值
+
+        Args:
+            key: 缓存键
+            default: 未命中时的返回值
+
+        Returns:
+            缓存值，不存在或已过期时返回default
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._purge_expired(now)
+            entry = self._entries.get(key)
+            if entry is None or (entry.expires_at is not None and entry.expires_at <= now):
+                if entry is not None:
+                    self._remove(key)
+                    self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Optional[Iterable[str]] = None) -> None:
+        """
+        设置缓存值
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 生存时间（秒），默认使用 ttl_seconds，0表示不过期
+            tags: 缓存项的标签，用于 invalidate_tag 批量失效
+        """
+        ttl = self.ttl_seconds if ttl is None else ttl
+        size = self._estimate_size(value)
+
+        with self._lock:
+            now = time.monotonic()
+            if key in self._entries:
+                self._remove(key)
+
+            if self.max_bytes is not None and size > self.max_bytes:
+                logger.debug(f"缓存值超出内存预算，不缓存: {key} ({size}字节)")
+                self._purge_expired(now)
+                return
+
+            self._version += 1
+            expires_at = now + ttl if ttl else None
+            entry = _CacheEntry(value, expires_at, set(tags or ()), size, self._version)
+            self._entries[key] = entry
+            self._bytes += size
+            namespace = self._namespace(key)
+            self._namespace_sizes[namespace] = self._namespace_sizes.get(namespace, 0) + 1
+            for tag in entry.tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            if expires_at is not None:
+                heapq.heappush(self._expiry_heap, (expires_at, entry.version, key))
+
+            self._purge_expired(now)
+            self._enforce_limits()
+
+    def delete(self, key: str) -> bool:
+        """
+        删除缓存项
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存项是否存在
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            self.invalidations += 1
+            return True
+
+    def invalidate_tag(self, *tags: str) -> int:
+        """
+        使带有任一指定标签的所有缓存项失效
+
+        Args:
+            tags: 标签
+
+        Returns:
+            失效的缓存项数量
+        """
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys.update(self._tag_index.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+        if keys:
+            logger.debug(f"按标签 {', '.join(tags)} 失效 {len(keys)} 个缓存项")
+        return len(keys)
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """
+        使键以指定前缀开头的所有缓存项失效
+
+        Args:
+            prefix: 键前缀
+
+        Returns:
+            失效的缓存项数量
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry.expires_at is None or entry.expires_at > time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---- 内部维护 ----
+
+    @staticmethod
+    def _namespace(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    def _remove(self, key: str) -> None:
+        # 需持有锁；堆中对应的记录在弹出时按版本号识别为过时并跳过
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        namespace = self._namespace(key)
+        remaining = self._namespace_sizes.get(namespace, 0) - 1
+        if remaining > 0:
+            self._namespace_sizes[namespace] = remaining
+        else:
+            self._namespace_sizes.pop(namespace, None)
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def _purge_expired(self, now: float) -> int:
+        # 需持有锁
+        heap = self._expiry_heap
+        expired = 0
+        while heap and heap[0][0] <= now:
+            _, version, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._remove(key)
+                expired += 1
+        self.expirations += expired
+
+        # 被覆盖或删除的项在堆中留下过时记录，过多时重建堆
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [(e.expires_at, e.version, k) for k, e in self._entries.items()
+                                 if e.expires_at is not None]
+            heapq.heapify(self._expiry_heap)
+        return expired
+
+    def _enforce_limits(self) -> None:
+        # 需持有锁
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def _cleanup_expired_cache(self) -> int:
+        """清理过期的缓存项，返回清理数量"""
+        with self._lock:
+            expired = self._purge_expired(time.monotonic())
+        if expired:
+            logger.debug(f"已清理过期缓存: {expired}项")
+        return expired
+
+    # ---- 兼容接口 ----
+
     def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """从缓存获取会话"""
-        if session_id in self.session_cache:
-            return self.session_cache[session_id]
-        return None
-    
+        return self.get(f"session:{session_id}")
+
     def set_session(self, session_id: str, session_data: Dict[str, Any]):
         """设置会话缓存"""
-        self.session_cache[session_id] = session_data
-        self.cache_timestamps["session"][session_id] = time.time()
-    
+        self.set(f"session:{session_id}", session_data, tags=[f"session:{session_id}"])
+
     def invalidate_session(self, session_id: str):
         """使会话缓存失效"""
-        if session_id in self.session_cache:
-            del self.session_cache[session_id]
-        if session_id in self.cache_timestamps["session"]:
-            del self.cache_timestamps["session"][session_id]
-    
+        self.delete(f"session:{session_id}")
+
     def get_message(self, message_id: str) -> Optional[Dict[str, Any]]:
         """从缓存获取消息"""
-        if message_id in self.message_cache:
-            return self.message_cache[message_id]
-        return None
-    
+        return self.get(f"message:{message_id}")
+
     def set_message(self, message_id: str, message_data: Dict[str, Any]):
         """设置消息缓存"""
-        self.message_cache[message_id] = message_data
-        self.cache_timestamps["message"][message_id] = time.time()
-    
+        tags = [f"session:{message_data['session_id']}"] if message_data.get("session_id") else None
+        self.set(f"message:{message_id}", message_data, tags=tags)
+
     def invalidate_message(self, message_id: str):
         """使消息缓存失效"""
-        if message_id in self.message_cache:
-            del self.message_cache[message_id]
-        if message_id in self.cache_timestamps["message"]:
-            del self.cache_timestamps["message"][message_id]
-    
+        self.delete(f"message:{message_id}")
+
     def get_user_sessions(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
         """从缓存获取用户会话列表"""
-        if user_id in self.user_sessions_cache:
-            return self.user_sessions_cache[user_id]
-        return None
-    
+        return self.get(f"user_sessions:{user_id}")
+
     def set_user_sessions(self, user_id: str, sessions_data: List[Dict[str, Any]]):
         """设置用户会话列表缓存"""
-        self.user_sessions_cache[user_id] = sessions_data
-        self.cache_timestamps["user_sessions"][user_id] = time.time()
-    
+        self.set(f"user_sessions:{user_id}", sessions_data, tags=[f"user:{user_id}"])
+
     def invalidate_user_sessions(self, user_id: str):
         """使用户会话列表缓存失效"""
-        if user_id in self.user_sessions_cache:
-            del self.user_sessions_cache[user_id]
-        if user_id in self.cache_timestamps["user_sessions"]:
-            del self.cache_timestamps["user_sessions"][user_id]
-    
+        self.delete(f"user_sessions:{user_id}")
+
     def get_session_messages(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
         """从缓存获取会话消息列表"""
-        if session_id in self.session_messages_cache:
-            return self.session_messages_cache[session_id]
-        return None
-    
+        return self.get(f"session_messages:{session_id}")
+
     def set_session_messages(self, session_id: str, messages_data: List[Dict[str, Any]]):
         """设置会话消息列表缓存"""
-        self.session_messages_cache[session_id] = messages_data
-        self.cache_timestamps["session_messages"][session_id] = time.time()
-    
+        self.set(f"session_messages:{session_id}", messages_data, tags=[f"session:{session_id}"])
+
     def invalidate_session_messages(self, session_id: str):
         """使会话消息列表缓存失效"""
-        if session_id in self.session_messages_cache:
-            del self.session_messages_cache[session_id]
-        if session_id in self.cache_timestamps["session_messages"]:
-            del self.cache_timestamps["session_messages"][session_id]
-    
+        self.delete(f"session_messages:{session_id}")
+
     def invalidate_all(self):
         """清空所有缓存"""
-        self.session_cache.clear()
-        self.message_cache.clear()
-        self.user_sessions_cache.clear()
-        self.session_messages_cache.clear()
-        
-        for cache_type in self.cache_timestamps:
-            self.cache_timestamps[cache_type].clear()
-        
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._expiry_heap.clear()
+            self._tag_index.clear()
+            self._namespace_sizes.clear()
+            self._bytes = 0
+
         logger.info("已清空所有缓存")
-    
+
     def get_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
-        return {
-            "session_cache_size": len(self.session_cache),
-            "message_cache_size": len(self.message_cache),
-            "user_sessions_cache_size": len(self.user_sessions_cache),
-            "session_messages_cache_size": len(self.session_messages_cache),
-            "ttl_seconds": self.ttl_seconds
-        }
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            lookups = self.hits + self.misses
+            return {
+                "session_cache_size": self._namespace_sizes.get("session", 0),
+                "message_cache_size": self._namespace_sizes.get("message", 0),
+                "user_sessions_cache_size": self._namespace_sizes.get("user_sessions", 0),
+                "session_messages_cache_size": self._namespace_sizes.get("session_messages", 0),
+                "ttl_seconds": self.ttl_seconds,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "tags": len(self._tag_index),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
@@ -12,6 +12,7 @@ from .notification import NotificationService
 from .cache_manager import CacheManager
 from .websocket_optimizer import WebSocketOptimizer
 from .db_query_optimizer import DBQueryOptimizer
+from .session_summary import SessionSummary, SessionSummaryIndex
 from rainbow_agent.storage.unified_dialogue_storage import UnifiedDialogueStorage
 
 logger = logging.getLogger(__name__)
@@ -32,6 +33,8 @@ class HumanChatManager:
         self.cache = CacheManager(ttl_seconds=cache_ttl)
         self.websocket_optimizer = WebSocketOptimizer()
         self.db_optimizer = DBQueryOptimizer()
+        # 按参与者索引的会话摘要，用于会话列表，与缓存相同的周期与存储核对有更新的会话
+        self.session_summaries = SessionSummaryIndex(reconcile_seconds=cache_ttl)
         
         # 批量操作锁
         self._batch_locks = {}
@@ -58,6 +61,7 @@ class HumanChatManager:
         
         if session:
             logger.info(f"成功创建私聊会话: {session.get('id', '')}")
+            self.session_summaries.add_session({"id": session.get("id"), "title": title, "metadata": metadata})
             
             # 通知接收者有新会话
             notification = {
@@ -98,6 +102,7 @@ class HumanChatManager:
         
         if session:
             logger.info(f"成功创建群聊会话: {session.get('id', '')}")
+            self.session_summaries.add_session({"id": session.get("id"), "title": title, "metadata": metadata})
             
             # 通知所有成员有新群聊
             notification = {
@@ -154,12 +159,24 @@ class HumanChatManager:
         if stored_message:
             logger.info(f"消息已存储: {stored_message.get('id', '')}")
             
+            # 使该会话的消息列表、最后一条消息、未读数以及包含该会话的会话列表缓存失效
+            self.cache.invalidate_tag(f"session:{session_id}")
+            
             # 更新会话最后活动时间
+            updated_at = datetime.now().isoformat()
             await self.storage.update_session_async(
                 session_id, 
-                {"metadata.updated_at": datetime.now().isoformat()}
+                {"metadata.updated_at": updated_at}
             )
             
+            # 增量更新所有参与者的会话摘要
+            self.session_summaries.record_message(session, {
+                "id": stored_message.get("id"),
+                "content": content,
+                "sender_id": sender_id,
+                "created_at": stored_message.get("created_at")
+            }, sender_id, updated_at)
+            
             # 准备要发送的消息数据
             message_to_send = {
                 "type": "chat_message",
@@ -206,15 +223,20 @@ class HumanChatManager:
             logger.error(f"用户 {user_id} 不是会话 {session_id} 的参与者")
             return False
         
+        sender_id = message.get("metadata", {}).get("sender_id")
+        newly_read = sender_id != user_id and user_id not in message.get("metadata", {}).get("read_at", {})
+        
         # 更新消息元数据，添加已读时间
         read_at_key = f"metadata.read_at.{user_id}"
         await self.storage.update_turn_async(
             message_id, 
             {read_at_key: datetime.now().isoformat()}
         )
+        self.cache.invalidate_tag(f"session:{session_id}")
+        if newly_read:
+            self.session_summaries.record_read(session_id, user_id)
         
         # 通知发送者消息已读
-        sender_id = message.get("metadata", {}).get("sender_id")
         if sender_id and sender_id != user_id:
             read_notification = {
                 "type": "message_read",
@@ -227,62 +249,53 @@ class HumanChatManager:
         
         return True
     
-    async def get_user_sessions(self, user_id: str) -> List[Dict[str, Any]]:
-        """获取用户的所有会话列表"""
-        # 尝试从缓存获取会话列表
-        cache_key = f"user_sessions:{user_id}"
-        cached_sessions = self.cache.get(cache_key)
-        if cached_sessions:
-            logger.info(f"从缓存获取用户会话列表: {user_id}")
-            return cached_sessions
-            
-        # 查询用户参与的所有会话
-        sessions = await self.db_optimizer.get_sessions(self.storage)
-        
-        # 过滤出用户参与的人类对话会话
-        user_sessions = []
-        for session in sessions:
-            metadata = session.get("metadata", {})
-            participants = metadata.get("participants", [])
-            dialogue_type = metadata.get("dialogue_type", "")
-            
-            # 只返回人类对话类型且用户是参与者的会话
-            if user_id in participants and dialogue_type.startswith("human_human"):
-                # 格式化会话信息
-                formatted_session = {
-                    "id": session.get("id"),
-                    "title": session.get("title"),
-                    "is_group": dialogue_type == "human_human_group",
-                    "participants": participants,
-                    "created_at": metadata.get("created_at"),
-                    "updated_at": metadata.get("updated_at"),
-                    "last_message": None,  # 将在下面填充
-                    "unread_count": 0  # 将在下面填充
-                }
-                
-                # 获取最后一条消息
-                last_message = await self._get_last_message(session.get("id"))
-                if last_message:
-                    formatted_session["last_message"] = {
-                        "id": last_message.get("id"),
-                        "content": last_message.get("content"),
-                        "sender_id": last_message.get("metadata", {}).get("sender_id"),
-                        "created_at": last_message.get("created_at")
-                    }
-                
-                # 计算未读消息数
-                unread_count = await self._count_unread_messages(session.get("id"), user_id)
-                formatted_session["unread_count"] = unread_count
-                
-                user_sessions.append(formatted_session)
+    async def get_user_sessions(self, user_id: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """获取用户的所有会话列表，最近更新的在前面"""
+        # 摘要在发送消息和标记已读时增量维护，第一次查询时从存储建立，之后定期只核对有更新的会话
+        if self.session_summaries.needs_sync(user_id):
+            await self._sync_user_summaries(user_id)
         
-        # 按最后更新时间排序，最新的在前面
-        user_sessions.sort(key=lambda s: s.get("updated_at", ""), reverse=True)
+        return self.session_summaries.get_user_sessions(user_id, limit, offset)
+    
+    async def _sync_user_summaries(self, user_id: str) -> None:
+        """与存储核对用户的会话摘要，只读取新出现或有更新的会话的消息，删除已不存在的会话的摘要"""
+        snapshot = self.session_summaries.begin_sync(user_id)
+        loaded = self.session_summaries.is_loaded(user_id)
+        
+        # 查询用户参与的人类对话会话
+        sessions = [
+            session for session in await self.db_optimizer.get_sessions(self.storage)
+            if user_id in session.get("metadata", {}).get("participants", [])
+            and session.get("metadata", {}).get("dialogue_type", "").startswith("human_human")
+        ]
+        
+        summaries = []
+        for session in self.session_summaries.sessions_to_rebuild(user_id, sessions):
+            if loaded:
+                # 会话在其他地方有更新，本地缓存的最后一条消息和未读数已过期
+                self.cache.invalidate_tag(f"session:{session.get('id')}")
+            summaries.append(await self._build_summary(session, user_id))
+        
+        self.session_summaries.finish_sync(user_id, [session.get("id") for session in sessions], summaries, snapshot)
+        logger.info(f"已与存储核对用户会话摘要: {user_id}, {len(sessions)}个会话，重建{len(summaries)}个")
+    
+    async def _build_summary(self, session: Dict[str, Any], user_id: str) -> SessionSummary:
+        """读取会话的消息，重建用户在该会话中的摘要"""
+        summary = SessionSummary.from_session(session)
         
-        # 缓存结果
-        self.cache.set(cache_key, user_sessions)
+        # 获取最后一条消息
+        last_message = await self._get_last_message(session.get("id"))
+        if last_message:
+            summary.last_message = {
+                "id": last_message.get("id"),
+                "content": last_message.get("content"),
+                "sender_id": last_message.get("metadata", {}).get("sender_id"),
+                "created_at": last_message.get("created_at")
+            }
         
-        return user_sessions
+        # 计算未读消息数
+        summary.unread_count = await self._count_unread_messages(session.get("id"), user_id)
+        return summary
     
     async def get_session_messages(self, session_id: str, user_id: str, limit: int = 20, before_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """获取会话消息列表"""
@@ -352,7 +365,7 @@ class HumanChatManager:
         formatted_messages.reverse()
         
         # 缓存结果
-        self.cache.set(cache_key, formatted_messages)
+        self.cache.set(cache_key, formatted_messages, tags=[f"session:{session_id}"])
         
         return formatted_messages
     
@@ -414,7 +427,7 @@ class HumanChatManager:
         
         # 缓存结果
         if last_message:
-            self.cache.set(cache_key, last_message)
+            self.cache.set(cache_key, last_message, tags=[f"session:{session_id}"])
             
         return last_message
     
@@ -445,6 +458,6 @@ class HumanChatManager:
                 unread_count += 1
         
         # 缓存结果
-        self.cache.set(cache_key, unread_count)
+        self.cache.set(cache_key, unread_count, tags=[f"session:{session_id}"])
         
         return unread_count
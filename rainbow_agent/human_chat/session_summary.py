@@ -0,0 +1,260 @@
+from typing import Dict, Any, List, Optional, Iterable
+from collections import OrderedDict
+from itertools import islice
+import threading
+import time
+
+
+class SessionSummary:
+    """用户在一个会话中的摘要：会话信息、最后一条消息和未读消息数"""
+
+    __slots__ = ("session_id", "title", "is_group", "participants", "created_at",
+                 "updated_at", "last_message", "unread_count")
+
+    def __init__(self, session_id: str, title: Optional[str] = None, is_group: bool = False,
+                 participants: Optional[List[str]] = None, created_at: Optional[str] = None,
+                 updated_at: Optional[str] = None, last_message: Optional[Dict[str, Any]] = None,
+                 unread_count: int = 0):
+        self.session_id = session_id
+        self.title = title
+        self.is_group = is_group
+        self.participants = list(participants or [])
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.last_message = last_message
+        self.unread_count = unread_count
+
+    @classmethod
+    def from_session(cls, session: Dict[str, Any]) -> "SessionSummary":
+        """根据存储中的会话数据创建摘要"""
+        metadata = session.get("metadata", {})
+        return cls(
+            session_id=session.get("id"),
+            title=session.get("title"),
+            is_group=metadata.get("dialogue_type", "") == "human_human_group",
+            participants=metadata.get("participants", []),
+            created_at=metadata.get("created_at"),
+            updated_at=metadata.get("updated_at")
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为会话列表项"""
+        return {
+            "id": self.session_id,
+            "title": self.title,
+            "is_group": self.is_group,
+            "participants": list(self.participants),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "last_message": dict(self.last_message) if self.last_message else None,
+            "unread_count": self.unread_count
+        }
+
+
+class SessionSummaryIndex:
+    """
+    按参与者索引的会话摘要
+
+    每个用户的摘要按更新时间升序保存在一个有序字典中，会话有新消息时移到末尾，
+    读取会话列表只需按逆序遍历该用户的摘要，不需要查询任何会话的消息。
+    摘要由发送消息和标记已读增量维护，不会整体过期重建：用户第一次查询时从存储建立，
+    之后每隔 reconcile_seconds 与存储的会话列表核对一次，只重建新出现的、以及存储中
+    更新时间比摘要新（其他进程发送了消息）的会话，并删除已不存在的会话。
+    核对期间有增量更新的会话保留内存中的摘要。最多保留 max_users 个用户的摘要，
+    超出时淘汰最久未访问的用户，被淘汰的用户下次查询时重新建立。
+    """
+
+    def __init__(self, max_users: int = 10000, reconcile_seconds: Optional[float] = 300):
+        """
+        初始化摘要索引
+
+        Args:
+            max_users: 最多保留摘要的用户数
+            reconcile_seconds: 与存储核对的间隔（秒），None表示建立后不再核对
+        """
+        self.max_users = max(1, max_users)
+        self.reconcile_seconds = reconcile_seconds
+        # 按最近访问顺序排列的用户摘要
+        self._by_user: "OrderedDict[str, OrderedDict[str, SessionSummary]]" = OrderedDict()
+        self._synced_at: Dict[str, float] = {}
+        # 用户 -> 会话 -> 增量更新次数，用于识别与存储核对期间发生的更新
+        self._changes: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.RLock()
+
+    def is_loaded(self, user_id: str) -> bool:
+        """用户的摘要是否已从存储建立"""
+        with self._lock:
+            return user_id in self._synced_at
+
+    def needs_sync(self, user_id: str) -> bool:
+        """用户的摘要尚未建立，或距上次与存储核对已超过 reconcile_seconds"""
+        with self._lock:
+            synced_at = self._synced_at.get(user_id)
+            if synced_at is None:
+                return True
+            return self.reconcile_seconds is not None and time.monotonic() - synced_at >= self.reconcile_seconds
+
+    def begin_sync(self, user_id: str) -> Dict[str, int]:
+        """
+        开始与存储核对用户的摘要，需要在读取存储之前调用
+
+        Returns:
+            各会话增量更新次数的快照，传给 finish_sync
+        """
+        with self._lock:
+            return dict(self._changes.get(user_id, {}))
+
+    def sessions_to_rebuild(self, user_id: str, sessions: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        找出需要从消息重建摘要的会话
+
+        Args:
+            user_id: 用户ID
+            sessions: 存储中用户参与的会话
+
+        Returns:
+            摘要尚未建立时为全部会话，否则为没有摘要的会话和存储中更新时间比摘要新的会话
+        """
+        with self._lock:
+            if user_id not in self._synced_at:
+                return list(sessions)
+            summaries = self._by_user.get(user_id, {})
+            stale = []
+            for session in sessions:
+                summary = summaries.get(session.get("id"))
+                updated_at = session.get("metadata", {}).get("updated_at") or ""
+                if summary is None or updated_at > (summary.updated_at or ""):
+                    stale.append(session)
+            return stale
+
+    def finish_sync(self, user_id: str, session_ids: Iterable[str], summaries: Iterable[SessionSummary],
+                    snapshot: Dict[str, int]) -> None:
+        """
+        完成核对：用重建的摘要替换旧摘要，删除存储中已不存在的会话的摘要，
+        begin_sync 之后有增量更新的会话保留内存中的摘要
+
+        Args:
+            user_id: 用户ID
+            session_ids: 存储中用户参与的全部会话ID
+            summaries: 重建的摘要
+            snapshot: begin_sync 返回的快照
+        """
+        with self._lock:
+            changes = self._changes.setdefault(user_id, {})
+
+            def untouched(session_id: str) -> bool:
+                return changes.get(session_id, 0) == snapshot.get(session_id, 0)
+
+            existing = set(session_ids)
+            merged = {session_id: summary for session_id, summary in self._by_user.get(user_id, {}).items()
+                      if session_id in existing or not untouched(session_id)}
+            for summary in summaries:
+                if untouched(summary.session_id):
+                    merged[summary.session_id] = summary
+            for session_id in [session_id for session_id in changes if session_id not in merged]:
+                del changes[session_id]
+
+            ordered = sorted(merged.values(), key=lambda s: s.updated_at or "")
+            self._by_user[user_id] = OrderedDict((s.session_id, s) for s in ordered)
+            self._synced_at[user_id] = time.monotonic()
+            self._touch(user_id)
+
+    def add_session(self, session: Dict[str, Any]) -> None:
+        """
+        为新会话的所有参与者创建摘要
+
+        Args:
+            session: 存储中的会话数据
+        """
+        with self._lock:
+            for user_id in session.get("metadata", {}).get("participants", []):
+                self._put(user_id, SessionSummary.from_session(session))
+
+    def record_message(self, session: Dict[str, Any], message: Dict[str, Any],
+                       sender_id: str, updated_at: str) -> None:
+        """
+        会话有新消息：更新所有参与者的最后一条消息和更新时间，其他参与者的未读数加一
+
+        Args:
+            session: 存储中的会话数据
+            message: 会话列表中展示的最后一条消息
+            sender_id: 发送者ID
+            updated_at: 会话更新时间
+        """
+        with self._lock:
+            for user_id in session.get("metadata", {}).get("participants", []):
+                summary = self._get(user_id, session.get("id"))
+                if summary is None:
+                    summary = SessionSummary.from_session(session)
+                summary.last_message = dict(message)
+                summary.updated_at = updated_at
+                if user_id != sender_id:
+                    summary.unread_count += 1
+                self._put(user_id, summary)
+
+    def record_read(self, session_id: str, user_id: str, count: int = 1) -> None:
+        """
+        用户读了会话中的消息：未读数减少
+
+        Args:
+            session_id: 会话ID
+            user_id: 用户ID
+            count: 新读的消息数
+        """
+        with self._lock:
+            summary = self._get(user_id, session_id)
+            if summary is not None:
+                summary.unread_count = max(0, summary.unread_count - count)
+                self._changed(user_id, session_id)
+
+    def get_user_sessions(self, user_id: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        获取用户的会话列表
+
+        Args:
+            user_id: 用户ID
+            limit: 最多返回的会话数
+            offset: 跳过最近更新的会话数
+
+        Returns:
+            会话列表项，最近更新的在前面
+        """
+        with self._lock:
+            if user_id in self._by_user:
+                self._by_user.move_to_end(user_id)
+            stop = None if limit is None else offset + limit
+            summaries = reversed(self._by_user.get(user_id, {}).values())
+            return [summary.to_dict() for summary in islice(summaries, offset, stop)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._by_user)
+
+    def _get(self, user_id: str, session_id: str) -> Optional[SessionSummary]:
+        summaries = self._by_user.get(user_id)
+        return summaries.get(session_id) if summaries else None
+
+    def _put(self, user_id: str, summary: SessionSummary) -> None:
+        # 需持有锁；更新时间不早于当前最新摘要时直接放到末尾，否则重新排序
+        summaries = self._by_user.setdefault(user_id, OrderedDict())
+        summaries.pop(summary.session_id, None)
+        newest = next(reversed(summaries.values()), None) if summaries else None
+        summaries[summary.session_id] = summary
+        if newest is not None and (summary.updated_at or "") < (newest.updated_at or ""):
+            self._by_user[user_id] = OrderedDict(
+                sorted(summaries.items(), key=lambda item: item[1].updated_at or ""))
+        self._changed(user_id, summary.session_id)
+        self._touch(user_id)
+
+    def _changed(self, user_id: str, session_id: str) -> None:
+        # 需持有锁
+        changes = self._changes.setdefault(user_id, {})
+        changes[session_id] = changes.get(session_id, 0) + 1
+
+    def _touch(self, user_id: str) -> None:
+        # 需持有锁；标记用户最近被访问，超出用户数上限时淘汰最久未访问的用户
+        self._by_user.move_to_end(user_id)
+        while len(self._by_user) > self.max_users:
+            evicted, _ = self._by_user.popitem(last=False)
+            self._synced_at.pop(evicted, None)
+            self._changes.pop(evicted, None)
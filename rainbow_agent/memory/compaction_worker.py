@@ -0,0 +1,180 @@
+"""
+记忆压缩后台任务
+
+在后台线程中按块增量压缩长期记忆，不阻塞对话的保存路径，并记录吞吐量指标。
+"""
+from typing import Dict, Any, Optional, Callable
+from datetime import datetime
+import threading
+import time
+
+from .memory_compression import MemoryCompression
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class MemoryCompactionWorker:
+    """
+    记忆压缩后台任务
+
+    trigger() 唤醒后台线程执行一轮压缩；也可以通过 interval 定期执行。
+    每轮压缩按时间顺序分块处理，每块独立提交并推进检查点。
+    """
+
+    def __init__(
+        self,
+        compression: MemoryCompression,
+        days: int = 7,
+        min_count: int = 20,
+        chunk_size: int = 50,
+        max_chunk_chars: int = 12000,
+        max_chunks_per_run: Optional[int] = None,
+        rollup_fanout: int = 8,
+        interval: Optional[float] = None,
+        on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        """
+        初始化记忆压缩后台任务
+
+        Args:
+            compression: 记忆压缩系统
+            days: 压缩多少天前的记忆
+            min_count: 最小记忆数量，低于此数量不压缩
+            chunk_size: 每块的最大记忆数量
+            max_chunk_chars: 每块的最大文本长度
+            max_chunks_per_run: 每轮最多处理的块数，None表示不限制
+            rollup_fanout: 生成上一层级摘要所需的摘要数量
+            interval: 定期压缩的间隔(秒)，None表示只在触发时压缩
+            on_chunk: 每处理完一块后的回调
+        """
+        self.compression = compression
+        self.days = days
+        self.min_count = min_count
+        self.chunk_size = chunk_size
+        self.max_chunk_chars = max_chunk_chars
+        self.max_chunks_per_run = max_chunks_per_run
+        self.rollup_fanout = rollup_fanout
+        self.interval = interval
+        self.on_chunk = on_chunk
+
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._run_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self.metrics: Dict[str, Any] = {
+            "runs": 0,
+            "chunks": 0,
+            "memories_processed": 0,
+            "memories_deleted": 0,
+            "summaries_created": 0,
+            "rollups_created": 0,
+            "input_chars": 0,
+            "busy_seconds": 0.0,
+            "last_run_at": None,
+            "last_status": None,
+            "last_error": None
+        }
+
+    @property
+    def is_running(self) -> bool:
+        """后台线程是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """启动后台线程"""
+        if self.is_running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._loop, name="memory-compaction", daemon=True)
+        self._thread.start()
+        logger.info("记忆压缩后台任务已启动")
+
+    def trigger(self) -> None:
+        """请求执行一轮压缩，立即返回"""
+        self.start()
+        self._wakeup.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        停止后台线程，当前块处理完成后退出
+
+        Args:
+            timeout: 等待线程退出的超时时间(秒)
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                break
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"记忆压缩后台任务出错: {e}")
+
+    def _handle_chunk(self, chunk_result: Dict[str, Any]) -> None:
+        self.metrics["chunks"] += 1
+        self.metrics["memories_processed"] += chunk_result["original_count"]
+        self.metrics["memories_deleted"] += len(chunk_result["deleted_ids"])
+        self.metrics["summaries_created"] += 1
+        self.metrics["input_chars"] += chunk_result["input_chars"]
+
+        if self.on_chunk:
+            self.on_chunk(chunk_result)
+
+        # 停止请求在块之间生效
+        if self._stopping.is_set():
+            raise InterruptedError("记忆压缩任务已停止")
+
+    def run_once(self, days: Optional[int] = None, min_count: Optional[int] = None) -> Dict[str, Any]:
+        """
+        在当前线程中执行一轮压缩
+
+        Args:
+            days: 压缩多少天前的记忆，None表示使用默认值
+            min_count: 最小记忆数量，None表示使用默认值
+
+        Returns:
+            压缩结果
+        """
+        with self._run_lock:
+            started = time.time()
+            result = self.compression.compress_long_term_memories(
+                days=self.days if days is None else days,
+                min_count=self.min_count if min_count is None else min_count,
+                chunk_size=self.chunk_size,
+                max_chunk_chars=self.max_chunk_chars,
+                max_chunks=self.max_chunks_per_run,
+                rollup_fanout=self.rollup_fanout,
+                on_chunk=self._handle_chunk
+            )
+
+            self.metrics["runs"] += 1
+            self.metrics["busy_seconds"] += time.time() - started
+            self.metrics["rollups_created"] += result.get("rollup_count", 0)
+            self.metrics["last_run_at"] = datetime.now().isoformat()
+            self.metrics["last_status"] = result["status"]
+            self.metrics["last_error"] = result.get("error")
+            return result
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        获取吞吐量指标
+
+        Returns:
+            指标字典，包含每秒处理的记忆数和输入字符数
+        """
+        metrics = dict(self.metrics)
+        busy = metrics["busy_seconds"]
+        metrics["memories_per_second"] = metrics["memories_processed"] / busy if busy else 0.0
+        metrics["chars_per_second"] = metrics["input_chars"] / busy if busy else 0.0
+        metrics["is_running"] = self.is_running
+        return metrics
@@ -0,0 +1,375 @@
+"""
+嵌入向量服务
+
+为记忆系统提供批量化、带缓存的嵌入向量生成：
+- 将短时间窗口内的待嵌入文本合并为一次批量请求
+- 通过内容哈希LRU缓存和可选的磁盘缓存对相同文本去重
+- 支持OpenAI嵌入接口和用于测试/基准的本地伪后端
+"""
+from typing import List, Dict, Any, Optional, Sequence
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+import hashlib
+import threading
+import time
+
+import numpy as np
+
+from .sqlite_pool import get_connection_manager
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class EmbeddingBackend(ABC):
+    """嵌入向量后端接口"""
+
+    model: str = "unknown"
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        批量生成嵌入向量
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            与输入顺序一致的float32向量列表
+        """
+        pass
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """基于OpenAI embeddings接口的后端，一次请求处理整批文本"""
+
+    def __init__(self, llm_client, model: str = "text-embedding-ada-002"):
+        """
+        初始化OpenAI嵌入后端
+
+        Args:
+            llm_client: OpenAI客户端
+            model: 嵌入模型名称
+        """
+        self.llm_client = llm_client
+        self.model = model
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        response = self.llm_client.embeddings.create(model=self.model, input=texts)
+        data = sorted(response.data, key=lambda item: getattr(item, "index", 0))
+        return [np.array(item.embedding, dtype=np.float32) for item in data]
+
+
+class FakeEmbeddingBackend(EmbeddingBackend):
+    """
+    本地伪嵌入后端
+
+    根据文本哈希生成确定性的随机向量，可模拟每次请求的网络延迟，
+    用于测试和基准测试。
+    """
+
+    def __init__(self, dimension: int = 1536, latency: float = 0.0, model: str = "fake-embedding"):
+        """
+        初始化伪嵌入后端
+
+        Args:
+            dimension: 向量维度
+            latency: 每次请求模拟的延迟(秒)
+            model: 模型名称
+        """
+        self.dimension = dimension
+        self.latency = latency
+        self.model = model
+        self.request_count = 0
+        self.text_count = 0
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        self.request_count += 1
+        self.text_count += len(texts)
+        if self.latency:
+            time.sleep(self.latency)
+
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vectors.append(np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32))
+        return vectors
+
+
+class EmbeddingCache:
+    """
+    嵌入向量缓存
+
+    内存中使用按内容哈希索引的LRU缓存，可选地以SQLite文件作为持久化的第二层缓存。
+    """
+
+    def __init__(self, capacity: int = 10000, db_path: Optional[str] = None):
+        """
+        初始化嵌入缓存
+
+        Args:
+            capacity: 内存LRU缓存容量
+            db_path: 磁盘缓存数据库路径，None表示不使用磁盘缓存
+        """
+        self.capacity = capacity
+        self.db_path = db_path
+        self.db = get_connection_manager(db_path) if db_path else None
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._init_db()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """根据模型和文本内容生成缓存键"""
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _init_db(self) -> None:
+        """初始化磁盘缓存"""
+        self.db.execute('''
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            embedding BLOB NOT NULL
+        )
+        ''')
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        批量读取缓存
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            命中的缓存键到向量的映射
+        """
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+            self.hits += len(found)
+
+        missing = [key for key in keys if key not in found]
+        if missing and self.db is not None:
+            placeholders = ", ".join(["?"] * len(missing))
+            rows = self.db.query(f"SELECT key, embedding FROM embedding_cache WHERE key IN ({placeholders})", missing)
+
+            disk_found = {key: np.frombuffer(blob, dtype=np.float32) for key, blob in rows}
+            self._put_memory(disk_found)
+            with self._lock:
+                self.disk_hits += len(disk_found)
+            found.update(disk_found)
+
+        with self._lock:
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, model: str, entries: Dict[str, np.ndarray]) -> None:
+        """
+        批量写入缓存
+
+        Args:
+            model: 嵌入模型名称
+            entries: 缓存键到向量的映射
+        """
+        if not entries:
+            return
+        self._put_memory(entries)
+
+        if self.db is not None:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, model, embedding) VALUES (?, ?, ?)",
+                [(key, model, vector.astype(np.float32).tobytes()) for key, vector in entries.items()]
+            )
+
+    def _put_memory(self, entries: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in entries.items():
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses
+            }
+
+
+class EmbeddingService:
+    """
+    嵌入向量服务
+
+    embed_many 对一组文本去重、查缓存并以单次批量请求生成未命中的向量；
+    submit/embed 将并发提交的单条文本在 max_wait 时间窗口或 max_batch_size
+    数量内合并为一次批量请求。
+    """
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        cache: Optional[EmbeddingCache] = None,
+        max_batch_size: int = 64,
+        max_wait: float = 0.01
+    ):
+        """
+        初始化嵌入向量服务
+
+        Args:
+            backend: 嵌入后端
+            cache: 嵌入缓存，None时使用默认的内存缓存
+            max_batch_size: 单次批量请求的最大文本数
+            max_wait: 合并请求的最长等待时间(秒)
+        """
+        self.backend = backend
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+
+        self._pending: List[tuple] = []
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+
+        self.batch_count = 0
+
+    @property
+    def model(self) -> str:
+        return self.backend.model
+
+    def embed_many(self, texts: Sequence[str]) -> List[np.ndarray]:
+        """
+        批量生成嵌入向量
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            与输入顺序一致的向量列表
+        """
+        if not texts:
+            return []
+
+        keys = [EmbeddingCache.make_key(self.model, text) for text in texts]
+        vectors = self.cache.get_many(list(dict.fromkeys(keys)))
+
+        # 对未命中的文本去重后分批请求
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            missing_keys = list(missing)
+            generated: Dict[str, np.ndarray] = {}
+            for start in range(0, len(missing_keys), self.max_batch_size):
+                batch_keys = missing_keys[start:start + self.max_batch_size]
+                batch_vectors = self.backend.embed([missing[key] for key in batch_keys])
+                self.batch_count += 1
+                generated.update(zip(batch_keys, batch_vectors))
+            self.cache.put_many(self.model, generated)
+            vectors.update(generated)
+
+        return [vectors[key] for key in keys]
+
+    def embed(self, text: str, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        生成单条文本的嵌入向量，与并发提交的其他文本合并请求
+
+        Args:
+            text: 文本
+            timeout: 等待超时时间(秒)
+
+        Returns:
+            嵌入向量
+        """
+        return self.submit(text).result(timeout=timeout)
+
+    def submit(self, text: str) -> Future:
+        """
+        提交一条待嵌入文本
+
+        Args:
+            text: 文本
+
+        Returns:
+            结果为嵌入向量的Future
+        """
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("嵌入向量服务已关闭")
+            self._pending.append((text, future))
+            self._ensure_worker()
+            self._condition.notify()
+        return future
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        """后台合并线程：凑满一批或等待超时后统一发起请求"""
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending and self._closed:
+                    return
+
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch = self._pending[:self.max_batch_size]
+                self._pending = self._pending[self.max_batch_size:]
+
+            self._flush(batch)
+
+    def _flush(self, batch: List[tuple]) -> None:
+        texts = [text for text, _ in batch]
+        try:
+            vectors = self.embed_many(texts)
+        except Exception as e:
+            logger.error(f"批量生成嵌入向量失败: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+    def close(self) -> None:
+        """处理完剩余请求后停止后台线程"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取服务统计信息"""
+        stats = self.cache.get_stats()
+        stats["batch_count"] = self.batch_count
+        stats["model"] = self.model
+        return stats
@@ -6,12 +6,14 @@
 from typing import List, Dict, Any, Optional, Tuple
 import json
 from datetime import datetime
-import sqlite3
 
 from .memory import Memory
 from .hierarchical_memory import HierarchicalMemory
 from .relevance_retrieval import RelevanceRetrieval
 from .memory_compression import MemoryCompression
+from .compaction_worker import MemoryCompactionWorker
+from .embedding_service import EmbeddingService
+from .sqlite_pool import get_connection_manager
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -39,7 +41,8 @@ class EnhancedMemory(Memory):
         importance_threshold: float = 0.6,
         auto_compress_days: int = 7,
         auto_compress_threshold: int = 50,
-        llm_client = None
+        llm_client = None,
+        embedding_service: Optional[EmbeddingService] = None
     ):
         """
         初始化增强记忆系统
@@ -59,6 +62,7 @@ class EnhancedMemory(Memory):
             auto_compress_days: 自动压缩天数
             auto_compress_threshold: 自动压缩阈值
             llm_client: LLM客户端
+            embedding_service: 嵌入向量服务，None时使用默认的OpenAI批量服务
         """
         # 初始化组件
         self.hierarchical_memory = HierarchicalMemory(
@@ -74,7 +78,8 @@ class EnhancedMemory(Memory):
             db_path=db_path,
             embedding_model=embedding_model,
             llm_client=llm_client,
-            relevance_threshold=relevance_threshold
+            relevance_threshold=relevance_threshold,
+            embedding_service=embedding_service
         )
         
         self.memory_compression = MemoryCompression(
@@ -87,15 +92,24 @@ class EnhancedMemory(Memory):
         
         # 配置参数
         self.db_path = db_path
+        self.db = get_connection_manager(db_path)
         self.auto_compress_days = auto_compress_days
         self.auto_compress_threshold = auto_compress_threshold
         
+        # 后台压缩任务，压缩删除的记忆同步移出常驻嵌入索引和文本索引
+        self.compaction_worker = MemoryCompactionWorker(
+            self.memory_compression,
+            days=auto_compress_days,
+            min_count=auto_compress_threshold,
+            on_chunk=self._on_compacted_chunk
+        )
+        
         # 记忆计数器，用于触发自动压缩
         self.memory_counter = 0
         
         logger.info("增强记忆系统初始化完成")
     
-    def save(self, user_input: str, assistant_response: str, importance: float = 0.5, metadata: Dict[str, Any] = None) -> None:
+    def save(self, user_input: str, assistant_response: str, importance: float = 0.5, metadata: Dict[str, Any] = None) -> Optional[int]:
         """
         保存对话记录到记忆系统
         
@@ -104,36 +118,29 @@ class EnhancedMemory(Memory):
             assistant_response: 助手回复
             importance: 重要性评分 (0.0-1.0)
             metadata: 元数据
+            
+        Returns:
+            长期记忆的行ID，未进入长期记忆时返回None
         """
-        # 保存到分层记忆系统
-        self.hierarchical_memory.save(
+        # 保存到分层记忆系统，直接获得新插入的长期记忆ID
+        memory_id = self.hierarchical_memory.save(
             user_input=user_input,
             assistant_response=assistant_response,
             importance=importance,
             metadata=metadata
         )
         
-        # 获取最新保存的记忆ID
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT MAX(id) FROM long_term_memories")
-        memory_id = cursor.fetchone()[0]
-        conn.close()
-        
         if memory_id:
-            # 为用户输入和助手回复生成嵌入向量
+            # 为用户输入和助手回复批量生成嵌入向量
             timestamp = datetime.now().isoformat()
-            self.relevance_retrieval.save_embedding(
+            self.relevance_retrieval.save_embeddings(
                 memory_id=memory_id,
-                content=user_input,
-                content_type="user_input",
-                timestamp=timestamp
-            )
-            self.relevance_retrieval.save_embedding(
-                memory_id=memory_id,
-                content=assistant_response,
-                content_type="assistant_response",
-                timestamp=timestamp
+                contents=[
+                    (user_input, "user_input"),
+                    (assistant_response, "assistant_response")
+                ],
+                timestamp=timestamp,
+                importance=importance
             )
         
         # 增加计数器并检查是否需要压缩
@@ -141,6 +148,23 @@ class EnhancedMemory(Memory):
         if self.memory_counter >= self.auto_compress_threshold:
             self._check_auto_compress()
             self.memory_counter = 0
+        
+        return memory_id
+    
+    async def save_async(self, user_input: str, assistant_response: str, importance: float = 0.5, metadata: Dict[str, Any] = None) -> Optional[int]:
+        """
+        save 的异步版本，在数据库IO线程中执行，不阻塞事件循环
+        
+        Args:
+            user_input: 用户输入
+            assistant_response: 助手回复
+            importance: 重要性评分 (0.0-1.0)
+            metadata: 元数据
+            
+        Returns:
+            长期记忆的行ID，未进入长期记忆时返回None
+        """
+        return await self.db.run_async(self.save, user_input, assistant_response, importance, metadata)
     
     def retrieve(self, query: str, limit: int = 5, use_relevance: bool = True) -> List[Dict[str, Any]]:
         """
@@ -227,6 +251,10 @@ class EnhancedMemory(Memory):
             limit=limit
         )
     
+    def _on_compacted_chunk(self, chunk_result: Dict[str, Any]) -> None:
+        self.relevance_retrieval.remove_memories(chunk_result["deleted_ids"])
+        self.hierarchical_memory.remove_long_term_memories(chunk_result["deleted_ids"])
+    
     def clear_layer(self, layer: str) -> None:
         """
         清空指定记忆层
@@ -235,6 +263,9 @@ class EnhancedMemory(Memory):
             layer: 记忆层名称 ("working", "short_term", "long_term", "all")
         """
         self.hierarchical_memory.clear_layer(layer)
+        
+        if layer in ["long_term", "all"]:
+            self.relevance_retrieval.reload_index()
     
     def manual_compress(self, days: int = 7, min_count: int = 20) -> Dict[str, Any]:
         """
@@ -247,27 +278,29 @@ class EnhancedMemory(Memory):
         Returns:
             压缩结果
         """
-        return self.memory_compression.compress_long_term_memories(
-            days=days,
-            min_count=min_count
-        )
+        return self.compaction_worker.run_once(days=days, min_count=min_count)
     
     def _check_auto_compress(self) -> None:
-        """检查并执行自动压缩"""
+        """检查并在后台触发自动压缩"""
         # 获取长期记忆数量
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM long_term_memories")
-        count = cursor.fetchone()[0]
-        conn.close()
+        count = self.db.query_one("SELECT COUNT(*) FROM long_term_memories")[0]
         
-        # 如果数量超过阈值，执行压缩
+        # 如果数量超过阈值，唤醒后台压缩任务，不阻塞保存路径
         if count > self.auto_compress_threshold:
-            compression_result = self.manual_compress(
-                days=self.auto_compress_days,
-                min_count=self.auto_compress_threshold
-            )
-            logger.info(f"自动压缩完成: {compression_result}")
+            self.compaction_worker.trigger()
+    
+    def get_compaction_metrics(self) -> Dict[str, Any]:
+        """
+        获取后台压缩任务的吞吐量指标
+        
+        Returns:
+            指标字典
+        """
+        return self.compaction_worker.get_metrics()
+    
+    def close(self) -> None:
+        """停止后台压缩任务"""
+        self.compaction_worker.stop()
     
     def get_memory_stats(self) -> Dict[str, Any]:
         """
@@ -276,24 +309,19 @@ class EnhancedMemory(Memory):
         Returns:
             统计信息
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         # 获取各表记录数
-        cursor.execute("SELECT COUNT(*) FROM long_term_memories")
-        long_term_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM memory_embeddings")
-        embedding_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM memory_summaries")
-        summary_count = cursor.fetchone()[0]
+        long_term_count, embedding_count, summary_count = self.db.query_one(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM long_term_memories),
+                (SELECT COUNT(*) FROM memory_embeddings),
+                (SELECT COUNT(*) FROM memory_summaries)
+            """
+        )
         
         # 获取工作记忆和短期记忆数量
-        working_memory_count = len(self.hierarchical_memory.working_memory.memories)
-        short_term_memory_count = len(self.hierarchical_memory.short_term_memory.memories)
-        
-        conn.close()
+        working_memory_count = len(self.hierarchical_memory.working_memory)
+        short_term_memory_count = len(self.hierarchical_memory.short_term_memory)
         
         return {
             "working_memory_count": working_memory_count,
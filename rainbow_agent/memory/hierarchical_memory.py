@@ -3,22 +3,51 @@
 
 提供多层次记忆存储和管理，包括工作记忆、短期记忆和长期记忆
 """
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Deque, Callable
+from collections import deque
 from datetime import datetime, timedelta
 import json
-import sqlite3
 import heapq
+import threading
+import time
+import uuid
 
 from .memory import Memory
+from .sqlite_pool import get_connection_manager
 from ..utils.logger import get_logger
+from ..utils.text_index import BM25Index
 
 logger = get_logger(__name__)
 
 
+class _LayerEntry:
+    """记忆层中的条目，按过期时间（单调时钟）排列"""
+    
+    __slots__ = ("key", "item", "expires_at", "alive")
+    
+    def __init__(self, key: Any, item: Dict[str, Any], expires_at: float):
+        self.key = key
+        self.item = item
+        self.expires_at = expires_at
+        self.alive = True
+
+
 class MemoryLayer:
-    """记忆层基类"""
+    """
+    记忆层基类
+    
+    条目保存在按过期时间排列的双端队列中（同一层的TTL相同，插入顺序即过期顺序），
+    过期只检查队首，容量淘汰从队首弹出，成员关系通过ID索引判断，
+    因此添加和读取最近记忆的均摊开销为O(1)。
+    """
     
-    def __init__(self, name: str, capacity: int, ttl: Optional[int] = None):
+    def __init__(
+        self,
+        name: str,
+        capacity: int,
+        ttl: Optional[int] = None,
+        on_evict: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
         """
         初始化记忆层
         
@@ -26,28 +55,46 @@ class MemoryLayer:
             name: 层名称
             capacity: 最大容量
             ttl: 生存时间(秒)，None表示永不过期
+            on_evict: 记忆项因过期、容量或清空而移出本层后的回调
         """
         self.name = name
         self.capacity = capacity
         self.ttl = ttl
-        self.memories = []
+        self.on_evict = on_evict
+        self._entries: Deque[_LayerEntry] = deque()
+        self._index: Dict[Any, _LayerEntry] = {}
+    
+    @staticmethod
+    def _key_of(memory_item: Dict[str, Any]) -> Any:
+        """记忆项的唯一键：优先使用id字段，否则使用对象标识"""
+        return memory_item.get("id") or id(memory_item)
     
     def add(self, memory_item: Dict[str, Any]) -> None:
         """
         添加记忆项
         
         Args:
-            memory_item: 记忆项，必须包含timestamp字段
+            memory_item: 记忆项，同一id的记忆项会替换旧的条目
         """
-        # 添加记忆
-        self.memories.append(memory_item)
+        now = time.monotonic()
+        key = self._key_of(memory_item)
+        
+        # 同一记忆项重复添加时，旧条目标记为失效，由队首弹出时清理
+        previous = self._index.get(key)
+        if previous is not None:
+            previous.alive = False
+        
+        expires_at = now + self.ttl if self.ttl is not None else float("inf")
+        entry = _LayerEntry(key, memory_item, expires_at)
+        self._entries.append(entry)
+        self._index[key] = entry
         
         # 清理过期记忆
-        self._clean_expired()
+        self._clean_expired(now)
         
         # 如果超出容量，移除最旧的记忆
-        if len(self.memories) > self.capacity:
-            self.memories = self.memories[-self.capacity:]
+        while len(self._index) > self.capacity:
+            self._pop_head()
     
     def get(self, limit: int = -1) -> List[Dict[str, Any]]:
         """
@@ -57,38 +104,90 @@ class MemoryLayer:
             limit: 返回数量限制，-1表示返回所有
             
         Returns:
-            记忆项列表
+            记忆项列表，按添加顺序排列
         """
         self._clean_expired()
         
         if limit < 0:
-            return self.memories
-        return self.memories[-limit:]
+            return [entry.item for entry in self._entries if entry.alive]
+        
+        # 从队尾向前收集最近的limit条
+        items = []
+        for entry in reversed(self._entries):
+            if len(items) >= limit:
+                break
+            if entry.alive:
+                items.append(entry.item)
+        items.reverse()
+        return items
     
-    def _clean_expired(self) -> None:
-        """清理过期记忆"""
-        if self.ttl is None:
-            return
-            
-        now = datetime.now()
-        cutoff = now - timedelta(seconds=self.ttl)
+    @property
+    def memories(self) -> List[Dict[str, Any]]:
+        """当前未过期的全部记忆项"""
+        return self.get()
+    
+    def __len__(self) -> int:
+        self._clean_expired()
+        return len(self._index)
+    
+    def __contains__(self, memory_id: Any) -> bool:
+        self._clean_expired()
+        return memory_id in self._index
+    
+    def holds(self, memory_id: Any) -> bool:
+        """是否持有该记忆项（包括已过期但尚未清理的），不触发过期清理"""
+        return memory_id in self._index
+    
+    def lookup(self, memory_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        按ID查找记忆项，不触发过期清理
         
-        # 过滤出未过期的记忆
-        self.memories = [
-            memory for memory in self.memories
-            if datetime.fromisoformat(memory["timestamp"]) > cutoff
-        ]
+        Args:
+            memory_id: 记忆项ID
+            
+        Returns:
+            记忆项，不存在或已过期时返回None
+        """
+        entry = self._index.get(memory_id)
+        if entry is None or entry.expires_at <= time.monotonic():
+            return None
+        return entry.item
+    
+    def _pop_head(self) -> None:
+        entry = self._entries.popleft()
+        if entry.alive:
+            del self._index[entry.key]
+            if self.on_evict:
+                self.on_evict(entry.item)
+    
+    def _clean_expired(self, now: Optional[float] = None) -> None:
+        """清理过期记忆（只检查队首）"""
+        if now is None:
+            now = time.monotonic()
+        
+        entries = self._entries
+        while entries and (not entries[0].alive or entries[0].expires_at <= now):
+            self._pop_head()
     
     def clear(self) -> None:
         """清空记忆层"""
-        self.memories = []
+        evicted = [entry.item for entry in self._index.values()]
+        self._entries.clear()
+        self._index.clear()
+        if self.on_evict:
+            for item in evicted:
+                self.on_evict(item)
 
 
 class HierarchicalMemory(Memory):
     """
     分层记忆系统
     
-    实现工作记忆、短期记忆和长期记忆的分层管理
+    实现工作记忆、短期记忆和长期记忆的分层管理。
+    
+    三层记忆共用一个BM25文本索引，每轮对话只对应一个文档：仍在工作记忆或短期记忆中的
+    对话以记忆项ID为键，只存在于长期记忆中的对话以 ("long_term", 行ID) 为键。
+    检索时只访问查询词的倒排列表，并只为排名前列的长期记忆读取数据库。
     """
     
     def __init__(
@@ -98,7 +197,8 @@ class HierarchicalMemory(Memory):
         short_term_capacity: int = 100,
         short_term_ttl: int = 86400,  # 1天
         long_term_capacity: int = 1000,
-        db_path: str = "memory.db"
+        db_path: str = "memory.db",
+        ranked_retrieval: bool = False
     ):
         """
         初始化分层记忆系统
@@ -110,51 +210,60 @@ class HierarchicalMemory(Memory):
             short_term_ttl: 短期记忆生存时间(秒)
             long_term_capacity: 长期记忆容量
             db_path: 长期记忆数据库路径
+            ranked_retrieval: retrieve 是否默认按与查询的相关性排序
         """
+        # 文本索引，长期记忆部分在第一次检索时从数据库加载
+        self.ranked_retrieval = ranked_retrieval
+        self.text_index = BM25Index()
+        self._long_term_indexed = False
+        self._promoted: Dict[int, str] = {}
+        # 记忆层、文本索引和 _promoted 也会被后台压缩线程修改，公开方法都持有此锁
+        self._lock = threading.RLock()
+        
         # 初始化各记忆层
         self.working_memory = MemoryLayer(
             name="working_memory",
             capacity=working_memory_capacity,
-            ttl=working_memory_ttl
+            ttl=working_memory_ttl,
+            on_evict=self._on_layer_evict
         )
         
         self.short_term_memory = MemoryLayer(
             name="short_term_memory",
             capacity=short_term_capacity,
-            ttl=short_term_ttl
+            ttl=short_term_ttl,
+            on_evict=self._on_layer_evict
         )
         
         # 长期记忆使用SQLite存储
         self.long_term_capacity = long_term_capacity
         self.db_path = db_path
+        self.db = get_connection_manager(db_path)
         self._init_long_term_db()
         
         logger.info("分层记忆系统初始化完成")
     
     def _init_long_term_db(self) -> None:
         """初始化长期记忆数据库"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 创建长期记忆表
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS long_term_memories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT NOT NULL,
-            user_input TEXT NOT NULL,
-            assistant_response TEXT NOT NULL,
-            importance REAL DEFAULT 0.5,
-            embedding TEXT,
-            metadata TEXT
-        )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as cursor:
+            # 创建长期记忆表
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS long_term_memories (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                user_input TEXT NOT NULL,
+                assistant_response TEXT NOT NULL,
+                importance REAL DEFAULT 0.5,
+                embedding TEXT,
+                metadata TEXT
+            )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_long_term_timestamp ON long_term_memories(timestamp)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_long_term_importance ON long_term_memories(importance)')
         
         logger.info(f"长期记忆数据库初始化完成: {self.db_path}")
     
-    def save(self, user_input: str, assistant_response: str, importance: float = 0.5, metadata: Dict[str, Any] = None) -> None:
+    def save(self, user_input: str, assistant_response: str, importance: float = 0.5, metadata: Dict[str, Any] = None) -> Optional[int]:
         """
         保存对话记录到记忆系统
         
@@ -163,9 +272,13 @@ class HierarchicalMemory(Memory):
             assistant_response: 助手回复
             importance: 重要性评分 (0.0-1.0)
             metadata: 元数据
+            
+        Returns:
+            长期记忆的行ID，未进入长期记忆时返回None
         """
         timestamp = datetime.now().isoformat()
         memory_item = {
+            "id": uuid.uuid4().hex,
             "timestamp": timestamp,
             "user_input": user_input,
             "assistant_response": assistant_response,
@@ -173,97 +286,237 @@ class HierarchicalMemory(Memory):
             "metadata": metadata or {}
         }
         
-        # 保存到工作记忆
-        self.working_memory.add(memory_item)
-        
-        # 保存到短期记忆
-        self.short_term_memory.add(memory_item)
-        
-        # 如果重要性超过阈值，保存到长期记忆
-        if importance >= 0.7:
-            self._save_to_long_term(memory_item)
+        with self._lock:
+            # 如果重要性超过阈值，保存到长期记忆
+            memory_id = None
+            if importance >= 0.7:
+                memory_id = self._save_to_long_term(memory_item)
+            
+            self.text_index.add(memory_item["id"], self._document_text(memory_item))
+            
+            # 保存到工作记忆
+            self.working_memory.add(memory_item)
+            
+            # 保存到短期记忆
+            self.short_term_memory.add(memory_item)
             
         logger.debug(f"记忆已保存，重要性: {importance}")
+        return memory_id
     
-    def _save_to_long_term(self, memory_item: Dict[str, Any]) -> None:
+    def _save_to_long_term(self, memory_item: Dict[str, Any]) -> int:
         """
         保存到长期记忆
         
         Args:
             memory_item: 记忆项
+            
+        Returns:
+            新插入的记忆ID
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         # 序列化元数据
         metadata_json = json.dumps(memory_item.get("metadata", {}))
         
-        cursor.execute(
-            """
-            INSERT INTO long_term_memories 
-            (timestamp, user_input, assistant_response, importance, metadata) 
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (
-                memory_item["timestamp"],
-                memory_item["user_input"],
-                memory_item["assistant_response"],
-                memory_item["importance"],
-                metadata_json
-            )
-        )
-        
-        # 控制长期记忆容量
-        cursor.execute("SELECT COUNT(*) FROM long_term_memories")
-        count = cursor.fetchone()[0]
-        
-        if count > self.long_term_capacity:
-            # 删除最不重要的记忆
+        with self.db.transaction() as cursor:
             cursor.execute(
                 """
-                DELETE FROM long_term_memories 
-                WHERE id IN (
-                    SELECT id FROM long_term_memories 
-                    ORDER BY importance ASC 
-                    LIMIT ?
-                )
+                INSERT INTO long_term_memories 
+                (timestamp, user_input, assistant_response, importance, metadata) 
+                VALUES (?, ?, ?, ?, ?)
                 """,
-                (count - self.long_term_capacity,)
+                (
+                    memory_item["timestamp"],
+                    memory_item["user_input"],
+                    memory_item["assistant_response"],
+                    memory_item["importance"],
+                    metadata_json
+                )
             )
+            memory_id = cursor.lastrowid
+            
+            # 控制长期记忆容量
+            cursor.execute("SELECT COUNT(*) FROM long_term_memories")
+            count = cursor.fetchone()[0]
+            
+            evicted_ids = []
+            if count > self.long_term_capacity:
+                # 删除最不重要的记忆
+                cursor.execute(
+                    "SELECT id FROM long_term_memories ORDER BY importance ASC LIMIT ?",
+                    (count - self.long_term_capacity,)
+                )
+                evicted_ids = [row[0] for row in cursor.fetchall()]
+                cursor.executemany("DELETE FROM long_term_memories WHERE id = ?", [(i,) for i in evicted_ids])
+        
+        self.remove_long_term_memories(evicted_ids)
+        if memory_id not in evicted_ids:
+            memory_item["memory_id"] = memory_id
+            self._promoted[memory_id] = memory_item["id"]
+        return memory_id
+    
+    @staticmethod
+    def _document_text(memory: Dict[str, Any]) -> str:
+        return f"{memory['user_input']}\n{memory['assistant_response']}"
+    
+    def _on_layer_evict(self, memory_item: Dict[str, Any]) -> None:
+        """记忆项移出某一层后，若已不在任何内存层中，则在索引中改为长期记忆文档或删除"""
+        memory_key = memory_item.get("id")
+        if memory_key is None or self.working_memory.holds(memory_key) or self.short_term_memory.holds(memory_key):
+            return
         
-        conn.commit()
-        conn.close()
+        self.text_index.remove(memory_key)
+        memory_id = memory_item.get("memory_id")
+        if memory_id is not None and self._promoted.pop(memory_id, None) is not None:
+            self.text_index.add(("long_term", memory_id), self._document_text(memory_item))
     
-    def retrieve(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def remove_long_term_memories(self, memory_ids: List[int]) -> None:
+        """
+        将已从数据库删除的长期记忆移出文本索引
+        
+        Args:
+            memory_ids: 长期记忆ID列表
+        """
+        with self._lock:
+            for memory_id in memory_ids:
+                self.text_index.remove(("long_term", memory_id))
+                memory_key = self._promoted.pop(memory_id, None)
+                if memory_key is not None:
+                    # 仍在内存层中的记忆保留，只是不再对应长期记忆
+                    memory_item = self.working_memory.lookup(memory_key) or self.short_term_memory.lookup(memory_key)
+                    if memory_item is not None:
+                        memory_item["memory_id"] = None
+    
+    def _ensure_long_term_indexed(self) -> None:
+        """首次检索时将长期记忆加载到文本索引"""
+        if self._long_term_indexed:
+            return
+        
+        for memory_id, user_input, assistant_response in self.db.iterate(
+            "SELECT id, user_input, assistant_response FROM long_term_memories"
+        ):
+            if memory_id not in self._promoted:
+                self.text_index.add(("long_term", memory_id), f"{user_input}\n{assistant_response}")
+        self._long_term_indexed = True
+    
+    def reload_index(self) -> None:
+        """
+        重建文本索引
+        
+        在其他组件直接修改长期记忆表后调用。
+        """
+        with self._lock:
+            self.text_index.clear()
+            self._long_term_indexed = False
+            for memory_item in self.short_term_memory.get() + self.working_memory.get():
+                self.text_index.add(memory_item["id"], self._document_text(memory_item))
+    
+    def retrieve(self, query: str, limit: int = 5, ranked: Optional[bool] = None) -> List[Dict[str, Any]]:
         """
         从记忆系统中检索相关记忆
         
         Args:
             query: 查询文本
             limit: 返回结果数量限制
+            ranked: 是否按相关性排序，None表示使用初始化时的设置；
+                查询中没有可检索的词时退回按时间检索
             
         Returns:
-            相关记忆列表
+            相关记忆列表。按相关性排序时按得分降序，并附带 score 和 layer 字段；
+            否则为最近的记忆，按时间升序
+        """
+        with self._lock:
+            if ranked is None:
+                ranked = self.ranked_retrieval
+        
+            if ranked and self.text_index.tokenizer(query):
+                return self._retrieve_ranked(query, limit)
+            return self._retrieve_recent(limit)
+    
+    def _retrieve_ranked(self, query: str, limit: int, layer: str = "all") -> List[Dict[str, Any]]:
+        """
+        按BM25得分检索记忆
+        
+        Args:
+            query: 查询文本
+            limit: 返回结果数量限制
+            layer: 记忆层名称 ("working", "short_term", "long_term", "all")
+            
+        Returns:
+            按得分降序排列的记忆列表
+        """
+        if layer in ["long_term", "all"]:
+            self._ensure_long_term_indexed()
+        
+        accept = None
+        if layer == "working":
+            accept = lambda key: isinstance(key, str) and self.working_memory.lookup(key) is not None
+        elif layer == "short_term":
+            accept = lambda key: isinstance(key, str) and self.short_term_memory.lookup(key) is not None
+        elif layer == "long_term":
+            accept = lambda key: isinstance(key, tuple) or self._lookup_in_memory(key).get("memory_id") is not None
+        
+        while True:
+            hits = self.text_index.search(query, limit, accept)
+            
+            # 只为排名前列的长期记忆读取数据库
+            rows = self._fetch_long_term_rows([key[1] for key, _ in hits if isinstance(key, tuple)])
+            
+            results = []
+            stale = []
+            for key, score in hits:
+                if isinstance(key, tuple):
+                    memory, memory_layer = rows.get(key[1]), "long_term"
+                else:
+                    memory = self.working_memory.lookup(key)
+                    memory_layer = "working"
+                    if memory is None:
+                        memory, memory_layer = self.short_term_memory.lookup(key), "short_term"
+                
+                if memory is None:
+                    stale.append(key)
+                else:
+                    results.append(dict(memory, score=score, layer=memory_layer))
+            
+            if not stale:
+                return results
+            
+            # 已过期或被外部删除的记忆移出索引后重新检索
+            for key in stale:
+                self.text_index.remove(key)
+    
+    def _lookup_in_memory(self, memory_key: str) -> Dict[str, Any]:
+        return self.working_memory.lookup(memory_key) or self.short_term_memory.lookup(memory_key) or {}
+    
+    def _retrieve_recent(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        按时间检索最近的记忆
+        
+        Args:
+            limit: 返回结果数量限制
+            
+        Returns:
+            按时间升序排列的记忆列表
         """
         # 从各层检索记忆
         working_memories = self.working_memory.get()
         short_term_memories = self.short_term_memory.get()
         long_term_memories = self._retrieve_from_long_term(limit)
         
-        # 合并记忆（简单实现，后续可以基于相关性排序）
+        # 合并记忆（简单实现，后续可以基于相关性排序），按记忆ID去重
         all_memories = []
-        all_memories.extend(working_memories)
-        
-        # 添加不在工作记忆中的短期记忆
-        working_timestamps = {m["timestamp"] for m in working_memories}
-        for memory in short_term_memories:
-            if memory["timestamp"] not in working_timestamps:
-                all_memories.append(memory)
-        
-        # 添加不在工作记忆和短期记忆中的长期记忆
-        all_timestamps = {m["timestamp"] for m in all_memories}
+        seen_ids = set()
+        promoted_ids = set()
+        for memory in working_memories + short_term_memories:
+            memory_key = memory.get("id") or id(memory)
+            if memory_key in seen_ids:
+                continue
+            seen_ids.add(memory_key)
+            if memory.get("memory_id") is not None:
+                promoted_ids.add(memory["memory_id"])
+            all_memories.append(memory)
+        
+        # 添加尚未出现在工作记忆和短期记忆中的长期记忆
         for memory in long_term_memories:
-            if memory["timestamp"] not in all_timestamps:
+            if memory["memory_id"] not in promoted_ids:
                 all_memories.append(memory)
         
         # 按时间排序
@@ -282,12 +535,9 @@ class HierarchicalMemory(Memory):
         Returns:
             记忆项列表
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
+        rows = self.db.query(
             """
-            SELECT timestamp, user_input, assistant_response, importance, metadata
+            SELECT id, timestamp, user_input, assistant_response, importance, metadata
             FROM long_term_memories
             ORDER BY timestamp DESC
             LIMIT ?
@@ -295,27 +545,49 @@ class HierarchicalMemory(Memory):
             (limit,)
         )
         
-        rows = cursor.fetchall()
-        conn.close()
+        return [self._row_to_memory(row) for row in rows]
+    
+    def _fetch_long_term_rows(self, memory_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        按ID批量读取长期记忆
         
-        memories = []
-        for row in rows:
-            timestamp, user_input, assistant_response, importance, metadata_json = row
-            
-            try:
-                metadata = json.loads(metadata_json) if metadata_json else {}
-            except json.JSONDecodeError:
-                metadata = {}
+        Args:
+            memory_ids: 长期记忆ID列表
             
-            memories.append({
-                "timestamp": timestamp,
-                "user_input": user_input,
-                "assistant_response": assistant_response,
-                "importance": importance,
-                "metadata": metadata
-            })
+        Returns:
+            记忆ID到记忆项的映射，已删除的记忆不在结果中
+        """
+        if not memory_ids:
+            return {}
         
-        return memories
+        placeholders = ", ".join(["?"] * len(memory_ids))
+        rows = self.db.query(
+            f"""
+            SELECT id, timestamp, user_input, assistant_response, importance, metadata
+            FROM long_term_memories
+            WHERE id IN ({placeholders})
+            """,
+            memory_ids
+        )
+        return {row[0]: self._row_to_memory(row) for row in rows}
+    
+    @staticmethod
+    def _row_to_memory(row: Tuple) -> Dict[str, Any]:
+        memory_id, timestamp, user_input, assistant_response, importance, metadata_json = row
+        
+        try:
+            metadata = json.loads(metadata_json) if metadata_json else {}
+        except json.JSONDecodeError:
+            metadata = {}
+        
+        return {
+            "memory_id": memory_id,
+            "timestamp": timestamp,
+            "user_input": user_input,
+            "assistant_response": assistant_response,
+            "importance": importance,
+            "metadata": metadata
+        }
     
     def retrieve_by_layer(self, query: str, layer: str = "all", limit: int = 5) -> List[Dict[str, Any]]:
         """
@@ -329,14 +601,18 @@ class HierarchicalMemory(Memory):
         Returns:
             相关记忆列表
         """
-        if layer == "working":
-            return self.working_memory.get(limit)
-        elif layer == "short_term":
-            return self.short_term_memory.get(limit)
-        elif layer == "long_term":
-            return self._retrieve_from_long_term(limit)
-        else:  # "all"
-            return self.retrieve(query, limit)
+        with self._lock:
+            if self.ranked_retrieval and self.text_index.tokenizer(query):
+                return self._retrieve_ranked(query, limit, layer)
+        
+            if layer == "working":
+                return self.working_memory.get(limit)
+            elif layer == "short_term":
+                return self.short_term_memory.get(limit)
+            elif layer == "long_term":
+                return self._retrieve_from_long_term(limit)
+            else:  # "all"
+                return self.retrieve(query, limit)
     
     def clear_layer(self, layer: str) -> None:
         """
@@ -345,15 +621,14 @@ class HierarchicalMemory(Memory):
         Args:
             layer: 记忆层名称 ("working", "short_term", "long_term", "all")
         """
-        if layer in ["working", "all"]:
-            self.working_memory.clear()
+        with self._lock:
+            if layer in ["working", "all"]:
+                self.working_memory.clear()
             
-        if layer in ["short_term", "all"]:
-            self.short_term_memory.clear()
+            if layer in ["short_term", "all"]:
+                self.short_term_memory.clear()
             
-        if layer in ["long_term", "all"]:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM long_term_memories")
-            conn.commit()
-            conn.close()
+            if layer in ["long_term", "all"]:
+                self.db.execute("DELETE FROM long_term_memories")
+                self.remove_long_term_memories(list(self._promoted))
+                self.reload_index()
@@ -3,12 +3,13 @@
 
 提供对话记忆的摘要生成和关键信息提取功能
 """
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterator
 import json
-from datetime import datetime
-import sqlite3
+import time
+from datetime import datetime, timedelta
 
 from .memory import Memory
+from .sqlite_pool import get_connection_manager
 from ..utils.logger import get_logger
 from ..utils.llm import get_llm_client
 
@@ -41,6 +42,7 @@ class MemoryCompression:
             importance_threshold: 重要性阈值 (0.0-1.0)
         """
         self.db_path = db_path
+        self.db = get_connection_manager(db_path)
         self.llm_client = llm_client or get_llm_client()
         self.summary_model = summary_model
         self.compression_ratio = compression_ratio
@@ -52,24 +54,39 @@ class MemoryCompression:
     
     def _init_db(self) -> None:
         """初始化数据库"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 创建摘要表
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS memory_summaries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            start_timestamp TEXT NOT NULL,
-            end_timestamp TEXT NOT NULL,
-            original_count INTEGER NOT NULL,
-            summary TEXT NOT NULL,
-            key_points TEXT,
-            created_at TEXT NOT NULL
-        )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as cursor:
+            # 创建摘要表
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS memory_summaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                start_timestamp TEXT NOT NULL,
+                end_timestamp TEXT NOT NULL,
+                original_count INTEGER NOT NULL,
+                summary TEXT NOT NULL,
+                key_points TEXT,
+                created_at TEXT NOT NULL,
+                level INTEGER DEFAULT 1,
+                parent_id INTEGER
+            )
+            ''')
+            
+            # 兼容旧版本的摘要表：补充层级字段
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(memory_summaries)").fetchall()}
+            if "level" not in columns:
+                cursor.execute("ALTER TABLE memory_summaries ADD COLUMN level INTEGER DEFAULT 1")
+            if "parent_id" not in columns:
+                cursor.execute("ALTER TABLE memory_summaries ADD COLUMN parent_id INTEGER")
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_summary_level ON memory_summaries(level, parent_id, end_timestamp)')
+            
+            # 压缩进度检查点
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS memory_compaction_checkpoints (
+                name TEXT PRIMARY KEY,
+                last_timestamp TEXT NOT NULL,
+                last_id INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            ''')
     
     def generate_conversation_summary(self, conversation: List[Dict[str, Any]]) -> str:
         """
@@ -84,6 +101,24 @@ class MemoryCompression:
         if not conversation:
             return ""
         
+        try:
+            return self._summarize_conversation(conversation)
+        except Exception as e:
+            logger.error(f"生成对话摘要失败: {e}")
+            return "摘要生成失败"
+    
+    def _complete(self, prompt: str) -> str:
+        """调用摘要模型，失败时抛出异常"""
+        response = self.llm_client.chat.completions.create(
+            model=self.summary_model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=500
+        )
+        return response.choices[0].message.content.strip()
+    
+    def _summarize_conversation(self, conversation: List[Dict[str, Any]]) -> str:
+        """生成对话摘要，失败时抛出异常"""
         # 构建对话文本
         conversation_text = ""
         for i, item in enumerate(conversation):
@@ -100,19 +135,22 @@ class MemoryCompression:
         摘要:
         """
         
-        try:
-            response = self.llm_client.chat.completions.create(
-                model=self.summary_model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=500
-            )
-            
-            summary = response.choices[0].message.content.strip()
-            return summary
-        except Exception as e:
-            logger.error(f"生成对话摘要失败: {e}")
-            return "摘要生成失败"
+        return self._complete(prompt)
+    
+    def _summarize_summaries(self, summaries: List[str]) -> str:
+        """将多条摘要合并为更高层级的摘要，失败时抛出异常"""
+        summaries_text = "\n\n".join(f"{i + 1}. {summary}" for i, summary in enumerate(summaries))
+        
+        prompt = f"""
+        以下是按时间顺序排列的多段对话摘要。请将它们合并为一个更简洁的摘要，保留关键事实、决定和用户偏好，去除重复内容。
+
+        摘要列表:
+        {summaries_text}
+
+        合并摘要:
+        """
+        
+        return self._complete(prompt)
     
     def extract_key_points(self, conversation: List[Dict[str, Any]]) -> List[str]:
         """
@@ -219,14 +257,11 @@ class MemoryCompression:
         original_count = len(conversation)
         created_at = datetime.now().isoformat()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
+        self.db.insert(
             """
             INSERT INTO memory_summaries 
-            (start_timestamp, end_timestamp, original_count, summary, key_points, created_at) 
-            VALUES (?, ?, ?, ?, ?, ?)
+            (start_timestamp, end_timestamp, original_count, summary, key_points, created_at, level) 
+            VALUES (?, ?, ?, ?, ?, ?, 1)
             """,
             (
                 start_timestamp,
@@ -238,12 +273,15 @@ class MemoryCompression:
             )
         )
         
-        conn.commit()
-        conn.close()
-        
         logger.info(f"已保存对话摘要，原始对话数量: {original_count}")
     
-    def get_summaries(self, start_time: Optional[str] = None, end_time: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_summaries(
+        self,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        limit: int = 10,
+        level: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
         获取对话摘要
         
@@ -251,17 +289,19 @@ class MemoryCompression:
             start_time: 开始时间 (ISO格式)
             end_time: 结束时间 (ISO格式)
             limit: 返回数量限制
+            level: 摘要层级过滤，None表示不过滤
             
         Returns:
             摘要列表
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        query = "SELECT id, start_timestamp, end_timestamp, original_count, summary, key_points, created_at FROM memory_summaries"
+        query = "SELECT id, start_timestamp, end_timestamp, original_count, summary, key_points, created_at, level FROM memory_summaries"
         params = []
         
         conditions = []
+        if level is not None:
+            conditions.append("level = ?")
+            params.append(level)
+        
         if start_time:
             conditions.append("end_timestamp >= ?")
             params.append(start_time)
@@ -276,13 +316,11 @@ class MemoryCompression:
         query += " ORDER BY end_timestamp DESC LIMIT ?"
         params.append(limit)
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
+        rows = self.db.query(query, params)
         
         summaries = []
         for row in rows:
-            id, start_timestamp, end_timestamp, original_count, summary, key_points_json, created_at = row
+            id, start_timestamp, end_timestamp, original_count, summary, key_points_json, created_at, level = row
             
             try:
                 key_points = json.loads(key_points_json) if key_points_json else []
@@ -296,82 +334,299 @@ class MemoryCompression:
                 "original_count": original_count,
                 "summary": summary,
                 "key_points": key_points,
-                "created_at": created_at
+                "created_at": created_at,
+                "level": level
             })
         
         return summaries
     
-    def compress_long_term_memories(self, days: int = 7, min_count: int = 20) -> Dict[str, Any]:
+    def get_checkpoint(self, name: str = "long_term") -> Optional[Tuple[str, int]]:
         """
-        压缩长期记忆
+        获取压缩进度检查点
         
         Args:
-            days: 压缩多少天前的记忆
-            min_count: 最小记忆数量，低于此数量不压缩
+            name: 检查点名称
             
         Returns:
-            压缩结果
+            (最后处理的时间戳, 最后处理的记忆ID)，没有检查点时返回None
         """
-        # 获取需要压缩的记忆
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cutoff_date = (datetime.now() - datetime.timedelta(days=days)).isoformat()
+        row = self.db.query_one(
+            "SELECT last_timestamp, last_id FROM memory_compaction_checkpoints WHERE name = ?",
+            (name,)
+        )
+        return (row[0], row[1]) if row else None
+    
+    def count_pending_memories(self, cutoff: str, checkpoint: Optional[Tuple[str, int]] = None) -> int:
+        """
+        统计检查点之后、截止时间之前尚未压缩的记忆数量
         
-        cursor.execute(
+        Args:
+            cutoff: 截止时间 (ISO格式)
+            checkpoint: 压缩进度检查点
+            
+        Returns:
+            待压缩的记忆数量
+        """
+        last_timestamp, last_id = checkpoint or ("", 0)
+        return self.db.query_one(
             """
-            SELECT id, timestamp, user_input, assistant_response, importance, metadata
-            FROM long_term_memories
-            WHERE timestamp < ?
-            ORDER BY timestamp ASC
+            SELECT COUNT(*) FROM long_term_memories
+            WHERE timestamp < ? AND (timestamp > ? OR (timestamp = ? AND id > ?))
             """,
-            (cutoff_date,)
-        )
+            (cutoff, last_timestamp, last_timestamp, last_id)
+        )[0]
+    
+    def iter_memory_chunks(
+        self,
+        cutoff: str,
+        checkpoint: Optional[Tuple[str, int]] = None,
+        chunk_size: int = 50,
+        max_chunk_chars: int = 12000,
+        max_item_chars: int = 2000
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        按时间顺序分块读取待压缩的记忆
+        
+        使用 (timestamp, id) 键集分页，每块最多 chunk_size 条且文本总长度不超过
+        max_chunk_chars，单条记忆的文本会被截断到 max_item_chars，以限制内存和token消耗。
         
-        rows = cursor.fetchall()
+        Args:
+            cutoff: 截止时间 (ISO格式)
+            checkpoint: 从该检查点之后开始读取
+            chunk_size: 每块的最大记忆数量
+            max_chunk_chars: 每块的最大文本长度
+            max_item_chars: 单条记忆的最大文本长度
+            
+        Yields:
+            记忆块
+        """
+        last_timestamp, last_id = checkpoint or ("", 0)
+        
+        while True:
+            rows = self.db.query(
+                """
+                SELECT id, timestamp, user_input, assistant_response, importance
+                FROM long_term_memories
+                WHERE timestamp < ? AND (timestamp > ? OR (timestamp = ? AND id > ?))
+                ORDER BY timestamp ASC, id ASC
+                LIMIT ?
+                """,
+                (cutoff, last_timestamp, last_timestamp, last_id, chunk_size)
+            )
+            if not rows:
+                return
+            
+            chunk = []
+            chunk_chars = 0
+            for memory_id, timestamp, user_input, assistant_response, importance in rows:
+                user_input = user_input[:max_item_chars]
+                assistant_response = assistant_response[:max_item_chars]
+                item_chars = len(user_input) + len(assistant_response)
+                if chunk and chunk_chars + item_chars > max_chunk_chars:
+                    break
+                
+                chunk.append({
+                    "memory_id": memory_id,
+                    "timestamp": timestamp,
+                    "user_input": user_input,
+                    "assistant_response": assistant_response,
+                    "importance": importance
+                })
+                chunk_chars += item_chars
+            
+            yield chunk
+            last_timestamp, last_id = chunk[-1]["timestamp"], chunk[-1]["memory_id"]
+    
+    def compress_memory_chunk(self, chunk: List[Dict[str, Any]], checkpoint_name: str = "long_term") -> Dict[str, Any]:
+        """
+        压缩一个记忆块
         
-        if len(rows) < min_count:
-            conn.close()
-            return {"status": "skipped", "reason": f"记忆数量 {len(rows)} 低于最小阈值 {min_count}"}
+        生成摘要后，在同一个事务中写入一级摘要、删除低重要性的原始记忆及其嵌入，
+        并推进检查点。摘要生成失败时抛出异常且不修改数据库。
         
-        # 将记录转换为对话格式
-        conversation = []
-        for row in rows:
-            id, timestamp, user_input, assistant_response, importance, metadata_json = row
+        Args:
+            chunk: 按时间排序的记忆块
+            checkpoint_name: 检查点名称
             
-            try:
-                metadata = json.loads(metadata_json) if metadata_json else {}
-            except json.JSONDecodeError:
-                metadata = {}
+        Returns:
+            压缩结果
+        """
+        summary = self._summarize_conversation(chunk)
+        key_points = self.extract_key_points(chunk)
+        deleted_ids = [item["memory_id"] for item in chunk if item["importance"] < self.importance_threshold]
+        now = datetime.now().isoformat()
+        
+        with self.db.transaction() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO memory_summaries 
+                (start_timestamp, end_timestamp, original_count, summary, key_points, created_at, level) 
+                VALUES (?, ?, ?, ?, ?, ?, 1)
+                """,
+                (chunk[0]["timestamp"], chunk[-1]["timestamp"], len(chunk), summary, json.dumps(key_points), now)
+            )
+            summary_id = cursor.lastrowid
             
-            conversation.append({
-                "memory_id": id,
-                "timestamp": timestamp,
-                "user_input": user_input,
-                "assistant_response": assistant_response,
-                "importance": importance,
-                "metadata": metadata
-            })
+            if deleted_ids:
+                placeholders = ", ".join(["?"] * len(deleted_ids))
+                cursor.execute(f"DELETE FROM long_term_memories WHERE id IN ({placeholders})", deleted_ids)
+                
+                # 同时删除相关的嵌入（未启用相关性检索时没有嵌入表）
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memory_embeddings'")
+                if cursor.fetchone():
+                    cursor.execute(f"DELETE FROM memory_embeddings WHERE memory_id IN ({placeholders})", deleted_ids)
+            
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO memory_compaction_checkpoints (name, last_timestamp, last_id, updated_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (checkpoint_name, chunk[-1]["timestamp"], chunk[-1]["memory_id"], now)
+            )
         
-        # 生成压缩结果
-        compression_result = self.compress_conversation(conversation)
+        return {
+            "summary_id": summary_id,
+            "summary": summary,
+            "key_points": key_points,
+            "original_count": len(chunk),
+            "deleted_ids": deleted_ids,
+            "input_chars": sum(len(item["user_input"]) + len(item["assistant_response"]) for item in chunk)
+        }
+    
+    def rollup_summaries(self, fanout: int = 8, max_level: int = 4) -> int:
+        """
+        生成层级摘要（摘要的摘要）
         
-        # 删除原始记忆（仅保留重要的）
-        memory_ids = [item["memory_id"] for item in conversation if item["importance"] < self.importance_threshold]
+        当某一层级尚未合并的摘要达到 fanout 条时，将最早的 fanout 条合并为
+        上一层级的摘要，逐层向上直到 max_level。
         
-        if memory_ids:
-            placeholders = ", ".join(["?"] * len(memory_ids))
-            cursor.execute(f"DELETE FROM long_term_memories WHERE id IN ({placeholders})", memory_ids)
-            
-            # 同时删除相关的嵌入
-            cursor.execute(f"DELETE FROM memory_embeddings WHERE memory_id IN ({placeholders})", memory_ids)
+        Args:
+            fanout: 合并一次所需的摘要数量
+            max_level: 最高摘要层级
             
-            conn.commit()
+        Returns:
+            新生成的层级摘要数量
+        """
+        created = 0
+        for level in range(1, max_level):
+            while True:
+                rows = self.db.query(
+                    """
+                    SELECT id, start_timestamp, end_timestamp, original_count, summary
+                    FROM memory_summaries
+                    WHERE level = ? AND parent_id IS NULL
+                    ORDER BY end_timestamp ASC, id ASC
+                    LIMIT ?
+                    """,
+                    (level, fanout)
+                )
+                if len(rows) < fanout:
+                    break
+                
+                summary = self._summarize_summaries([row[4] for row in rows])
+                child_ids = [row[0] for row in rows]
+                
+                with self.db.transaction() as cursor:
+                    cursor.execute(
+                        """
+                        INSERT INTO memory_summaries 
+                        (start_timestamp, end_timestamp, original_count, summary, key_points, created_at, level) 
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            rows[0][1],
+                            rows[-1][2],
+                            sum(row[3] for row in rows),
+                            summary,
+                            json.dumps([]),
+                            datetime.now().isoformat(),
+                            level + 1
+                        )
+                    )
+                    parent_id = cursor.lastrowid
+                    placeholders = ", ".join(["?"] * len(child_ids))
+                    cursor.execute(
+                        f"UPDATE memory_summaries SET parent_id = ? WHERE id IN ({placeholders})",
+                        [parent_id] + child_ids
+                    )
+                created += 1
+        
+        return created
+    
+    def compress_long_term_memories(
+        self,
+        days: int = 7,
+        min_count: int = 20,
+        chunk_size: int = 50,
+        max_chunk_chars: int = 12000,
+        max_chunks: Optional[int] = None,
+        rollup_fanout: int = 8,
+        on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        压缩长期记忆
         
-        conn.close()
+        从上次的检查点开始按时间顺序分块压缩，每块独立生成摘要并提交，
+        中途失败时已完成的块不会重复处理。
         
-        compression_result["status"] = "completed"
-        compression_result["deleted_count"] = len(memory_ids)
-        compression_result["retained_count"] = len(conversation) - len(memory_ids)
+        Args:
+            days: 压缩多少天前的记忆
+            min_count: 最小记忆数量，低于此数量不压缩
+            chunk_size: 每块的最大记忆数量
+            max_chunk_chars: 每块的最大文本长度
+            max_chunks: 本次最多处理的块数，None表示不限制
+            rollup_fanout: 生成上一层级摘要所需的摘要数量
+            on_chunk: 每处理完一块后的回调，参数为该块的压缩结果
+            
+        Returns:
+            压缩结果
+        """
+        cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
+        checkpoint = self.get_checkpoint()
+        
+        pending = self.count_pending_memories(cutoff_date, checkpoint)
+        if pending < min_count:
+            return {"status": "skipped", "reason": f"记忆数量 {pending} 低于最小阈值 {min_count}"}
+        
+        started = time.time()
+        result = {
+            "status": "completed",
+            "chunk_count": 0,
+            "original_count": 0,
+            "deleted_count": 0,
+            "retained_count": 0,
+            "deleted_ids": [],
+            "summary_ids": [],
+            "compression_ratio": self.compression_ratio
+        }
         
-        return compression_result
+        try:
+            for chunk in self.iter_memory_chunks(cutoff_date, checkpoint, chunk_size, max_chunk_chars):
+                chunk_result = self.compress_memory_chunk(chunk)
+                
+                result["chunk_count"] += 1
+                result["original_count"] += chunk_result["original_count"]
+                result["deleted_count"] += len(chunk_result["deleted_ids"])
+                result["retained_count"] += chunk_result["original_count"] - len(chunk_result["deleted_ids"])
+                result["deleted_ids"].extend(chunk_result["deleted_ids"])
+                result["summary_ids"].append(chunk_result["summary_id"])
+                
+                if on_chunk:
+                    on_chunk(chunk_result)
+                
+                if max_chunks is not None and result["chunk_count"] >= max_chunks:
+                    result["status"] = "partial"
+                    break
+            
+            result["rollup_count"] = self.rollup_summaries(fanout=rollup_fanout)
+        except Exception as e:
+            logger.error(f"压缩长期记忆失败: {e}")
+            result["status"] = "failed"
+            result["error"] = str(e)
+        
+        result["elapsed"] = time.time() - started
+        logger.info(
+            f"长期记忆压缩{result['status']}: {result['chunk_count']} 块, "
+            f"{result['original_count']} 条记忆, 删除 {result['deleted_count']} 条"
+        )
+        return result
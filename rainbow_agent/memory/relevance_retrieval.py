@@ -3,19 +3,185 @@
 
 提供基于语义相似度的记忆检索功能
 """
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable
 import json
-import sqlite3
+import threading
 import numpy as np
 from datetime import datetime
 
 from .memory import Memory
+from .embedding_service import EmbeddingService, OpenAIEmbeddingBackend
+from .sqlite_pool import get_connection_manager
 from ..utils.logger import get_logger
 from ..utils.llm import get_llm_client
 
 logger = get_logger(__name__)
 
 
+class MemoryEmbeddingIndex:
+    """
+    常驻内存的记忆嵌入索引
+    
+    以列式数组保存所有嵌入向量（按行归一化的float32矩阵）及其记忆ID、
+    内容类型、时间戳（Unix秒）和重要性，使评分可以对全部记忆一次性向量化计算。
+    """
+    
+    def __init__(self, initial_capacity: int = 1024):
+        """
+        初始化记忆嵌入索引
+        
+        Args:
+            initial_capacity: 初始容量
+        """
+        self.initial_capacity = max(1, initial_capacity)
+        self.dimension: Optional[int] = None
+        self.size = 0
+        self._content_type_codes: Dict[str, int] = {}
+        self._content_type_names: List[str] = [""]
+        self._lock = threading.Lock()
+        self._allocate(self.initial_capacity, 0)
+    
+    def _allocate(self, capacity: int, dimension: int) -> None:
+        self._matrix = np.zeros((capacity, dimension), dtype=np.float32)
+        self._memory_ids = np.zeros(capacity, dtype=np.int64)
+        self._content_types = np.zeros(capacity, dtype=np.int16)
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._importance = np.zeros(capacity, dtype=np.float32)
+        self._timestamp_texts = np.empty(capacity, dtype=object)
+    
+    def _columns(self) -> Tuple[np.ndarray, ...]:
+        return (
+            self._matrix, self._memory_ids, self._content_types,
+            self._timestamps, self._importance, self._timestamp_texts
+        )
+    
+    def _grow(self, required: int) -> None:
+        capacity = self._memory_ids.shape[0]
+        if required <= capacity:
+            return
+        while capacity < required:
+            capacity *= 2
+        
+        old = self._columns()
+        self._allocate(capacity, self.dimension)
+        for new_array, old_array in zip(self._columns(), old):
+            new_array[:self.size] = old_array[:self.size]
+    
+    def _content_type_code(self, content_type: str) -> int:
+        if content_type not in self._content_type_codes:
+            self._content_type_codes[content_type] = len(self._content_type_names)
+            self._content_type_names.append(content_type)
+        return self._content_type_codes[content_type]
+    
+    def add_many(self, rows: Iterable[Tuple[int, np.ndarray, str, str, float]]) -> None:
+        """
+        批量添加嵌入
+        
+        Args:
+            rows: (记忆ID, 嵌入向量, 内容类型, ISO时间戳, 重要性) 列表
+        """
+        with self._lock:
+            for memory_id, embedding, content_type, timestamp, importance in rows:
+                vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+                if self.dimension is None:
+                    self.dimension = vector.shape[0]
+                    self._matrix = np.zeros((self._matrix.shape[0], self.dimension), dtype=np.float32)
+                elif vector.shape[0] != self.dimension:
+                    logger.warning(f"跳过维度不匹配的嵌入向量: 记忆ID {memory_id}")
+                    continue
+                
+                self._grow(self.size + 1)
+                norm = np.linalg.norm(vector)
+                row = self.size
+                self._matrix[row] = vector / norm if norm > 0 else vector
+                self._memory_ids[row] = memory_id
+                self._content_types[row] = self._content_type_code(content_type)
+                self._timestamps[row] = datetime.fromisoformat(timestamp).timestamp()
+                self._timestamp_texts[row] = timestamp
+                self._importance[row] = float(importance if importance is not None else 0.5)
+                self.size += 1
+    
+    def remove_memories(self, memory_ids: Iterable[int]) -> int:
+        """
+        移除指定记忆的全部嵌入
+        
+        Args:
+            memory_ids: 记忆ID列表
+            
+        Returns:
+            移除的嵌入数量
+        """
+        ids = np.fromiter(memory_ids, dtype=np.int64)
+        with self._lock:
+            if ids.size == 0 or self.size == 0:
+                return 0
+            keep = ~np.isin(self._memory_ids[:self.size], ids)
+            kept = int(keep.sum())
+            removed = self.size - kept
+            if removed:
+                for array in self._columns():
+                    array[:kept] = array[:self.size][keep]
+                self.size = kept
+            return removed
+    
+    def clear(self) -> None:
+        """清空索引"""
+        with self._lock:
+            self.size = 0
+    
+    def rank(
+        self,
+        query: np.ndarray,
+        now: float,
+        time_decay_factor: float,
+        relevance_threshold: float,
+        content_type: Optional[str] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        对全部嵌入一次性计算综合得分并排序
+        
+        综合得分 = 相似度 * 0.6 + 重要性 * 0.2 + 时间衰减 * 0.2
+        
+        Args:
+            query: 查询向量
+            now: 当前时间（Unix秒）
+            time_decay_factor: 时间衰减因子
+            relevance_threshold: 相似度阈值
+            content_type: 内容类型过滤
+            
+        Returns:
+            相似度不低于阈值的候选列，按综合得分降序排列
+        """
+        with self._lock:
+            rows = np.empty(0, dtype=np.int64)
+            if self.size and self.dimension is not None and query.shape[0] == self.dimension:
+                if content_type is None:
+                    rows = np.arange(self.size)
+                elif content_type in self._content_type_codes:
+                    code = self._content_type_codes[content_type]
+                    rows = np.flatnonzero(self._content_types[:self.size] == code)
+            
+            norm = np.linalg.norm(query)
+            query = query / norm if norm > 0 else query
+            
+            similarity = self._matrix[rows] @ query if rows.size else np.empty(0, dtype=np.float32)
+            days = (now - self._timestamps[rows]) / 86400.0
+            scores = similarity * 0.6 + self._importance[rows] * 0.2 + np.exp(-time_decay_factor * days) * 0.2
+            
+            passed = np.flatnonzero(similarity >= relevance_threshold)
+            order = passed[np.argsort(-scores[passed], kind="stable")]
+            selected = rows[order]
+            
+            return {
+                "memory_id": self._memory_ids[selected],
+                "content_type": [self._content_type_names[code] for code in self._content_types[selected]],
+                "timestamp": self._timestamp_texts[selected],
+                "importance": self._importance[selected],
+                "similarity": similarity[order],
+                "score": scores[order]
+            }
+
+
 class RelevanceRetrieval:
     """
     相关性检索系统
@@ -30,7 +196,8 @@ class RelevanceRetrieval:
         embedding_dimension: int = 1536,
         llm_client = None,
         relevance_threshold: float = 0.7,
-        time_decay_factor: float = 0.1
+        time_decay_factor: float = 0.1,
+        embedding_service: Optional[EmbeddingService] = None
     ):
         """
         初始化相关性检索系统
@@ -42,13 +209,23 @@ class RelevanceRetrieval:
             llm_client: LLM客户端
             relevance_threshold: 相关性阈值
             time_decay_factor: 时间衰减因子
+            embedding_service: 嵌入向量服务，None时基于llm_client创建
         """
         self.db_path = db_path
+        self.db = get_connection_manager(db_path)
         self.embedding_model = embedding_model
         self.embedding_dimension = embedding_dimension
         self.llm_client = llm_client or get_llm_client()
         self.relevance_threshold = relevance_threshold
         self.time_decay_factor = time_decay_factor
+        self.embedding_service = embedding_service or EmbeddingService(
+            OpenAIEmbeddingBackend(self.llm_client, embedding_model)
+        )
+        
+        # 常驻内存的嵌入索引，首次检索时从数据库加载
+        self.index = MemoryEmbeddingIndex()
+        self._index_loaded = False
+        self._index_lock = threading.Lock()
         
         self._init_db()
         
@@ -56,26 +233,21 @@ class RelevanceRetrieval:
     
     def _init_db(self) -> None:
         """初始化数据库"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 创建记忆表（如果不存在）
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS memory_embeddings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            memory_id INTEGER NOT NULL,
-            embedding BLOB NOT NULL,
-            content_type TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
-            FOREIGN KEY (memory_id) REFERENCES long_term_memories(id)
-        )
-        ''')
-        
-        # 创建索引
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_memory_id ON memory_embeddings(memory_id)')
-        
-        conn.commit()
-        conn.close()
+        with self.db.transaction() as cursor:
+            # 创建记忆表（如果不存在）
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS memory_embeddings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                memory_id INTEGER NOT NULL,
+                embedding BLOB NOT NULL,
+                content_type TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                FOREIGN KEY (memory_id) REFERENCES long_term_memories(id)
+            )
+            ''')
+            
+            # 创建索引
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_memory_id ON memory_embeddings(memory_id)')
     
     def generate_embedding(self, text: str) -> np.ndarray:
         """
@@ -88,17 +260,28 @@ class RelevanceRetrieval:
             嵌入向量
         """
         try:
-            response = self.llm_client.embeddings.create(
-                model=self.embedding_model,
-                input=text
-            )
-            embedding = np.array(response.data[0].embedding, dtype=np.float32)
-            return embedding
+            return self.embedding_service.embed(text)
         except Exception as e:
             logger.error(f"生成嵌入向量失败: {e}")
             # 返回零向量作为后备
             return np.zeros(self.embedding_dimension, dtype=np.float32)
     
+    def generate_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        批量生成文本的嵌入向量（单次请求，相同文本去重）
+        
+        Args:
+            texts: 输入文本列表
+            
+        Returns:
+            嵌入向量列表
+        """
+        try:
+            return self.embedding_service.embed_many(texts)
+        except Exception as e:
+            logger.error(f"批量生成嵌入向量失败: {e}")
+            return [np.zeros(self.embedding_dimension, dtype=np.float32) for _ in texts]
+    
     def save_embedding(self, memory_id: int, content: str, content_type: str, timestamp: str) -> None:
         """
         保存内容的嵌入向量
@@ -109,27 +292,60 @@ class RelevanceRetrieval:
             content_type: 内容类型 (user_input, assistant_response)
             timestamp: 时间戳
         """
-        embedding = self.generate_embedding(content)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 将numpy数组转换为二进制blob
-        embedding_blob = embedding.tobytes()
-        
-        cursor.execute(
-            """
-            INSERT INTO memory_embeddings 
-            (memory_id, embedding, content_type, timestamp) 
-            VALUES (?, ?, ?, ?)
-            """,
-            (memory_id, embedding_blob, content_type, timestamp)
-        )
+        self.save_embeddings(memory_id, [(content, content_type)], timestamp)
+    
+    def save_embeddings(
+        self,
+        memory_id: int,
+        contents: List[Tuple[str, str]],
+        timestamp: str,
+        importance: Optional[float] = None
+    ) -> None:
+        """
+        批量保存同一条记忆的多段内容的嵌入向量
         
-        conn.commit()
-        conn.close()
+        所有内容通过一次批量请求生成向量，并在同一个事务中写入。
         
-        logger.debug(f"已保存记忆ID {memory_id} 的嵌入向量")
+        Args:
+            memory_id: 记忆ID
+            contents: (内容文本, 内容类型) 列表
+            timestamp: 时间戳
+            importance: 记忆重要性，None时从长期记忆表中读取
+        """
+        if not contents:
+            return
+        
+        embeddings = self.generate_embeddings([content for content, _ in contents])
+        
+        # 写入数据库与同步常驻索引需要原子完成，避免与索引加载交错导致重复
+        with self._index_lock:
+            with self.db.transaction() as cursor:
+                # 将numpy数组转换为二进制blob
+                cursor.executemany(
+                    """
+                    INSERT INTO memory_embeddings 
+                    (memory_id, embedding, content_type, timestamp) 
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    [
+                        (memory_id, embedding.astype(np.float32).tobytes(), content_type, timestamp)
+                        for embedding, (_, content_type) in zip(embeddings, contents)
+                    ]
+                )
+                
+                if importance is None and self._index_loaded:
+                    cursor.execute("SELECT importance FROM long_term_memories WHERE id = ?", (memory_id,))
+                    row = cursor.fetchone()
+                    importance = row[0] if row else None
+            
+            # 尚未加载时由首次检索统一加载；记忆行不存在时与JOIN查询的语义一致，不加入索引
+            if self._index_loaded and importance is not None:
+                self.index.add_many(
+                    (memory_id, embedding, content_type, timestamp, importance)
+                    for embedding, (_, content_type) in zip(embeddings, contents)
+                )
+        
+        logger.debug(f"已保存记忆ID {memory_id} 的 {len(contents)} 个嵌入向量")
     
     def cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """
@@ -150,6 +366,63 @@ class RelevanceRetrieval:
             
         return np.dot(vec1, vec2) / (norm1 * norm2)
     
+    def _ensure_index_loaded(self) -> None:
+        """首次使用时从数据库加载常驻索引"""
+        if self._index_loaded:
+            return
+        
+        with self._index_lock:
+            if self._index_loaded:
+                return
+            
+            cursor = self.db.iterate(
+                """
+                SELECT e.memory_id, e.embedding, e.content_type, e.timestamp, m.importance
+                FROM memory_embeddings e
+                JOIN long_term_memories m ON e.memory_id = m.id
+                ORDER BY e.id
+                """
+            )
+            
+            self.index.clear()
+            self.index.add_many(
+                (memory_id, np.frombuffer(blob, dtype=np.float32), content_type, timestamp, importance)
+                for memory_id, blob, content_type, timestamp, importance in cursor
+            )
+            
+            self._index_loaded = True
+            logger.info(f"常驻嵌入索引加载完成，共 {self.index.size} 个嵌入向量")
+    
+    def reload_index(self) -> None:
+        """丢弃常驻索引，下次检索时从数据库重新加载"""
+        with self._index_lock:
+            self._index_loaded = False
+            self.index.clear()
+    
+    def remove_memories(self, memory_ids: List[int]) -> None:
+        """
+        从常驻索引中移除已删除记忆的嵌入
+        
+        Args:
+            memory_ids: 已删除的记忆ID列表
+        """
+        removed = self.index.remove_memories(memory_ids)
+        if removed:
+            logger.debug(f"已从常驻索引移除 {removed} 个嵌入向量")
+    
+    def _fetch_memory_rows(self, memory_ids: List[int]) -> Dict[int, Tuple]:
+        """批量读取记忆的文本内容和元数据"""
+        placeholders = ", ".join(["?"] * len(memory_ids))
+        rows = self.db.query(
+            f"""
+            SELECT id, user_input, assistant_response, metadata
+            FROM long_term_memories
+            WHERE id IN ({placeholders})
+            """,
+            memory_ids
+        )
+        return {row[0]: row[1:] for row in rows}
+    
     def retrieve_relevant_memories(
         self, 
         query: str, 
@@ -159,6 +432,9 @@ class RelevanceRetrieval:
         """
         检索与查询相关的记忆
         
+        相似度、重要性和时间衰减的综合得分在常驻索引上一次性向量化计算，
+        只有最终入选的记忆才会从数据库读取内容并解析元数据。
+        
         Args:
             query: 查询文本
             limit: 返回结果数量限制
@@ -167,82 +443,61 @@ class RelevanceRetrieval:
         Returns:
             相关记忆列表，按相关性排序
         """
+        if limit <= 0:
+            return []
+        
         # 生成查询的嵌入向量
         query_embedding = self.generate_embedding(query)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 获取所有记忆的嵌入向量
-        if content_type:
-            cursor.execute(
-                """
-                SELECT e.id, e.memory_id, e.embedding, e.content_type, e.timestamp,
-                       m.user_input, m.assistant_response, m.importance, m.metadata
-                FROM memory_embeddings e
-                JOIN long_term_memories m ON e.memory_id = m.id
-                WHERE e.content_type = ?
-                """,
-                (content_type,)
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT e.id, e.memory_id, e.embedding, e.content_type, e.timestamp,
-                       m.user_input, m.assistant_response, m.importance, m.metadata
-                FROM memory_embeddings e
-                JOIN long_term_memories m ON e.memory_id = m.id
-                """
-            )
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        # 计算相似度并排序
-        memory_similarities = []
-        now = datetime.now()
-        
-        for row in rows:
-            _, memory_id, embedding_blob, content_type, timestamp, user_input, assistant_response, importance, metadata_json = row
-            
-            # 将二进制blob转换回numpy数组
-            embedding = np.frombuffer(embedding_blob, dtype=np.float32)
-            
-            # 计算余弦相似度
-            similarity = self.cosine_similarity(query_embedding, embedding)
-            
-            # 应用时间衰减
-            time_diff = (now - datetime.fromisoformat(timestamp)).total_seconds() / 86400.0  # 转换为天
-            time_factor = np.exp(-self.time_decay_factor * time_diff)
-            
-            # 计算最终分数 (结合相似度、重要性和时间因素)
-            final_score = similarity * 0.6 + float(importance) * 0.2 + time_factor * 0.2
-            
-            try:
-                metadata = json.loads(metadata_json) if metadata_json else {}
-            except json.JSONDecodeError:
-                metadata = {}
+        self._ensure_index_loaded()
+        
+        ranked = self.index.rank(
+            query_embedding,
+            now=datetime.now().timestamp(),
+            time_decay_factor=self.time_decay_factor,
+            relevance_threshold=self.relevance_threshold,
+            content_type=content_type
+        )
+        candidate_count = ranked["memory_id"].shape[0]
+        
+        relevant_memories = []
+        stale_ids = set()
+        start = 0
+        while len(relevant_memories) < limit and start < candidate_count:
+            # 为被其他组件删除的记忆预留余量
+            end = min(candidate_count, start + (limit - len(relevant_memories)) * 2)
+            memory_rows = self._fetch_memory_rows(list({int(m) for m in ranked["memory_id"][start:end]}))
             
-            memory_similarities.append({
-                "memory_id": memory_id,
-                "score": final_score,
-                "similarity": similarity,
-                "timestamp": timestamp,
-                "user_input": user_input,
-                "assistant_response": assistant_response,
-                "importance": importance,
-                "content_type": content_type,
-                "metadata": metadata
-            })
-        
-        # 按分数降序排序
-        memory_similarities.sort(key=lambda x: x["score"], reverse=True)
-        
-        # 过滤低于阈值的结果
-        relevant_memories = [m for m in memory_similarities if m["similarity"] >= self.relevance_threshold]
-        
-        # 返回前limit个结果
-        return relevant_memories[:limit]
+            for i in range(start, end):
+                memory_id = int(ranked["memory_id"][i])
+                if memory_id not in memory_rows:
+                    stale_ids.add(memory_id)
+                    continue
+                if len(relevant_memories) >= limit:
+                    break
+                
+                user_input, assistant_response, metadata_json = memory_rows[memory_id]
+                try:
+                    metadata = json.loads(metadata_json) if metadata_json else {}
+                except json.JSONDecodeError:
+                    metadata = {}
+                
+                relevant_memories.append({
+                    "memory_id": memory_id,
+                    "score": float(ranked["score"][i]),
+                    "similarity": float(ranked["similarity"][i]),
+                    "timestamp": ranked["timestamp"][i],
+                    "user_input": user_input,
+                    "assistant_response": assistant_response,
+                    "importance": float(ranked["importance"][i]),
+                    "content_type": ranked["content_type"][i],
+                    "metadata": metadata
+                })
+            start = end
+        
+        if stale_ids:
+            self.remove_memories(list(stale_ids))
+        
+        return relevant_memories
     
     def hybrid_retrieval(
         self, 
@@ -262,10 +517,7 @@ class RelevanceRetrieval:
             混合记忆列表
         """
         # 获取最近的记忆
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
+        recent_rows = self.db.query(
             """
             SELECT id, timestamp, user_input, assistant_response, importance, metadata
             FROM long_term_memories
@@ -275,9 +527,6 @@ class RelevanceRetrieval:
             (recency_limit,)
         )
         
-        recent_rows = cursor.fetchall()
-        conn.close()
-        
         recent_memories = []
         for row in recent_rows:
             memory_id, timestamp, user_input, assistant_response, importance, metadata_json = row
@@ -0,0 +1,288 @@
+"""
+SQLite连接管理
+
+为记忆子系统提供共享的长连接访问层：
+- 每个数据库文件一个管理器实例，每个线程复用一个长连接，线程结束后其连接随之关闭
+- ":memory:" 使用共享缓存的内存数据库，同一管理器的所有线程看到同一个数据库
+- 启用WAL模式和NORMAL同步级别，读写互不阻塞
+- 长连接上的语句缓存使重复执行的SQL只需预编译一次
+- 事务批量写入，插入操作直接返回新行ID
+- 异步外观：在专用IO线程上执行数据库操作，避免阻塞事件循环
+"""
+from typing import List, Dict, Any, Optional, Sequence, Iterable, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import asyncio
+import functools
+import itertools
+import os
+import sqlite3
+import threading
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SQLiteConnectionManager:
+    """
+    SQLite连接管理器
+
+    通过 get_connection_manager 获取共享实例，同一数据库文件的所有组件共用
+    同一个管理器。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        busy_timeout: float = 30.0,
+        cached_statements: int = 256,
+        async_workers: int = 2
+    ):
+        """
+        初始化连接管理器
+
+        Args:
+            db_path: 数据库路径
+            busy_timeout: 等待数据库锁的超时时间(秒)
+            cached_statements: 每个连接缓存的预编译语句数量
+            async_workers: 异步外观使用的IO线程数量
+        """
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.async_workers = max(1, async_workers)
+
+        self._local = threading.local()
+        # 按线程记录连接，线程结束后在下次建立连接时关闭
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._connections_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._closed = False
+
+        # 内存数据库在最后一个连接关闭时销毁，由管理器持有一个连接保证其存活
+        self._uri: Optional[str] = None
+        self._keeper: Optional[sqlite3.Connection] = None
+        if db_path == ":memory:":
+            self._uri = f"file:rainbow-memory-{next(_memory_ids)}?mode=memory&cache=shared"
+            self._keeper = self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        return sqlite3.connect(
+            self._uri or self.db_path,
+            timeout=self.busy_timeout,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+            isolation_level=None,
+            uri=self._uri is not None
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = self._open()
+        if self._uri is None:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+
+        with self._connections_lock:
+            dead = [thread for thread in self._connections if not thread.is_alive()]
+            for thread in dead:
+                self._close_connection(self._connections.pop(thread))
+            self._connections[threading.current_thread()] = conn
+        return conn
+
+    @staticmethod
+    def _close_connection(conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"关闭SQLite连接时出错: {e}")
+
+    @property
+    def connection_count(self) -> int:
+        """当前打开的线程连接数量"""
+        with self._connections_lock:
+            return len(self._connections)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """当前线程的长连接"""
+        if self._closed:
+            raise RuntimeError(f"连接管理器已关闭: {self.db_path}")
+
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.connection = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """
+        在一个事务中执行多条语句，可以嵌套（内层并入外层事务）
+
+        Yields:
+            当前连接的游标
+        """
+        conn = self.connection
+        cursor = conn.cursor()
+        if self._local.depth == 0:
+            cursor.execute("BEGIN IMMEDIATE")
+        self._local.depth += 1
+        try:
+            yield cursor
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.rollback()
+            raise
+        else:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.commit()
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """
+        执行一条写语句
+
+        Returns:
+            受影响的行数
+        """
+        with self.transaction() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def insert(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """
+        执行一条插入语句
+
+        Returns:
+            新插入行的ID
+        """
+        with self.transaction() as cursor:
+            cursor.execute(sql, params)
+            return cursor.lastrowid
+
+    def executemany(self, sql: str, params_list: Iterable[Sequence[Any]]) -> int:
+        """
+        在一个事务中批量执行同一条语句
+
+        Returns:
+            受影响的行数
+        """
+        with self.transaction() as cursor:
+            cursor.executemany(sql, params_list)
+            return cursor.rowcount
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        """执行查询并返回全部结果"""
+        return self.connection.execute(sql, params).fetchall()
+
+    def query_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        """执行查询并返回第一行结果"""
+        return self.connection.execute(sql, params).fetchone()
+
+    def iterate(self, sql: str, params: Sequence[Any] = ()) -> Iterator[tuple]:
+        """执行查询并逐行返回结果"""
+        return self.connection.execute(sql, params)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._connections_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.async_workers,
+                        thread_name_prefix=f"sqlite-io-{os.path.basename(self.db_path)}"
+                    )
+        return self._executor
+
+    async def run_async(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """
+        在IO线程中执行任意数据库相关操作
+
+        Args:
+            func: 要执行的函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            函数的返回值
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+
+    async def execute_async(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """execute 的异步版本"""
+        return await self.run_async(self.execute, sql, params)
+
+    async def insert_async(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """insert 的异步版本"""
+        return await self.run_async(self.insert, sql, params)
+
+    async def executemany_async(self, sql: str, params_list: Iterable[Sequence[Any]]) -> int:
+        """executemany 的异步版本"""
+        return await self.run_async(self.executemany, sql, list(params_list))
+
+    async def query_async(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        """query 的异步版本"""
+        return await self.run_async(self.query, sql, params)
+
+    async def query_one_async(self, sql: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        """query_one 的异步版本"""
+        return await self.run_async(self.query_one, sql, params)
+
+    def close(self) -> None:
+        """关闭所有线程的连接和IO线程"""
+        self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._connections_lock:
+            for conn in list(self._connections.values()):
+                self._close_connection(conn)
+            self._connections.clear()
+        if self._keeper is not None:
+            self._close_connection(self._keeper)
+            self._keeper = None
+
+
+_managers: Dict[str, SQLiteConnectionManager] = {}
+_managers_lock = threading.Lock()
+_memory_ids = itertools.count()
+
+
+def get_connection_manager(db_path: str) -> SQLiteConnectionManager:
+    """
+    获取数据库文件对应的共享连接管理器
+
+    Args:
+        db_path: 数据库路径
+
+    Returns:
+        连接管理器实例
+    """
+    key = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        # 数据库文件被外部删除后，旧连接指向的是已删除的文件，新的调用方使用新的管理器；
+        # 旧管理器仍可能被其他组件持有，由持有者自行关闭
+        stale = manager is not None and key != ":memory:" and not os.path.exists(key)
+        if manager is None or manager._closed or stale:
+            manager = SQLiteConnectionManager(db_path)
+            _managers[key] = manager
+        return manager
+
+
+def close_connection_manager(db_path: str) -> None:
+    """
+    关闭并移除数据库文件对应的共享连接管理器
+
+    Args:
+        db_path: 数据库路径
+    """
+    key = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.pop(key, None)
+    if manager is not None:
+        manager.close()
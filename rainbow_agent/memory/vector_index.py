@@ -0,0 +1,545 @@
+"""
+向量索引
+
+为向量记忆提供可插拔的相似度检索后端：
+- exact: 连续float32矩阵 + 分块矩阵乘法 + argpartition取top-k
+- ivf:   基于k-means粗聚类的倒排索引（近似检索）
+- hnsw:  基于hnswlib的分层可导航小世界图（近似检索，可选依赖）
+
+所有后端存储的向量均已归一化，内积即为余弦相似度。
+"""
+from typing import List, Dict, Any, Optional, Tuple, Sequence
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+try:
+    import hnswlib
+    HNSW_SUPPORT = True
+except ImportError:
+    HNSW_SUPPORT = False
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _normalize(vector: Sequence[float]) -> np.ndarray:
+    """将向量转换为归一化的float32数组"""
+    array = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(array)
+    if norm == 0:
+        return array
+    return array / norm
+
+
+class VectorIndex(ABC):
+    """向量索引接口"""
+
+    @abstractmethod
+    def add(self, key: str, vector: Sequence[float]) -> None:
+        """
+        添加或替换一个向量
+
+        Args:
+            key: 向量对应的记忆ID
+            vector: 向量
+        """
+        pass
+
+    @abstractmethod
+    def remove(self, key: str) -> bool:
+        """
+        移除一个向量
+
+        Args:
+            key: 记忆ID
+
+        Returns:
+            是否成功移除
+        """
+        pass
+
+    @abstractmethod
+    def search(self, query: Sequence[float], k: int = 5) -> List[Tuple[str, float]]:
+        """
+        检索与查询向量最相似的k个向量
+
+        Args:
+            query: 查询向量
+            k: 返回结果数量
+
+        Returns:
+            (记忆ID, 余弦相似度) 列表，按相似度降序排列
+        """
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """清空索引"""
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def __contains__(self, key: str) -> bool:
+        pass
+
+
+class ExactVectorIndex(VectorIndex):
+    """
+    精确向量索引
+
+    将所有向量保存在一个连续的float32矩阵中（按行归一化），
+    添加时原地写入，删除时用最后一行填补空位，查询时分块计算矩阵乘法。
+    """
+
+    def __init__(self, dimension: Optional[int] = None, initial_capacity: int = 1024, block_size: int = 65536):
+        """
+        初始化精确向量索引
+
+        Args:
+            dimension: 向量维度，None表示由第一个添加的向量决定
+            initial_capacity: 矩阵初始行数
+            block_size: 查询时每个分块的行数
+        """
+        self.dimension = dimension
+        self.initial_capacity = max(1, initial_capacity)
+        self.block_size = max(1, block_size)
+
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+
+        if dimension:
+            self._matrix = np.zeros((self.initial_capacity, dimension), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._positions
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """当前有效的归一化向量矩阵视图"""
+        if self._matrix is None:
+            return np.zeros((0, self.dimension or 0), dtype=np.float32)
+        return self._matrix[:len(self._keys)]
+
+    def _ensure_capacity(self, dimension: int) -> None:
+        """确保矩阵有足够空间容纳新行"""
+        if self._matrix is None:
+            self.dimension = dimension
+            self._matrix = np.zeros((self.initial_capacity, dimension), dtype=np.float32)
+        elif len(self._keys) >= self._matrix.shape[0]:
+            grown = np.zeros((self._matrix.shape[0] * 2, self.dimension), dtype=np.float32)
+            grown[:len(self._keys)] = self._matrix[:len(self._keys)]
+            self._matrix = grown
+
+    def add(self, key: str, vector: Sequence[float]) -> None:
+        """添加或替换一个向量"""
+        row = _normalize(vector)
+        if self.dimension is not None and row.shape[0] != self.dimension:
+            raise ValueError(f"向量维度不匹配: 期望 {self.dimension}，实际 {row.shape[0]}")
+
+        position = self._positions.get(key)
+        if position is None:
+            self._ensure_capacity(row.shape[0])
+            position = len(self._keys)
+            self._keys.append(key)
+            self._positions[key] = position
+
+        self._matrix[position] = row
+        self._on_row_written(position)
+
+    def remove(self, key: str) -> bool:
+        """移除一个向量，用最后一行填补空位以保持矩阵连续"""
+        position = self._positions.pop(key, None)
+        if position is None:
+            return False
+
+        self._on_row_removed(position)
+        last = len(self._keys) - 1
+        if position != last:
+            moved_key = self._keys[last]
+            self._matrix[position] = self._matrix[last]
+            self._keys[position] = moved_key
+            self._positions[moved_key] = position
+            self._on_row_moved(last, position)
+        self._keys.pop()
+        return True
+
+    def clear(self) -> None:
+        """清空索引"""
+        self._keys = []
+        self._positions = {}
+        if self._matrix is not None:
+            self._matrix = np.zeros((self.initial_capacity, self.dimension), dtype=np.float32)
+
+    def _on_row_written(self, position: int) -> None:
+        """行写入后的钩子，供子类维护附加结构"""
+        pass
+
+    def _on_row_removed(self, position: int) -> None:
+        """行被删除前的钩子，供子类维护附加结构"""
+        pass
+
+    def _on_row_moved(self, source: int, target: int) -> None:
+        """行移动后的钩子，供子类维护附加结构"""
+        pass
+
+    def _top_k(self, query: np.ndarray, rows: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """
+        在给定的行中分块计算top-k
+
+        Args:
+            query: 归一化的查询向量
+            rows: 候选行号数组，None表示全部行
+            k: 返回结果数量
+        """
+        total = len(self._keys) if rows is None else len(rows)
+        if total == 0 or k <= 0:
+            return []
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+
+        for start in range(0, total, self.block_size):
+            end = min(start + self.block_size, total)
+            if rows is None:
+                block_rows = np.arange(start, end)
+                scores = self._matrix[start:end] @ query
+            else:
+                block_rows = rows[start:end]
+                scores = self._matrix[block_rows] @ query
+
+            if scores.shape[0] > k:
+                top = np.argpartition(scores, -k)[-k:]
+                block_rows = block_rows[top]
+                scores = scores[top]
+
+            best_rows = np.concatenate([best_rows, block_rows])
+            best_scores = np.concatenate([best_scores, scores])
+
+            # 合并候选，只保留当前最好的k个
+            if best_scores.shape[0] > k:
+                top = np.argpartition(best_scores, -k)[-k:]
+                best_rows = best_rows[top]
+                best_scores = best_scores[top]
+
+        order = np.argsort(-best_scores)
+        return [(self._keys[int(best_rows[i])], float(best_scores[i])) for i in order]
+
+    def search(self, query: Sequence[float], k: int = 5) -> List[Tuple[str, float]]:
+        """精确检索与查询向量最相似的k个向量"""
+        if not self._keys:
+            return []
+        query_row = _normalize(query)
+        if query_row.shape[0] != self.dimension:
+            raise ValueError(f"查询向量维度不匹配: 期望 {self.dimension}，实际 {query_row.shape[0]}")
+        return self._top_k(query_row, None, k)
+
+
+class IVFVectorIndex(ExactVectorIndex):
+    """
+    倒排文件（IVF）近似向量索引
+
+    在精确索引的矩阵之上维护k-means粗聚类中心、每行所属的聚类和每个聚类的行号列表，
+    查询时只扫描与查询最接近的n_probe个聚类中的行。
+    向量数量小于训练阈值时退化为精确检索。
+    """
+
+    def __init__(
+        self,
+        dimension: Optional[int] = None,
+        n_lists: int = 256,
+        n_probe: int = 8,
+        train_threshold: Optional[int] = None,
+        train_iterations: int = 10,
+        initial_capacity: int = 1024,
+        block_size: int = 65536,
+        seed: int = 0
+    ):
+        """
+        初始化IVF索引
+
+        Args:
+            dimension: 向量维度
+            n_lists: 聚类中心数量
+            n_probe: 查询时扫描的聚类数量
+            train_threshold: 开始训练聚类所需的向量数量，默认为 n_lists * 8
+            train_iterations: k-means迭代次数
+            initial_capacity: 矩阵初始行数
+            block_size: 查询时每个分块的行数
+            seed: 随机种子
+        """
+        super().__init__(dimension=dimension, initial_capacity=initial_capacity, block_size=block_size)
+        self.n_lists = max(1, n_lists)
+        self.n_probe = max(1, n_probe)
+        self.train_threshold = train_threshold or self.n_lists * 8
+        self.train_iterations = train_iterations
+        self._rng = np.random.default_rng(seed)
+
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(self.initial_capacity, dtype=np.int32)
+        # 每个聚类的行号列表，以及每行在其列表中的下标（-1表示未分配）
+        self._lists: List[List[int]] = []
+        self._slots = np.full(self.initial_capacity, -1, dtype=np.int64)
+        self._trained_size = 0
+
+    @property
+    def is_trained(self) -> bool:
+        """是否已训练聚类中心"""
+        return self._centroids is not None
+
+    def _on_row_written(self, position: int) -> None:
+        """为新写入的行分配聚类，并在数据量翻倍时重新训练"""
+        if self._assignments.shape[0] <= position:
+            grown = np.zeros(self._matrix.shape[0], dtype=np.int32)
+            grown[:self._assignments.shape[0]] = self._assignments
+            self._assignments = grown
+            slots = np.full(self._matrix.shape[0], -1, dtype=np.int64)
+            slots[:self._slots.shape[0]] = self._slots
+            self._slots = slots
+
+        if self._centroids is not None:
+            self._unassign(position)
+            self._assign(position, int(np.argmax(self._centroids @ self._matrix[position])))
+
+        size = len(self._keys)
+        if size >= self.train_threshold and size >= self._trained_size * 2:
+            self.train()
+
+    def _assign(self, position: int, list_id: int) -> None:
+        members = self._lists[list_id]
+        self._assignments[position] = list_id
+        self._slots[position] = len(members)
+        members.append(position)
+
+    def _unassign(self, position: int) -> None:
+        """从所属聚类的行号列表中移除，用列表末尾的行填补空位"""
+        slot = int(self._slots[position])
+        if slot < 0:
+            return
+        members = self._lists[self._assignments[position]]
+        last = members.pop()
+        if last != position:
+            members[slot] = last
+            self._slots[last] = slot
+        self._slots[position] = -1
+
+    def _on_row_removed(self, position: int) -> None:
+        self._unassign(position)
+
+    def _on_row_moved(self, source: int, target: int) -> None:
+        self._assignments[target] = self._assignments[source]
+        slot = int(self._slots[source])
+        self._slots[target] = slot
+        self._slots[source] = -1
+        if slot >= 0:
+            self._lists[self._assignments[target]][slot] = target
+
+    def clear(self) -> None:
+        super().clear()
+        self._centroids = None
+        self._assignments = np.zeros(self.initial_capacity, dtype=np.int32)
+        self._lists = []
+        self._slots = np.full(self.initial_capacity, -1, dtype=np.int64)
+        self._trained_size = 0
+
+    def train(self) -> None:
+        """使用球面k-means训练聚类中心并重新分配所有行"""
+        vectors = self.vectors
+        size = vectors.shape[0]
+        if size == 0:
+            return
+
+        n_lists = min(self.n_lists, size)
+        sample_size = min(size, n_lists * 64)
+        sample = vectors[self._rng.choice(size, sample_size, replace=False)]
+        centroids = sample[self._rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(self.train_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            non_empty = norms[:, 0] > 0
+            centroids[non_empty] = sums[non_empty] / norms[non_empty]
+
+        self._centroids = centroids
+        for start in range(0, size, self.block_size):
+            end = min(start + self.block_size, size)
+            self._assignments[start:end] = np.argmax(vectors[start:end] @ centroids.T, axis=1)
+
+        # 按聚类重建行号列表
+        order = np.argsort(self._assignments[:size], kind="stable")
+        bounds = np.searchsorted(self._assignments[:size][order], np.arange(n_lists + 1))
+        self._lists = []
+        for list_id in range(n_lists):
+            members = order[bounds[list_id]:bounds[list_id + 1]]
+            self._slots[members] = np.arange(members.shape[0])
+            self._lists.append(members.tolist())
+        self._trained_size = size
+        logger.debug(f"IVF索引训练完成: {size} 个向量, {n_lists} 个聚类")
+
+    def search(self, query: Sequence[float], k: int = 5) -> List[Tuple[str, float]]:
+        """近似检索与查询向量最相似的k个向量"""
+        if not self._keys:
+            return []
+        query_row = _normalize(query)
+        if query_row.shape[0] != self.dimension:
+            raise ValueError(f"查询向量维度不匹配: 期望 {self.dimension}，实际 {query_row.shape[0]}")
+
+        if self._centroids is None:
+            return self._top_k(query_row, None, k)
+
+        n_probe = min(self.n_probe, self._centroids.shape[0])
+        probes = np.argpartition(self._centroids @ query_row, -n_probe)[-n_probe:]
+        rows = np.fromiter(
+            (row for list_id in probes for row in self._lists[list_id]),
+            dtype=np.int64
+        )
+        return self._top_k(query_row, rows, k)
+
+
+class HNSWVectorIndex(VectorIndex):
+    """
+    HNSW近似向量索引
+
+    基于hnswlib实现，删除采用标记删除并在后续添加时复用空位。
+    需要安装可选依赖: pip install hnswlib
+    """
+
+    def __init__(
+        self,
+        dimension: Optional[int] = None,
+        initial_capacity: int = 1024,
+        m: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64
+    ):
+        """
+        初始化HNSW索引
+
+        Args:
+            dimension: 向量维度
+            initial_capacity: 初始容量
+            m: 图中每个节点的连接数
+            ef_construction: 构建时的候选队列大小
+            ef_search: 查询时的候选队列大小
+        """
+        if not HNSW_SUPPORT:
+            raise ImportError("HNSW索引需要hnswlib库。请安装: pip install hnswlib")
+
+        self.dimension = dimension
+        self.initial_capacity = max(1, initial_capacity)
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+
+        self._index = None
+        self._labels: Dict[str, int] = {}
+        self._keys: Dict[int, str] = {}
+        self._next_label = 0
+
+        if dimension:
+            self._create_index(dimension)
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._labels
+
+    def _create_index(self, dimension: int) -> None:
+        self.dimension = dimension
+        self._index = hnswlib.Index(space="ip", dim=dimension)
+        self._index.init_index(
+            max_elements=self.initial_capacity,
+            ef_construction=self.ef_construction,
+            M=self.m,
+            allow_replace_deleted=True
+        )
+        self._index.set_ef(self.ef_search)
+
+    def add(self, key: str, vector: Sequence[float]) -> None:
+        """添加或替换一个向量"""
+        row = _normalize(vector)
+        if self._index is None:
+            self._create_index(row.shape[0])
+        elif row.shape[0] != self.dimension:
+            raise ValueError(f"向量维度不匹配: 期望 {self.dimension}，实际 {row.shape[0]}")
+
+        label = self._labels.get(key)
+        if label is None:
+            label = self._next_label
+            self._next_label += 1
+            # 标记删除的空位会被复用，只有有效向量占满容量时才需要扩容
+            if len(self._labels) >= self._index.get_max_elements():
+                self._index.resize_index(self._index.get_max_elements() * 2)
+            self._labels[key] = label
+            self._keys[label] = key
+        self._index.add_items(row.reshape(1, -1), np.array([label]), replace_deleted=True)
+
+    def remove(self, key: str) -> bool:
+        """标记删除一个向量"""
+        label = self._labels.pop(key, None)
+        if label is None:
+            return False
+        del self._keys[label]
+        self._index.mark_deleted(label)
+        return True
+
+    def search(self, query: Sequence[float], k: int = 5) -> List[Tuple[str, float]]:
+        """近似检索与查询向量最相似的k个向量"""
+        if not self._labels or k <= 0:
+            return []
+        query_row = _normalize(query)
+        if query_row.shape[0] != self.dimension:
+            raise ValueError(f"查询向量维度不匹配: 期望 {self.dimension}，实际 {query_row.shape[0]}")
+
+        k = min(k, len(self._labels))
+        self._index.set_ef(max(self.ef_search, k))
+        labels, distances = self._index.knn_query(query_row.reshape(1, -1), k=k)
+        # 内积空间中 distance = 1 - ip
+        return [
+            (self._keys[int(label)], float(1.0 - distance))
+            for label, distance in zip(labels[0], distances[0])
+            if int(label) in self._keys
+        ]
+
+    def clear(self) -> None:
+        """清空索引"""
+        self._labels = {}
+        self._keys = {}
+        self._next_label = 0
+        if self.dimension:
+            self._create_index(self.dimension)
+
+
+_INDEX_BACKENDS = {
+    "exact": ExactVectorIndex,
+    "ivf": IVFVectorIndex,
+    "hnsw": HNSWVectorIndex,
+}
+
+
+def create_vector_index(backend: str = "exact", **kwargs: Any) -> VectorIndex:
+    """
+    创建向量索引
+
+    Args:
+        backend: 索引后端 ("exact", "ivf", "hnsw")
+        **kwargs: 传递给索引构造函数的参数
+
+    Returns:
+        向量索引实例
+    """
+    index_class = _INDEX_BACKENDS.get(backend)
+    if index_class is None:
+        raise ValueError(f"未知的向量索引后端: {backend}，可选: {', '.join(_INDEX_BACKENDS)}")
+    return index_class(**kwargs)
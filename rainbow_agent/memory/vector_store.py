@@ -11,6 +11,7 @@ import pickle
 try:
     import numpy as np
     from sentence_transformers import SentenceTransformer
+    from .vector_index import create_vector_index
     VECTOR_SUPPORT = True
 except ImportError:
     VECTOR_SUPPORT = False
@@ -61,7 +62,9 @@ class VectorMemory(Memory):
         self, 
         model_name: str = "paraphrase-MiniLM-L6-v2", 
         capacity: int = 1000,
-        save_path: Optional[str] = None
+        save_path: Optional[str] = None,
+        index_backend: str = "exact",
+        index_options: Optional[Dict[str, Any]] = None
     ):
         """
         初始化向量记忆系统
@@ -70,16 +73,20 @@ class VectorMemory(Memory):
             model_name: 嵌入模型名称
             capacity: 记忆容量
             save_path: 记忆保存路径
+            index_backend: 向量索引后端 ("exact", "ivf", "hnsw")
+            index_options: 传递给向量索引的额外参数
         """
         self.capacity = capacity
         self.memories: Dict[str, VectorMemoryItem] = {}
         self.save_path = save_path
+        self.index = None
         
         # 检查向量支持
         if not VECTOR_SUPPORT:
             logger.warning("缺少向量支持库。请安装所需依赖: pip install numpy sentence-transformers")
             self.model = None
         else:
+            self.index = create_vector_index(index_backend, **(index_options or {}))
             try:
                 self.model = SentenceTransformer(model_name)
                 logger.info(f"向量记忆系统初始化完成，使用模型: {model_name}")
@@ -125,6 +132,8 @@ class VectorMemory(Memory):
         
         # 存储记忆
         self.memories[memory_item.memory_id] = memory_item
+        if vector and self.index is not None:
+            self.index.add(memory_item.memory_id, vector)
         logger.debug(f"添加向量记忆: {memory_item.memory_id[:8]}...")
         
         # 如果指定了保存路径，保存记忆
@@ -160,20 +169,15 @@ class VectorMemory(Memory):
             # 将查询编码为向量
             query_vector = self._encode_text(query)
             
-            # 计算所有记忆与查询的相似度
-            similarities = []
-            for memory_id, memory in self.memories.items():
-                if memory.vector:
-                    # 计算余弦相似度
-                    similarity = self._cosine_similarity(query_vector, memory.vector)
-                    similarities.append((memory_id, similarity))
+            if not query_vector:
+                return self._fallback_search(query, limit)
             
-            # 按相似度排序
-            similarities.sort(key=lambda x: x[1], reverse=True)
+            # 通过向量索引获取最相似的记忆
+            similarities = self.index.search(query_vector, limit)
             
             # 获取最相关的记忆
             results = []
-            for memory_id, similarity in similarities[:limit]:
+            for memory_id, similarity in similarities:
                 memory = self.memories[memory_id]
                 memory.access()
                 result = memory.to_dict()
@@ -203,42 +207,11 @@ class VectorMemory(Memory):
         results.sort(key=lambda x: x["last_accessed"], reverse=True)
         return results[:limit]
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """
-        计算两个向量的余弦相似度
-        
-        Args:
-            vec1: 第一个向量
-            vec2: 第二个向量
-            
-        Returns:
-            余弦相似度 (-1到1之间的值)
-        """
-        try:
-            if not VECTOR_SUPPORT:
-                return 0.0
-                
-            # 使用numpy计算余弦相似度
-            vec1 = np.array(vec1)
-            vec2 = np.array(vec2)
-            
-            dot_product = np.dot(vec1, vec2)
-            norm_vec1 = np.linalg.norm(vec1)
-            norm_vec2 = np.linalg.norm(vec2)
-            
-            # 避免除以零
-            if norm_vec1 == 0 or norm_vec2 == 0:
-                return 0.0
-                
-            similarity = dot_product / (norm_vec1 * norm_vec2)
-            return float(similarity)
-        except Exception as e:
-            logger.error(f"计算余弦相似度时出错: {e}")
-            return 0.0
-    
     def clear(self) -> None:
         """清除所有记忆"""
         self.memories.clear()
+        if self.index is not None:
+            self.index.clear()
         logger.debug("清除所有向量记忆")
         
         if self.save_path:
@@ -282,6 +255,8 @@ class VectorMemory(Memory):
             # 从pickle文件加载记忆
             with open(self.save_path, 'rb') as f:
                 self.memories = pickle.load(f)
+            
+            self._rebuild_index()
                 
             logger.info(f"从 {self.save_path} 加载了 {len(self.memories)} 条记忆")
             return True
@@ -289,6 +264,16 @@ class VectorMemory(Memory):
             logger.error(f"加载记忆时出错: {e}")
             return False
     
+    def _rebuild_index(self) -> None:
+        """根据当前记忆重建向量索引"""
+        if self.index is None:
+            return
+        
+        self.index.clear()
+        for memory_id, memory in self.memories.items():
+            if memory.vector:
+                self.index.add(memory_id, memory.vector)
+    
     def _evict_least_important(self) -> None:
         """移除最不重要的记忆"""
         if not self.memories:
@@ -309,4 +294,6 @@ class VectorMemory(Memory):
         # 找出最不重要的记忆并移除
         least_important = min(memory_scores, key=memory_scores.get)
         self.memories.pop(least_important)
+        if self.index is not None:
+            self.index.remove(least_important)
         logger.debug(f"移除最不重要的记忆: {least_important[:8]}...")
@@ -9,6 +9,7 @@ from .models import (
     RelationshipIntensity,
     RelationshipStatus
 )
+from .store import RelationshipStore
 from .tools import RelationshipTool, RelationshipAnalysisTool
 from .tasks import TaskManager, Task, RelationshipTask
 from .agent_team import EnhancedAgentTeam, AgentProfile, AgentTask
@@ -28,6 +29,7 @@ __all__ = [
     'RelationshipGraph',
     'RelationshipIntensity',
     'RelationshipStatus',
+    'RelationshipStore',
     'RelationshipTool',
     'RelationshipAnalysisTool',
     'TaskManager',
@@ -3,17 +3,20 @@ Rainbow Agent 增强型代理团队模块
 
 提供基于关系网络的多代理协作系统
 """
-from typing import Dict, List, Any, Optional, Union, Callable, Tuple
+from typing import Dict, List, Any, Optional, Union, Callable, Tuple, Set
 import os
 import json
+import threading
 from datetime import datetime
 import uuid
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import weakref
 
 from .models import RelationshipManager, RelationshipIntensity, RelationshipStatus
+from .store import ChangeSet, RelationshipStore, atomic_write_json
 from .tasks import TaskManager, Task
 from ..utils.logger import get_logger
+from ..utils.runtime import PoolType, get_runtime
 
 logger = get_logger(__name__)
 
@@ -255,11 +258,64 @@ class EnhancedAgentTeam:
         self.relationship_manager = relationship_manager or RelationshipManager()
         self.task_manager = task_manager or TaskManager(self.relationship_manager)
         
-        # 任务执行器
-        self.executor = ThreadPoolExecutor(max_workers=10)
+        # 任务执行器，借用共享的LLM线程池，团队内最多同时执行10个任务；
+        # 团队关闭或被回收时移除运行时中该团队的并发限制和统计
+        runtime = get_runtime()
+        owner = f"team:{self.team_id}"
+        self.executor = runtime.executor(PoolType.LLM, owner=owner, limit=10)
+        self._release_owner = weakref.finalize(self, runtime.release_owner, owner)
         
         # 任务处理函数映射
         self.task_handlers: Dict[str, Callable] = {}
+
+        # 已变更的代理和任务ID，由 collect_changes 收集后写入存储
+        self._dirty_agents: Set[str] = set()
+        self._dirty_tasks: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+        self._info_saved = False
+
+    def close(self) -> None:
+        """停止提交新任务，取消排队中的任务，并释放团队在共享运行时中的所属方"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self._release_owner()
+
+    def mark_agent_dirty(self, agent_id: str) -> None:
+        """标记代理已变更，直接修改代理配置后调用"""
+        with self._dirty_lock:
+            self._dirty_agents.add(agent_id)
+
+    def mark_task_dirty(self, task_id: str) -> None:
+        """标记任务已变更，直接修改任务实例后调用"""
+        with self._dirty_lock:
+            self._dirty_tasks.add(task_id)
+
+    def collect_changes(self, changes: ChangeSet) -> None:
+        """
+        将已变更的代理和任务加入变更集合，并清除变更标记
+
+        Args:
+            changes: 变更集合
+        """
+        with self._dirty_lock:
+            dirty_agents, self._dirty_agents = self._dirty_agents, set()
+            dirty_tasks, self._dirty_tasks = self._dirty_tasks, set()
+        for table, ids, items in (("agents", dirty_agents, self.agents), ("agent_tasks", dirty_tasks, self.tasks)):
+            for item_id in ids:
+                item = items.get(item_id)
+                if item is None:
+                    changes.delete(table, item_id)
+                else:
+                    changes.put(table, item_id, item.to_dict())
+        if not self._info_saved:
+            changes.meta["agent_team"] = {"team_id": self.team_id, "name": self.name, "description": self.description}
+            self._info_saved = True
+
+    def mark_all_dirty(self) -> None:
+        """将所有代理和任务标记为已变更，用于把内存中的全部数据写入新的存储"""
+        with self._dirty_lock:
+            self._dirty_agents.update(self.agents)
+            self._dirty_tasks.update(self.tasks)
+        self._info_saved = False
         
     def add_agent(self, agent: AgentProfile) -> str:
         """
@@ -272,6 +328,7 @@ class EnhancedAgentTeam:
             代理ID
         """
         self.agents[agent.agent_id] = agent
+        self.mark_agent_dirty(agent.agent_id)
         return agent.agent_id
         
     def remove_agent(self, agent_id: str) -> bool:
@@ -286,6 +343,7 @@ class EnhancedAgentTeam:
         """
         if agent_id in self.agents:
             del self.agents[agent_id]
+            self.mark_agent_dirty(agent_id)
             return True
         return False
         
@@ -314,6 +372,7 @@ class EnhancedAgentTeam:
         task_id = kwargs.get("task_id") or str(uuid.uuid4())
         task = AgentTask(task_id=task_id, **kwargs)
         self.tasks[task_id] = task
+        self.mark_task_dirty(task_id)
         return task_id
         
     def get_task(self, task_id: str) -> Optional[AgentTask]:
@@ -346,6 +405,7 @@ class EnhancedAgentTeam:
             return False
             
         task.assigned_agent_id = agent_id
+        self.mark_task_dirty(task_id)
         return True
         
     def decompose_task(
@@ -378,6 +438,7 @@ class EnhancedAgentTeam:
             
         # 更新父任务的子任务列表
         parent_task.subtasks.extend(subtask_ids)
+        self.mark_task_dirty(parent_task_id)
         
         return subtask_ids
         
@@ -421,6 +482,7 @@ class EnhancedAgentTeam:
             
         # 开始任务
         task.start()
+        self.mark_task_dirty(task_id)
         
         try:
             # 获取任务类型
@@ -447,12 +509,14 @@ class EnhancedAgentTeam:
                 
             # 完成任务
             task.complete(result)
+            self.mark_task_dirty(task_id)
             return result
             
         except Exception as e:
             # 任务失败
             error_message = f"Task execution failed: {str(e)}"
             task.fail(error_message)
+            self.mark_task_dirty(task_id)
             logger.error(error_message)
             return error_message
             
@@ -710,8 +774,43 @@ class EnhancedAgentTeam:
             "tasks": [task.to_dict() for task in self.tasks.values()]
         }
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        atomic_write_json(filepath, data)
+
+    @classmethod
+    def load_from_store(
+        cls,
+        store: RelationshipStore,
+        relationship_manager: Optional[RelationshipManager] = None,
+        task_manager: Optional[TaskManager] = None
+    ) -> 'EnhancedAgentTeam':
+        """
+        从存储加载团队数据
+
+        Args:
+            store: 关系数据存储
+            relationship_manager: 关系管理器实例
+            task_manager: 任务管理器实例
+
+        Returns:
+            团队实例
+        """
+        info = store.get_meta("agent_team") or {}
+        team = cls(
+            team_id=info.get("team_id"),
+            name=info.get("name", "Agent Team"),
+            description=info.get("description", ""),
+            relationship_manager=relationship_manager,
+            task_manager=task_manager
+        )
+        team._info_saved = bool(info)
+
+        for agent_data in store.load_records("agents"):
+            agent = AgentProfile.from_dict(agent_data)
+            team.agents[agent.agent_id] = agent
+        for task_data in store.load_records("agent_tasks"):
+            task = AgentTask.from_dict(task_data)
+            team.tasks[task.task_id] = task
+        return team
             
     @classmethod
     def load_from_file(
@@ -6,27 +6,40 @@ Rainbow Agent 关系系统集成模块
 from typing import Dict, List, Any, Optional, Union, Callable
 import os
 import json
+import time
 from datetime import datetime
 import asyncio
 
 from .models import RelationshipManager, RelationshipStatus, RelationshipIntensity
+from .store import ChangeSet, RelationshipStore
 from .tools import RelationshipTool, RelationshipAnalysisTool
 from .tasks import TaskManager, Task
 from .agent_team import EnhancedAgentTeam, AgentProfile
 from .utils import calculate_relationship_stats, generate_relationship_report
 from ..utils.logger import get_logger
+from ..utils.runtime import PoolType, get_runtime
 
 logger = get_logger(__name__)
 
 
 class RelationshipSystem:
-    """关系系统集成类"""
+    """
+    关系系统集成类
+
+    数据保存在 data_dir/relationships.db 中：每次保存只写入变更过的关系、任务和代理，
+    关系在第一次被访问时才从存储中读取。旧版的 relationships.json、tasks.json 和
+    agent_team.json 在存储不存在时导入一次；export_data 仍可导出完整的JSON文件。
+    """
+
+    # 旧版的全量JSON文件
+    LEGACY_FILES = ("relationships.json", "tasks.json", "agent_team.json")
     
     def __init__(
         self,
         data_dir: str = "./data/relationships",
         auto_save: bool = True,
-        save_interval: int = 60  # 60秒自动保存一次
+        save_interval: int = 60,  # 60秒自动保存一次
+        compact_interval: int = 3600
     ):
         """
         初始化关系系统
@@ -35,18 +48,25 @@ class RelationshipSystem:
             data_dir: 数据保存目录
             auto_save: 是否自动保存
             save_interval: 自动保存间隔（秒）
+            compact_interval: 压缩存储的间隔（秒）
         """
         self.data_dir = data_dir
         self.auto_save = auto_save
         self.save_interval = save_interval
+        self.compact_interval = compact_interval
         
         # 创建数据目录
         os.makedirs(data_dir, exist_ok=True)
+
+        # 增量存储；写入在共享的IO线程池中按提交顺序逐个执行，不阻塞事件循环
+        self.store = RelationshipStore(os.path.join(data_dir, "relationships.db"))
+        self._writer = get_runtime().executor(
+            PoolType.IO, owner=f"relationship-save:{os.path.abspath(data_dir)}", limit=1
+        )
+        self._last_compact = time.time()
         
         # 初始化组件
-        self.relationship_manager = self._load_relationship_manager()
-        self.task_manager = self._load_task_manager()
-        self.agent_team = self._load_agent_team()
+        self._load_components()
         
         # 初始化工具
         self.relationship_tool = RelationshipTool(self.relationship_manager)
@@ -57,6 +77,29 @@ class RelationshipSystem:
         if auto_save:
             self._start_auto_save()
     
+    def _load_components(self) -> None:
+        """从存储加载组件；存储不存在而旧版JSON文件存在时导入JSON文件"""
+        legacy = [os.path.join(self.data_dir, name) for name in self.LEGACY_FILES]
+        if not self.store.exists() and any(os.path.exists(path) for path in legacy):
+            self.relationship_manager = self._load_relationship_manager()
+            self.task_manager = self._load_task_manager()
+            self.agent_team = self._load_agent_team()
+
+            self.relationship_manager.store = self.store
+            for component in (self.relationship_manager, self.task_manager, self.agent_team):
+                component.mark_all_dirty()
+            written = self.save_data()
+            logger.info(f"已将旧版JSON数据导入 {self.store.db_path}，共 {written} 条记录")
+            return
+
+        self.relationship_manager = RelationshipManager(store=self.store)
+        self.task_manager = TaskManager.load_from_store(self.store, self.relationship_manager)
+        self.agent_team = EnhancedAgentTeam.load_from_store(
+            self.store,
+            self.relationship_manager,
+            self.task_manager
+        )
+
     def _load_relationship_manager(self) -> RelationshipManager:
         """加载关系管理器"""
         filepath = os.path.join(self.data_dir, "relationships.json")
@@ -100,28 +143,93 @@ class RelationshipSystem:
             while True:
                 await asyncio.sleep(self.save_interval)
                 try:
-                    self.save_data()
-                    logger.info(f"自动保存关系系统数据成功")
+                    written = await self.save_data_async()
+                    if written:
+                        logger.info(f"自动保存关系系统数据成功，写入 {written} 条记录")
                 except Exception as e:
                     logger.error(f"自动保存关系系统数据失败: {e}")
         
         # 创建异步任务
         loop = asyncio.get_event_loop()
         self._save_task = loop.create_task(auto_save_task())
+
+    def _collect_changes(self) -> ChangeSet:
+        """收集所有组件中已变更的记录"""
+        changes = ChangeSet()
+        self.relationship_manager.collect_changes(changes)
+        self.task_manager.collect_changes(changes)
+        self.agent_team.collect_changes(changes)
+        return changes
+
+    def _write(self, changes: ChangeSet) -> int:
+        """写入变更，到达压缩间隔时压缩存储；写入失败时恢复变更标记"""
+        try:
+            written = self.store.write(changes)
+        except Exception:
+            self._restore(changes)
+            raise
+
+        if time.time() - self._last_compact >= self.compact_interval:
+            self._last_compact = time.time()
+            self.store.compact()
+        return written
+
+    def _restore(self, changes: ChangeSet) -> None:
+        """重新标记未能写入的记录，下次保存时重试"""
+        for record_id in changes.records.get("relationships", {}):
+            self.relationship_manager.mark_dirty(record_id)
+        for record_id in changes.records.get("tasks", {}):
+            self.task_manager.mark_dirty(record_id)
+        for record_id in changes.records.get("agents", {}):
+            self.agent_team.mark_agent_dirty(record_id)
+        for record_id in changes.records.get("agent_tasks", {}):
+            self.agent_team.mark_task_dirty(record_id)
+        if "agent_team" in changes.meta:
+            self.agent_team._info_saved = False
     
-    def save_data(self) -> None:
-        """保存所有数据"""
-        # 保存关系数据
-        rel_filepath = os.path.join(self.data_dir, "relationships.json")
-        self.relationship_manager.save_to_file(rel_filepath)
-        
-        # 保存任务数据
-        task_filepath = os.path.join(self.data_dir, "tasks.json")
-        self.task_manager.save_to_file(task_filepath)
-        
-        # 保存代理团队数据
-        team_filepath = os.path.join(self.data_dir, "agent_team.json")
-        self.agent_team.save_to_file(team_filepath)
+    def save_data(self) -> int:
+        """
+        保存变更过的数据
+
+        Returns:
+            写入的记录数
+        """
+        return self._write(self._collect_changes())
+
+    async def save_data_async(self) -> int:
+        """
+        保存变更过的数据：在事件循环中收集变更，在写入线程中提交
+
+        Returns:
+            写入的记录数
+        """
+        changes = self._collect_changes()
+        if not len(changes):
+            return 0
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, self._write, changes)
+
+    def export_data(self, directory: Optional[str] = None) -> None:
+        """
+        将所有数据导出为完整的JSON文件（原子替换）
+
+        Args:
+            directory: 导出目录，默认为数据目录
+        """
+        directory = directory or self.data_dir
+        os.makedirs(directory, exist_ok=True)
+        self.relationship_manager.save_to_file(os.path.join(directory, "relationships.json"))
+        self.task_manager.save_to_file(os.path.join(directory, "tasks.json"))
+        self.agent_team.save_to_file(os.path.join(directory, "agent_team.json"))
+
+    def close(self) -> None:
+        """保存剩余的变更并关闭存储"""
+        if self._save_task is not None:
+            self._save_task.cancel()
+            self._save_task = None
+        self.save_data()
+        self._writer.shutdown(wait=True)
+        self.store.close()
     
     def get_tools(self) -> List[Any]:
         """获取关系系统工具"""
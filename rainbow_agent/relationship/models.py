@@ -8,14 +8,16 @@ Rainbow Agent 关系网络模型
 4. 关系性质 (Relationship Nature)
 5. 关系阶段 (Relationship Stage)
 """
-from typing import Dict, List, Any, Optional, Union, Tuple
+from typing import Dict, List, Any, Optional, Union, Tuple, Callable, Set
 from enum import Enum
 from datetime import datetime, timedelta
 import time
 import json
+import threading
 import uuid
 import logging
 
+from .store import ChangeSet, RelationshipStore, atomic_write_json
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -230,6 +232,17 @@ class RelationshipIntensity:
         
         # 最后更新时间
         self.last_updated = datetime.now()
+
+        # RIS缓存，因子更新时失效；on_change 由关系管理器设置，用于维护RIS索引
+        self._ris: Optional[float] = None
+        self.on_change: Optional[Callable[['RelationshipIntensity'], None]] = None
+
+    def _changed(self):
+        """因子已更新：清除RIS缓存并通知关系管理器"""
+        self._ris = None
+        self.last_updated = datetime.now()
+        if self.on_change:
+            self.on_change(self)
         
     def update_interaction_frequency(self, recent_rounds: int):
         """
@@ -241,7 +254,7 @@ class RelationshipIntensity:
         self.recent_interaction_rounds = recent_rounds
         # 标准上限值为200轮
         self.interaction_frequency = min(recent_rounds / 200.0, 1.0)
-        self.last_updated = datetime.now()
+        self._changed()
         
     def update_emotional_density(self, resonance_count: int, total_rounds: int):
         """
@@ -256,7 +269,7 @@ class RelationshipIntensity:
             self.emotional_density = min(self.emotional_resonance_ratio, 1.0)
         else:
             self.emotional_density = 0.0
-        self.last_updated = datetime.now()
+        self._changed()
         
     def update_collaboration_depth(self, diary_count: int, co_creation_count: int, gift_count: int):
         """
@@ -279,7 +292,7 @@ class RelationshipIntensity:
         gift_score = min(gift_count * 0.1, 0.5)
         
         self.collaboration_depth = min(diary_score + co_creation_score + gift_score, 1.0)
-        self.last_updated = datetime.now()
+        self._changed()
         
     def calculate_ris(self) -> float:
         """
@@ -288,12 +301,14 @@ class RelationshipIntensity:
         Returns:
             关系强度值 (0.0-1.0)
         """
-        ris = (
-            self.interaction_weight * self.interaction_frequency +
-            self.emotional_weight * self.emotional_density +
-            self.collaboration_weight * self.collaboration_depth
-        )
-        return round(ris, 2)
+        if self._ris is None:
+            ris = (
+                self.interaction_weight * self.interaction_frequency +
+                self.emotional_weight * self.emotional_density +
+                self.collaboration_weight * self.collaboration_depth
+            )
+            self._ris = round(ris, 2)
+        return self._ris
     
     def get_relationship_level(self) -> str:
         """
@@ -357,12 +372,156 @@ class RelationshipIntensity:
 class RelationshipManager:
     """
     关系管理器 - 管理所有关系数据
+
+    维护以下索引，使查找不需要扫描所有关系：
+    - 实体对索引：无序实体对 -> 关系ID
+    - 实体邻接表：实体ID -> 该实体参与的关系ID
+    - RIS索引：RIS（保留两位小数）-> 关系ID，用于按强度范围查找
+
+    指定 store 时关系按需从存储中读取：relationships 和 intensities 只包含
+    已经访问过的关系，需要遍历所有关系的操作会先调用 load_all。
+    创建或更新的关系被标记为已变更，由 collect_changes 收集后写入存储。
     """
     
-    def __init__(self):
-        """初始化关系管理器"""
+    def __init__(self, store: Optional[RelationshipStore] = None):
+        """
+        初始化关系管理器
+
+        Args:
+            store: 关系数据存储，为None时所有关系只保存在内存中
+        """
         self.relationships = {}  # relationship_id -> RelationshipGraph
         self.intensities = {}    # relationship_id -> RelationshipIntensity
+        self.store = store
+
+        self._lock = threading.RLock()
+        self._dirty: Set[str] = set()
+        self._fully_loaded = store is None
+        self._loaded_entities: Set[str] = set()
+
+        self._pair_index: Dict[Tuple[str, str], str] = {}       # 实体对 -> 关系ID
+        self._entity_index: Dict[str, List[str]] = {}            # 实体ID -> 关系ID列表
+        self._ris_buckets: Dict[int, Set[str]] = {}              # RIS×100 -> 关系ID集合
+        self._ris_bucket_of: Dict[str, int] = {}                 # 关系ID -> 所在的RIS桶
+
+    @staticmethod
+    def _pair_key(entity_id: str, connected_to_id: str) -> Tuple[str, str]:
+        """实体对的规范键，与方向无关"""
+        return (entity_id, connected_to_id) if entity_id <= connected_to_id else (connected_to_id, entity_id)
+
+    @staticmethod
+    def _ris_bucket(ris: float) -> int:
+        return int(round(ris * 100))
+
+    def _index_relationship(self, relationship: RelationshipGraph):
+        """将关系加入实体对索引和实体邻接表"""
+        rel_id = relationship.relationship_id
+        # 同一实体对有多个关系时保留最早的一个，与原先按插入顺序查找的结果一致
+        self._pair_index.setdefault(self._pair_key(relationship.entity_id, relationship.connected_to_id), rel_id)
+        self._entity_index.setdefault(relationship.entity_id, []).append(rel_id)
+        if relationship.connected_to_id != relationship.entity_id:
+            self._entity_index.setdefault(relationship.connected_to_id, []).append(rel_id)
+
+    def _index_intensity(self, intensity: RelationshipIntensity):
+        """将关系强度加入RIS索引，并在强度变化时更新索引"""
+        intensity.on_change = self._intensity_changed
+        self._reindex_ris(intensity)
+
+    def _intensity_changed(self, intensity: RelationshipIntensity):
+        self._reindex_ris(intensity)
+        self.mark_dirty(intensity.relationship_id)
+
+    def mark_dirty(self, relationship_id: str):
+        """标记关系已变更，直接修改关系图谱后调用"""
+        with self._lock:
+            self._dirty.add(relationship_id)
+
+    def _attach(self, relationship: RelationshipGraph, intensity: Optional[RelationshipIntensity]):
+        """将从存储中读取的关系加入内存和索引"""
+        self.relationships[relationship.relationship_id] = relationship
+        self._index_relationship(relationship)
+        if intensity is not None:
+            self.intensities[relationship.relationship_id] = intensity
+            self._index_intensity(intensity)
+
+    def _ensure_loaded(self, relationship_id: str):
+        """关系尚未读取时从存储中读取"""
+        if self._fully_loaded or relationship_id in self.relationships:
+            return
+        with self._lock:
+            if relationship_id in self.relationships:
+                return
+            record = self.store.load_relationship(relationship_id)
+            if record is None:
+                return
+            rel_data, int_data = record
+            self._attach(RelationshipGraph.from_dict(rel_data),
+                         RelationshipIntensity.from_dict(int_data) if int_data else None)
+
+    def load_all(self):
+        """从存储中读取所有尚未读取的关系"""
+        if self._fully_loaded:
+            return
+        with self._lock:
+            if self._fully_loaded:
+                return
+            count = 0
+            for rel_data, int_data in self.store.iter_relationships():
+                if rel_data["relationship_id"] in self.relationships:
+                    continue
+                self._attach(RelationshipGraph.from_dict(rel_data),
+                             RelationshipIntensity.from_dict(int_data) if int_data else None)
+                count += 1
+            self._fully_loaded = True
+            logger.info(f"从存储读取了 {count} 个关系")
+
+    def collect_changes(self, changes: ChangeSet):
+        """
+        将已变更的关系加入变更集合，并清除变更标记
+
+        Args:
+            changes: 变更集合
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            for rel_id in dirty:
+                relationship = self.relationships.get(rel_id)
+                if relationship is None:
+                    continue
+                intensity = self.intensities.get(rel_id)
+                changes.put("relationships", rel_id,
+                            (relationship.to_dict(), intensity.to_dict() if intensity else None))
+
+    def mark_all_dirty(self):
+        """将所有关系标记为已变更，用于把内存中的全部数据写入新的存储"""
+        self.load_all()
+        with self._lock:
+            self._dirty.update(self.relationships)
+
+    def _reindex_ris(self, intensity: RelationshipIntensity):
+        rel_id = intensity.relationship_id
+        bucket = self._ris_bucket(intensity.calculate_ris())
+        previous = self._ris_bucket_of.get(rel_id)
+        if previous == bucket:
+            return
+        if previous is not None:
+            members = self._ris_buckets[previous]
+            members.discard(rel_id)
+            if not members:
+                del self._ris_buckets[previous]
+        self._ris_buckets.setdefault(bucket, set()).add(rel_id)
+        self._ris_bucket_of[rel_id] = bucket
+
+    def rebuild_indexes(self):
+        """根据 relationships 和 intensities 重建所有索引"""
+        self._pair_index = {}
+        self._entity_index = {}
+        self._ris_buckets = {}
+        self._ris_bucket_of = {}
+        for relationship in self.relationships.values():
+            self._index_relationship(relationship)
+        for intensity in self.intensities.values():
+            self._index_intensity(intensity)
         
     def create_relationship(
         self,
@@ -397,16 +556,21 @@ class RelationshipManager:
         # 存储关系数据
         self.relationships[relationship.relationship_id] = relationship
         self.intensities[relationship.relationship_id] = intensity
+        self._index_relationship(relationship)
+        self._index_intensity(intensity)
+        self.mark_dirty(relationship.relationship_id)
         
         logger.info(f"创建新关系: {entity_id}({entity_type}) -> {connected_to_id}({connected_to_type})")
         return relationship.relationship_id
         
     def get_relationship(self, relationship_id: str) -> Optional[RelationshipGraph]:
         """获取关系图谱"""
+        self._ensure_loaded(relationship_id)
         return self.relationships.get(relationship_id)
         
     def get_intensity(self, relationship_id: str) -> Optional[RelationshipIntensity]:
         """获取关系强度"""
+        self._ensure_loaded(relationship_id)
         return self.intensities.get(relationship_id)
         
     def find_relationship(
@@ -424,11 +588,66 @@ class RelationshipManager:
         Returns:
             关系ID，如果不存在则返回None
         """
-        for rel_id, rel in self.relationships.items():
-            if (rel.entity_id == entity_id and rel.connected_to_id == connected_to_id) or \
-               (rel.entity_id == connected_to_id and rel.connected_to_id == entity_id):
-                return rel_id
-        return None
+        rel_id = self._pair_index.get(self._pair_key(entity_id, connected_to_id))
+        if rel_id is None and not self._fully_loaded:
+            rel_id = self.store.find_pair(entity_id, connected_to_id)
+            if rel_id is not None:
+                self._ensure_loaded(rel_id)
+        return rel_id
+
+    def get_entity_relationship_ids(self, entity_id: str) -> List[str]:
+        """
+        获取实体参与的所有关系ID
+
+        Args:
+            entity_id: 实体ID
+
+        Returns:
+            关系ID列表
+        """
+        if not self._fully_loaded and entity_id not in self._loaded_entities:
+            for rel_id in self.store.entity_relationship_ids(entity_id):
+                self._ensure_loaded(rel_id)
+            self._loaded_entities.add(entity_id)
+        return list(self._entity_index.get(entity_id, []))
+
+    def get_ris(self, relationship_id: str) -> Optional[float]:
+        """
+        获取关系强度值（缓存的RIS）
+
+        Args:
+            relationship_id: 关系ID
+
+        Returns:
+            关系强度值，关系不存在时返回None
+        """
+        intensity = self.get_intensity(relationship_id)
+        return intensity.calculate_ris() if intensity else None
+
+    def find_by_ris(self, min_ris: float, max_ris: float) -> List[str]:
+        """
+        查找关系强度值在 [min_ris, max_ris] 范围内的关系
+
+        Args:
+            min_ris: 最小关系强度值
+            max_ris: 最大关系强度值
+
+        Returns:
+            关系ID列表
+        """
+        low = max(self._ris_bucket(min_ris), 0)
+        high = min(self._ris_bucket(max_ris), 100)
+        result = []
+        for bucket in range(low, high + 1):
+            members = self._ris_buckets.get(bucket)
+            if members:
+                result.extend(members)
+
+        # 尚未读取的关系在存储中的RIS就是当前值
+        if not self._fully_loaded:
+            result.extend(rel_id for rel_id in self.store.relationship_ids_by_ris(low / 100, high / 100)
+                          if rel_id not in self.relationships)
+        return result
         
     def update_interaction(
         self,
@@ -455,6 +674,7 @@ class RelationshipManager:
         relationship.update_interaction(rounds)
         if emotional_resonance:
             relationship.record_emotional_resonance()
+        self.mark_dirty(relationship_id)
             
         # 更新关系强度
         # 获取最近7天的对话轮数（简化处理）
@@ -498,6 +718,7 @@ class RelationshipManager:
             relationship = self.get_relationship(relationship_id)
             if relationship:
                 relationship.add_human_affection(gift_count * 10)  # 假设每个礼物价值10点
+                self.mark_dirty(relationship_id)
                 
         logger.info(f"更新关系 {relationship_id} 协作: 日记={diary_count}, 共创={co_creation_count}, 礼物={gift_count}")
         
@@ -516,18 +737,29 @@ class RelationshipManager:
             return
             
         relationship.break_relationship(reason)
+        self.mark_dirty(relationship_id)
         logger.info(f"断开关系 {relationship_id}, 原因: {reason}")
         
-    def get_all_relationships(self) -> List[Dict[str, Any]]:
+    def get_all_relationships(self, entity_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         获取所有关系数据
         
+        Args:
+            entity_id: 只返回该实体参与的关系，None表示所有关系
+
         Returns:
             关系数据列表
         """
         result = []
         
-        for rel_id, relationship in self.relationships.items():
+        if entity_id is None:
+            self.load_all()
+            rel_ids = list(self.relationships.keys())
+        else:
+            rel_ids = self.get_entity_relationship_ids(entity_id)
+
+        for rel_id in rel_ids:
+            relationship = self.relationships[rel_id]
             intensity = self.get_intensity(rel_id)
             
             if intensity:
@@ -546,13 +778,13 @@ class RelationshipManager:
         Args:
             filepath: 文件路径
         """
+        self.load_all()
         data = {
             "relationships": {rel_id: rel.to_dict() for rel_id, rel in self.relationships.items()},
             "intensities": {int_id: intensity.to_dict() for int_id, intensity in self.intensities.items()}
         }
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        atomic_write_json(filepath, data)
             
         logger.info(f"关系数据已保存到 {filepath}")
         
@@ -588,5 +820,6 @@ class RelationshipManager:
             
         except Exception as e:
             logger.error(f"加载关系数据时出错: {e}")
-            
+
+        manager.rebuild_indexes()
         return manager
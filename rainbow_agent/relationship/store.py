@@ -0,0 +1,307 @@
+"""
+Rainbow Agent 关系数据存储
+
+关系系统的增量持久化：
+- 关系、任务和代理分别存放在SQLite表中，每条记录一行
+- 每次保存只写入变更过的记录，在一个事务中提交（原子性）
+- 关系按需读取：按ID、实体对、实体或RIS范围查询，启动时不加载全部关系
+- 定期压缩：回收删除记录占用的空间并截断WAL日志
+- JSON导出通过临时文件加重命名原子地替换目标文件
+"""
+from typing import Dict, List, Any, Optional, Iterator, Iterable, Tuple
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def atomic_write_json(filepath: str, data: Any) -> None:
+    """
+    原子地写入JSON文件：先写入同目录的临时文件，再重命名覆盖目标文件
+
+    Args:
+        filepath: 文件路径
+        data: 要写入的数据
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ChangeSet:
+    """
+    一次保存的变更集合
+
+    记录表名 -> {记录ID: 记录数据}，数据为None表示删除该记录。
+    关系记录的数据为 (关系字典, 关系强度字典)。
+    """
+
+    def __init__(self):
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.meta: Dict[str, Any] = {}
+
+    def put(self, table: str, record_id: str, data: Any) -> None:
+        self.records.setdefault(table, {})[record_id] = data
+
+    def delete(self, table: str, record_id: str) -> None:
+        self.records.setdefault(table, {})[record_id] = None
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self.records.values()) + len(self.meta)
+
+
+class RelationshipStore:
+    """
+    关系系统的SQLite存储
+
+    数据库文件在第一次写入时创建；文件不存在时所有查询返回空结果。
+    所有方法都是线程安全的，写入可以在后台线程中执行。
+    """
+
+    # 保存通用记录（任务、代理等）的表
+    RECORD_TABLES = ("tasks", "agent_tasks", "agents")
+
+    def __init__(self, db_path: str):
+        """
+        初始化存储
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        """数据库文件是否存在"""
+        return self._conn is not None or os.path.exists(self.db_path)
+
+    def _connection(self) -> sqlite3.Connection:
+        # 需持有锁
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            # auto_vacuum 必须在建表之前设置
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS relationships (
+                    relationship_id TEXT PRIMARY KEY,
+                    entity_id TEXT NOT NULL,
+                    connected_to_id TEXT NOT NULL,
+                    pair_key TEXT NOT NULL,
+                    ris REAL NOT NULL DEFAULT 0,
+                    relationship TEXT NOT NULL,
+                    intensity TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_relationships_pair ON relationships(pair_key);
+                CREATE INDEX IF NOT EXISTS idx_relationships_entity ON relationships(entity_id);
+                CREATE INDEX IF NOT EXISTS idx_relationships_connected ON relationships(connected_to_id);
+                CREATE INDEX IF NOT EXISTS idx_relationships_ris ON relationships(ris);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """)
+            for table in self.RECORD_TABLES:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[Tuple]:
+        with self._lock:
+            if not self.exists():
+                return []
+            return self._connection().execute(sql, tuple(params)).fetchall()
+
+    @staticmethod
+    def pair_key(entity_id: str, connected_to_id: str) -> str:
+        """实体对的规范键，与方向无关"""
+        first, second = sorted((entity_id, connected_to_id))
+        return json.dumps([first, second], ensure_ascii=False)
+
+    def load_relationship(self, relationship_id: str) -> Optional[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+        """
+        读取关系
+
+        Args:
+            relationship_id: 关系ID
+
+        Returns:
+            (关系字典, 关系强度字典)，不存在时返回None
+        """
+        rows = self._query("SELECT relationship, intensity FROM relationships WHERE relationship_id = ?",
+                           (relationship_id,))
+        if not rows:
+            return None
+        relationship, intensity = rows[0]
+        return json.loads(relationship), json.loads(intensity) if intensity else None
+
+    def find_pair(self, entity_id: str, connected_to_id: str) -> Optional[str]:
+        """
+        查找两个实体之间最早创建的关系ID
+
+        Args:
+            entity_id: 实体ID
+            connected_to_id: 连接对象ID
+
+        Returns:
+            关系ID，不存在时返回None
+        """
+        rows = self._query("SELECT relationship_id FROM relationships WHERE pair_key = ? ORDER BY rowid LIMIT 1",
+                           (self.pair_key(entity_id, connected_to_id),))
+        return rows[0][0] if rows else None
+
+    def entity_relationship_ids(self, entity_id: str) -> List[str]:
+        """
+        获取实体参与的所有关系ID
+
+        Args:
+            entity_id: 实体ID
+
+        Returns:
+            关系ID列表，按创建顺序
+        """
+        rows = self._query("SELECT relationship_id FROM relationships "
+                           "WHERE entity_id = ? OR connected_to_id = ? ORDER BY rowid",
+                           (entity_id, entity_id))
+        return [row[0] for row in rows]
+
+    def relationship_ids_by_ris(self, min_ris: float, max_ris: float) -> List[str]:
+        """
+        查找保存时关系强度值在 [min_ris, max_ris] 范围内的关系ID
+
+        Args:
+            min_ris: 最小关系强度值
+            max_ris: 最大关系强度值
+
+        Returns:
+            关系ID列表
+        """
+        rows = self._query("SELECT relationship_id FROM relationships WHERE ris BETWEEN ? AND ?",
+                           (min_ris, max_ris))
+        return [row[0] for row in rows]
+
+    def iter_relationships(self) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+        """
+        按创建顺序读取所有关系
+
+        Yields:
+            (关系字典, 关系强度字典)
+        """
+        for relationship, intensity in self._query(
+                "SELECT relationship, intensity FROM relationships ORDER BY rowid"):
+            yield json.loads(relationship), json.loads(intensity) if intensity else None
+
+    def count_relationships(self) -> int:
+        """保存的关系数量"""
+        rows = self._query("SELECT COUNT(*) FROM relationships")
+        return rows[0][0] if rows else 0
+
+    def load_records(self, table: str) -> List[Dict[str, Any]]:
+        """
+        读取表中的所有记录
+
+        Args:
+            table: 表名，见 RECORD_TABLES
+
+        Returns:
+            记录列表，按写入顺序
+        """
+        if table not in self.RECORD_TABLES:
+            raise ValueError(f"未知的表: {table}")
+        return [json.loads(data) for (data,) in self._query(f"SELECT data FROM {table} ORDER BY rowid")]
+
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        """读取元数据"""
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def write(self, changes: ChangeSet) -> int:
+        """
+        在一个事务中写入变更
+
+        Args:
+            changes: 变更集合
+
+        Returns:
+            写入的记录数
+        """
+        if not len(changes):
+            return 0
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                for table, records in changes.records.items():
+                    upserts = [(record_id, data) for record_id, data in records.items() if data is not None]
+                    deletes = [(record_id,) for record_id, data in records.items() if data is None]
+                    if table == "relationships":
+                        conn.executemany(
+                            "INSERT INTO relationships "
+                            "(relationship_id, entity_id, connected_to_id, pair_key, ris, relationship, intensity) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                            "ON CONFLICT(relationship_id) DO UPDATE SET "
+                            "ris = excluded.ris, relationship = excluded.relationship, intensity = excluded.intensity",
+                            [self._relationship_row(record_id, *data) for record_id, data in upserts]
+                        )
+                        conn.executemany("DELETE FROM relationships WHERE relationship_id = ?", deletes)
+                    else:
+                        conn.executemany(
+                            f"INSERT INTO {table} (id, data) VALUES (?, ?) "
+                            f"ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                            [(record_id, json.dumps(data, ensure_ascii=False)) for record_id, data in upserts]
+                        )
+                        conn.executemany(f"DELETE FROM {table} WHERE id = ?", deletes)
+                conn.executemany(
+                    "INSERT INTO meta (key, value) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    [(key, json.dumps(value, ensure_ascii=False)) for key, value in changes.meta.items()]
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return len(changes)
+
+    def _relationship_row(self, relationship_id: str, relationship: Dict[str, Any],
+                          intensity: Optional[Dict[str, Any]]) -> Tuple:
+        return (
+            relationship_id,
+            relationship["entity_id"],
+            relationship["connected_to_id"],
+            self.pair_key(relationship["entity_id"], relationship["connected_to_id"]),
+            (intensity or {}).get("ris", 0.0),
+            json.dumps(relationship, ensure_ascii=False),
+            json.dumps(intensity, ensure_ascii=False) if intensity else None
+        )
+
+    def compact(self) -> None:
+        """回收已删除记录占用的页面，并将WAL日志合并回数据库文件后截断"""
+        with self._lock:
+            if not self.exists():
+                return
+            conn = self._connection()
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
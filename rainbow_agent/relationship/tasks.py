@@ -3,13 +3,15 @@ Rainbow Agent 关系任务管理模块
 
 提供基于关系状态的动态任务管理功能
 """
-from typing import Dict, List, Any, Optional, Union, Callable
+from typing import Dict, List, Any, Optional, Union, Callable, Set
 import os
 import json
+import threading
 from datetime import datetime, timedelta
 import uuid
 
 from .models import RelationshipManager, RelationshipStatus, RelationshipIntensity
+from .store import ChangeSet, RelationshipStore, atomic_write_json
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -203,12 +205,8 @@ class RelationshipTask(Task):
             
         # 检查关系强度要求
         if self.relationship_intensity_threshold > 0:
-            intensity = relationship_manager.get_intensity(self.relationship_id)
-            if not intensity:
-                return False
-                
-            ris = intensity.calculate_ris()
-            if ris < self.relationship_intensity_threshold:
+            ris = relationship_manager.get_ris(self.relationship_id)
+            if ris is None or ris < self.relationship_intensity_threshold:
                 return False
                 
         return True
@@ -227,6 +225,10 @@ class TaskManager:
         self.tasks: Dict[str, Task] = {}
         self.relationship_manager = relationship_manager or RelationshipManager()
         self.task_templates: Dict[str, Dict[str, Any]] = self._load_default_templates()
+
+        # 已变更（新增、修改或删除）的任务ID，由 collect_changes 收集后写入存储
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
         
     def _load_default_templates(self) -> Dict[str, Dict[str, Any]]:
         """加载默认任务模板"""
@@ -292,7 +294,39 @@ class TaskManager:
             任务ID
         """
         self.tasks[task.task_id] = task
+        self.mark_dirty(task.task_id)
         return task.task_id
+
+    def mark_dirty(self, task_id: str) -> None:
+        """
+        标记任务已变更，直接修改任务实例后调用
+
+        Args:
+            task_id: 任务ID
+        """
+        with self._dirty_lock:
+            self._dirty.add(task_id)
+
+    def collect_changes(self, changes: ChangeSet) -> None:
+        """
+        将已变更的任务加入变更集合，并清除变更标记
+
+        Args:
+            changes: 变更集合
+        """
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        for task_id in dirty:
+            task = self.tasks.get(task_id)
+            if task is None:
+                changes.delete("tasks", task_id)
+            else:
+                changes.put("tasks", task_id, task.to_dict())
+
+    def mark_all_dirty(self) -> None:
+        """将所有任务标记为已变更，用于把内存中的全部数据写入新的存储"""
+        with self._dirty_lock:
+            self._dirty.update(self.tasks)
         
     def create_task(self, **kwargs) -> str:
         """
@@ -384,6 +418,7 @@ class TaskManager:
         for key, value in kwargs.items():
             if hasattr(task, key):
                 setattr(task, key, value)
+        self.mark_dirty(task_id)
                 
         return True
         
@@ -399,6 +434,7 @@ class TaskManager:
         """
         if task_id in self.tasks:
             del self.tasks[task_id]
+            self.mark_dirty(task_id)
             return True
         return False
         
@@ -417,6 +453,7 @@ class TaskManager:
             return False
             
         task.complete()
+        self.mark_dirty(task_id)
         return True
         
     def get_all_tasks(self) -> List[Dict[str, Any]]:
@@ -549,8 +586,33 @@ class TaskManager:
             "templates": self.task_templates
         }
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        atomic_write_json(filepath, data)
+
+    @staticmethod
+    def task_from_dict(task_data: Dict[str, Any]) -> Task:
+        """根据任务数据创建任务或关系任务实例"""
+        if "relationship_intensity_threshold" in task_data:
+            return RelationshipTask.from_dict(task_data)
+        return Task.from_dict(task_data)
+
+    @classmethod
+    def load_from_store(cls, store: RelationshipStore,
+                        relationship_manager: Optional[RelationshipManager] = None) -> 'TaskManager':
+        """
+        从存储加载任务数据（任务模板使用默认模板）
+
+        Args:
+            store: 关系数据存储
+            relationship_manager: 关系管理器实例
+
+        Returns:
+            任务管理器实例
+        """
+        manager = cls(relationship_manager)
+        for task_data in store.load_records("tasks"):
+            task = cls.task_from_dict(task_data)
+            manager.tasks[task.task_id] = task
+        return manager
             
     @classmethod
     def load_from_file(cls, filepath: str, relationship_manager: Optional[RelationshipManager] = None) -> 'TaskManager':
@@ -580,11 +642,6 @@ class TaskManager:
         if "tasks" in data:
             for task_data in data["tasks"]:
                 # 根据任务类型创建不同的任务实例
-                if "relationship_intensity_threshold" in task_data:
-                    task = RelationshipTask.from_dict(task_data)
-                else:
-                    task = Task.from_dict(task_data)
-                    
-                manager.add_task(task)
+                manager.add_task(cls.task_from_dict(task_data))
                 
         return manager
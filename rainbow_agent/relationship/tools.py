@@ -395,14 +395,8 @@ class RelationshipAnalysisTool(BaseTool):
         if not entity_id:
             return "生成关系摘要失败: 缺少实体ID"
             
-        # 获取所有关系
-        all_relationships = self.manager.get_all_relationships()
-        
-        # 筛选与指定实体相关的关系
-        entity_relationships = []
-        for rel_data in all_relationships:
-            if rel_data["entity_id"] == entity_id or rel_data["connected_to_id"] == entity_id:
-                entity_relationships.append(rel_data)
+        # 获取与指定实体相关的关系
+        entity_relationships = self.manager.get_all_relationships(entity_id=entity_id)
                 
         if not entity_relationships:
             return f"未找到与 {entity_id} 相关的关系"
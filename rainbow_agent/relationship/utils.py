@@ -192,37 +192,35 @@ def find_similar_relationships(
     
     base_ris = base_intensity.calculate_ris()
     
-    # 获取所有关系
-    all_relationships = relationship_manager.get_all_relationships()
+    # 相似度为 1 - |RIS差值|，只需查找RIS在 base_ris ± (1 - threshold) 范围内的关系；
+    # 范围两端各放宽0.01，由下面的相似度判断精确过滤
+    delta = 1 - threshold
+    candidate_ids = relationship_manager.find_by_ris(base_ris - delta - 0.01, base_ris + delta + 0.01)
     
     # 查找相似关系
     similar_relationships = []
     
-    for rel in all_relationships:
-        rel_id = rel.get("relationship_id", "")
-        
+    for rel_id in candidate_ids:
         # 跳过基准关系
         if rel_id == relationship_id:
             continue
         
-        # 获取关系强度
-        intensity = relationship_manager.get_intensity(rel_id)
-        if not intensity:
+        rel = relationship_manager.get_relationship(rel_id)
+        ris = relationship_manager.get_ris(rel_id)
+        if rel is None or ris is None:
             continue
         
-        ris = intensity.calculate_ris()
-        
         # 计算相似度（简化为RIS差值）
         similarity = 1 - abs(base_ris - ris)
         
         if similarity >= threshold:
             similar_relationships.append({
                 "relationship_id": rel_id,
-                "entity_id": rel.get("entity_id", ""),
-                "connected_to_id": rel.get("connected_to_id", ""),
+                "entity_id": rel.entity_id,
+                "connected_to_id": rel.connected_to_id,
                 "similarity": round(similarity, 3),
                 "ris": ris,
-                "status": rel.get("status", "")
+                "status": rel.status.value
             })
     
     # 按相似度排序
@@ -246,14 +244,7 @@ def generate_relationship_report(
         关系报告字典
     """
     # 获取关系数据
-    if entity_id:
-        relationships = []
-        all_rels = relationship_manager.get_all_relationships()
-        for rel in all_rels:
-            if rel.get("entity_id") == entity_id or rel.get("connected_to_id") == entity_id:
-                relationships.append(rel)
-    else:
-        relationships = relationship_manager.get_all_relationships()
+    relationships = relationship_manager.get_all_relationships(entity_id=entity_id or None)
     
     if not relationships:
         return {"error": "未找到关系数据"}
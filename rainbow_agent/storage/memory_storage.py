@@ -5,15 +5,23 @@ This provides the same interface as the SurrealDB storage but stores data in mem
 Useful for development and as a fallback when database connection fails.
 """
 
+import bisect
 import logging
 import uuid
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime
 import json
 
 logger = logging.getLogger(__name__)
 
 
+def _created_key(value: Union[str, datetime, None]) -> str:
+    """Normalize a created_at value to an ISO string that sorts chronologically."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value or ''
+
+
 class MemoryStorage:
     """
     In-memory storage that mimics the SurrealDB interface.
@@ -26,6 +34,8 @@ class MemoryStorage:
         """Initialize memory storage."""
         self.sessions = {}  # session_id -> session_data
         self.turns = {}     # turn_id -> turn_data
+        # session_id -> [((created_at, turn_id), turn_data)], sorted by creation time
+        self.session_turns: Dict[str, List[Tuple[Tuple[str, str], Dict[str, Any]]]] = {}
         self.user_sessions = {}  # user_id -> [session_ids]
         
         logger.info("Memory storage initialized")
@@ -105,7 +115,7 @@ class MemoryStorage:
             }
             
             # Store turn
-            self.turns[turn_id] = turn_data
+            self._add_turn(turn_data)
             
             logger.info(f"Memory storage: Created turn {turn_id} for session {session_id}")
             return turn_data
@@ -114,23 +124,76 @@ class MemoryStorage:
             logger.error(f"Failed to create turn in memory: {e}")
             return None
     
-    def get_turns(self, session_id: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
-        """Get turns for a session from memory."""
-        # Find all turns for this session
-        session_turns = []
-        for turn in self.turns.values():
-            if turn.get('session_id') == session_id:
-                session_turns.append(turn)
+    def _add_turn(self, turn_data: Dict[str, Any]) -> None:
+        self.turns[turn_data['id']] = turn_data
+        entry = ((_created_key(turn_data.get('created_at')), turn_data['id']), turn_data)
+        session_turns = self.session_turns.setdefault(turn_data['session_id'], [])
+        if not session_turns or session_turns[-1][0] <= entry[0]:
+            # 新轮次通常是会话中最新的，直接追加
+            session_turns.append(entry)
+        else:
+            session_turns.insert(bisect.bisect(session_turns, (entry[0],)), entry)
+    
+    def store_turns(self, turns: List[Dict[str, Any]]) -> None:
+        """Store already-built turns in memory, keeping their IDs."""
+        for turn in turns:
+            turn = dict(turn)
+            for field in ('created_at', 'updated_at'):
+                if isinstance(turn.get(field), datetime):
+                    turn[field] = turn[field].isoformat()
+            self._add_turn(turn)
+        logger.info(f"Memory storage: Stored {len(turns)} turns")
+    
+    def get_turns(self,
+                  session_id: str,
+                  limit: int = 100,
+                  offset: int = 0,
+                  after_created_at: Union[str, datetime, None] = None,
+                  before_id: Optional[str] = None,
+                  after_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get turns for a session from memory, oldest first.
         
-        # Sort by created_at
-        session_turns.sort(key=lambda t: t.get('created_at', ''))
+        Turns are ordered by ``(created_at, id)`` and the cursors compare that
+        whole tuple, so turns sharing a timestamp are not skipped across pages.
         
-        # Apply pagination
-        paginated_turns = session_turns[offset:offset + limit]
+        Args:
+            session_id: Session ID
+            limit: Maximum number of turns to return
+            offset: Number of turns to skip from the cursor
+            after_created_at: Only return turns created after this time
+            before_id: Only return the turns directly preceding this turn
+            after_id: Tie-breaker for ``after_created_at``: the ID of the last turn seen
+        """
+        session_turns = self.session_turns.get(session_id, [])
+        
+        if before_id is not None:
+            anchor = self.turns.get(before_id)
+            if not anchor or anchor.get('session_id') != session_id:
+                return []
+            end = bisect.bisect_left(session_turns, ((_created_key(anchor.get('created_at')), before_id),)) - offset
+            start = max(0, end - limit)
+        else:
+            start = offset
+            if after_created_at is not None:
+                # 没有给出ID时 '\uffff' 排在任何ID之后，跳过与游标时间相同的轮次
+                cursor = (_created_key(after_created_at), '\uffff' if after_id is None else after_id)
+                position = bisect.bisect_left(session_turns, (cursor,))
+                if position < len(session_turns) and session_turns[position][0] == cursor:
+                    position += 1
+                start += position
+            end = start + limit
+        
+        paginated_turns = [turn for _, turn in session_turns[start:max(start, end)]]
         
         logger.debug(f"Memory storage: Retrieved {len(paginated_turns)} turns for session {session_id}")
         return paginated_turns
     
+    def get_recent_turns(self, session_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the last turns of a session from memory, oldest first."""
+        session_turns = self.session_turns.get(session_id, [])
+        return [turn for _, turn in session_turns[max(0, len(session_turns) - limit):]]
+    
     def update_session(self, session_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update a session in memory."""
         if session_id in self.sessions:
@@ -152,7 +215,7 @@ class MemoryStorage:
     
     def count_turns(self, session_id: str) -> int:
         """Count turns in a session."""
-        count = sum(1 for turn in self.turns.values() if turn.get('session_id') == session_id)
+        count = len(self.session_turns.get(session_id, []))
         logger.debug(f"Memory storage: Session {session_id} has {count} turns")
         return count
 
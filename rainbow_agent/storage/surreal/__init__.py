@@ -3,8 +3,10 @@ SurrealDB client modules for Rainbow Agent.
 
 This package contains the unified SurrealDB client:
 - unified_client.py: Unified client using official SurrealDB library
+- connection_pool.py: Bounded pool of authenticated connections
 """
 
 from .unified_client import UnifiedSurrealClient
+from .connection_pool import SurrealConnectionLostError, SurrealConnectionPool, SurrealPoolError
 
-__all__ = ['UnifiedSurrealClient']
+__all__ = ['UnifiedSurrealClient', 'SurrealConnectionPool', 'SurrealPoolError', 'SurrealConnectionLostError']
@@ -0,0 +1,353 @@
+"""
+Bounded pool of authenticated SurrealDB connections.
+
+Every connection in the pool has already completed the WebSocket handshake,
+``signin`` and ``use``, so a query only pays for its own round trip.
+The pool runs on a dedicated event loop thread: async callers on any loop
+await it through ``run_async`` and synchronous callers block on ``run``,
+and both share the same connections.
+
+- Idle connections are health-checked before reuse once they have been idle
+  longer than ``health_check_interval``
+- Broken connections are discarded and the operation is retried on a fresh
+  connection, with exponential backoff between attempts. Failures while
+  acquiring a connection (connect, handshake) are always retried; a failure
+  after the operation was sent is only retried for operations marked
+  ``idempotent``, since the server may already have applied it
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from surrealdb import AsyncSurreal
+
+logger = logging.getLogger(__name__)
+
+try:
+    from websockets.exceptions import WebSocketException
+    _CONNECTION_ERRORS: tuple = (ConnectionError, OSError, EOFError, asyncio.TimeoutError, WebSocketException)
+except ImportError:
+    _CONNECTION_ERRORS = (ConnectionError, OSError, EOFError, asyncio.TimeoutError)
+
+
+class SurrealPoolError(Exception):
+    """Raised when no healthy connection could be obtained from the pool."""
+
+
+class SurrealConnectionLostError(Exception):
+    """Raised when the connection failed after a non-idempotent operation was sent."""
+
+
+_CONNECTION_MESSAGES = ("connection closed", "connection is closed", "closed database", "not connected")
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """
+    Check whether an error means the connection itself is unusable.
+
+    Query errors (bad SQL, permissions, ...) are not connection errors and
+    are never retried.
+
+    Args:
+        error: The raised exception
+
+    Returns:
+        True if the connection should be discarded
+    """
+    if isinstance(error, (_CONNECTION_ERRORS, SurrealPoolError)):
+        return True
+    message = str(error).lower()
+    return any(text in message for text in _CONNECTION_MESSAGES) or type(error).__name__ == "ConnectionUnavailableError"
+
+
+class _PooledConnection:
+    __slots__ = ("db", "created_at", "last_used")
+
+    def __init__(self, db: Any):
+        self.db = db
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class SurrealConnectionPool:
+    """
+    Bounded pool of authenticated SurrealDB connections.
+
+    Operations are passed as ``operation(db)`` callables returning an
+    awaitable, e.g. ``pool.run(lambda db: db.query(sql))``.
+    """
+
+    def __init__(self,
+                 url: str,
+                 namespace: str,
+                 database: str,
+                 username: str,
+                 password: str,
+                 max_size: int = 8,
+                 acquire_timeout: float = 10.0,
+                 health_check_interval: float = 30.0,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.05,
+                 backoff_max: float = 2.0,
+                 connection_factory: Optional[Callable[[str], Any]] = None):
+        """
+        Initialize the pool. Connections are opened lazily.
+
+        Args:
+            url: SurrealDB WebSocket URL
+            namespace: SurrealDB namespace
+            database: SurrealDB database name
+            username: SurrealDB username
+            password: SurrealDB password
+            max_size: Maximum number of open connections
+            acquire_timeout: Seconds to wait for a free connection
+            health_check_interval: Idle seconds after which a connection is pinged before reuse
+            max_retries: Attempts per operation when the connection fails
+            backoff_base: Initial reconnect backoff in seconds
+            backoff_max: Maximum reconnect backoff in seconds
+            connection_factory: Creates an unconnected async connection for a URL,
+                defaults to ``surrealdb.AsyncSurreal``
+        """
+        self.url = url
+        self.namespace = namespace
+        self.database = database
+        self.username = username
+        self.password = password
+        self.max_size = max(1, max_size)
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.max_retries = max(1, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connection_factory = connection_factory or AsyncSurreal
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+        # The following are only touched on the pool loop
+        self._idle: Deque[_PooledConnection] = deque()
+        self._size = 0
+        self._available: Optional[asyncio.Condition] = None
+
+        self.stats: Dict[str, int] = {
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "operations": 0,
+            "retries": 0,
+            "health_checks": 0,
+            "health_check_failures": 0
+        }
+
+    # ===== Event loop thread =====
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._closed:
+            raise SurrealPoolError("Connection pool is closed")
+        if self._loop is None:
+            with self._start_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    started = threading.Event()
+
+                    def run_loop():
+                        asyncio.set_event_loop(loop)
+                        started.set()
+                        loop.run_forever()
+
+                    self._thread = threading.Thread(target=run_loop, name="surreal-pool", daemon=True)
+                    self._thread.start()
+                    started.wait()
+                    self._loop = loop
+        return self._loop
+
+    def submit(self, operation: Callable[[Any], Awaitable[Any]], idempotent: bool = False) -> Future:
+        """
+        Schedule an operation on a pooled connection.
+
+        Args:
+            operation: Callable receiving a connection and returning an awaitable
+            idempotent: Whether the operation may be re-run on a fresh connection
+                when the connection fails after it was sent
+
+        Returns:
+            A concurrent future resolving to the operation result
+        """
+        return asyncio.run_coroutine_threadsafe(self._run(operation, idempotent), self._ensure_loop())
+
+    def run(self, operation: Callable[[Any], Awaitable[Any]], idempotent: bool = False) -> Any:
+        """
+        Run an operation on a pooled connection, blocking the calling thread.
+
+        Must not be called from the pool's own event loop.
+        """
+        return self.submit(operation, idempotent).result()
+
+    async def run_async(self, operation: Callable[[Any], Awaitable[Any]], idempotent: bool = False) -> Any:
+        """Run an operation on a pooled connection from any event loop."""
+        return await asyncio.wrap_future(self.submit(operation, idempotent))
+
+    # ===== Pool internals (pool loop only) =====
+
+    async def _open(self) -> _PooledConnection:
+        db = self.connection_factory(self.url)
+        await db.connect()
+        try:
+            await db.signin({"username": self.username, "password": self.password})
+            await db.use(self.namespace, self.database)
+        except BaseException:
+            await self._close_db(db)
+            raise
+        self.stats["connections_opened"] += 1
+        logger.debug(f"Opened pooled SurrealDB connection ({self._size}/{self.max_size})")
+        return _PooledConnection(db)
+
+    async def _close_db(self, db: Any) -> None:
+        try:
+            await db.close()
+        except Exception as e:
+            logger.debug(f"Error closing SurrealDB connection: {e}")
+
+    async def _discard(self, conn: _PooledConnection) -> None:
+        self._size -= 1
+        self.stats["connections_closed"] += 1
+        await self._close_db(conn.db)
+        async with self._available:
+            self._available.notify()
+
+    async def _is_healthy(self, conn: _PooledConnection) -> bool:
+        self.stats["health_checks"] += 1
+        try:
+            await asyncio.wait_for(conn.db.query("RETURN true;"), timeout=self.acquire_timeout)
+            return True
+        except Exception as e:
+            self.stats["health_check_failures"] += 1
+            logger.warning(f"Pooled SurrealDB connection failed health check: {e}")
+            return False
+
+    async def _acquire(self) -> _PooledConnection:
+        if self._available is None:
+            self._available = asyncio.Condition()
+
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            while self._idle:
+                conn = self._idle.pop()
+                if time.monotonic() - conn.last_used < self.health_check_interval or await self._is_healthy(conn):
+                    return conn
+                await self._discard(conn)
+
+            if self._size < self.max_size:
+                # Reserve the slot before awaiting the handshake
+                self._size += 1
+                try:
+                    return await self._open()
+                except BaseException:
+                    self._size -= 1
+                    raise
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SurrealPoolError(f"Timed out waiting for a SurrealDB connection after {self.acquire_timeout}s")
+            async with self._available:
+                try:
+                    await asyncio.wait_for(self._available.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release(self, conn: _PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        if self._closed:
+            await self._discard(conn)
+            return
+        self._idle.append(conn)
+        async with self._available:
+            self._available.notify()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    async def _run(self, operation: Callable[[Any], Awaitable[Any]], idempotent: bool) -> Any:
+        self.stats["operations"] += 1
+        last_error: Optional[BaseException] = None
+
+        for attempt in range(self.max_retries):
+            if attempt:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt - 1))
+
+            try:
+                conn = await self._acquire()
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+                logger.warning(f"SurrealDB connect failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                last_error = e
+                continue
+
+            try:
+                result = await operation(conn.db)
+            except Exception as e:
+                if not is_connection_error(e):
+                    await self._release(conn)
+                    raise
+                await self._discard(conn)
+                if not idempotent:
+                    raise SurrealConnectionLostError(
+                        f"SurrealDB connection lost after the operation was sent, not retrying "
+                        f"because it may already have been applied: {e}"
+                    ) from e
+                logger.warning(f"SurrealDB connection lost (attempt {attempt + 1}/{self.max_retries}): {e}")
+                last_error = e
+                continue
+
+            await self._release(conn)
+            return result
+
+        raise SurrealPoolError(f"SurrealDB operation failed after {self.max_retries} attempts: {last_error}") from last_error
+
+    async def _close_idle(self) -> None:
+        while self._idle:
+            conn = self._idle.pop()
+            self._size -= 1
+            self.stats["connections_closed"] += 1
+            await self._close_db(conn.db)
+
+    # ===== Lifecycle =====
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool statistics.
+
+        Returns:
+            Counters plus the current number of open and idle connections
+        """
+        stats = dict(self.stats)
+        stats["size"] = self._size
+        stats["idle"] = len(self._idle)
+        stats["max_size"] = self.max_size
+        return stats
+
+    def close(self) -> None:
+        """Close idle connections and stop the pool loop. In-use connections close on release."""
+        if self._closed:
+            return
+        self._closed = True
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_idle(), loop).result(timeout=self.acquire_timeout)
+        except Exception as e:
+            logger.warning(f"Error closing SurrealDB connection pool: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=self.acquire_timeout)
@@ -0,0 +1,231 @@
+"""
+In-process mock SurrealDB server for tests and benchmarks.
+
+``MockSurrealServer.connect`` is a drop-in ``connection_factory`` for
+``SurrealConnectionPool`` / ``UnifiedSurrealClient``. It simulates handshake
+and query latency and supports the subset of SurrealQL the unified managers
+issue: ``create``, ``SELECT * FROM t [WHERE cond] [ORDER BY f [ASC|DESC], ...]
+[LIMIT n] [START m]``, ``SELECT count() FROM t [WHERE cond] GROUP ALL``,
+``DELETE FROM t WHERE id = 'v'``, ``INSERT INTO t $records``, ``RETURN`` and
+``DEFINE``/``UPDATE``/transaction statements (ignored). Conditions combine
+``=``, ``!=``, ``<``, ``<=``, ``>``, ``>=`` and ``IN`` comparisons of fields,
+string literals and ``$variables`` with ``AND``, ``OR`` and parentheses.
+"""
+
+import asyncio
+import re
+from typing import Any, Dict, List, Optional
+
+_SELECT = re.compile(
+    r"SELECT\s+(?P<fields>\*|count\(\))\s+FROM\s+(?P<table>\w+)"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?"
+    r"(?:\s+GROUP\s+ALL)?(?:\s+ORDER\s+BY\s+(?P<order>[\w\s,]+?))?"
+    r"(?:\s+LIMIT\s+(?P<limit>\d+))?(?:\s+START\s+(?P<start>\d+))?\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+_INSERT = re.compile(r"INSERT\s+INTO\s+(?P<table>\w+)\s+\$(?P<var>\w+)", re.IGNORECASE)
+_DELETE = re.compile(r"DELETE\s+FROM\s+(?P<table>\w+)\s+WHERE\s+id\s*=\s*'(?P<value>(?:[^']|'')*)'", re.IGNORECASE)
+_TOKEN = re.compile(r"\s*(?:(?P<string>'(?:[^']|'')*')|(?P<var>\$\w+)|(?P<op>!=|<=|>=|=|<|>|\(|\))|(?P<word>[\w.]+))")
+_COMPARISONS = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and b is not None and a < b,
+    "<=": lambda a, b: a is not None and b is not None and a <= b,
+    ">": lambda a, b: a is not None and b is not None and a > b,
+    ">=": lambda a, b: a is not None and b is not None and a >= b,
+    "IN": lambda a, b: a in (b or ())
+}
+
+
+class _Condition:
+    """Recursive-descent evaluator for the WHERE subset the managers issue."""
+
+    def __init__(self, text: str, vars: Dict[str, Any]):
+        self.tokens = []
+        position = 0
+        text = text.strip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if not match or match.end() == position:
+                raise ValueError(f"Unsupported condition for mock server: {text}")
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "string":
+                self.tokens.append(("value", value[1:-1].replace("''", "'")))
+            elif kind == "var":
+                self.tokens.append(("value", vars[value[1:]]))
+            elif kind == "word" and value.upper() in ("AND", "OR", "IN"):
+                self.tokens.append(("op", value.upper()))
+            elif kind == "word" and value.isdigit():
+                self.tokens.append(("value", int(value)))
+            else:
+                self.tokens.append((kind, value))
+            position = match.end()
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        self.row, self.position = row, 0
+        return self._or()
+
+    def _peek_op(self) -> Optional[str]:
+        if self.position < len(self.tokens) and self.tokens[self.position][0] == "op":
+            return self.tokens[self.position][1]
+        return None
+
+    def _or(self) -> bool:
+        result = self._and()
+        while self._peek_op() == "OR":
+            self.position += 1
+            result = self._and() or result
+        return result
+
+    def _and(self) -> bool:
+        result = self._comparison()
+        while self._peek_op() == "AND":
+            self.position += 1
+            result = self._comparison() and result
+        return result
+
+    def _comparison(self) -> bool:
+        if self._peek_op() == "(":
+            self.position += 1
+            result = self._or()
+            self.position += 1
+            return result
+        left = self._operand()
+        op = self.tokens[self.position][1]
+        self.position += 1
+        right = self._operand()
+        if op in ("=", "!=") and isinstance(right, str) and not isinstance(left, str) and left is not None:
+            left = str(left)
+        return _COMPARISONS[op](left, right)
+
+    def _operand(self) -> Any:
+        kind, value = self.tokens[self.position]
+        self.position += 1
+        return self.row.get(value) if kind == "word" else value
+
+
+class MockSurrealServer:
+    """Shared in-memory tables plus counters for handshakes and queries."""
+
+    def __init__(self, handshake_latency: float = 0.0, query_latency: float = 0.0):
+        """
+        Initialize the mock server.
+
+        Args:
+            handshake_latency: Simulated seconds for connect + signin + use
+            query_latency: Simulated seconds per request
+        """
+        self.handshake_latency = handshake_latency
+        self.query_latency = query_latency
+        self.tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.handshakes = 0
+        self.requests = 0
+        self.open_connections = 0
+        self.fail_next_requests = 0
+
+    def connect(self, url: str) -> "MockSurrealConnection":
+        """Connection factory compatible with ``surrealdb.AsyncSurreal``."""
+        return MockSurrealConnection(self, url)
+
+    def execute(self, sql: str, vars: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """Execute the supported SurrealQL subset and return the last statement's result."""
+        result: List[Any] = []
+        for statement in filter(None, (s.strip() for s in sql.split(";"))):
+            result = self._execute_statement(statement, vars or {})
+        return result
+
+    def _execute_statement(self, statement: str, vars: Dict[str, Any]) -> List[Any]:
+        keyword = statement.split(None, 1)[0].upper()
+        if keyword in ("DEFINE", "RETURN", "UPDATE", "BEGIN", "COMMIT", "CANCEL"):
+            return []
+
+        match = _INSERT.match(statement)
+        if match:
+            records = vars[match.group("var")]
+            return [self.create(match.group("table"), record) for record in records]
+
+        match = _DELETE.match(statement)
+        if match:
+            table = self.tables.get(match.group("table"), {})
+            table.pop(match.group("value").replace("''", "'"), None)
+            return []
+
+        match = _SELECT.match(statement)
+        if not match:
+            raise ValueError(f"Unsupported statement for mock server: {statement}")
+
+        rows = list(self.tables.get(match.group("table"), {}).values())
+        if match.group("where"):
+            condition = _Condition(match.group("where"), vars)
+            rows = [row for row in rows if condition.matches(row)]
+        if match.group("fields").lower() == "count()":
+            return [{"count": len(rows)}] if rows else []
+        if match.group("order"):
+            for term in reversed(match.group("order").split(",")):
+                field, _, direction = term.strip().partition(" ")
+                rows.sort(key=lambda row: (row.get(field) is not None, row.get(field)),
+                          reverse=direction.strip().upper() == "DESC")
+
+        start = int(match.group("start") or 0)
+        limit = int(match.group("limit")) if match.group("limit") else None
+        rows = rows[start:start + limit] if limit is not None else rows[start:]
+        return [dict(row) for row in rows]
+
+    def create(self, table: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        record = dict(data)
+        self.tables.setdefault(table, {})[str(record["id"])] = record
+        return dict(record)
+
+
+class MockSurrealConnection:
+    """Async connection to a ``MockSurrealServer``."""
+
+    def __init__(self, server: MockSurrealServer, url: str):
+        self.server = server
+        self.url = url
+        self.connected = False
+
+    async def _request(self) -> None:
+        if not self.connected:
+            raise ConnectionError("Cannot operate on a closed database")
+        if self.server.fail_next_requests:
+            self.server.fail_next_requests -= 1
+            self.connected = False
+            self.server.open_connections -= 1
+            raise ConnectionError("Mock connection dropped")
+        self.server.requests += 1
+        if self.server.query_latency:
+            await asyncio.sleep(self.server.query_latency)
+
+    async def connect(self, url: Optional[str] = None) -> None:
+        if self.server.handshake_latency:
+            await asyncio.sleep(self.server.handshake_latency)
+        self.connected = True
+        self.server.handshakes += 1
+        self.server.open_connections += 1
+
+    async def signin(self, credentials: Dict[str, Any]) -> str:
+        return "mock-token"
+
+    async def use(self, namespace: str, database: str) -> None:
+        return None
+
+    async def query(self, sql: str, vars: Optional[Dict[str, Any]] = None) -> List[Any]:
+        await self._request()
+        return self.server.execute(sql, vars)
+
+    async def create(self, table: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        await self._request()
+        return self.server.create(table, data)
+
+    async def select(self, thing: str) -> List[Dict[str, Any]]:
+        await self._request()
+        table, _, record_id = thing.partition(":")
+        record = self.server.tables.get(table, {}).get(record_id)
+        return [dict(record)] if record else []
+
+    async def close(self) -> None:
+        if self.connected:
+            self.connected = False
+            self.server.open_connections -= 1
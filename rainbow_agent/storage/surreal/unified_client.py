@@ -3,15 +3,18 @@ Unified SurrealDB client using the official SurrealDB Python library.
 
 This client provides a simple, reliable interface to SurrealDB using 
 the official WebSocket-based connection and SQL queries, with HTTP fallback.
+All WebSocket traffic goes through a bounded pool of authenticated
+connections; every operation has a synchronous and an ``*_async`` variant.
 """
 
+import asyncio
+import json
 import logging
-from typing import Dict, Any, List, Optional, Union
-from surrealdb import Surreal
-from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Union, Callable, Awaitable
 from datetime import datetime
 import uuid
 from .http_client import HTTPSurrealClient
+from .connection_pool import SurrealConnectionPool, SurrealPoolError
 
 logger = logging.getLogger(__name__)
 
@@ -24,9 +27,14 @@ class UnifiedSurrealClient:
     - WebSocket connection via official SurrealDB library
     - SQL queries using db.query() method
     - Simple, reliable operations without complex HTTP handling
+    
+    Connections are opened, authenticated and reused by a
+    ``SurrealConnectionPool``; the HTTP client is only used when no
+    WebSocket connection can be established.
     """
     
-    def __init__(self, url: str, namespace: str, database: str, username: str, password: str):
+    def __init__(self, url: str, namespace: str, database: str, username: str, password: str,
+                 pool_size: int = 8, connection_factory: Optional[Callable[[str], Any]] = None):
         """
         Initialize the unified client.
         
@@ -36,6 +44,8 @@ class UnifiedSurrealClient:
             database: SurrealDB database name
             username: SurrealDB username
             password: SurrealDB password
+            pool_size: Maximum number of pooled WebSocket connections
+            connection_factory: Optional factory for async connections (defaults to surrealdb.AsyncSurreal)
         """
         # Convert HTTP URL to WebSocket URL if needed
         if url.startswith('http://'):
@@ -56,134 +66,136 @@ class UnifiedSurrealClient:
         # Initialize HTTP client as fallback
         self.http_client = HTTPSurrealClient(url, namespace, database, username, password)
         
-        # 创建持久连接
-        self.persistent_db = None
-        self._init_persistent_connection()
+        # 连接池，连接在第一次使用时建立
+        self.pool = SurrealConnectionPool(
+            self.ws_url, namespace, database, username, password,
+            max_size=pool_size,
+            connection_factory=connection_factory
+        )
         
         logger.info(f"Unified SurrealDB client initialized: {self.ws_url}, {namespace}, {database}")
+    
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.pool.close()
+    
+    # ===== Operations executed on pooled connections =====
+    
+    @staticmethod
+    def _query_operation(sql: str, params: Optional[Dict[str, Any]]) -> Callable[[Any], Awaitable[Any]]:
+        if params:
+            return lambda db: db.query(sql, params)
+        return lambda db: db.query(sql)
+    
+    @staticmethod
+    def _create_operation(table: str, data: Dict[str, Any]) -> Callable[[Any], Awaitable[Any]]:
+        attempts = []
+
+        async def create(db):
+            # The record ID is fixed, so a retry first checks whether the lost attempt was applied
+            if attempts:
+                existing = await db.select(f"{table}:{data.get('id')}")
+                if existing:
+                    return existing
+            attempts.append(True)
+            result = await db.create(table, data)
+            if not result:
+                # Create may return nothing; verify the record on the same connection
+                logger.warning(f"Create returned empty result for {table}, verifying")
+                result = await db.select(f"{table}:{data.get('id')}")
+            return result
+        return create
+    
+    def _query_result(self, sql: str, result: Any) -> List[Dict[str, Any]]:
+        if not result:
+            logger.debug(f"SQL查询返回空结果: {sql}")
+            return []
         
-    def _init_persistent_connection(self):
-        """
-        初始化持久连接
-        """
-        try:
-            logger.info(f"创建持久连接到SurrealDB: {self.ws_url}")
-            self.persistent_db = Surreal(self.ws_url)
-            self.persistent_db.signin({"username": self.username, "password": self.password})
-            self.persistent_db.use(self.namespace, self.database)
-            logger.info("SurrealDB持久连接创建成功")
-        except Exception as e:
-            logger.error(f"创建SurrealDB持久连接失败: {e}")
-            self.persistent_db = None
+        # 转换SurrealDB对象为可序列化的Python类型
+        return self._make_serializable(result)
     
-    @contextmanager
-    def get_connection(self):
+    def execute_sql(self, sql: str, params: Optional[Dict[str, Any]] = None,
+                    idempotent: bool = False) -> List[Dict[str, Any]]:
         """
-        Get a SurrealDB connection using context manager.
+        Execute SQL query synchronously.
         
-        This follows the official pattern from test_surreal_http.py.
+        Args:
+            sql: SQL query to execute
+            params: Optional query variables
+            idempotent: Whether the query may be re-sent if the connection fails after sending it
+            
+        Returns:
+            List of records or empty list on failure
         """
-        db = None
+        logger.debug(f"执行SQL: {sql}")
         try:
-            logger.info(f"Connecting to SurrealDB at {self.ws_url}")
-            db = Surreal(self.ws_url)
-            logger.info(f"Signing in with username: {self.username}")
-            db.signin({"username": self.username, "password": self.password})
-            logger.info(f"Using namespace: {self.namespace}, database: {self.database}")
-            db.use(self.namespace, self.database)
-            logger.info("SurrealDB connection established successfully")
-            yield db
-        except Exception as e:
-            logger.error(f"Database connection error: {e}, type: {type(e)}")
-            # Print more details about the error
-            import traceback
-            logger.error(f"Connection error details: {traceback.format_exc()}")
-            raise
-        finally:
-            if db:
-                try:
-                    db.close()
-                    logger.info("SurrealDB connection closed")
-                except Exception as close_error:
-                    logger.warning(f"Error closing SurrealDB connection: {close_error}")
+            result = self.pool.run(self._query_operation(sql, params), idempotent=idempotent)
+        except SurrealPoolError as e:
+            # 无法建立WebSocket连接时使用HTTP回退，查询本身的错误直接抛出
+            # HTTP客户端不支持查询变量，带变量的查询不回退
+            if params:
+                raise
+            logger.warning(f"WebSocket连接不可用，尝试HTTP回退: {e}")
+            return self.http_client.execute_sql(sql)
+        
+        return self._query_result(sql, result)
     
-    def execute_sql(self, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    async def execute_sql_async(self, sql: str, params: Optional[Dict[str, Any]] = None,
+                                idempotent: bool = False) -> List[Dict[str, Any]]:
         """
-        Execute SQL query synchronously.
+        Execute SQL query asynchronously.
         
         Args:
             sql: SQL query to execute
-            params: Optional parameters (not used in current implementation)
+            params: Optional query variables
+            idempotent: Whether the query may be re-sent if the connection fails after sending it
             
         Returns:
             List of records or empty list on failure
         """
-        # 最多重试3次
-        max_retries = 3
-        retry_count = 0
-        last_error = None
+        logger.debug(f"执行SQL: {sql}")
+        try:
+            result = await self.pool.run_async(self._query_operation(sql, params), idempotent=idempotent)
+        except SurrealPoolError as e:
+            if params:
+                raise
+            logger.warning(f"WebSocket连接不可用，尝试HTTP回退: {e}")
+            return await asyncio.to_thread(self.http_client.execute_sql, sql)
         
-        while retry_count < max_retries:
-            try:
-                # 优先使用持久连接执行查询
-                if self.persistent_db:
-                    try:
-                        logger.info(f"使用持久连接执行SQL: {sql}")
-                        result = self.persistent_db.query(sql)
-                        
-                        if not result:
-                            logger.warning(f"SQL查询返回空结果: {sql}")
-                            return []
-                        
-                        # 转换SurrealDB对象为可序列化的Python类型
-                        serializable_result = self._make_serializable(result)
-                        return serializable_result
-                    except Exception as e:
-                        if "Cannot operate on a closed database" in str(e):
-                            logger.warning(f"持久连接已关闭，尝试重新连接 (重试 {retry_count+1}/{max_retries}): {e}")
-                            # 重新初始化持久连接
-                            self._init_persistent_connection()
-                            retry_count += 1
-                            last_error = e
-                            continue
-                        else:
-                            logger.warning(f"持久连接执行SQL失败: {e}，尝试临时连接")
-                
-                # 如果持久连接不可用或执行失败，使用临时连接
-                with self.get_connection() as db:
-                    logger.info(f"使用临时连接执行SQL: {sql}")
-                    result = db.query(sql)
-                    
-                    if not result:
-                        logger.warning(f"SQL查询返回空结果: {sql}")
-                        return []
-                    
-                    # 转换SurrealDB对象为可序列化的Python类型
-                    serializable_result = self._make_serializable(result)
-                    return serializable_result
-                    
-            except Exception as e:
-                if "Cannot operate on a closed database" in str(e):
-                    logger.warning(f"数据库连接已关闭，尝试重新连接 (重试 {retry_count+1}/{max_retries}): {e}")
-                    # 重新初始化持久连接
-                    self._init_persistent_connection()
-                    retry_count += 1
-                    last_error = e
-                else:
-                    # 如果WebSocket失败，尝试HTTP回退
-                    logger.warning(f"WebSocket查询失败，尝试HTTP回退: {e}")
-                    try:
-                        result = self.http_client.execute_sql(sql)
-                        return result
-                    except Exception as http_error:
-                        logger.error(f"HTTP回退也失败了: {http_error}")
-                        last_error = http_error
-                        retry_count += 1
+        return self._query_result(sql, result)
+    
+    @staticmethod
+    def prepare_record(record_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Assign a record ID if missing and resolve ``time::now()`` placeholders.
         
-        # 如果所有重试都失败
-        if last_error:
-            logger.error(f"在 {max_retries} 次重试后执行SQL仍然失败: {last_error}")
-            raise last_error
+        Args:
+            record_data: Record data (the ID is added in place)
+            
+        Returns:
+            Record data ready to be sent to SurrealDB
+        """
+        # Generate ID if not provided
+        if 'id' not in record_data:
+            record_data['id'] = str(uuid.uuid4())
+            
+        # Handle special time::now() values and ensure proper datetime handling
+        processed_data = {}
+        for key, value in record_data.items():
+            if isinstance(value, str) and value == 'time::now()':
+                # For SurrealDB, use datetime object directly instead of string
+                processed_data[key] = datetime.now()
+            else:
+                processed_data[key] = value
+        return processed_data
+    
+    def _created_record(self, table: str, record_id: Any, result: Any) -> Optional[Dict[str, Any]]:
+        if result:
+            logger.debug(f"Record created successfully in {table}: {record_id}")
+            return self._make_serializable(result[0] if isinstance(result, list) else result)
+        
+        logger.error(f"Failed to create record in {table}: {record_id}")
+        return None
     
     def create_record(self, table: str, record_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -197,84 +209,117 @@ class UnifiedSurrealClient:
             Created record or None on failure
         """
         try:
-            # Generate ID if not provided
-            if 'id' not in record_data:
-                record_data['id'] = str(uuid.uuid4())
-                
-            # Handle special time::now() values and ensure proper datetime handling
-            processed_data = {}
-            for key, value in record_data.items():
-                if isinstance(value, str) and value == 'time::now()':
-                    # Use Python's datetime for time::now()
-                    from datetime import datetime
-                    # For SurrealDB, use datetime object directly instead of string
-                    processed_data[key] = datetime.now()
-                else:
-                    processed_data[key] = value
-            
-            logger.info(f"Creating record in {table} with data: {processed_data}")
+            processed_data = self.prepare_record(record_data)
+            result = self.pool.run(self._create_operation(table, processed_data), idempotent=True)
+            return self._created_record(table, processed_data['id'], result)
+        except Exception as e:
+            logger.error(f"Create record failed: {e}, table: {table}, record_id: {record_data.get('id')}")
+            return None
+    
+    async def create_record_async(self, table: str, record_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Create a record asynchronously.
+        
+        Args:
+            table: Table name
+            record_data: Record data to create
             
-            # Use direct create method like in test_surreal_http.py
-            with self.get_connection() as db:
-                try:
-                    # Use the create method directly
-                    result = db.create(table, processed_data)
-                    
-                    if result and len(result) > 0:
-                        logger.info(f"Record created successfully in {table}: {processed_data.get('id')}")
-                        return self._make_serializable(result[0] if isinstance(result, list) else result)
-                    else:
-                        logger.warning(f"Create returned empty result for {table}")
-                        # Try to verify if record was created
-                        verify_result = db.select(f"{table}:{processed_data.get('id')}")
-                        if verify_result and len(verify_result) > 0:
-                            logger.info(f"Record verified in {table}: {processed_data.get('id')}")
-                            return self._make_serializable(verify_result[0] if isinstance(verify_result, list) else verify_result)
-                        else:
-                            logger.error(f"Failed to create record in {table}")
-                            return None
-                except Exception as create_error:
-                    logger.error(f"Error during db.create: {create_error}")
-                    import traceback
-                    logger.error(f"Create error details: {traceback.format_exc()}")
-                    return None
+        Returns:
+            Created record or None on failure
+        """
+        try:
+            processed_data = self.prepare_record(record_data)
+            result = await self.pool.run_async(self._create_operation(table, processed_data), idempotent=True)
+            return self._created_record(table, processed_data['id'], result)
         except Exception as e:
             logger.error(f"Create record failed: {e}, table: {table}, record_id: {record_data.get('id')}")
-            import traceback
-            logger.error(f"Create record error details: {traceback.format_exc()}")
             return None
     
-    def get_records(self, table: str, condition: str = "", limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _select_sql(table: str, condition: str = "", limit: int = 100, offset: int = 0,
+                    order_by: Optional[str] = None) -> str:
+        sql = f"SELECT * FROM {table}"
+        
+        if condition:
+            sql += f" WHERE {condition}"
+        
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        
+        sql += f" LIMIT {int(limit)}"
+        
+        if offset > 0:
+            sql += f" START {int(offset)}"
+        
+        return sql + ";"
+    
+    def get_records(self, table: str, condition: str = "", limit: int = 100, offset: int = 0,
+                    params: Optional[Dict[str, Any]] = None, order_by: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get records from a table.
         
         Args:
             table: Table name
-            condition: WHERE condition (optional)
+            condition: WHERE condition (optional), may reference ``$variables``
             limit: Maximum number of records to return
             offset: Number of records to skip
+            params: Values for the variables used in the condition
+            order_by: ORDER BY clause (optional), e.g. ``"created_at ASC"``
             
         Returns:
             List of records
         """
-        try:
-            sql = f"SELECT * FROM {table}"
-            
-            if condition:
-                sql += f" WHERE {condition}"
-            
-            sql += f" LIMIT {limit}"
-            
-            if offset > 0:
-                sql += f" START {offset}"
-            
-            sql += ";"
-            
-            return self.execute_sql(sql)
+        return self.execute_sql(self._select_sql(table, condition, limit, offset, order_by), params, idempotent=True)
+    
+    async def get_records_async(self, table: str, condition: str = "", limit: int = 100, offset: int = 0,
+                                params: Optional[Dict[str, Any]] = None,
+                                order_by: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get records from a table asynchronously.
+        
+        Args:
+            table: Table name
+            condition: WHERE condition (optional), may reference ``$variables``
+            limit: Maximum number of records to return
+            offset: Number of records to skip
+            params: Values for the variables used in the condition
+            order_by: ORDER BY clause (optional), e.g. ``"created_at ASC"``
             
-        except Exception as e:
-            logger.warning(f"WebSocket get records failed, trying HTTP fallback: {e}")
-            return self.http_client.get_records(table, condition, limit, offset)
+        Returns:
+            List of records
+        """
+        return await self.execute_sql_async(self._select_sql(table, condition, limit, offset, order_by), params,
+                                            idempotent=True)
+    
+    @staticmethod
+    def _update_sql(table: str, record_id: str, update_data: Dict[str, Any]) -> str:
+        # Build SET clause
+        set_clauses = []
+        
+        for key, value in update_data.items():
+            if isinstance(value, str):
+                escaped_value = value.replace("'", "''")
+                set_clauses.append(f"{key} = '{escaped_value}'")
+            elif isinstance(value, bool):
+                set_clauses.append(f"{key} = {'true' if value else 'false'}")
+            elif isinstance(value, (int, float)):
+                set_clauses.append(f"{key} = {value}")
+            elif value is None:
+                set_clauses.append(f"{key} = NULL")
+            else:
+                json_str = json.dumps(value).replace("'", "''")
+                set_clauses.append(f"{key} = '{json_str}'")
+        
+        set_clause = ', '.join(set_clauses)
+        return f"UPDATE {table} SET {set_clause} WHERE id = '{record_id}'; SELECT * FROM {table} WHERE id = '{record_id}';"
+    
+    def _updated_record(self, table: str, record_id: str, result: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if result:
+            logger.debug(f"Record updated successfully in {table}: {record_id}")
+            return result[0]
+        
+        logger.error(f"Failed to update record in {table}: {record_id}")
+        return None
     
     def update_record(self, table: str, record_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -289,36 +334,27 @@ class UnifiedSurrealClient:
             Updated record or None on failure
         """
         try:
-            # Build SET clause
-            set_clauses = []
-            
-            for key, value in update_data.items():
-                if isinstance(value, str):
-                    escaped_value = value.replace("'", "''")
-                    set_clauses.append(f"{key} = '{escaped_value}'")
-                elif isinstance(value, (int, float)):
-                    set_clauses.append(f"{key} = {value}")
-                elif isinstance(value, bool):
-                    set_clauses.append(f"{key} = {'true' if value else 'false'}")
-                elif value is None:
-                    set_clauses.append(f"{key} = NULL")
-                else:
-                    import json
-                    json_str = json.dumps(value).replace("'", "''")
-                    set_clauses.append(f"{key} = '{json_str}'")
-            
-            set_clause = ', '.join(set_clauses)
-            sql = f"UPDATE {table} SET {set_clause} WHERE id = '{record_id}'; SELECT * FROM {table} WHERE id = '{record_id}';"
-            
-            result = self.execute_sql(sql)
+            result = self.execute_sql(self._update_sql(table, record_id, update_data), idempotent=True)
+            return self._updated_record(table, record_id, result)
+        except Exception as e:
+            logger.error(f"Update record failed: {e}")
+            return None
+    
+    async def update_record_async(self, table: str, record_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Update a record asynchronously.
+        
+        Args:
+            table: Table name
+            record_id: Record ID to update
+            update_data: Data to update
             
-            if result:
-                logger.info(f"Record updated successfully in {table}: {record_id}")
-                return result[0] if result else None
-            else:
-                logger.error(f"Failed to update record in {table}: {record_id}")
-                return None
-                
+        Returns:
+            Updated record or None on failure
+        """
+        try:
+            result = await self.execute_sql_async(self._update_sql(table, record_id, update_data), idempotent=True)
+            return self._updated_record(table, record_id, result)
         except Exception as e:
             logger.error(f"Update record failed: {e}")
             return None
@@ -335,13 +371,28 @@ class UnifiedSurrealClient:
             True if successful, False otherwise
         """
         try:
-            sql = f"DELETE FROM {table} WHERE id = '{record_id}';"
-            
-            result = self.execute_sql(sql)
-            
-            logger.info(f"Record deleted successfully from {table}: {record_id}")
+            self.execute_sql(f"DELETE FROM {table} WHERE id = '{record_id}';", idempotent=True)
+            logger.debug(f"Record deleted successfully from {table}: {record_id}")
             return True
+        except Exception as e:
+            logger.error(f"Delete record failed: {e}")
+            return False
+    
+    async def delete_record_async(self, table: str, record_id: str) -> bool:
+        """
+        Delete a record asynchronously.
+        
+        Args:
+            table: Table name
+            record_id: Record ID to delete
             
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            await self.execute_sql_async(f"DELETE FROM {table} WHERE id = '{record_id}';", idempotent=True)
+            logger.debug(f"Record deleted successfully from {table}: {record_id}")
+            return True
         except Exception as e:
             logger.error(f"Delete record failed: {e}")
             return False
@@ -361,7 +412,7 @@ class UnifiedSurrealClient:
             # First check if table exists by querying it
             check_sql = f"SELECT count() FROM {table} LIMIT 1;"
             try:
-                self.execute_sql(check_sql)
+                self.execute_sql(check_sql, idempotent=True)
                 # If we get here, table exists
                 logger.info(f"Table {table} already exists")
                 return True
@@ -409,13 +460,15 @@ class UnifiedSurrealClient:
             # Return primitive types as is
             return data
     
-    def ensure_table(self, table: str, fields: Dict[str, str]) -> bool:
+    def ensure_table(self, table: str, fields: Dict[str, str],
+                     indexes: Optional[Dict[str, List[str]]] = None) -> bool:
         """
-        Ensure a table exists with the specified fields.
+        Ensure a table exists with the specified fields and indexes.
         
         Args:
             table: Table name
             fields: Dictionary of field_name -> field_type
+            indexes: Optional dictionary of index_name -> indexed columns
             
         Returns:
             True if successful, False otherwise
@@ -430,11 +483,16 @@ class UnifiedSurrealClient:
             for field_name, field_type in fields.items():
                 sql_statements.append(f"DEFINE FIELD {field_name} ON {table} TYPE {field_type};")
             
+            for index_name, columns in (indexes or {}).items():
+                sql_statements.append(
+                    f"DEFINE INDEX IF NOT EXISTS {index_name} ON TABLE {table} COLUMNS {', '.join(columns)};"
+                )
+            
             if sql_statements:
                 sql = " ".join(sql_statements)
                 self.execute_sql(sql)
                 
-            logger.info(f"Table {table} ensured with fields: {fields}")
+            logger.info(f"Table {table} ensured with fields: {fields}, indexes: {list(indexes or {})}")
             return True
             
         except Exception as e:
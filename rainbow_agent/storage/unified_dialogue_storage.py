@@ -6,12 +6,14 @@ transparent interface using the unified managers.
 """
 
 import logging
-from typing import Dict, List, Any, Optional
+import time
+from typing import Dict, List, Any, Optional, Union
 from datetime import datetime
 
 from .unified_session_manager import UnifiedSessionManager
 from .unified_turn_manager import UnifiedTurnManager
 from .memory_storage import get_memory_storage
+from .write_behind import TurnWriteBuffer
 from .config import get_surreal_config
 
 logger = logging.getLogger(__name__)
@@ -26,12 +28,20 @@ class UnifiedDialogueStorage:
     HTTP endpoint mixing and fallback logic.
     """
     
+    # Seconds before SurrealDB is retried after a failed write-behind batch, doubled per failure
+    DB_RETRY_BACKOFF = 5.0
+    DB_RETRY_BACKOFF_MAX = 300.0
+    
     def __init__(self, 
                  url: str = "ws://localhost:8000/rpc",
                  namespace: str = "rainbow",
                  database: str = "test",
                  username: str = "root",
-                 password: str = "root"):
+                 password: str = "root",
+                 write_behind: bool = False,
+                 write_batch_size: int = 32,
+                 write_flush_interval: float = 0.05,
+                 client: Optional[Any] = None):
         """
         Initialize the unified dialogue storage.
         
@@ -41,7 +51,17 @@ class UnifiedDialogueStorage:
             database: SurrealDB database name
             username: SurrealDB username
             password: SurrealDB password
+            write_behind: Batch new turns into multi-record transactions
+            write_batch_size: Maximum number of turns per batch
+            write_flush_interval: Maximum seconds a turn waits before its batch is written
+            client: Optional external UnifiedSurrealClient instance
         """
+        self._db_available = False
+        # Backoff after a failed write-behind batch before SurrealDB is tried again
+        self._db_retry_at: Optional[float] = None
+        self._db_backoff = self.DB_RETRY_BACKOFF
+        self._db_failed_at: Optional[float] = None
+        
         self.url = url
         self.namespace = namespace
         self.database = database
@@ -54,10 +74,18 @@ class UnifiedDialogueStorage:
         
         # 创建一个共享的UnifiedSurrealClient实例
         from .surreal.unified_client import UnifiedSurrealClient
-        self.shared_client = UnifiedSurrealClient(
+        self.shared_client = client or UnifiedSurrealClient(
             self.url, self.namespace, self.database, self.username, self.password
         )
         
+        # 轮次写入缓冲：按批次合并为单个事务写入
+        self.write_buffer = TurnWriteBuffer(
+            self.shared_client,
+            max_batch_size=write_batch_size,
+            max_delay=write_flush_interval,
+            on_failure=self._on_turn_batch_failed
+        ) if write_behind else None
+        
         # 初始化管理器并直接传递共享客户端实例
         self.session_manager = UnifiedSessionManager(
             url=self.url, namespace=self.namespace, database=self.database, 
@@ -67,7 +95,7 @@ class UnifiedDialogueStorage:
         self.turn_manager = UnifiedTurnManager(
             url=self.url, namespace=self.namespace, database=self.database, 
             username=self.username, password=self.password,
-            client=self.shared_client
+            client=self.shared_client, write_buffer=self.write_buffer
         )
         
         # Initialize memory storage as fallback
@@ -97,6 +125,51 @@ class UnifiedDialogueStorage:
         
         logger.info("UnifiedDialogueStorage initialized")
     
+    @property
+    def db_available(self) -> bool:
+        """Whether operations go to SurrealDB, re-enabled once a write failure backoff has elapsed."""
+        if not self._db_available and self._db_retry_at is not None and time.monotonic() >= self._db_retry_at:
+            logger.info("Retrying SurrealDB after write failure backoff")
+            self._db_retry_at = None
+            self._db_available = True
+        return self._db_available
+    
+    @db_available.setter
+    def db_available(self, value: bool) -> None:
+        self._db_available = value
+    
+    def _on_turn_batch_failed(self, turns: List[Dict[str, Any]]) -> None:
+        """Keep turns from a batch that could not be written in memory storage and back off."""
+        logger.warning(f"Batched turn write failed, moving {len(turns)} turns to memory storage, "
+                       f"retrying SurrealDB in {self._db_backoff:.0f}s")
+        now = time.monotonic()
+        if self._db_failed_at is not None and now - self._db_failed_at > 2 * self.DB_RETRY_BACKOFF_MAX:
+            # The previous failure is long past, start over with a short backoff
+            self._db_backoff = self.DB_RETRY_BACKOFF
+        self._db_failed_at = now
+        self._db_available = False
+        self._db_retry_at = now + self._db_backoff
+        self._db_backoff = min(self.DB_RETRY_BACKOFF_MAX, self._db_backoff * 2)
+        self.memory_storage.store_turns(turns)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write all buffered turns to SurrealDB.
+        
+        Args:
+            timeout: Maximum seconds to wait, None waits indefinitely
+            
+        Returns:
+            True if all buffered turns were written within the timeout
+        """
+        return self.write_buffer.flush(timeout) if self.write_buffer else True
+    
+    def close(self) -> None:
+        """Flush buffered turns and close the database connections."""
+        if self.write_buffer:
+            self.write_buffer.close()
+        self.shared_client.close()
+    
     # ===== Session Operations =====
     
     def create_session(self, 
@@ -292,11 +365,24 @@ class UnifiedDialogueStorage:
     def get_turns(self, 
                  session_id: str, 
                  limit: int = 100, 
-                 offset: int = 0) -> List[Dict[str, Any]]:
-        """Get turns for a session."""
+                 offset: int = 0,
+                 after_created_at: Union[str, datetime, None] = None,
+                 before_id: Optional[str] = None,
+                 after_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get turns for a session, oldest first.
+        
+        Args:
+            session_id: Session ID to get turns for
+            limit: Maximum number of turns to return
+            offset: Number of turns to skip
+            after_created_at: Keyset cursor, only return turns created after this time
+            before_id: Keyset cursor, only return the turns directly preceding this turn
+            after_id: Keyset cursor tie-breaker, the ID of the turn at ``after_created_at``
+        """
         if self.db_available:
             try:
-                result = self.turn_manager.get_turns(session_id, limit, offset)
+                result = self.turn_manager.get_turns(session_id, limit, offset, after_created_at, before_id, after_id)
                 if result is not None:  # Allow empty list as valid result
                     return result
             except Exception as e:
@@ -304,16 +390,21 @@ class UnifiedDialogueStorage:
                 self.db_available = False
         
         # Use memory storage fallback
-        return self.memory_storage.get_turns(session_id, limit, offset)
+        return self.memory_storage.get_turns(session_id, limit, offset, after_created_at, before_id, after_id)
     
     async def get_turns_async(self, 
                              session_id: str, 
                              limit: int = 100, 
-                             offset: int = 0) -> List[Dict[str, Any]]:
-        """Get turns for a session asynchronously."""
+                             offset: int = 0,
+                             after_created_at: Union[str, datetime, None] = None,
+                             before_id: Optional[str] = None,
+                             after_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get turns for a session asynchronously, oldest first."""
         if self.db_available:
             try:
-                result = await self.turn_manager.get_turns_async(session_id, limit, offset)
+                result = await self.turn_manager.get_turns_async(
+                    session_id, limit, offset, after_created_at, before_id, after_id
+                )
                 if result is not None:  # Allow empty list as valid result
                     return result
             except Exception as e:
@@ -321,7 +412,31 @@ class UnifiedDialogueStorage:
                 self.db_available = False
         
         # Use memory storage fallback
-        return self.memory_storage.get_turns(session_id, limit, offset)
+        return self.memory_storage.get_turns(session_id, limit, offset, after_created_at, before_id, after_id)
+    
+    def get_recent_turns(self, session_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the last turns of a session, oldest first."""
+        if self.db_available:
+            try:
+                return self.turn_manager.get_recent_turns(session_id, limit)
+            except Exception as e:
+                logger.warning(f"SurrealDB get recent turns error, falling back to memory: {e}")
+                self.db_available = False
+        
+        # Use memory storage fallback
+        return self.memory_storage.get_recent_turns(session_id, limit)
+    
+    async def get_recent_turns_async(self, session_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the last turns of a session asynchronously, oldest first."""
+        if self.db_available:
+            try:
+                return await self.turn_manager.get_recent_turns_async(session_id, limit)
+            except Exception as e:
+                logger.warning(f"SurrealDB get recent turns async error, falling back to memory: {e}")
+                self.db_available = False
+        
+        # Use memory storage fallback
+        return self.memory_storage.get_recent_turns(session_id, limit)
     
     def update_turn(self, 
                    turn_id: str, 
@@ -99,32 +99,34 @@ class UnifiedSessionManager:
             Created session data or None on failure
         """
         try:
-            # Create session model
-            session_model = SessionModel(
-                user_id=user_id,
-                title=title or f"Session {datetime.now().strftime('%Y-%m-%d %H:%M')}",
-                metadata=metadata or {}
-            )
-            
-            # Convert to dictionary
-            session_data = session_model.to_dict()
-            
-            logger.info(f"Creating session: {session_model.id} for user: {user_id}")
+            session_data = self._build_session_data(user_id, title, metadata)
             
             # Create record using unified client
             result = self.client.create_record("sessions", session_data)
-            
-            if result:
-                logger.info(f"Session created successfully: {session_model.id}")
-                return result
-            else:
-                logger.error(f"Failed to create session: {session_model.id}")
-                return None
+            return self._created_session(session_data["id"], result)
                 
         except Exception as e:
             logger.error(f"Session creation failed: {e}")
             return None
     
+    @staticmethod
+    def _build_session_data(user_id: str, title: str, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        session_model = SessionModel(
+            user_id=user_id,
+            title=title or f"Session {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+            metadata=metadata or {}
+        )
+        logger.debug(f"Creating session: {session_model.id} for user: {user_id}")
+        return session_model.to_dict()
+    
+    @staticmethod
+    def _created_session(session_id: str, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if result:
+            logger.info(f"Session created successfully: {session_id}")
+            return result
+        logger.error(f"Failed to create session: {session_id}")
+        return None
+    
     async def create_session_async(self, 
                                   user_id: str, 
                                   title: str = "",
@@ -140,8 +142,14 @@ class UnifiedSessionManager:
         Returns:
             Created session data or None on failure
         """
-        # For now, use the synchronous method
-        return self.create_session(user_id, title, metadata)
+        try:
+            session_data = self._build_session_data(user_id, title, metadata)
+            result = await self.client.create_record_async("sessions", session_data)
+            return self._created_session(session_data["id"], result)
+                
+        except Exception as e:
+            logger.error(f"Session creation failed: {e}")
+            return None
     
     def get_session(self, session_id: Union[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         """
@@ -154,43 +162,57 @@ class UnifiedSessionManager:
             Session record or None if not found
         """
         try:
-            # 检查session_id是否为字典，如果是则提取id字段
-            if isinstance(session_id, dict):
-                if 'id' in session_id:
-                    actual_id = session_id['id']
-                    logger.info(f"Extracted session_id from dictionary: {actual_id}")
-                else:
-                    logger.error(f"Invalid session_id dictionary without id field: {session_id}")
-                    return None
-            else:
-                actual_id = session_id
-                
-            condition = f"id = '{actual_id}'"
-            result = self.client.get_records("sessions", condition, limit=1)
-            
-            if result:
-                logger.info(f"Retrieved session: {actual_id}")
-                return result[0]
-            else:
-                logger.warning(f"Session not found: {actual_id}")
+            actual_id = self._resolve_session_id(session_id)
+            if actual_id is None:
                 return None
                 
+            result = self.client.get_records("sessions", f"id = '{actual_id}'", limit=1)
+            return self._first_session(actual_id, result)
+                
         except Exception as e:
             logger.error(f"Failed to get session {session_id}: {e}")
             return None
     
-    async def get_session_async(self, session_id: str) -> Optional[Dict[str, Any]]:
+    @staticmethod
+    def _resolve_session_id(session_id: Union[str, Dict[str, Any]]) -> Optional[str]:
+        # 检查session_id是否为字典，如果是则提取id字段
+        if isinstance(session_id, dict):
+            if 'id' in session_id:
+                logger.debug(f"Extracted session_id from dictionary: {session_id['id']}")
+                return session_id['id']
+            logger.error(f"Invalid session_id dictionary without id field: {session_id}")
+            return None
+        return session_id
+    
+    @staticmethod
+    def _first_session(session_id: str, result: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if result:
+            logger.debug(f"Retrieved session: {session_id}")
+            return result[0]
+        logger.warning(f"Session not found: {session_id}")
+        return None
+    
+    async def get_session_async(self, session_id: Union[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         """
         Get a specific session by ID asynchronously.
         
         Args:
-            session_id: Session ID to retrieve
+            session_id: Session ID to retrieve (string or dictionary with id field)
             
         Returns:
             Session record or None if not found
         """
-        # For now, use the synchronous method
-        return self.get_session(session_id)
+        try:
+            actual_id = self._resolve_session_id(session_id)
+            if actual_id is None:
+                return None
+                
+            result = await self.client.get_records_async("sessions", f"id = '{actual_id}'", limit=1)
+            return self._first_session(actual_id, result)
+                
+        except Exception as e:
+            logger.error(f"Failed to get session {session_id}: {e}")
+            return None
     
     def get_user_sessions(self, 
                          user_id: str, 
@@ -212,7 +234,7 @@ class UnifiedSessionManager:
             
             result = self.client.get_records("sessions", condition, limit, offset)
             
-            logger.info(f"Retrieved {len(result)} sessions for user: {user_id}")
+            logger.debug(f"Retrieved {len(result)} sessions for user: {user_id}")
             return result
             
         except Exception as e:
@@ -234,8 +256,17 @@ class UnifiedSessionManager:
         Returns:
             List of session records
         """
-        # For now, use the synchronous method
-        return self.get_user_sessions(user_id, limit, offset)
+        try:
+            condition = f"user_id = '{user_id}'"
+            
+            result = await self.client.get_records_async("sessions", condition, limit, offset)
+            
+            logger.debug(f"Retrieved {len(result)} sessions for user: {user_id}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Failed to get sessions for user {user_id}: {e}")
+            return []
     
     def update_session(self, 
                       session_id: str, 
@@ -280,8 +311,22 @@ class UnifiedSessionManager:
         Returns:
             Updated session record or None on failure
         """
-        # For now, use the synchronous method
-        return self.update_session(session_id, update_data)
+        try:
+            # Add updated_at timestamp
+            update_data['updated_at'] = datetime.now().isoformat()
+            
+            result = await self.client.update_record_async("sessions", session_id, update_data)
+            
+            if result:
+                logger.info(f"Session updated successfully: {session_id}")
+                return result
+            else:
+                logger.error(f"Failed to update session: {session_id}")
+                return None
+                
+        except Exception as e:
+            logger.error(f"Session update failed: {e}")
+            return None
     
     def delete_session(self, session_id: str) -> bool:
         """
@@ -319,7 +364,7 @@ class UnifiedSessionManager:
         """
         try:
             sql = f"SELECT count() FROM sessions WHERE user_id = '{user_id}' GROUP ALL;"
-            result = self.client.execute_sql(sql)
+            result = self.client.execute_sql(sql, idempotent=True)
             
             if result and len(result) > 0 and 'count' in result[0]:
                 count = result[0]['count']
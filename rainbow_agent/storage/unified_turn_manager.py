@@ -7,14 +7,19 @@ eliminating complex fallback logic and HTTP endpoint mixing.
 
 import logging
 import uuid
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime
 
 from .surreal.unified_client import UnifiedSurrealClient
 from .models import TurnModel
+from .write_behind import TurnWriteBuffer
 
 logger = logging.getLogger(__name__)
 
+# 会话内按创建时间排序，id仅用于打破同一时间戳的顺序
+TURN_ORDER = "created_at ASC, id ASC"
+TURN_ORDER_DESC = "created_at DESC, id DESC"
+
 
 class UnifiedTurnManager:
     """
@@ -33,7 +38,8 @@ class UnifiedTurnManager:
                  database: str = "test",
                  username: str = "root",
                  password: str = "root",
-                 client: Optional[Any] = None):
+                 client: Optional[Any] = None,
+                 write_buffer: Optional[TurnWriteBuffer] = None):
         """
         Initialize the turn manager.
         
@@ -44,6 +50,8 @@ class UnifiedTurnManager:
             username: SurrealDB username
             password: SurrealDB password
             client: Optional external UnifiedSurrealClient instance
+            write_buffer: Optional write-behind buffer; when set, new turns are
+                batched instead of written one record at a time
         """
         # 保存连接参数，以便需要时重新创建客户端
         self.url = url
@@ -61,6 +69,7 @@ class UnifiedTurnManager:
             from .surreal.unified_client import UnifiedSurrealClient
             self.client = UnifiedSurrealClient(url, namespace, database, username, password)
             logger.info("UnifiedTurnManager created new client instance")
+        self.write_buffer = write_buffer
             
         # Ensure table structure exists
         self._ensure_table_structure()
@@ -81,7 +90,10 @@ class UnifiedTurnManager:
                 "metadata": "option<object>"
             }
             
-            self.client.ensure_table("turns", fields)
+            # (session_id, created_at) 复合索引支撑按会话的有序查询和游标分页
+            indexes = {"turns_session_created": ["session_id", "created_at"]}
+            
+            self.client.ensure_table("turns", fields, indexes)
             logger.info("Turns table structure ensured")
             
         except Exception as e:
@@ -107,34 +119,164 @@ class UnifiedTurnManager:
             Created turn data or None on failure
         """
         try:
-            # Create turn model
-            turn_model = TurnModel(
-                session_id=session_id,
-                role=role,
-                content=content,
-                embedding=embedding,
-                metadata=metadata or {}
-            )
-            
-            # Convert to dictionary
-            turn_data = turn_model.to_dict()
-            
-            logger.info(f"Creating turn: {turn_model.id} for session: {session_id}")
+            turn_data = self._build_turn_data(session_id, role, content, embedding, metadata)
+            if self.write_buffer:
+                return self._buffer_turn(turn_data)
             
             # Create record using unified client
             result = self.client.create_record("turns", turn_data)
-            
-            if result:
-                logger.info(f"Turn created successfully: {turn_model.id}")
-                return result
-            else:
-                logger.error(f"Failed to create turn: {turn_model.id}")
-                return None
+            return self._created_turn(turn_data["id"], result)
                 
         except Exception as e:
             logger.error(f"Turn creation failed: {e}")
             return None
     
+    @staticmethod
+    def _build_turn_data(session_id: str,
+                         role: str,
+                         content: str,
+                         embedding: Optional[List[float]],
+                         metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        turn_model = TurnModel(
+            session_id=session_id,
+            role=role,
+            content=content,
+            embedding=embedding,
+            metadata=metadata or {}
+        )
+        logger.debug(f"Creating turn: {turn_model.id} for session: {session_id}")
+        return turn_model.to_dict()
+    
+    def _buffer_turn(self, turn_data: Dict[str, Any]) -> Dict[str, Any]:
+        turn = self.write_buffer.add_turn(self.client.prepare_record(turn_data))
+        logger.debug(f"Turn queued for batched write: {turn['id']}")
+        return dict(turn)
+    
+    def _pending_turns(self,
+                       session_id: str,
+                       offset: int,
+                       after: Optional[datetime],
+                       after_id: Optional[str],
+                       before: Optional[datetime],
+                       before_id: Optional[str]) -> List[Dict[str, Any]]:
+        # Snapshot before querying: a turn written in between shows up in both
+        # and is de-duplicated by ID, a turn written before is in the results
+        if not self.write_buffer:
+            return []
+        pending = self.write_buffer.pending_turns(session_id)
+        if pending and offset:
+            # Offsets are only meaningful against the stored rows
+            self.write_buffer.flush()
+            return []
+        return [
+            turn for turn in pending
+            if self._after_cursor(turn, after, after_id) and self._before_cursor(turn, before, before_id)
+        ]
+    
+    @staticmethod
+    def _after_cursor(turn: Dict[str, Any], after: Optional[datetime], after_id: Optional[str]) -> bool:
+        # 游标是 (created_at, id) 元组，时间相同的轮次按ID排序
+        if after is None:
+            return True
+        if after_id is None:
+            return turn['created_at'] > after
+        return (turn['created_at'], str(turn['id'])) > (after, str(after_id))
+    
+    @staticmethod
+    def _before_cursor(turn: Dict[str, Any], before: Optional[datetime], before_id: Optional[str]) -> bool:
+        if before is None:
+            return True
+        if before_id is None:
+            return turn['created_at'] < before
+        return (turn['created_at'], str(turn['id'])) < (before, str(before_id))
+    
+    @staticmethod
+    def _merge_pending(result: List[Dict[str, Any]],
+                       pending: List[Dict[str, Any]],
+                       limit: int,
+                       newest_first: bool) -> List[Dict[str, Any]]:
+        if not pending:
+            return result
+        stored_ids = {str(turn.get('id')) for turn in result}
+        merged = result + [dict(turn) for turn in pending if turn['id'] not in stored_ids]
+        merged.sort(key=lambda turn: (turn['created_at'], str(turn['id'])))
+        return merged[-limit:] if newest_first else merged[:limit]
+    
+    @staticmethod
+    def _as_datetime(value: Union[str, datetime, None]) -> Optional[datetime]:
+        if isinstance(value, str):
+            return datetime.fromisoformat(value)
+        return value
+    
+    @staticmethod
+    def _turn_query(session_id: str,
+                    after: Optional[datetime],
+                    after_id: Optional[str],
+                    before: Optional[datetime],
+                    before_id: Optional[str],
+                    newest_first: bool) -> Tuple[str, Dict[str, Any], str]:
+        # 结果按 (created_at, id) 排序，游标也按这个元组比较，时间相同的轮次不会在翻页时丢失
+        conditions = ["session_id = $session_id"]
+        params: Dict[str, Any] = {"session_id": session_id}
+        if after is not None:
+            params["after_created_at"] = after
+            if after_id is not None:
+                conditions.append(
+                    "(created_at > $after_created_at OR (created_at = $after_created_at AND id > $after_id))"
+                )
+                params["after_id"] = after_id
+            else:
+                conditions.append("created_at > $after_created_at")
+        if before is not None:
+            params["before_created_at"] = before
+            if before_id is not None:
+                conditions.append(
+                    "(created_at < $before_created_at OR (created_at = $before_created_at AND id < $before_id))"
+                )
+                params["before_id"] = before_id
+            else:
+                conditions.append("created_at < $before_created_at")
+        return " AND ".join(conditions), params, TURN_ORDER_DESC if newest_first else TURN_ORDER
+    
+    def _query_turns(self,
+                     session_id: Any,
+                     offset: int,
+                     after_created_at: Union[str, datetime, None],
+                     after_id: Optional[str],
+                     anchor: Optional[Dict[str, Any]],
+                     newest_first: bool) -> Tuple[str, Dict[str, Any], str, List[Dict[str, Any]]]:
+        actual_session_id = self._resolve_session_id(session_id)
+        after = self._as_datetime(after_created_at)
+        before = self._as_datetime(anchor['created_at']) if anchor else None
+        before_id = anchor.get('id') if anchor else None
+        pending = self._pending_turns(actual_session_id, offset, after, after_id, before, before_id)
+        return (*self._turn_query(actual_session_id, after, after_id, before, before_id, newest_first), pending)
+    
+    def _turns_result(self,
+                      session_id: Any,
+                      result: List[Dict[str, Any]],
+                      pending: List[Dict[str, Any]],
+                      limit: int,
+                      newest_first: bool) -> List[Dict[str, Any]]:
+        if newest_first:
+            # 倒序查询只为取到最近的N条，返回时仍按时间正序
+            result.reverse()
+        turns = self._merge_pending(result, pending, limit, newest_first)
+        logger.debug(f"Retrieved {len(turns)} turns for session: {self._resolve_session_id(session_id)}")
+        return turns
+    
+    def _flush_pending(self) -> None:
+        if self.write_buffer and self.write_buffer.has_pending():
+            self.write_buffer.flush()
+    
+    @staticmethod
+    def _created_turn(turn_id: str, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if result:
+            logger.info(f"Turn created successfully: {turn_id}")
+            return result
+        logger.error(f"Failed to create turn: {turn_id}")
+        return None
+    
     async def create_turn_async(self, 
                                session_id: str, 
                                role: str, 
@@ -142,10 +284,7 @@ class UnifiedTurnManager:
                                embedding: Optional[List[float]] = None,
                                metadata: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
-        Create a new turn asynchronously.
-        
-        For now, this wraps the synchronous method. In the future,
-        we can implement true async if needed.
+        Create a new turn asynchronously on a pooled connection.
         
         Args:
             session_id: Session ID this turn belongs to
@@ -157,67 +296,156 @@ class UnifiedTurnManager:
         Returns:
             Created turn data or None on failure
         """
-        # For now, use the synchronous method
-        # In the future, we can implement true async using asyncio.to_thread
-        return self.create_turn(session_id, role, content, embedding, metadata)
+        try:
+            turn_data = self._build_turn_data(session_id, role, content, embedding, metadata)
+            if self.write_buffer:
+                return self._buffer_turn(turn_data)
+            result = await self.client.create_record_async("turns", turn_data)
+            return self._created_turn(turn_data["id"], result)
+                
+        except Exception as e:
+            logger.error(f"Turn creation failed: {e}")
+            return None
     
     def get_turns(self, 
                  session_id: str, 
                  limit: int = 100, 
-                 offset: int = 0) -> List[Dict[str, Any]]:
+                 offset: int = 0,
+                 after_created_at: Union[str, datetime, None] = None,
+                 before_id: Optional[str] = None,
+                 after_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        Get turns for a session.
+        Get turns for a session in creation order.
+        
+        Pages are addressed by keyset cursor rather than offset: pass the
+        ``created_at`` and ``id`` of the last turn seen as ``after_created_at``
+        and ``after_id`` to page forward, or the ID of the first turn seen as
+        ``before_id`` to get the ``limit`` turns immediately preceding it.
+        Turns are ordered by ``(created_at, id)``, so turns sharing a timestamp
+        are neither skipped nor repeated across pages.
         
         Args:
             session_id: Session ID to get turns for
             limit: Maximum number of turns to return
             offset: Number of turns to skip
+            after_created_at: Only return turns created after this time
+            before_id: Only return the turns directly preceding this turn
+            after_id: Tie-breaker for ``after_created_at``: the ID of the last turn seen
             
         Returns:
-            List of turn records
+            List of turn records, oldest first
         """
         try:
-            # 处理session_id可能是字典的情况
-            actual_session_id = session_id
-            if isinstance(session_id, dict) and 'id' in session_id:
-                actual_session_id = session_id['id']
-                logger.info(f"Extracted session_id from dictionary: {actual_session_id}")
-            
-            condition = f"session_id = '{actual_session_id}'"
-            
-            # 获取记录并按created_at字段排序
-            result = self.client.get_records("turns", condition, limit, offset)
-            
-            # 确保按照创建时间排序
-            if result:
-                result.sort(key=lambda x: x.get('created_at', ''))
-                logger.info(f"Retrieved and sorted {len(result)} turns for session: {actual_session_id}")
-            else:
-                logger.info(f"Retrieved {len(result)} turns for session: {actual_session_id}")
-            
-            return result
+            anchor = None
+            if before_id:
+                anchor = self.get_turn(before_id)
+                if not anchor:
+                    return []
+            return self._get_turns(
+                session_id, limit, offset, after_created_at, after_id, anchor, newest_first=anchor is not None
+            )
             
         except Exception as e:
             logger.error(f"Failed to get turns for session {session_id}: {e}")
             return []
     
+    def get_recent_turns(self, session_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get the most recent turns of a session.
+        
+        Args:
+            session_id: Session ID to get turns for
+            limit: Maximum number of turns to return
+            
+        Returns:
+            The last ``limit`` turns, oldest first
+        """
+        try:
+            return self._get_turns(session_id, limit, 0, None, None, None, newest_first=True)
+        except Exception as e:
+            logger.error(f"Failed to get recent turns for session {session_id}: {e}")
+            return []
+    
+    def _get_turns(self,
+                   session_id: Any,
+                   limit: int,
+                   offset: int,
+                   after_created_at: Union[str, datetime, None],
+                   after_id: Optional[str],
+                   anchor: Optional[Dict[str, Any]],
+                   newest_first: bool) -> List[Dict[str, Any]]:
+        condition, params, order_by, pending = self._query_turns(
+            session_id, offset, after_created_at, after_id, anchor, newest_first
+        )
+        result = self.client.get_records("turns", condition, limit, offset, params=params, order_by=order_by)
+        return self._turns_result(session_id, result, pending, limit, newest_first)
+    
+    @staticmethod
+    def _resolve_session_id(session_id: Any) -> str:
+        # 处理session_id可能是字典的情况
+        if isinstance(session_id, dict) and 'id' in session_id:
+            logger.debug(f"Extracted session_id from dictionary: {session_id['id']}")
+            return session_id['id']
+        return session_id
+    
     async def get_turns_async(self, 
                              session_id: str, 
                              limit: int = 100, 
-                             offset: int = 0) -> List[Dict[str, Any]]:
+                             offset: int = 0,
+                             after_created_at: Union[str, datetime, None] = None,
+                             before_id: Optional[str] = None,
+                             after_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        Get turns for a session asynchronously.
+        Get turns for a session in creation order asynchronously.
         
         Args:
             session_id: Session ID to get turns for
             limit: Maximum number of turns to return
             offset: Number of turns to skip
+            after_created_at: Only return turns created after this time
+            before_id: Only return the turns directly preceding this turn
+            after_id: Tie-breaker for ``after_created_at``: the ID of the last turn seen
             
         Returns:
-            List of turn records
+            List of turn records, oldest first
         """
-        # For now, use the synchronous method
-        return self.get_turns(session_id, limit, offset)
+        try:
+            anchor = None
+            if before_id:
+                anchor = await self.get_turn_async(before_id)
+                if not anchor:
+                    return []
+            return await self._get_turns_async(
+                session_id, limit, offset, after_created_at, after_id, anchor, newest_first=anchor is not None
+            )
+            
+        except Exception as e:
+            logger.error(f"Failed to get turns for session {session_id}: {e}")
+            return []
+    
+    async def get_recent_turns_async(self, session_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the most recent turns of a session asynchronously, oldest first."""
+        try:
+            return await self._get_turns_async(session_id, limit, 0, None, None, None, newest_first=True)
+        except Exception as e:
+            logger.error(f"Failed to get recent turns for session {session_id}: {e}")
+            return []
+    
+    async def _get_turns_async(self,
+                               session_id: Any,
+                               limit: int,
+                               offset: int,
+                               after_created_at: Union[str, datetime, None],
+                               after_id: Optional[str],
+                               anchor: Optional[Dict[str, Any]],
+                               newest_first: bool) -> List[Dict[str, Any]]:
+        condition, params, order_by, pending = self._query_turns(
+            session_id, offset, after_created_at, after_id, anchor, newest_first
+        )
+        result = await self.client.get_records_async(
+            "turns", condition, limit, offset, params=params, order_by=order_by
+        )
+        return self._turns_result(session_id, result, pending, limit, newest_first)
     
     def get_turn(self, turn_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -230,20 +458,48 @@ class UnifiedTurnManager:
             Turn record or None if not found
         """
         try:
-            condition = f"id = '{turn_id}'"
-            result = self.client.get_records("turns", condition, limit=1)
+            pending = self._pending_turn(turn_id)
+            if pending:
+                return pending
             
-            if result:
-                logger.info(f"Retrieved turn: {turn_id}")
-                return result[0]
-            else:
-                logger.warning(f"Turn not found: {turn_id}")
-                return None
+            result = self.client.get_records("turns", "id = $turn_id", limit=1, params={"turn_id": turn_id})
+            return self._found_turn(turn_id, result)
+                
+        except Exception as e:
+            logger.error(f"Failed to get turn {turn_id}: {e}")
+            return None
+    
+    async def get_turn_async(self, turn_id: str) -> Optional[Dict[str, Any]]:
+        """Get a specific turn by ID asynchronously."""
+        try:
+            pending = self._pending_turn(turn_id)
+            if pending:
+                return pending
+            
+            result = await self.client.get_records_async(
+                "turns", "id = $turn_id", limit=1, params={"turn_id": turn_id}
+            )
+            return self._found_turn(turn_id, result)
                 
         except Exception as e:
             logger.error(f"Failed to get turn {turn_id}: {e}")
             return None
     
+    def _pending_turn(self, turn_id: str) -> Optional[Dict[str, Any]]:
+        if self.write_buffer:
+            pending = self.write_buffer.get_pending_turn(turn_id)
+            if pending:
+                return dict(pending)
+        return None
+    
+    @staticmethod
+    def _found_turn(turn_id: str, result: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if result:
+            logger.info(f"Retrieved turn: {turn_id}")
+            return result[0]
+        logger.warning(f"Turn not found: {turn_id}")
+        return None
+    
     def update_turn(self, 
                    turn_id: str, 
                    update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -258,6 +514,8 @@ class UnifiedTurnManager:
             Updated turn record or None on failure
         """
         try:
+            self._flush_pending()
+            
             # Add updated_at timestamp
             update_data['updated_at'] = datetime.now().isoformat()
             
@@ -285,6 +543,7 @@ class UnifiedTurnManager:
             True if successful, False otherwise
         """
         try:
+            self._flush_pending()
             result = self.client.delete_record("turns", turn_id)
             
             if result:
@@ -309,14 +568,10 @@ class UnifiedTurnManager:
             Number of turns in the session
         """
         try:
-            # 处理session_id可能是字典的情况
-            actual_session_id = session_id
-            if isinstance(session_id, dict) and 'id' in session_id:
-                actual_session_id = session_id['id']
-                logger.info(f"Extracted session_id from dictionary: {actual_session_id}")
-            
-            sql = f"SELECT count() FROM turns WHERE session_id = '{actual_session_id}' GROUP ALL;"
-            result = self.client.execute_sql(sql)
+            self._flush_pending()
+            actual_session_id = self._resolve_session_id(session_id)
+            sql = "SELECT count() FROM turns WHERE session_id = $session_id GROUP ALL;"
+            result = self.client.execute_sql(sql, {"session_id": actual_session_id}, idempotent=True)
             
             if result and len(result) > 0 and 'count' in result[0]:
                 count = result[0]['count']
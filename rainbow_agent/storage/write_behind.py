@@ -0,0 +1,281 @@
+"""
+Write-behind batching for dialogue turns.
+
+Turns are accepted immediately and written by a background thread as one
+multi-statement transaction per batch: a multi-record ``INSERT`` for the
+turns plus a single ``updated_at`` bump for every session they belong to.
+A batch is flushed when it reaches ``max_batch_size`` turns or when the
+oldest pending turn has waited ``max_delay`` seconds.
+
+Turns stay visible through ``pending_turns`` until their batch has been
+written, so readers in the same process can merge them with query results
+(read-your-writes). ``flush`` blocks until everything accepted so far has
+been written and is also registered to run at interpreter shutdown.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .surreal.connection_pool import SurrealConnectionLostError
+
+logger = logging.getLogger(__name__)
+
+BATCH_SQL = (
+    "BEGIN TRANSACTION; "
+    "INSERT INTO turns $turns; "
+    "UPDATE sessions SET updated_at = time::now() WHERE id IN $session_ids; "
+    "COMMIT TRANSACTION;"
+)
+
+
+class TurnWriteBuffer:
+    """
+    Write-behind buffer for turns and session ``updated_at`` bumps.
+
+    Thread-safe; ``add_turn`` never performs I/O and can be called from
+    async code without blocking the event loop.
+    """
+
+    def __init__(self,
+                 client: Any,
+                 max_batch_size: int = 32,
+                 max_delay: float = 0.05,
+                 max_retries: int = 3,
+                 on_failure: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        """
+        Initialize the buffer. The writer thread starts on the first write.
+
+        Args:
+            client: UnifiedSurrealClient used to execute batches
+            max_batch_size: Maximum number of turns per transaction
+            max_delay: Maximum seconds a turn waits before its batch is flushed
+            max_retries: Attempts per batch before giving up on it
+            on_failure: Called with the turns of a batch that could not be written
+        """
+        self.client = client
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay = max_delay
+        self.max_retries = max(1, max_retries)
+        self.on_failure = on_failure
+
+        self._condition = threading.Condition()
+        self._queue: List[Dict[str, Any]] = []
+        self._touched: Dict[str, None] = {}
+        self._oldest_at: Optional[float] = None
+        # Turns accepted but not yet written, by session and by ID
+        self._pending_by_session: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._pending_by_id: Dict[str, Dict[str, Any]] = {}
+
+        self._accepted = 0
+        self._completed = 0
+        self._flush_requested = False
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+
+        self.stats: Dict[str, int] = {
+            "turns_written": 0,
+            "turns_failed": 0,
+            "batches": 0,
+            "batch_retries": 0
+        }
+
+    # ===== Producers =====
+
+    def add_turn(self, turn: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Accept a turn for writing.
+
+        Args:
+            turn: Prepared turn record, must contain ``id`` and ``session_id``
+
+        Returns:
+            The accepted turn
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Turn write buffer is closed")
+            self._queue.append(turn)
+            self._touched[turn["session_id"]] = None
+            self._pending_by_session.setdefault(turn["session_id"], {})[turn["id"]] = turn
+            self._pending_by_id[turn["id"]] = turn
+            self._enqueued()
+        return turn
+
+    def touch_session(self, session_id: str) -> None:
+        """
+        Schedule an ``updated_at`` bump for a session with the next batch.
+
+        Args:
+            session_id: Session ID
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Turn write buffer is closed")
+            self._touched[session_id] = None
+            self._enqueued()
+
+    def _enqueued(self) -> None:
+        self._accepted += 1
+        if self._oldest_at is None:
+            self._oldest_at = time.monotonic()
+        if self._worker is None or not self._worker.is_alive():
+            if self._worker is None:
+                atexit.register(self.flush)
+            self._worker = threading.Thread(target=self._run, name="turn-write-behind", daemon=True)
+            self._worker.start()
+        if len(self._queue) >= self.max_batch_size:
+            self._condition.notify_all()
+
+    # ===== Read-your-writes =====
+
+    def pending_turns(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Get turns of a session that may not be written yet, in acceptance order.
+
+        Args:
+            session_id: Session ID
+
+        Returns:
+            Copy of the pending turns
+        """
+        with self._condition:
+            return list(self._pending_by_session.get(session_id, {}).values())
+
+    def get_pending_turn(self, turn_id: str) -> Optional[Dict[str, Any]]:
+        """Get a pending turn by ID, or None if it has been written or never existed."""
+        with self._condition:
+            return self._pending_by_id.get(turn_id)
+
+    def has_pending(self) -> bool:
+        """Whether any accepted write has not completed yet."""
+        with self._condition:
+            return self._completed < self._accepted
+
+    # ===== Writer =====
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._touched and not self._closed:
+                    self._condition.wait()
+                if not self._queue and not self._touched:
+                    return
+
+                deadline = self._oldest_at + self.max_delay
+                while (len(self._queue) < self.max_batch_size
+                       and not self._closed and not self._flush_requested):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch = self._queue[:self.max_batch_size]
+                self._queue = self._queue[self.max_batch_size:]
+                if self._queue:
+                    # Sessions of turns left for the next batch are bumped with it
+                    session_ids = list(dict.fromkeys(turn["session_id"] for turn in batch))
+                    for session_id in session_ids:
+                        self._touched.pop(session_id, None)
+                else:
+                    session_ids = list(self._touched)
+                    self._touched.clear()
+                    self._flush_requested = False
+                completed = self._accepted - len(self._queue)
+                self._oldest_at = time.monotonic() if self._queue else None
+
+            written = self._write(batch, session_ids)
+
+            with self._condition:
+                for turn in batch:
+                    self._pending_by_id.pop(turn["id"], None)
+                    session_turns = self._pending_by_session.get(turn["session_id"])
+                    if session_turns is not None:
+                        session_turns.pop(turn["id"], None)
+                        if not session_turns:
+                            del self._pending_by_session[turn["session_id"]]
+                self._completed = max(self._completed, completed)
+                self._condition.notify_all()
+
+            if not written and self.on_failure and batch:
+                self.on_failure(batch)
+
+    def _write(self, batch: List[Dict[str, Any]], session_ids: List[str]) -> bool:
+        if batch:
+            sql, params = BATCH_SQL, {"turns": batch, "session_ids": session_ids}
+        else:
+            sql = "UPDATE sessions SET updated_at = time::now() WHERE id IN $session_ids;"
+            params = {"session_ids": session_ids}
+
+        for attempt in range(self.max_retries):
+            try:
+                self.client.execute_sql(sql, params)
+                self.stats["batches"] += 1
+                self.stats["turns_written"] += len(batch)
+                logger.debug(f"Wrote {len(batch)} turns and {len(session_ids)} session updates in one batch")
+                return True
+            except SurrealConnectionLostError as e:
+                # The batch may already have been committed, re-sending it could duplicate turns
+                logger.error(f"Write-behind batch of {len(batch)} turns lost its connection, not retrying: {e}")
+                break
+            except Exception as e:
+                logger.warning(f"Write-behind batch failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                if attempt + 1 < self.max_retries:
+                    self.stats["batch_retries"] += 1
+                    time.sleep(min(1.0, 0.05 * (2 ** attempt)))
+
+        self.stats["turns_failed"] += len(batch)
+        logger.error(f"Giving up on write-behind batch of {len(batch)} turns")
+        return False
+
+    # ===== Durability =====
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write everything accepted so far and wait for it.
+
+        Args:
+            timeout: Maximum seconds to wait, None waits indefinitely
+
+        Returns:
+            True if all accepted writes completed within the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            target = self._accepted
+            if self._completed >= target:
+                return True
+            self._flush_requested = True
+            self._condition.notify_all()
+            while self._completed < target:
+                if self._worker is None or not self._worker.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Flush pending writes and stop the writer thread.
+
+        Args:
+            timeout: Maximum seconds to wait for the final flush
+        """
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        atexit.unregister(self.flush)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics."""
+        with self._condition:
+            stats = dict(self.stats)
+            stats["pending"] = self._accepted - self._completed
+        return stats
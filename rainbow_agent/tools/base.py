@@ -2,15 +2,31 @@
 工具系统的基础定义
 """
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from enum import Enum
+from typing import Any, Dict, Iterator, Optional
+
+
+class CachePolicy(Enum):
+    """工具结果的缓存策略"""
+    NEVER = "never"                  # 不缓存（默认），用于有副作用或结果不确定的工具
+    TTL = "ttl"                      # 缓存 cache_ttl 秒
+    DETERMINISTIC = "deterministic"  # 相同参数结果不变，缓存到被LRU淘汰或工具版本变化
+    PER_USER = "per_user"            # 按用户分别缓存 cache_ttl 秒，未提供用户时不缓存
 
 
 class BaseTool(ABC):
     """
     所有工具的基类
     
-    所有工具必须继承此类并实现必要的方法
+    所有工具必须继承此类并实现必要的方法。
+    子类可以通过类属性声明结果的缓存方式：
+    cache_policy 为缓存策略，默认不缓存，只读且结果可复用的工具需要显式声明；
+    cache_ttl 为有效期（秒，None表示使用调用器的默认值），
+    persistent_cache 为True时结果还会写入调用器的磁盘缓存，适合开销大的确定性工具。
     """
+    cache_policy: CachePolicy = CachePolicy.NEVER
+    cache_ttl: Optional[float] = None
+    persistent_cache: bool = False
     
     def __init__(self, name: str, description: str, usage: str = None, version: str = "1.0", author: str = "Rainbow Team", tags: list = None):
         """
@@ -44,6 +60,21 @@ class BaseTool(ABC):
         """
         pass
     
+    def run_stream(self, args: Any) -> Iterator[Any]:
+        """
+        以数据块的形式逐步产生执行结果
+        
+        用于工具链中在步骤之间流式传递大的中间结果，默认一次产生run的完整结果，
+        能够边读取边输出的工具（如读取大文件）可以重写此方法。
+        
+        Args:
+            args: 工具参数
+            
+        Returns:
+            结果数据块的迭代器
+        """
+        yield self.run(args)
+    
     def __str__(self) -> str:
         return f"{self.name}: {self.description}\n用法: {self.usage}"
         
@@ -2,12 +2,13 @@
 计算器工具
 """
 from typing import Any
-from .base import BaseTool
+from .base import BaseTool, CachePolicy
 import re
 import math
 
 class CalculatorTool(BaseTool):
     """计算器工具，可以执行基本的数学计算"""
+    cache_policy = CachePolicy.DETERMINISTIC
     
     def __init__(self):
         super().__init__(
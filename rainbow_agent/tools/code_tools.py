@@ -9,7 +9,7 @@ import tempfile
 from typing import Dict, Any, List, Optional, Union
 import time
 
-from .base import BaseTool
+from .base import BaseTool, CachePolicy
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -22,6 +22,7 @@ class CodeExecutionTool(BaseTool):
     执行Python代码片段并返回结果
     """
     category = "代码工具"
+    cache_policy = CachePolicy.NEVER
     
     def __init__(self, 
                  workspace_dir: Optional[str] = None,
@@ -157,6 +158,7 @@ class CodeAnalysisTool(BaseTool):
     分析代码质量、复杂度和潜在问题
     """
     category = "代码工具"
+    cache_policy = CachePolicy.DETERMINISTIC
     
     def __init__(self):
         """初始化代码分析工具"""
@@ -7,11 +7,11 @@ import os
 import json
 import csv
 import base64
-from typing import Dict, Any, List, Optional, Union
-from io import StringIO
+from typing import Dict, Any, Iterable, List, Optional, Union
+from io import StringIO, TextIOBase
 import time
 
-from .base import BaseTool
+from .base import BaseTool, CachePolicy
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -35,6 +35,29 @@ except ImportError:
     logger.warning("matplotlib库未安装，图表生成功能将不可用")
 
 
+class _ChunkReader(TextIOBase):
+    """把文本数据块的迭代器包装为可读的文件对象，使pandas可以边接收边解析"""
+    
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self._buffer = ""
+    
+    def readable(self) -> bool:
+        return True
+    
+    def read(self, size: int = -1) -> str:
+        while size is None or size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+        if size is None or size < 0:
+            data, self._buffer = self._buffer, ""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
 class CSVAnalysisTool(BaseTool):
     """
     CSV数据分析工具
@@ -42,6 +65,7 @@ class CSVAnalysisTool(BaseTool):
     解析和分析CSV格式的数据
     """
     category = "数据分析"
+    cache_policy = CachePolicy.NEVER
     
     def __init__(self):
         """初始化CSV分析工具"""
@@ -51,7 +75,7 @@ class CSVAnalysisTool(BaseTool):
             usage="'[文件路径]' 或 '[命令]|[CSV数据]'"
         )
         
-    def run(self, args: str) -> str:
+    def run(self, args: Union[str, Dict[str, Any], Iterable[str]]) -> str:
         """
         分析CSV数据
         
@@ -61,6 +85,8 @@ class CSVAnalysisTool(BaseTool):
                   - head: 查看前几行
                   - stats: 生成统计数据
                   - info: 显示数据信息
+                  也可以是CSV文本数据块的迭代器（如工具链中上游步骤的流式输出），
+                  或 {"command": 命令, "data": 数据块迭代器} 格式的字典
                   
         Returns:
             分析结果
@@ -71,7 +97,12 @@ class CSVAnalysisTool(BaseTool):
         try:
             # 解析命令和数据
             command = "summary"  # 默认命令
-            if "|" in args:
+            if isinstance(args, dict):
+                command = str(args.get("command", command)).strip().lower()
+                data = args.get("data", "")
+            elif not isinstance(args, str):
+                data = args
+            elif "|" in args:
                 command_part, data_part = args.split("|", 1)
                 command = command_part.strip().lower()
                 data = data_part.strip()
@@ -80,7 +111,11 @@ class CSVAnalysisTool(BaseTool):
             
             # 处理数据来源
             df = None
-            if os.path.exists(data) and data.endswith(('.csv', '.CSV')):
+            if not isinstance(data, str):
+                # 边接收数据块边解析，不需要先拼接完整的文本
+                logger.info(f"解析流式CSV数据")
+                df = pd.read_csv(_ChunkReader(data))
+            elif os.path.exists(data) and data.endswith(('.csv', '.CSV')):
                 # 从文件加载
                 logger.info(f"从文件加载CSV数据: {data}")
                 df = pd.read_csv(data)
@@ -150,6 +185,7 @@ class DataVisualizationTool(BaseTool):
     生成数据可视化图表
     """
     category = "数据分析"
+    cache_policy = CachePolicy.NEVER
     
     def __init__(self, output_dir: str = "./charts"):
         """
@@ -351,6 +387,7 @@ class JSONProcessingTool(BaseTool):
     解析、转换和处理JSON数据
     """
     category = "数据分析"
+    cache_policy = CachePolicy.DETERMINISTIC
     
     def __init__(self):
         """初始化JSON处理工具"""
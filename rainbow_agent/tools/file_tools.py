@@ -3,10 +3,10 @@
 """
 import os
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator
 import time
 
-from .base import BaseTool
+from .base import BaseTool, CachePolicy
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -18,6 +18,7 @@ class FileReadTool(BaseTool):
     
     允许代理读取文件内容
     """
+    cache_policy = CachePolicy.NEVER
     
     def __init__(self, base_dir: Optional[str] = None):
         """
@@ -74,6 +75,32 @@ class FileReadTool(BaseTool):
         except Exception as e:
             logger.error(f"文件读取错误: {e}")
             return f"读取文件时出错: {str(e)}"
+    
+    def run_stream(self, args: str, chunk_size: int = 64 * 1024) -> Iterator[str]:
+        """
+        按块读取文件的原始内容，用于在工具链中把大文件流式传递给下一个步骤
+        
+        Args:
+            args: 文件路径
+            chunk_size: 每个数据块的字符数
+            
+        Returns:
+            文件内容数据块的迭代器，文件不存在或无法读取时抛出异常
+        """
+        file_path = args.strip()
+        normalized_path = self._normalize_path(file_path)
+        
+        if not os.path.isfile(normalized_path):
+            raise FileNotFoundError(f"文件 '{file_path}' 不存在或不是一个文件")
+        
+        logger.info(f"流式读取文件: {normalized_path}")
+        
+        with open(normalized_path, 'r', encoding='utf-8') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
 
 
 class FileWriteTool(BaseTool):
@@ -82,6 +109,7 @@ class FileWriteTool(BaseTool):
     
     允许代理写入文件内容
     """
+    cache_policy = CachePolicy.NEVER
     
     def __init__(self, base_dir: Optional[str] = None):
         """
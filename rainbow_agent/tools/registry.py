@@ -40,6 +40,8 @@ class ToolRegistry:
             self.available_tools: Dict[str, BaseTool] = {}
             # 存储分类信息
             self.categories: Dict[str, List[str]] = {}
+            # 工具实例集合的版本号，每次注册工具实例时递增
+            self.version = 0
             self._initialized = True
     
     def register(self, tool_class: Type[BaseTool]) -> None:
@@ -61,6 +63,7 @@ class ToolRegistry:
             tool: 要注册的工具实例
         """
         self.available_tools[tool.name] = tool
+        self.version += 1
         logger.info(f"注册工具实例: {tool.name}")
     
     def get_tool_class(self, name: str) -> Optional[Type[BaseTool]]:
@@ -0,0 +1,329 @@
+"""
+工具结果缓存 - 按工具缓存策略管理的结果缓存
+
+- 内存中是按条目数和字节数双重限制的LRU缓存，每个条目有自己的过期时间
+- 可选的磁盘缓存按缓存键的内容哈希存放文件，进程重启后仍然有效，只用于声明了 persistent_cache 的工具
+- 相同调用并发到达时只执行一次，其余调用等待同一个结果（single-flight）
+- 按工具统计命中率
+"""
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .base import BaseTool, CachePolicy
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    估算结果占用的字节数
+
+    Args:
+        value: 工具结果
+
+    Returns:
+        字节数
+    """
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+class _CacheEntry:
+    __slots__ = ("tool_name", "value", "expires_at", "size")
+
+    def __init__(self, tool_name: str, value: Any, expires_at: Optional[float], size: int):
+        self.tool_name = tool_name
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class ToolResultCache:
+    """
+    工具结果缓存
+
+    缓存键由工具名、工具版本、参数和（按用户缓存时的）用户ID计算得出，
+    工具升级版本后旧结果自然失效。
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 32 * 1024 * 1024,
+                 default_ttl: float = 3600, cache_dir: Optional[str] = None):
+        """
+        初始化工具结果缓存
+
+        Args:
+            max_entries: 内存中最多缓存的结果数量
+            max_bytes: 内存中缓存结果的总字节数上限
+            default_ttl: 工具未声明 cache_ttl 时的有效期（秒）
+            cache_dir: 磁盘缓存目录，None表示不使用磁盘缓存
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def make_key(self, tool: BaseTool, args: Any, user_id: Optional[str] = None) -> Optional[str]:
+        """
+        按工具的缓存策略生成缓存键
+
+        Args:
+            tool: 工具
+            args: 工具参数
+            user_id: 用户ID
+
+        Returns:
+            缓存键，工具不应缓存时返回None
+        """
+        policy = tool.cache_policy
+        if policy == CachePolicy.NEVER or (policy == CachePolicy.PER_USER and not user_id):
+            return None
+        if isinstance(args, (dict, list)):
+            args_str = json.dumps(args, sort_keys=True, ensure_ascii=False, default=str)
+        else:
+            args_str = str(args)
+        scope = user_id if policy == CachePolicy.PER_USER else ""
+        raw = "\x00".join([tool.name, str(tool.version), scope, args_str])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, tool: BaseTool, key: str) -> Tuple[bool, Any]:
+        """
+        读取缓存结果，内存未命中时读取磁盘缓存
+
+        Args:
+            tool: 工具
+            key: 缓存键
+
+        Returns:
+            (是否命中, 结果)
+        """
+        found, value = self._lookup(tool, key)
+        if not found:
+            with self._lock:
+                self._count(tool.name, "misses")
+        return found, value
+
+    def put(self, tool: BaseTool, key: str, value: Any) -> None:
+        """
+        写入缓存结果
+
+        Args:
+            tool: 工具
+            key: 缓存键
+            value: 工具结果
+        """
+        if tool.cache_policy == CachePolicy.DETERMINISTIC:
+            expires_at = None
+        else:
+            ttl = tool.cache_ttl if tool.cache_ttl is not None else self.default_ttl
+            expires_at = time.time() + ttl
+
+        with self._lock:
+            self._store(tool.name, key, value, expires_at)
+        if tool.persistent_cache and self.cache_dir:
+            self._write_disk(key, tool.name, value, expires_at)
+
+    def get_or_compute(self, tool: BaseTool, key: str,
+                       compute: Callable[[], Tuple[Any, bool]]) -> Any:
+        """
+        读取缓存，未命中时执行计算；相同缓存键的并发调用只计算一次
+
+        Args:
+            tool: 工具
+            key: 缓存键
+            compute: 计算函数，返回 (结果, 是否可缓存)，失败的结果不应缓存
+
+        Returns:
+            工具结果
+        """
+        found, value = self._lookup(tool, key)
+        if found:
+            return value
+
+        with self._lock:
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                # 查找之后可能刚有相同调用完成并写入了结果
+                found, value = self._lookup_memory(tool, key)
+                if found:
+                    return value
+                self._count(tool.name, "misses")
+                flight = self._inflight[key] = Future()
+            else:
+                self._count(tool.name, "shared")
+        if waiting is not None:
+            return waiting.result()
+
+        try:
+            value, cacheable = compute()
+            if cacheable:
+                self.put(tool, key, value)
+            flight.set_result(value)
+            return value
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def invalidate(self, tool_name: Optional[str] = None) -> int:
+        """
+        清除内存中的缓存结果，磁盘缓存不受影响
+
+        Args:
+            tool_name: 只清除该工具的结果，None表示全部清除
+
+        Returns:
+            清除的条目数量
+        """
+        with self._lock:
+            keys = [key for key, entry in self._entries.items()
+                    if tool_name is None or entry.tool_name == tool_name]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        """清除内存中的所有缓存结果"""
+        self.invalidate()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            总条目数、总字节数，以及每个工具的命中、磁盘命中、未命中、
+            并发共享、淘汰次数和命中率
+        """
+        with self._lock:
+            tools = {}
+            for tool_name, counts in self._stats.items():
+                stats = dict(counts)
+                hits = stats["hits"] + stats["disk_hits"] + stats["shared"]
+                total = hits + stats["misses"]
+                stats["hit_rate"] = hits / total if total else 0.0
+                tools[tool_name] = stats
+            return {"entries": len(self._entries), "bytes": self._bytes, "tools": tools}
+
+    def _lookup(self, tool: BaseTool, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            found, value = self._lookup_memory(tool, key)
+        if found or not (tool.persistent_cache and self.cache_dir):
+            return found, value
+
+        found, value, expires_at = self._read_disk(key, time.time())
+        if found:
+            with self._lock:
+                self._store(tool.name, key, value, expires_at)
+                self._count(tool.name, "disk_hits")
+        return found, value
+
+    def _lookup_memory(self, tool: BaseTool, key: str) -> Tuple[bool, Any]:
+        # 需持有锁
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry.expires_at is not None and entry.expires_at <= time.time():
+            self._remove(key)
+            return False, None
+        self._entries.move_to_end(key)
+        self._count(tool.name, "hits")
+        return True, entry.value
+
+    def _count(self, tool_name: str, field: str) -> None:
+        # 需持有锁
+        stats = self._stats.get(tool_name)
+        if stats is None:
+            stats = self._stats[tool_name] = {"hits": 0, "disk_hits": 0, "misses": 0,
+                                              "shared": 0, "evictions": 0}
+        stats[field] += 1
+
+    def _store(self, tool_name: str, key: str, value: Any, expires_at: Optional[float]) -> None:
+        # 需持有锁
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _CacheEntry(tool_name, value, expires_at, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key, oldest = next(iter(self._entries.items()))
+            self._remove(oldest_key)
+            self._count(oldest.tool_name, "evictions")
+
+    def _remove(self, key: str) -> None:
+        # 需持有锁
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str, now: float) -> Tuple[bool, Any, Optional[float]]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return False, None, None
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取工具磁盘缓存失败 {path}: {e}")
+            return False, None, None
+
+        expires_at = record.get("expires_at")
+        if expires_at is not None and expires_at <= now:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return False, None, None
+        return True, record.get("value"), expires_at
+
+    def _write_disk(self, key: str, tool_name: str, value: Any, expires_at: Optional[float]) -> None:
+        path = self._disk_path(key)
+        try:
+            data = json.dumps({"tool": tool_name, "expires_at": expires_at, "value": value}, ensure_ascii=False)
+        except (TypeError, ValueError):
+            logger.warning(f"工具 '{tool_name}' 的结果无法序列化，不写入磁盘缓存")
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再替换，其他进程不会读到写了一半的文件
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        except OSError as e:
+            logger.warning(f"写入工具磁盘缓存失败 {path}: {e}")
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if not isinstance(e, OSError):
+                raise
+            logger.warning(f"写入工具磁盘缓存失败 {path}: {e}")
@@ -0,0 +1,155 @@
+"""
+工具调用解析器 - 预编译的工具调用匹配
+
+所有模式在模块加载时编译一次，与工具数量无关：
+- 直接指示格式先匹配“使用工具”等前缀，再用哈希表检查紧随其后的词是否是工具名
+- JSON格式用 json.JSONDecoder.raw_decode 从每个 { 开始解析，支持嵌套参数
+- 已经结构化的调用（字典、OpenAI 的 function_call / tool_calls）直接读取，不经过正则
+"""
+import json
+import re
+from typing import Any, Dict, Iterable, Optional
+
+# 直接指示格式: 我需要使用工具：mock_tool 测试参数
+_DIRECT_PATTERN = re.compile(
+    r'(?:我需要使用工具[:：]?|使用工具[:：]?|调用工具[:：]?|工具|'
+    r'use\s+tool\s*[:：]?|call\s+tool\s*[:：]?)\s*(\S+)(?=\s)',
+    re.IGNORECASE
+)
+_ARGS_PATTERN = re.compile(r'\s+(.*)')
+
+# 函数式格式: tool_name(arg1, arg2, ...)
+_FUNC_PATTERN = re.compile(r'(\w+)\s*\((.*?)\)')
+
+# 简单文本格式: 使用工具：tool_name: arg1, arg2, ...
+_SIMPLE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'使用工具[:：]\s*(\w+)[:：]\s*(.*)',
+        r'调用工具[:：]\s*(\w+)[:：]\s*(.*)',
+        r'工具调用[:：]\s*(\w+)[:：]\s*(.*)',
+        r'[Uu]se tool:\s*(\w+)[:：]?\s*(.*)',
+        r'[Cc]all tool:\s*(\w+)[:：]?\s*(.*)'
+    )
+]
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+class ToolCallParser:
+    """
+    针对一组工具名预先构建的工具调用解析器
+
+    工具集合变化时重新创建即可，创建只需建立工具名的哈希表。
+    """
+
+    def __init__(self, tool_names: Iterable[str]):
+        """
+        初始化解析器
+
+        Args:
+            tool_names: 工具名称，按注册顺序
+        """
+        self.tool_names = set()
+        self._names_lower = {}
+        for name in tool_names:
+            self.tool_names.add(name)
+            # 大小写不同的重名工具以先注册的为准
+            self._names_lower.setdefault(name.lower(), name)
+
+    def __len__(self) -> int:
+        return len(self.tool_names)
+
+    def parse(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        从文本中解析工具调用
+
+        依次尝试直接指示格式、函数式格式、JSON格式和简单文本格式。
+        直接指示格式中出现多个工具时返回文本中最靠前的一个。
+
+        Args:
+            text: 包含工具调用的文本
+
+        Returns:
+            {"tool_name": 工具名, "tool_args": 参数字符串}，或None表示无工具调用
+        """
+        if not self.tool_names or not text:
+            return None
+
+        return (self._parse_direct(text) or self._parse_function(text) or
+                self._parse_json(text) or self._parse_simple(text))
+
+    def parse_structured(self, data: Any) -> Optional[Dict[str, Any]]:
+        """
+        读取结构化的工具调用
+
+        支持 {"name": ..., "args": {...}}、OpenAI 的 {"name": ..., "arguments": "..."}，
+        以及外层的 {"function": {...}}、{"function_call": {...}}、{"tool_calls": [...]}。
+
+        Args:
+            data: 工具调用数据
+
+        Returns:
+            {"tool_name": 工具名, "tool_args": 参数字符串}，或None表示不是已知工具的调用
+        """
+        if not isinstance(data, dict):
+            return None
+        if isinstance(data.get("tool_calls"), list) and data["tool_calls"]:
+            return self.parse_structured(data["tool_calls"][0])
+        for wrapper in ("function_call", "function"):
+            if isinstance(data.get(wrapper), dict):
+                return self.parse_structured(data[wrapper])
+
+        tool_name = data.get("name")
+        if not isinstance(tool_name, str) or tool_name not in self.tool_names:
+            return None
+
+        args = data.get("args", data.get("arguments"))
+        if isinstance(args, dict):
+            args_str = json.dumps(args)
+        elif isinstance(args, str):
+            args_str = args
+        else:
+            args_str = ""
+        return {"tool_name": tool_name, "tool_args": args_str}
+
+    def _parse_direct(self, text: str) -> Optional[Dict[str, Any]]:
+        pos = 0
+        while True:
+            match = _DIRECT_PATTERN.search(text, pos)
+            if not match:
+                return None
+            tool_name = self._names_lower.get(match.group(1).lower())
+            if tool_name is not None:
+                args = _ARGS_PATTERN.match(text, match.end())
+                return {"tool_name": tool_name, "tool_args": args.group(1).strip()}
+            # 从下一个字符继续，以免跳过嵌在不匹配候选中的前缀
+            pos = match.start() + 1
+
+    def _parse_function(self, text: str) -> Optional[Dict[str, Any]]:
+        match = _FUNC_PATTERN.search(text)
+        if match and match.group(1) in self.tool_names:
+            return {"tool_name": match.group(1), "tool_args": match.group(2).strip()}
+        return None
+
+    def _parse_json(self, text: str) -> Optional[Dict[str, Any]]:
+        start = text.find("{")
+        while start != -1:
+            try:
+                data, end = _JSON_DECODER.raw_decode(text, start)
+            except ValueError:
+                start = text.find("{", start + 1)
+                continue
+            result = self.parse_structured(data)
+            if result is not None:
+                return result
+            # 跳过已解析的对象，不把其中嵌套的参数当作工具调用
+            start = text.find("{", end)
+        return None
+
+    def _parse_simple(self, text: str) -> Optional[Dict[str, Any]]:
+        for pattern in _SIMPLE_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                if match.group(1) in self.tool_names:
+                    return {"tool_name": match.group(1), "tool_args": match.group(2).strip()}
+        return None
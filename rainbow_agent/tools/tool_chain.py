@@ -2,24 +2,36 @@
 工具链 - 用于组合多个工具按顺序执行
 
 借鉴LangChain的链式概念，允许多个工具按顺序或条件执行，
-支持工具组合和结果缓存，提高工具调用的灵活性和效率。
+支持工具组合和按各工具缓存策略的结果缓存（ToolResultCache），提高工具调用的灵活性和效率。
+ParallelToolChain按步骤之间的数据依赖组成有向无环图，
+在共享执行运行时上并发执行互不依赖的步骤，并支持在步骤之间流式传递中间结果。
 """
-from typing import List, Dict, Any, Optional, Union, Callable
+from typing import List, Dict, Any, Optional, Union, Callable, Iterator
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 import json
-import hashlib
+import queue
+import threading
 import time
 from .base import BaseTool
+from .result_cache import ToolResultCache
 from ..utils.logger import get_logger
+from ..utils.runtime import PoolType, get_runtime
 
 logger = get_logger(__name__)
 
+# 流式通道检查关闭状态的间隔（秒）
+_POLL_INTERVAL = 0.05
+_END_OF_STREAM = object()
+
 class ToolChain:
     """
     工具链，用于组合多个工具按顺序执行
     """
     
     def __init__(self, name: str, description: str, tools: List[BaseTool] = None, 
-                 use_cache: bool = True, cache_ttl: int = 3600):
+                 use_cache: bool = True, cache_ttl: int = 3600,
+                 cache_max_entries: int = 1000, results_cache: Optional[ToolResultCache] = None):
         """
         初始化工具链
         
@@ -27,15 +39,17 @@ class ToolChain:
             name: 工具链名称
             description: 工具链描述
             tools: 工具链中的工具列表
-            use_cache: 是否使用缓存
-            cache_ttl: 缓存有效期（秒）
+            use_cache: 是否使用缓存，工具按各自声明的缓存策略缓存结果
+            cache_ttl: 工具未声明 cache_ttl 时的缓存有效期（秒）
+            cache_max_entries: 最多缓存的工具结果数量
+            results_cache: 共享的工具结果缓存（如ToolInvoker的缓存），默认为工具链单独创建
         """
         self.name = name
         self.description = description
         self.tools = tools or []
         self.use_cache = use_cache
         self.cache_ttl = cache_ttl
-        self.results_cache = {}  # 缓存结构: {cache_key: (result, timestamp)}
+        self.results_cache = results_cache or ToolResultCache(max_entries=cache_max_entries, default_ttl=cache_ttl)
         
         logger.info(f"工具链 '{name}' 初始化完成，包含 {len(self.tools)} 个工具")
     
@@ -49,63 +63,22 @@ class ToolChain:
         self.tools.append(tool)
         logger.info(f"工具 '{tool.name}' 已添加到工具链 '{self.name}'")
     
-    def _generate_cache_key(self, tool_name: str, args: Any) -> str:
+    def _run_tool(self, tool: BaseTool, args: Any, user_id: Optional[str] = None) -> Any:
         """
-        生成缓存键
+        按工具的缓存策略执行工具：命中缓存时直接返回，相同调用并发时只执行一次
         
         Args:
-            tool_name: 工具名称
+            tool: 工具
             args: 工具参数
+            user_id: 用户ID，用于按用户缓存的工具
             
         Returns:
-            缓存键
+            工具执行结果
         """
-        # 将参数转换为字符串并计算哈希值
-        args_str = str(args)
-        return f"{tool_name}:{hashlib.md5(args_str.encode()).hexdigest()}"
-    
-    def _get_from_cache(self, tool_name: str, args: Any) -> Optional[str]:
-        """
-        从缓存中获取结果
-        
-        Args:
-            tool_name: 工具名称
-            args: 工具参数
-            
-        Returns:
-            缓存的结果，如果没有缓存或缓存过期则返回None
-        """
-        if not self.use_cache:
-            return None
-            
-        cache_key = self._generate_cache_key(tool_name, args)
-        if cache_key in self.results_cache:
-            result, timestamp = self.results_cache[cache_key]
-            # 检查缓存是否过期
-            if time.time() - timestamp <= self.cache_ttl:
-                logger.info(f"工具 '{tool_name}' 命中缓存")
-                return result
-            else:
-                # 删除过期缓存
-                del self.results_cache[cache_key]
-                
-        return None
-    
-    def _add_to_cache(self, tool_name: str, args: Any, result: str) -> None:
-        """
-        添加结果到缓存
-        
-        Args:
-            tool_name: 工具名称
-            args: 工具参数
-            result: 工具执行结果
-        """
-        if not self.use_cache:
-            return
-            
-        cache_key = self._generate_cache_key(tool_name, args)
-        self.results_cache[cache_key] = (result, time.time())
-        logger.info(f"工具 '{tool_name}' 结果已缓存")
+        cache_key = self.results_cache.make_key(tool, args, user_id) if self.use_cache else None
+        if cache_key is None:
+            return tool.run(args)
+        return self.results_cache.get_or_compute(tool, cache_key, lambda: (tool.run(args), True))
     
     def execute(self, input_data: Any, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -129,15 +102,8 @@ class ToolChain:
             for i, tool in enumerate(self.tools):
                 logger.info(f"执行工具链 '{self.name}' 中的第 {i+1}/{len(self.tools)} 个工具: '{tool.name}'")
                 
-                # 尝试从缓存获取结果
-                cached_result = self._get_from_cache(tool.name, current_input)
-                if cached_result is not None:
-                    result = cached_result
-                else:
-                    # 执行工具
-                    result = tool.run(current_input)
-                    # 缓存结果
-                    self._add_to_cache(tool.name, current_input, result)
+                # 按工具的缓存策略执行
+                result = self._run_tool(tool, current_input, context.get("user_id"))
                 
                 # 记录结果
                 results.append({
@@ -210,6 +176,400 @@ class ConditionalToolChain(ToolChain):
         # 条件满足，执行工具链
         return super().execute(input_data, context)
 
+class ChainStep:
+    """
+    并行工具链中的一个步骤
+    """
+    
+    def __init__(self, step_id: str, tool: BaseTool, depends_on: List[str] = None,
+                 input_builder: Callable[[Dict[str, Any], Any], Any] = None,
+                 timeout: Optional[float] = None, stream: bool = False):
+        """
+        初始化步骤
+        
+        Args:
+            step_id: 步骤ID，在工具链内唯一
+            tool: 步骤执行的工具
+            depends_on: 依赖的步骤ID列表，这些步骤的输出是本步骤的输入
+            input_builder: 根据依赖步骤的输出 {步骤ID: 输出} 和工具链的输入生成工具参数的函数，
+                默认没有依赖时使用工具链的输入，只有一个依赖时使用该依赖的输出，否则使用输出字典
+            timeout: 步骤的超时时间（秒），None表示不限制
+            stream: 是否通过工具的run_stream把结果流式传递给下游步骤，
+                下游步骤收到数据块的迭代器，并且与本步骤同时开始执行
+        """
+        self.step_id = step_id
+        self.tool = tool
+        self.depends_on = list(depends_on or [])
+        self.input_builder = input_builder
+        self.timeout = timeout
+        self.stream = stream
+
+
+class _StreamChannel:
+    """
+    流式步骤到单个下游步骤的数据通道
+    
+    生产者逐块写入，消费者按顺序迭代，maxsize为0时不限制缓冲的数据块数量。
+    通道关闭后写入被丢弃，关闭时附带的异常会在消费者迭代时抛出。
+    """
+    
+    def __init__(self, maxsize: int = 0):
+        self._queue = queue.Queue(maxsize)
+        self._closed = False
+        self._error: Optional[BaseException] = None
+    
+    def put(self, chunk: Any) -> bool:
+        """写入数据块，缓冲区已满时等待消费者读取，通道已关闭时返回False"""
+        while not self._closed:
+            try:
+                self._queue.put(chunk, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def finish(self) -> None:
+        """标记数据已全部写入"""
+        self.put(_END_OF_STREAM)
+    
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """关闭通道，error不为None时消费者会收到该异常"""
+        self._error = error
+        self._closed = True
+    
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            if self._closed and self._error is not None:
+                raise self._error
+            try:
+                chunk = self._queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            if chunk is _END_OF_STREAM:
+                return
+            yield chunk
+
+
+class ParallelToolChain(ToolChain):
+    """
+    并行工具链，按步骤之间声明的数据依赖组成有向无环图执行
+    
+    依赖都已完成的步骤在共享执行运行时的工具线程池上并发执行，总耗时接近关键路径
+    而不是所有步骤耗时之和。支持扇出/扇入、每个步骤的超时和整个工具链的超时；
+    流式步骤与下游步骤同时执行，中间结果以数据块迭代器的形式传递而不必完整地保存在内存中。
+    流式步骤和它的下游步骤必须同时占用线程，因此它们不使用共享线程池，
+    而是在每次执行时创建的、线程数等于这些步骤数量的专用线程池中执行。
+    失败或超时的步骤的下游步骤会被跳过，超时的步骤无法被强制中断，其结果会被丢弃。
+    """
+    
+    def __init__(self, name: str, description: str, tools: List[BaseTool] = None,
+                 timeout: Optional[float] = None, stream_buffer: int = 16,
+                 max_stream_workers: int = 32, **kwargs):
+        """
+        初始化并行工具链
+        
+        Args:
+            name: 工具链名称
+            description: 工具链描述
+            tools: 按顺序依次依赖的工具列表，与ToolChain的行为相同
+            timeout: 整个工具链的超时时间（秒），None表示不限制
+            stream_buffer: 流式步骤与同时开始的下游步骤之间最多缓冲的数据块数量
+            max_stream_workers: 流式步骤及其下游步骤最多占用的专用线程数，
+                超过时添加步骤会直接失败，而不是在执行时因线程不足而死锁
+            **kwargs: 传递给ToolChain的其他参数
+        """
+        self.steps: "OrderedDict[str, ChainStep]" = OrderedDict()
+        self.timeout = timeout
+        self.stream_buffer = stream_buffer
+        self.max_stream_workers = max_stream_workers
+        super().__init__(name, description, **kwargs)
+        self.executor = get_runtime().executor(PoolType.TOOL, owner=f"chain:{name}")
+        for tool in tools or []:
+            self.add_tool(tool)
+    
+    def add_step(self, step_id: str, tool: BaseTool, depends_on: List[str] = None,
+                 input_builder: Callable[[Dict[str, Any], Any], Any] = None,
+                 timeout: Optional[float] = None, stream: bool = False) -> ChainStep:
+        """
+        添加步骤，依赖的步骤必须已经添加，因此步骤之间不会形成环
+        
+        Args:
+            step_id: 步骤ID
+            tool: 步骤执行的工具
+            depends_on: 依赖的步骤ID列表
+            input_builder: 生成工具参数的函数，参见ChainStep
+            timeout: 步骤的超时时间（秒）
+            stream: 是否把结果流式传递给下游步骤
+            
+        Returns:
+            添加的步骤
+        """
+        if step_id in self.steps:
+            raise ValueError(f"步骤 '{step_id}' 已存在")
+        missing = [dep for dep in depends_on or [] if dep not in self.steps]
+        if missing:
+            raise ValueError(f"步骤 '{step_id}' 依赖的步骤不存在: {', '.join(missing)}")
+        
+        step = ChainStep(step_id, tool, depends_on, input_builder, timeout, stream)
+        self.steps[step_id] = step
+        stream_steps = self._stream_steps()
+        if len(stream_steps) > self.max_stream_workers:
+            del self.steps[step_id]
+            raise ValueError(f"流式步骤及其下游步骤共 {len(stream_steps)} 个，"
+                             f"超过了 max_stream_workers={self.max_stream_workers}")
+        self.tools.append(tool)
+        logger.info(f"步骤 '{step_id}' ({tool.name}) 已添加到工具链 '{self.name}'，依赖: {step.depends_on}")
+        return step
+    
+    def _stream_steps(self) -> List[str]:
+        """
+        返回需要同时执行的流式步骤（有下游步骤的流式步骤及其下游步骤）
+        
+        Returns:
+            步骤ID列表
+        """
+        producers = {step.step_id for step in self.steps.values() if step.stream} & {
+            dep for step in self.steps.values() for dep in step.depends_on
+        }
+        return [step_id for step_id, step in self.steps.items()
+                if step_id in producers or producers.intersection(step.depends_on)]
+    
+    def add_tool(self, tool: BaseTool) -> None:
+        """
+        添加依赖上一个步骤的工具，以工具名称作为步骤ID
+        
+        Args:
+            tool: 要添加的工具
+        """
+        step_id = tool.name
+        index = 2
+        while step_id in self.steps:
+            step_id = f"{tool.name}_{index}"
+            index += 1
+        previous = next(reversed(self.steps)) if self.steps else None
+        self.add_step(step_id, tool, depends_on=[previous] if previous else None)
+    
+    def execute(self, input_data: Any, context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        执行并行工具链
+        
+        Args:
+            input_data: 输入数据，作为没有依赖的步骤的输入
+            context: 上下文信息
+            
+        Returns:
+            工具链执行结果，final_result为没有下游步骤的步骤的输出，有多个这样的步骤时为
+            {步骤ID: 输出} 字典；steps按添加顺序记录每个步骤的状态
+            （completed、failed、timeout或skipped）、输出、错误和耗时
+        """
+        if not self.steps:
+            return {"error": "工具链为空"}
+        
+        start = time.time()
+        user_id = (context or {}).get("user_id")
+        chain_deadline = None if self.timeout is None else start + self.timeout
+        dependents = {step_id: [] for step_id in self.steps}
+        for step in self.steps.values():
+            for dep in step.depends_on:
+                dependents[dep].append(step.step_id)
+        # 没有下游步骤的流式步骤按普通步骤执行
+        streamed = {step_id for step_id, step in self.steps.items() if step.stream and dependents[step_id]}
+        # 流式步骤和它的下游步骤各占一个专用线程，保证它们能够同时执行
+        stream_steps = set(self._stream_steps())
+        stream_executor = ThreadPoolExecutor(
+            max_workers=len(stream_steps), thread_name_prefix=f"chain-{self.name}"
+        ) if stream_steps else None
+        
+        unmet = {step_id: set(step.depends_on) for step_id, step in self.steps.items() if step.depends_on}
+        ready = deque(step_id for step_id, step in self.steps.items() if not step.depends_on)
+        outputs: Dict[str, Any] = {}
+        records: Dict[str, Dict[str, Any]] = {}
+        channels: Dict[tuple, _StreamChannel] = {}  # {(生产者ID, 消费者ID): 通道}
+        running: Dict[Future, str] = {}
+        started: Dict[str, float] = {}
+        deadlines: Dict[str, float] = {}
+        
+        def record(step_id: str, status: str, output: Any = None, error: str = None) -> None:
+            records[step_id] = {
+                "step_id": step_id,
+                "tool_name": self.steps[step_id].tool.name,
+                "status": status,
+                "output": output,
+                "error": error,
+                "elapsed": time.time() - started[step_id] if step_id in started else 0.0
+            }
+        
+        def satisfy(dep: str, step_id: str) -> None:
+            if step_id in unmet:
+                unmet[step_id].discard(dep)
+                if not unmet[step_id]:
+                    del unmet[step_id]
+                    ready.append(step_id)
+        
+        def stop(step_id: str, status: str, error: BaseException) -> None:
+            # 结束失败或超时的步骤：关闭相关的流式通道，并跳过尚未开始的下游步骤
+            record(step_id, status, error=str(error))
+            for (producer, consumer), channel in channels.items():
+                if producer == step_id:
+                    channel.close(error)
+                elif consumer == step_id:
+                    channel.close()
+            pending = list(dependents[step_id])
+            while pending:
+                child = pending.pop()
+                if child in unmet:
+                    del unmet[child]
+                    record(child, "skipped", error=f"依赖的步骤 '{step_id}' 未成功完成")
+                    for (producer, consumer), channel in channels.items():
+                        if consumer == child:
+                            channel.close()
+                    pending.extend(dependents[child])
+        
+        while ready or running:
+            while ready:
+                step_id = ready.popleft()
+                step = self.steps[step_id]
+                inputs = {dep: iter(channels[(dep, step_id)]) if dep in streamed else outputs[dep]
+                          for dep in step.depends_on}
+                outgoing = None
+                if step_id in streamed:
+                    # 流式步骤开始后，下游步骤不必等待它完成
+                    for consumer in dependents[step_id]:
+                        satisfy(step_id, consumer)
+                    # 同时开始的下游步骤使用有界缓冲形成背压，仍在等待其他依赖的下游步骤
+                    # 使用无界缓冲，避免生产者因下游尚未开始而阻塞
+                    outgoing = []
+                    for consumer in dependents[step_id]:
+                        channel = _StreamChannel(self.stream_buffer if consumer in ready else 0)
+                        if consumer in records:
+                            channel.close()
+                        channels[(step_id, consumer)] = channel
+                        outgoing.append(channel)
+                
+                logger.info(f"执行工具链 '{self.name}' 中的步骤 '{step_id}': '{step.tool.name}'")
+                started[step_id] = time.time()
+                if step.timeout is not None:
+                    deadlines[step_id] = started[step_id] + step.timeout
+                executor = stream_executor if step_id in stream_steps else self.executor
+                running[executor.submit(self._run_step, step, inputs, input_data, outgoing, user_id)] = step_id
+            
+            limits = [deadlines[step_id] for step_id in running.values() if step_id in deadlines]
+            if chain_deadline is not None:
+                limits.append(chain_deadline)
+            wait_time = max(0.0, min(limits) - time.time()) if limits else None
+            done, _ = wait(list(running), timeout=wait_time, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                step_id = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"工具链 '{self.name}' 中的步骤 '{step_id}' 执行错误: {e}")
+                    stop(step_id, "failed", e)
+                    continue
+                if step_id in streamed:
+                    record(step_id, "completed")
+                    records[step_id]["chunks"] = result
+                else:
+                    outputs[step_id] = result
+                    record(step_id, "completed", output=result)
+                    for consumer in dependents[step_id]:
+                        satisfy(step_id, consumer)
+                # 下游步骤可能没有读完输入流，关闭通道使生产者停止写入
+                for (producer, consumer), channel in channels.items():
+                    if consumer == step_id:
+                        channel.close()
+            
+            now = time.time()
+            for future, step_id in list(running.items()):
+                if step_id in deadlines and now >= deadlines[step_id]:
+                    del running[future]
+                    future.cancel()
+                    logger.warning(f"工具链 '{self.name}' 中的步骤 '{step_id}' 超时")
+                    stop(step_id, "timeout",
+                         TimeoutError(f"步骤 '{step_id}' 超过 {self.steps[step_id].timeout} 秒未完成"))
+            
+            if chain_deadline is not None and now >= chain_deadline and (running or ready):
+                logger.warning(f"工具链 '{self.name}' 超时")
+                error = TimeoutError(f"工具链超过 {self.timeout} 秒未完成")
+                for future, step_id in list(running.items()):
+                    future.cancel()
+                    stop(step_id, "timeout", error)
+                running.clear()
+                break
+        
+        if stream_executor is not None:
+            stream_executor.shutdown(wait=False)
+        for step_id in self.steps:
+            if step_id not in records:
+                record(step_id, "skipped", error="工具链超时")
+        
+        steps = [records[step_id] for step_id in self.steps]
+        sinks = [step_id for step_id in self.steps if not dependents[step_id]]
+        final_result = records[sinks[0]]["output"] if len(sinks) == 1 else {
+            step_id: records[step_id]["output"] for step_id in sinks
+        }
+        result = {
+            "chain_name": self.name,
+            "final_result": final_result,
+            "steps": steps,
+            "elapsed": time.time() - start
+        }
+        failed = [step for step in steps if step["status"] in ("failed", "timeout")]
+        if failed:
+            result["error"] = f"步骤 '{failed[0]['step_id']}' 未完成: {failed[0]['error']}"
+        logger.info(f"工具链 '{self.name}' 执行完成，耗时 {result['elapsed']:.3f} 秒")
+        return result
+    
+    def _run_step(self, step: ChainStep, inputs: Dict[str, Any], input_data: Any,
+                  channels: Optional[List[_StreamChannel]], user_id: Optional[str] = None) -> Any:
+        """
+        在工作线程中执行单个步骤
+        
+        Args:
+            step: 要执行的步骤
+            inputs: 依赖步骤的输出，流式依赖为数据块迭代器
+            input_data: 工具链的输入
+            channels: 流式步骤写入的通道，普通步骤为None
+            user_id: 用户ID，用于按用户缓存的工具
+            
+        Returns:
+            工具的执行结果，流式步骤返回产生的数据块数量
+        """
+        if step.input_builder is not None:
+            args = step.input_builder(inputs, input_data)
+        elif not step.depends_on:
+            args = input_data
+        elif len(step.depends_on) == 1:
+            args = inputs[step.depends_on[0]]
+        else:
+            args = inputs
+        
+        if channels is None:
+            # 输入中含有数据流时参数无法作为缓存键
+            if any(isinstance(value, Iterator) for value in inputs.values()):
+                return step.tool.run(args)
+            return self._run_tool(step.tool, args, user_id)
+        
+        chunks = 0
+        try:
+            for chunk in step.tool.run_stream(args):
+                chunks += 1
+                delivered = [channel.put(chunk) for channel in channels]
+                if not any(delivered):
+                    logger.info(f"步骤 '{step.step_id}' 的下游步骤都已结束，停止产生数据")
+                    break
+        except BaseException as e:
+            for channel in channels:
+                channel.close(e)
+            raise
+        for channel in channels:
+            channel.finish()
+        return chunks
+
+
 class BranchingToolChain:
     """
     分支工具链，支持基于条件选择不同的执行路径
@@ -217,7 +577,7 @@ class BranchingToolChain:
     
     def __init__(self, name: str, description: str, 
                  branches: Dict[str, Dict[str, Any]] = None,
-                 default_branch: str = None):
+                 default_branch: str = None, parallel: bool = False):
         """
         初始化分支工具链
         
@@ -229,11 +589,13 @@ class BranchingToolChain:
                 "chain": 工具链对象
             }}
             default_branch: 默认分支名称
+            parallel: 为True时并发执行所有满足条件的分支，否则只执行第一个满足条件的分支
         """
         self.name = name
         self.description = description
         self.branches = branches or {}
         self.default_branch = default_branch
+        self.parallel = parallel
         
         logger.info(f"分支工具链 '{name}' 初始化完成，包含 {len(self.branches)} 个分支")
     
@@ -275,10 +637,13 @@ class BranchingToolChain:
             context: 上下文信息
             
         Returns:
-            选定分支的执行结果
+            选定分支的执行结果，并发执行时为 {"branches": 分支名列表, "results": {分支名: 结果}}
         """
         context = context or {}
         
+        if self.parallel:
+            return self._execute_parallel(input_data, context)
+        
         # 查找满足条件的分支
         for branch_name, branch_config in self.branches.items():
             condition = branch_config["condition"]
@@ -309,3 +674,54 @@ class BranchingToolChain:
             "chain_name": self.name,
             "error": "没有满足条件的分支且没有默认分支"
         }
+    
+    def _execute_parallel(self, input_data: Any, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        并发执行所有满足条件的分支，没有满足条件的分支时执行默认分支
+        
+        Args:
+            input_data: 输入数据
+            context: 上下文信息
+            
+        Returns:
+            各分支的执行结果
+        """
+        matched = [branch_name for branch_name, branch_config in self.branches.items()
+                   if branch_config["condition"](input_data, context)]
+        if not matched and self.default_branch and self.default_branch in self.branches:
+            matched = [self.default_branch]
+        if not matched:
+            logger.warning(f"分支工具链 '{self.name}' 没有满足条件的分支且没有默认分支")
+            return {
+                "chain_name": self.name,
+                "error": "没有满足条件的分支且没有默认分支"
+            }
+        
+        logger.info(f"分支工具链 '{self.name}' 并发执行分支: {matched}")
+        results = {}
+        
+        def run_branch(branch_name: str) -> None:
+            try:
+                results[branch_name] = self.branches[branch_name]["chain"].execute(input_data, context)
+            except Exception as e:
+                logger.error(f"分支工具链 '{self.name}' 的分支 '{branch_name}' 执行错误: {e}")
+                results[branch_name] = {"error": str(e)}
+        
+        # 分支只是等待各自工具链的步骤完成，在专用线程中协调，
+        # 不占用共享线程池的工作线程，避免与分支提交的步骤争用线程而死锁
+        threads = [
+            threading.Thread(target=run_branch, args=(branch_name,),
+                             name=f"chain-{self.name}-{branch_name}", daemon=True)
+            for branch_name in matched[1:]
+        ]
+        for thread in threads:
+            thread.start()
+        run_branch(matched[0])
+        for thread in threads:
+            thread.join()
+        
+        return {
+            "chain_name": self.name,
+            "branches": matched,
+            "results": {branch_name: results[branch_name] for branch_name in matched}
+        }
@@ -2,14 +2,15 @@
 from typing import Dict, Any, List, Tuple, Optional, Union
 import re
 import json
-import time
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from concurrent.futures import TimeoutError
 from .base import BaseTool
 from .tool_executor import ToolExecutor
+from .result_cache import ToolResultCache
 from .tool_chain import ToolChain, ConditionalToolChain, BranchingToolChain
 from ..core.tool_selector import ToolSelector, SelectionStrategy
 from ..utils.llm import get_llm_client
 from ..utils.logger import get_logger
+from ..utils.runtime import PoolType, get_runtime
 
 logger = get_logger(__name__)
 
@@ -17,7 +18,8 @@ class ToolInvoker:
     """
     工具调用器，负责决策是否调用工具以及执行工具调用
     
-    支持单个工具调用和工具链调用，提供缓存和组合能力
+    支持单个工具调用和工具链调用，提供缓存和组合能力。
+    工具结果按各工具声明的缓存策略（BaseTool.cache_policy）缓存
     """
     
     def __init__(
@@ -30,7 +32,11 @@ class ToolInvoker:
         use_cache: bool = True,
         cache_ttl: int = 3600,
         tool_selection_strategy: SelectionStrategy = SelectionStrategy.HYBRID,
-        confidence_threshold: float = 0.6
+        confidence_threshold: float = 0.6,
+        cache_max_entries: int = 1000,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+        cache_dir: Optional[str] = None,
+        owner: Optional[str] = None
     ):
         """
         初始化工具调用器
@@ -42,7 +48,11 @@ class ToolInvoker:
             timeout: 工具执行超时时间（秒）
             use_llm_for_decision: 是否使用LLM进行工具调用决策
             use_cache: 是否使用缓存
-            cache_ttl: 缓存有效期（秒）
+            cache_ttl: 工具未声明 cache_ttl 时的缓存有效期（秒）
+            cache_max_entries: 内存中最多缓存的工具结果数量
+            cache_max_bytes: 内存中缓存的工具结果总字节数上限
+            cache_dir: 磁盘缓存目录，声明了 persistent_cache 的工具结果会写入该目录，None表示不使用
+            owner: 工具执行任务的所属方，用于共享运行时的并发限制和统计
         """
         self.tools = tools or []
         self.tools_by_name = {tool.name: tool for tool in self.tools}
@@ -53,7 +63,7 @@ class ToolInvoker:
         self.use_cache = use_cache
         self.cache_ttl = cache_ttl
         self.confidence_threshold = confidence_threshold
-        self.executor = ThreadPoolExecutor(max_workers=10)
+        self.executor = get_runtime().executor(PoolType.TOOL, owner=owner)
         self.tool_executor = ToolExecutor(self.tools)
         
         # 创建工具选择器
@@ -67,7 +77,12 @@ class ToolInvoker:
         
         # 工具链相关
         self.tool_chains = {}
-        self.results_cache = {}  # 缓存结构: {cache_key: (result, timestamp)}
+        self.results_cache = ToolResultCache(
+            max_entries=cache_max_entries,
+            max_bytes=cache_max_bytes,
+            default_ttl=cache_ttl,
+            cache_dir=cache_dir
+        )
         
         logger.info(f"ToolInvoker初始化完成，加载了 {len(self.tools)} 个工具")
     
@@ -134,12 +149,13 @@ class ToolInvoker:
         logger.info("判断不需要工具调用")
         return False, None
     
-    def invoke_tool(self, tool_info: Dict[str, Any]) -> str:
+    def invoke_tool(self, tool_info: Dict[str, Any], user_id: Optional[str] = None) -> str:
         """
         执行工具调用
         
         Args:
-            tool_info: 工具调用信息
+            tool_info: 工具调用信息，可以包含 user_id
+            user_id: 用户ID，用于按用户缓存的工具
             
         Returns:
             工具执行结果
@@ -151,32 +167,42 @@ class ToolInvoker:
         if tool_name not in self.tools_by_name:
             return f"错误: 找不到名为 '{tool_name}' 的工具"
             
-        # 尝试从缓存获取结果
-        cached_result = self._get_from_cache(tool_name, tool_args)
-        if cached_result is not None:
-            return cached_result
-            
         tool = self.tools_by_name[tool_name]
+        cache_key = None
+        if self.use_cache:
+            cache_key = self.results_cache.make_key(tool, tool_args, user_id or tool_info.get("user_id"))
+        if cache_key is None:
+            result, _ = self._run_tool(tool, tool_args)
+            return result
         
+        # 命中缓存时直接返回，相同调用并发时只执行一次
+        return self.results_cache.get_or_compute(tool, cache_key, lambda: self._run_tool(tool, tool_args))
+    
+    def _run_tool(self, tool: BaseTool, tool_args: Any) -> Tuple[Any, bool]:
+        """
+        带超时控制地执行工具
+        
+        Args:
+            tool: 工具
+            tool_args: 工具参数
+            
+        Returns:
+            (执行结果或错误信息, 是否执行成功)
+        """
         try:
-            # 尝试执行工具，添加超时控制
-            logger.info(f"开始执行工具 '{tool_name}'，参数: {tool_args}")
+            logger.info(f"开始执行工具 '{tool.name}'，参数: {tool_args}")
             future = self.executor.submit(tool.run, tool_args)
             result = future.result(timeout=self.timeout)
-            logger.info(f"工具 '{tool_name}' 执行成功")
-            
-            # 缓存结果
-            self._add_to_cache(tool_name, tool_args, result)
-            
-            return result
+            logger.info(f"工具 '{tool.name}' 执行成功")
+            return result, True
         except TimeoutError:
-            error_msg = f"工具 '{tool_name}' 执行超时 (>{self.timeout}秒)"
+            error_msg = f"工具 '{tool.name}' 执行超时 (>{self.timeout}秒)"
             logger.error(error_msg)
-            return error_msg
+            return error_msg, False
         except Exception as e:
-            error_msg = f"工具 '{tool_name}' 执行失败: {str(e)}"
-            logger.error(f"工具 '{tool_name}' 执行错误: {e}")
-            return error_msg
+            error_msg = f"工具 '{tool.name}' 执行失败: {str(e)}"
+            logger.error(f"工具 '{tool.name}' 执行错误: {e}")
+            return error_msg, False
     
     def _rule_based_filter(self, user_input: str) -> bool:
         """使用规则快速过滤不需要工具的查询"""
@@ -341,61 +367,11 @@ class ToolInvoker:
             return {"error": f"工具链 '{chain_name}' 执行失败: {str(e)}"}
     
     # 缓存相关方法
-    def _generate_cache_key(self, tool_name: str, args: Any) -> str:
+    def get_cache_stats(self) -> Dict[str, Any]:
         """
-        生成缓存键
+        获取工具结果缓存统计
         
-        Args:
-            tool_name: 工具名称
-            args: 工具参数
-            
         Returns:
-            缓存键
+            缓存条目数、字节数和每个工具的命中率等统计
         """
-        # 将参数转换为字符串并计算哈希值
-        import hashlib
-        args_str = str(args)
-        return f"{tool_name}:{hashlib.md5(args_str.encode()).hexdigest()}"
-    
-    def _get_from_cache(self, tool_name: str, args: Any) -> Optional[str]:
-        """
-        从缓存中获取结果
-        
-        Args:
-            tool_name: 工具名称
-            args: 工具参数
-            
-        Returns:
-            缓存的结果，如果没有缓存或缓存过期则返回None
-        """
-        if not self.use_cache:
-            return None
-            
-        cache_key = self._generate_cache_key(tool_name, args)
-        if cache_key in self.results_cache:
-            result, timestamp = self.results_cache[cache_key]
-            # 检查缓存是否过期
-            if time.time() - timestamp <= self.cache_ttl:
-                logger.info(f"工具 '{tool_name}' 命中缓存")
-                return result
-            else:
-                # 删除过期缓存
-                del self.results_cache[cache_key]
-                
-        return None
-    
-    def _add_to_cache(self, tool_name: str, args: Any, result: str) -> None:
-        """
-        添加结果到缓存
-        
-        Args:
-            tool_name: 工具名称
-            args: 工具参数
-            result: 工具执行结果
-        """
-        if not self.use_cache:
-            return
-            
-        cache_key = self._generate_cache_key(tool_name, args)
-        self.results_cache[cache_key] = (result, time.time())
-        logger.info(f"工具 '{tool_name}' 结果已缓存")
\ No newline at end of file
+        return self.results_cache.get_stats()
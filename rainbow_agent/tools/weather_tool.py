@@ -2,12 +2,14 @@
 天气查询工具
 """
 from typing import Any
-from .base import BaseTool
+from .base import BaseTool, CachePolicy
 import json
 import random
 
 class WeatherTool(BaseTool):
     """天气查询工具，可以查询指定城市的天气情况"""
+    cache_policy = CachePolicy.TTL
+    cache_ttl = 600
     
     def __init__(self):
         super().__init__(
@@ -8,7 +8,7 @@ import json
 import requests
 from typing import Dict, Any, List, Optional
 
-from .base import BaseTool
+from .base import BaseTool, CachePolicy
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -20,6 +20,8 @@ class WebSearchTool(BaseTool):
     
     支持通过Serpapi或Bing搜索API获取网络信息
     """
+    cache_policy = CachePolicy.TTL
+    cache_ttl = 300
     
     def __init__(
         self, 
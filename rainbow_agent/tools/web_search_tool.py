@@ -2,12 +2,14 @@
 网络搜索工具
 """
 from typing import Any, List, Dict
-from .base import BaseTool
+from .base import BaseTool, CachePolicy
 import json
 import random
 
 class WebSearchTool(BaseTool):
     """网络搜索工具，可以搜索互联网上的信息"""
+    cache_policy = CachePolicy.TTL
+    cache_ttl = 300
     
     def __init__(self):
         super().__init__(
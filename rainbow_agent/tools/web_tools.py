@@ -6,7 +6,7 @@ import requests
 from typing import Dict, Any, Optional
 import time
 
-from .base import BaseTool
+from .base import BaseTool, CachePolicy
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -18,6 +18,8 @@ class WebSearchTool(BaseTool):
     
     使用公共搜索API获取信息
     """
+    cache_policy = CachePolicy.TTL
+    cache_ttl = 300
     
     def __init__(self, api_key: Optional[str] = None):
         """
@@ -68,6 +70,8 @@ class WeatherTool(BaseTool):
     
     获取指定城市的天气信息
     """
+    cache_policy = CachePolicy.TTL
+    cache_ttl = 600
     
     def __init__(self, api_key: Optional[str] = None):
         """
@@ -9,11 +9,11 @@ from typing import Optional, Dict, Any, List, Union
 from dotenv import load_dotenv
 import openai
 import requests
-from openai import OpenAI
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from ..config.settings import get_settings
 from .logger import get_logger
+from .llm_pool import PooledLLMClient, get_pool_stats, get_shared_client
 
 logger = get_logger(__name__)
 settings = get_settings()
@@ -22,67 +22,59 @@ settings = get_settings()
 load_dotenv()
 
 
-def get_llm_client() -> OpenAI:
+def get_llm_client() -> PooledLLMClient:
     """
     获取配置好的OpenAI客户端
     
-    使用标准OpenAI API。
+    使用标准OpenAI API。配置相同的调用方共享同一个客户端：连接通过
+    keep-alive 复用，每个模型的并发请求数受限，参数相同的并发请求只发送一次。
     
     Returns:
-        OpenAI客户端实例
+        共享的OpenAI客户端（接口与 ``OpenAI`` 相同）
     """
     # 获取API密钥
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         logger.warning("未设置OPENAI_API_KEY环境变量，请确保设置了有效的API密钥")
     
-    # 初始化客户端参数
-    client_kwargs = {
-        "api_key": api_key,
-        "timeout": settings.get("api.timeout", 60),
-        "max_retries": settings.get("api.max_retries", 3)
-    }
-    
     # 设置代理 - 首先检查配置文件中的代理设置，然后是系统环境变量
     # 1. 优先使用配置文件指定的代理
     proxy = settings.get("api.proxy")
     
     # 2. 如果配置文件中没有设置，则尝试使用系统环境变量中的代理
     if not proxy:
-        # 检查系统环境变量中的HTTP/HTTPS代理设置
-        if os.environ.get("HTTP_PROXY"):
-            proxy = os.environ.get("HTTP_PROXY")
-            logger.info(f"使用系统 HTTP 代理: {proxy}")
-        elif os.environ.get("http_proxy"):
-            proxy = os.environ.get("http_proxy")
-            logger.info(f"使用系统 http 代理: {proxy}")
-        elif os.environ.get("HTTPS_PROXY"):
-            proxy = os.environ.get("HTTPS_PROXY")
-            logger.info(f"使用系统 HTTPS 代理: {proxy}")
-        elif os.environ.get("https_proxy"):
-            proxy = os.environ.get("https_proxy")
-            logger.info(f"使用系统 https 代理: {proxy}")
-    
-    # 3. 如果找到了代理设置，则应用到客户端
-    if proxy:
-        import httpx
-        client_kwargs["http_client"] = httpx.Client(proxies={"http://": proxy, "https://": proxy})
-        logger.info(f"使用HTTP代理: {proxy}")
+        for name in ("HTTP_PROXY", "http_proxy", "HTTPS_PROXY", "https_proxy"):
+            if os.environ.get(name):
+                proxy = os.environ.get(name)
+                logger.debug(f"使用系统 {name} 代理: {proxy}")
+                break
     
     # 设置自定义基础URL（如果提供）
     base_url = settings.get("api.base_url")
-    if base_url and base_url != "https://api.openai.com/v1":
-        client_kwargs["base_url"] = base_url
-        logger.info(f"使用自定义API基础URL: {base_url}")
+    if not base_url or base_url == "https://api.openai.com/v1":
+        base_url = None
+    
+    # 获取共享客户端
+    return get_shared_client(
+        api_key,
+        base_url=base_url,
+        proxy=proxy,
+        timeout=settings.get("api.timeout", 60),
+        max_retries=settings.get("api.max_retries", 3),
+        max_connections=settings.get("api.max_connections", 32),
+        model_concurrency=settings.get("api.model_concurrency", 8),
+        coalesce=settings.get("api.coalesce_requests", True)
+    )
+
+
+def get_llm_pool_stats() -> Dict[str, Any]:
+    """
+    获取共享LLM客户端的统计信息
     
-    # 初始化客户端
-    try:
-        client = OpenAI(**client_kwargs)
-        return client
-    except Exception as e:
-        logger.error(f"初始化OpenAI客户端时出错: {e}")
-        # 尝试使用最小配置
-        return OpenAI(api_key=api_key)
+    Returns:
+        请求数、合并请求数、新建连接数和连接复用次数等
+    """
+    return get_pool_stats()
 
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
@@ -0,0 +1,366 @@
+"""
+LLM客户端共享池
+
+进程内共享的OpenAI客户端注册表：
+- 配置相同（API密钥、基础URL、代理）的调用方共享同一个客户端及其 keep-alive 连接池
+- 每个模型的并发请求数由信号量限制
+- 参数完全相同的并发请求合并为一次调用（single-flight），流式请求除外
+- 统计请求数、合并数和新建连接数，用于观察负载下的连接复用情况
+"""
+import json
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import httpx
+from openai import OpenAI
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SingleFlight:
+    """相同键的并发调用只执行一次，其余调用等待并共享结果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        执行调用或加入进行中的相同调用
+
+        Args:
+            key: 调用键
+            fn: 实际执行的调用
+
+        Returns:
+            (结果, 是否与进行中的调用合并)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class _LimitedStream:
+    """
+    占用模型并发名额的流式响应
+
+    名额在流被读完、出错、关闭、退出上下文管理器或被垃圾回收时释放，且只释放一次，
+    因此创建后从未迭代的流也不会永久占用名额。其余属性（如 ``response``）委托给底层的流。
+    """
+
+    def __init__(self, stream: Any, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._iterator: Optional[Iterator[Any]] = None
+        self._released = False
+        self._release_lock = threading.Lock()
+
+    def _release_slot(self) -> None:
+        with self._release_lock:
+            if self._released:
+                return
+            self._released = True
+        self._release()
+
+    def __iter__(self) -> "_LimitedStream":
+        return self
+
+    def __next__(self) -> Any:
+        if self._iterator is None:
+            self._iterator = iter(self._stream)
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> "_LimitedStream":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """关闭底层的流并释放并发名额"""
+        try:
+            close = getattr(self._stream, "close", None)
+            if close:
+                close()
+        finally:
+            self._release_slot()
+
+    def __del__(self) -> None:
+        if "_release_lock" in self.__dict__:
+            self._release_slot()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class _Endpoint:
+    """包装 ``create`` 方法的API端点（chat.completions、embeddings）"""
+
+    def __init__(self, pool: "PooledLLMClient", endpoint: Any, name: str):
+        self._pool = pool
+        self._endpoint = endpoint
+        self._name = name
+
+    def create(self, **kwargs) -> Any:
+        return self._pool.call(self._name, self._endpoint.create, kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._endpoint, name)
+
+
+class _Chat:
+    def __init__(self, pool: "PooledLLMClient", chat: Any):
+        self.completions = _Endpoint(pool, chat.completions, "chat")
+        self._chat = chat
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._chat, name)
+
+
+class PooledLLMClient:
+    """
+    共享的OpenAI客户端
+
+    ``chat.completions.create`` 和 ``embeddings.create`` 经过按模型的并发限制
+    和请求合并，其余属性直接委托给底层的 ``OpenAI`` 客户端。
+    """
+
+    def __init__(self,
+                 client: OpenAI,
+                 model_concurrency: int = 8,
+                 coalesce: bool = True):
+        """
+        初始化共享客户端
+
+        Args:
+            client: 底层OpenAI客户端
+            model_concurrency: 每个模型同时进行的最大请求数
+            coalesce: 是否合并参数完全相同的并发请求
+        """
+        self.client = client
+        self.model_concurrency = max(1, model_concurrency)
+        self.coalesce = coalesce
+        self.chat = _Chat(self, client.chat)
+        self.embeddings = _Endpoint(self, client.embeddings, "embeddings")
+
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._single_flight = SingleFlight()
+        self._streams: "weakref.WeakSet[Any]" = weakref.WeakSet()
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "coalesced": 0,
+            "http_responses": 0,
+            "connections_opened": 0
+        }
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def on_response(self, response: httpx.Response) -> None:
+        """httpx 响应钩子：按网络流统计新建连接和复用连接"""
+        stream = response.extensions.get("network_stream")
+        with self._lock:
+            self.stats["http_responses"] += 1
+            if stream is not None and stream not in self._streams:
+                self._streams.add(stream)
+                self.stats["connections_opened"] += 1
+
+    def _semaphore(self, model: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(model)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.model_concurrency)
+                self._semaphores[model] = semaphore
+            return semaphore
+
+    def _track(self, model: str, delta: int) -> None:
+        with self._lock:
+            self._in_flight[model] = self._in_flight.get(model, 0) + delta
+
+    def _limited(self, model: str, create: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        with self._semaphore(model):
+            self._track(model, 1)
+            try:
+                return create(**kwargs)
+            finally:
+                self._track(model, -1)
+
+    def _limited_stream(self, model: str, create: Callable[..., Any], kwargs: Dict[str, Any]) -> "_LimitedStream":
+        # 流式请求占用并发名额直到流被消费完、关闭或回收
+        semaphore = self._semaphore(model)
+        semaphore.acquire()
+        self._track(model, 1)
+
+        def release():
+            self._track(model, -1)
+            semaphore.release()
+
+        try:
+            stream = create(**kwargs)
+        except BaseException:
+            release()
+            raise
+        return _LimitedStream(stream, release)
+
+    def call(self, endpoint: str, create: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        """
+        经过并发限制和请求合并执行一次API调用
+
+        Args:
+            endpoint: 端点名称，用于区分合并键
+            create: 底层的 ``create`` 方法
+            kwargs: 调用参数
+
+        Returns:
+            API响应，合并的调用共享同一个响应对象
+        """
+        model = str(kwargs.get("model", "default"))
+        with self._lock:
+            self.stats["requests"] += 1
+
+        if kwargs.get("stream"):
+            return self._limited_stream(model, create, kwargs)
+        if not self.coalesce:
+            return self._limited(model, create, kwargs)
+
+        try:
+            key = endpoint + ":" + json.dumps(kwargs, sort_keys=True, ensure_ascii=False)
+        except (TypeError, ValueError):
+            # 参数无法序列化时不合并
+            return self._limited(model, create, kwargs)
+
+        result, coalesced = self._single_flight.do(key, lambda: self._limited(model, create, kwargs))
+        if coalesced:
+            with self._lock:
+                self.stats["coalesced"] += 1
+            logger.debug(f"合并了相同的进行中请求，模型: {model}")
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取客户端统计信息
+
+        Returns:
+            请求数、合并数、HTTP响应数、新建连接数、连接复用次数和各模型的进行中请求数
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["connections_reused"] = max(0, stats["http_responses"] - stats["connections_opened"])
+            stats["in_flight"] = {model: count for model, count in self._in_flight.items() if count}
+        return stats
+
+    def close(self) -> None:
+        """关闭底层客户端及其连接池"""
+        self.client.close()
+
+
+_registry: Dict[Tuple[Any, ...], PooledLLMClient] = {}
+_registry_lock = threading.Lock()
+
+
+def get_shared_client(api_key: Optional[str],
+                      base_url: Optional[str] = None,
+                      proxy: Optional[str] = None,
+                      timeout: float = 60,
+                      max_retries: int = 3,
+                      max_connections: int = 32,
+                      model_concurrency: int = 8,
+                      coalesce: bool = True) -> PooledLLMClient:
+    """
+    获取（必要时创建）指定配置的共享客户端
+
+    Args:
+        api_key: OpenAI API密钥
+        base_url: 自定义API基础URL
+        proxy: HTTP代理
+        timeout: 请求超时时间（秒）
+        max_retries: 最大重试次数
+        max_connections: 连接池最大连接数
+        model_concurrency: 每个模型同时进行的最大请求数
+        coalesce: 是否合并参数完全相同的并发请求
+
+    Returns:
+        共享客户端
+    """
+    key = (api_key, base_url, proxy, timeout, max_retries, max_connections, model_concurrency, coalesce)
+    with _registry_lock:
+        pooled = _registry.get(key)
+        if pooled is not None:
+            return pooled
+
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        client_kwargs: Dict[str, Any] = {"limits": limits, "timeout": timeout}
+        if proxy:
+            try:
+                http_client = httpx.Client(proxy=proxy, **client_kwargs)
+            except TypeError:
+                # httpx < 0.26
+                http_client = httpx.Client(proxies={"http://": proxy, "https://": proxy}, **client_kwargs)
+        else:
+            http_client = httpx.Client(**client_kwargs)
+
+        openai_kwargs: Dict[str, Any] = {"api_key": api_key, "max_retries": max_retries, "http_client": http_client}
+        if base_url:
+            openai_kwargs["base_url"] = base_url
+        pooled = PooledLLMClient(OpenAI(**openai_kwargs), model_concurrency=model_concurrency, coalesce=coalesce)
+        http_client.event_hooks = {"request": [], "response": [pooled.on_response]}
+
+        _registry[key] = pooled
+        logger.info(f"创建共享LLM客户端，最大连接数: {max_connections}，每模型并发: {model_concurrency}")
+        return pooled
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    获取所有共享客户端的汇总统计
+
+    Returns:
+        客户端数量及各项计数之和
+    """
+    with _registry_lock:
+        clients = list(_registry.values())
+    totals: Dict[str, Any] = {"clients": len(clients)}
+    for pooled in clients:
+        for name, value in pooled.get_stats().items():
+            if isinstance(value, int):
+                totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+def close_shared_clients() -> None:
+    """关闭并移除所有共享客户端"""
+    with _registry_lock:
+        clients = list(_registry.values())
+        _registry.clear()
+    for pooled in clients:
+        try:
+            pooled.close()
+        except Exception as e:
+            logger.warning(f"关闭共享LLM客户端时出错: {e}")
@@ -0,0 +1,408 @@
+"""
+共享执行运行时
+
+进程内所有代理、工具调用器和团队共用的有界线程池，代替各自创建的 ThreadPoolExecutor：
+- LLM/网络I/O、工具执行和阻塞的文件/数据库I/O分别使用独立的线程池，互不挤占
+- 内置工具（搜索、天气、网页读取等）多为网络I/O，工具线程池按I/O任务而不是CPU核数设置大小
+- 按任务所属方（代理、团队或租户）限制并发数，超出限制的任务在所属方的队列中等待，不阻塞提交者
+- 统计每个线程池和所属方的排队数、运行数和完成数
+- 关闭时拒绝新任务，可以等待所有已提交任务完成，或取消尚未开始的任务
+
+各组件通过 get_runtime().executor(...) 借用一个绑定了线程池和所属方的 Executor，
+接口与 concurrent.futures.Executor 相同，也可以直接传给 loop.run_in_executor。
+"""
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, Optional, Union
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PoolType(Enum):
+    """线程池类型"""
+    LLM = "llm"    # LLM调用和其他网络I/O
+    TOOL = "tool"  # 工具执行，多为网络I/O
+    IO = "io"      # 阻塞的文件和数据库I/O
+
+
+DEFAULT_POOL_SIZES = {PoolType.LLM: 32, PoolType.TOOL: 32, PoolType.IO: 16}
+
+
+class _Task:
+    __slots__ = ("pool", "owner", "fn", "args", "kwargs", "future")
+
+    def __init__(self, pool: PoolType, owner: Optional[str], fn: Callable, args: tuple, kwargs: dict):
+        self.pool = pool
+        self.owner = owner
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+
+
+class _OwnerState:
+    __slots__ = ("running", "waiting", "completed")
+
+    def __init__(self):
+        self.running = 0
+        self.waiting: Deque[_Task] = deque()
+        self.completed = 0
+
+
+class ExecutionRuntime:
+    """
+    共享执行运行时
+
+    每种线程池在第一次使用时创建。任务的所属方设置了并发限制时，
+    同一所属方同时运行的任务数不超过限制，其余任务按提交顺序排队。
+    """
+
+    def __init__(self, pool_sizes: Optional[Dict[Union[PoolType, str], int]] = None,
+                 default_owner_limit: Optional[int] = None):
+        """
+        初始化执行运行时
+
+        Args:
+            pool_sizes: 各线程池的线程数，未指定的使用默认值
+            default_owner_limit: 未单独设置限制的所属方的最大并发任务数，None表示不限制
+        """
+        self.pool_sizes = dict(DEFAULT_POOL_SIZES)
+        for pool, size in (pool_sizes or {}).items():
+            self.pool_sizes[PoolType(pool)] = size
+        self.default_owner_limit = default_owner_limit
+
+        self._executors: Dict[PoolType, ThreadPoolExecutor] = {}
+        self._limits: Dict[str, int] = {}
+        self._owners: Dict[str, _OwnerState] = {}
+        self._pool_stats = {pool: {"submitted": 0, "queued": 0, "running": 0, "completed": 0, "failed": 0}
+                            for pool in PoolType}
+        self._outstanding = 0
+        self._closed = False
+        self._cancel_pending = False
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def submit(self, pool: Union[PoolType, str], fn: Callable, *args: Any,
+               owner: Optional[str] = None, **kwargs: Any) -> Future:
+        """
+        提交任务
+
+        Args:
+            pool: 线程池类型
+            fn: 要执行的函数
+            *args: 位置参数
+            owner: 任务所属方，如 "agent:<名称>"，用于并发限制和统计
+            **kwargs: 关键字参数
+
+        Returns:
+            任务的Future
+
+        Raises:
+            RuntimeError: 运行时已关闭
+        """
+        task = _Task(PoolType(pool), owner, fn, args, kwargs)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("执行运行时已关闭，不能提交新任务")
+            self._outstanding += 1
+            self._pool_stats[task.pool]["submitted"] += 1
+
+            if owner is not None:
+                state = self._owners.get(owner)
+                if state is None:
+                    state = self._owners[owner] = _OwnerState()
+                limit = self._limits.get(owner, self.default_owner_limit)
+                if limit is not None and state.running >= limit:
+                    state.waiting.append(task)
+                    return task.future
+                state.running += 1
+            self._dispatch(task)
+        return task.future
+
+    async def run_async(self, pool: Union[PoolType, str], fn: Callable, *args: Any,
+                        owner: Optional[str] = None, **kwargs: Any) -> Any:
+        """
+        submit 的异步版本，等待任务完成并返回结果
+
+        Args:
+            pool: 线程池类型
+            fn: 要执行的函数
+            *args: 位置参数
+            owner: 任务所属方
+            **kwargs: 关键字参数
+
+        Returns:
+            函数的返回值
+        """
+        return await asyncio.wrap_future(self.submit(pool, fn, *args, owner=owner, **kwargs))
+
+    def executor(self, pool: Union[PoolType, str], owner: Optional[str] = None,
+                 limit: Optional[int] = None) -> "RuntimeExecutor":
+        """
+        借用绑定了线程池和所属方的Executor
+
+        Args:
+            pool: 线程池类型
+            owner: 任务所属方
+            limit: 所属方的最大并发任务数，None表示保持现有设置
+
+        Returns:
+            RuntimeExecutor
+        """
+        if owner is not None and limit is not None:
+            self.set_limit(owner, limit)
+        return RuntimeExecutor(self, PoolType(pool), owner)
+
+    def set_limit(self, owner: str, limit: Optional[int]) -> None:
+        """
+        设置所属方的最大并发任务数
+
+        Args:
+            owner: 任务所属方
+            limit: 最大并发任务数，None表示使用默认限制
+        """
+        with self._lock:
+            if limit is None:
+                self._limits.pop(owner, None)
+            else:
+                self._limits[owner] = max(1, limit)
+            state = self._owners.get(owner)
+            if state is not None:
+                self._drain(owner, state)
+
+    def release_owner(self, owner: str) -> None:
+        """
+        移除所属方的并发限制和统计，在团队等临时所属方不再使用时调用
+
+        所属方仍有任务时，其状态在任务全部完成后移除。
+
+        Args:
+            owner: 任务所属方
+        """
+        with self._lock:
+            self._limits.pop(owner, None)
+            state = self._owners.get(owner)
+            if state is not None:
+                self._drain(owner, state)
+
+    def wait_idle(self, owner: str, timeout: Optional[float] = None) -> bool:
+        """
+        等待所属方的所有任务完成
+
+        Args:
+            owner: 任务所属方
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            所属方的任务是否已全部完成
+        """
+        def idle():
+            state = self._owners.get(owner)
+            return state is None or (not state.running and not state.waiting)
+
+        with self._lock:
+            return self._idle.wait_for(idle, timeout)
+
+    def cancel_waiting(self, owner: str) -> int:
+        """
+        取消所属方因并发限制而排队、尚未开始的任务
+
+        Args:
+            owner: 任务所属方
+
+        Returns:
+            取消的任务数量
+        """
+        with self._lock:
+            state = self._owners.get(owner)
+            if state is None:
+                return 0
+            cancelled = self._cancel_waiting(state)
+            self._drain(owner, state)
+            self._idle.notify_all()
+            return cancelled
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取运行时统计
+
+        Returns:
+            各线程池的线程数、已提交、排队、运行、完成和失败的任务数，
+            以及每个所属方的运行数、排队数、完成数和并发限制
+        """
+        with self._lock:
+            pools = {}
+            for pool, stats in self._pool_stats.items():
+                pools[pool.value] = dict(stats, workers=self.pool_sizes[pool])
+            owners = {}
+            for owner, state in self._owners.items():
+                owners[owner] = {
+                    "running": state.running,
+                    "waiting": len(state.waiting),
+                    "completed": state.completed,
+                    "limit": self._limits.get(owner, self.default_owner_limit)
+                }
+            return {"pools": pools, "owners": owners, "outstanding": self._outstanding, "closed": self._closed}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        关闭运行时，之后提交任务会抛出 RuntimeError
+
+        不能在运行时的线程中以 wait=True 调用，否则会等待自己。
+
+        Args:
+            wait: True表示等待所有已提交的任务（包括因并发限制排队的任务）完成；
+                  False表示取消尚未开始的任务，正在运行的任务在后台完成
+        """
+        with self._lock:
+            self._closed = True
+            if not wait:
+                self._cancel_pending = True
+                for state in self._owners.values():
+                    self._cancel_waiting(state)
+            else:
+                while self._outstanding:
+                    self._idle.wait()
+            executors = list(self._executors.values())
+
+        for executor in executors:
+            executor.shutdown(wait=wait)
+        logger.info("共享执行运行时已关闭")
+
+    def _dispatch(self, task: _Task) -> None:
+        # 需持有锁
+        executor = self._executors.get(task.pool)
+        if executor is None:
+            executor = self._executors[task.pool] = ThreadPoolExecutor(
+                max_workers=self.pool_sizes[task.pool],
+                thread_name_prefix=f"rainbow-{task.pool.value}"
+            )
+        self._pool_stats[task.pool]["queued"] += 1
+        executor.submit(self._run, task)
+
+    def _run(self, task: _Task) -> None:
+        stats = self._pool_stats[task.pool]
+        with self._lock:
+            stats["queued"] -= 1
+            stats["running"] += 1
+            if self._cancel_pending:
+                task.future.cancel()
+
+        result = error = None
+        started = task.future.set_running_or_notify_cancel()
+        if started:
+            try:
+                result = task.fn(*task.args, **task.kwargs)
+            except BaseException as e:
+                error = e
+
+        # 先更新统计再设置结果，调用方拿到结果时统计已包含该任务
+        with self._lock:
+            stats["running"] -= 1
+            stats["completed" if error is None else "failed"] += 1
+        if started:
+            if error is None:
+                task.future.set_result(result)
+            else:
+                task.future.set_exception(error)
+
+        with self._lock:
+            self._outstanding -= 1
+            if task.owner is not None:
+                state = self._owners[task.owner]
+                state.running -= 1
+                state.completed += 1
+                self._drain(task.owner, state)
+            self._idle.notify_all()
+
+    def _cancel_waiting(self, state: _OwnerState) -> int:
+        # 需持有锁
+        cancelled = len(state.waiting)
+        while state.waiting:
+            state.waiting.popleft().future.cancel()
+        self._outstanding -= cancelled
+        return cancelled
+
+    def _drain(self, owner: str, state: _OwnerState) -> None:
+        # 需持有锁：在并发限制内启动排队的任务，所属方空闲且没有单独限制时移除其状态
+        limit = self._limits.get(owner, self.default_owner_limit)
+        while state.waiting and (limit is None or state.running < limit):
+            state.running += 1
+            self._dispatch(state.waiting.popleft())
+        if not state.running and not state.waiting and owner not in self._limits:
+            del self._owners[owner]
+
+
+class RuntimeExecutor(Executor):
+    """
+    绑定了线程池和所属方的Executor
+
+    不拥有线程。shutdown 只停止通过它提交新任务，并按参数等待或取消所属方的任务，
+    不会关闭共享运行时。
+    """
+
+    def __init__(self, runtime: ExecutionRuntime, pool: PoolType, owner: Optional[str] = None):
+        self.runtime = runtime
+        self.pool = pool
+        self.owner = owner
+        self._shutdown = False
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        if self._shutdown:
+            raise RuntimeError("Executor已关闭，不能提交新任务")
+        return self.runtime.submit(self.pool, fn, *args, owner=self.owner, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self._shutdown = True
+        if self.owner is None:
+            return
+        if cancel_futures:
+            self.runtime.cancel_waiting(self.owner)
+        if wait:
+            self.runtime.wait_idle(self.owner)
+
+
+_runtime: Optional[ExecutionRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> ExecutionRuntime:
+    """
+    获取进程内共享的执行运行时，线程数和默认并发限制读取 runtime 配置
+
+    Returns:
+        共享的执行运行时
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None or _runtime._closed:
+            from ..config.settings import get_settings
+            settings = get_settings()
+            _runtime = ExecutionRuntime(
+                pool_sizes={
+                    PoolType.LLM: settings.get("runtime.llm_workers", DEFAULT_POOL_SIZES[PoolType.LLM]),
+                    PoolType.TOOL: settings.get("runtime.tool_workers", DEFAULT_POOL_SIZES[PoolType.TOOL]),
+                    PoolType.IO: settings.get("runtime.io_workers", DEFAULT_POOL_SIZES[PoolType.IO]),
+                },
+                default_owner_limit=settings.get("runtime.owner_concurrency")
+            )
+        return _runtime
+
+
+def shutdown_runtime(wait: bool = True) -> None:
+    """
+    关闭共享的执行运行时，之后调用 get_runtime 会创建新的运行时
+
+    Args:
+        wait: 是否等待所有已提交的任务完成
+    """
+    global _runtime
+    with _runtime_lock:
+        runtime, _runtime = _runtime, None
+    if runtime is not None:
+        runtime.shutdown(wait=wait)
@@ -0,0 +1,224 @@
+"""
+文本检索索引
+
+提供支持中文的轻量级分词和基于倒排索引的BM25检索：
+- 英文和数字按单词切分，中文按相邻字的二元组切分，无需额外的分词依赖
+- 查询时只访问查询词的倒排列表，并按词的得分上界提前截断（MaxScore），
+  检索开销与命中文档数相关，而不是与索引中的文档总数相关
+"""
+from typing import List, Dict, Optional, Callable, Tuple, Hashable
+import heapq
+import math
+import re
+import threading
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_]+|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    将文本切分为检索词
+
+    Args:
+        text: 文本
+
+    Returns:
+        检索词列表，英文转为小写，中文连续片段切分为二元组（单字片段保留单字）
+    """
+    tokens: List[str] = []
+    for piece in _TOKEN_PATTERN.findall(text.lower()):
+        if piece[0] < "\u3400":
+            tokens.append(piece)
+        elif len(piece) == 1:
+            tokens.append(piece)
+        else:
+            tokens.extend(piece[i:i + 2] for i in range(len(piece) - 1))
+    return tokens
+
+
+class BM25Index:
+    """
+    BM25倒排索引
+
+    文档可以随时添加、替换和删除；search 按BM25得分返回前k个文档。
+    所有操作都持有内部锁，可在多个线程间共享。
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, tokenizer: Callable[[str], List[str]] = tokenize):
+        """
+        初始化BM25索引
+
+        Args:
+            k1: 词频饱和参数
+            b: 文档长度归一化参数
+            tokenizer: 分词函数
+        """
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer
+
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._doc_terms: Dict[Hashable, Dict[str, int]] = {}
+        self._doc_lengths: Dict[Hashable, int] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._doc_lengths
+
+    def add(self, doc_id: Hashable, text: str) -> None:
+        """
+        添加文档，已存在的文档会被替换
+
+        Args:
+            doc_id: 文档ID
+            text: 文档文本
+        """
+        tokens = self.tokenizer(text)
+        term_counts: Dict[str, int] = {}
+        for token in tokens:
+            term_counts[token] = term_counts.get(token, 0) + 1
+
+        with self._lock:
+            self._remove(doc_id)
+            for term, count in term_counts.items():
+                self._postings.setdefault(term, {})[doc_id] = count
+            self._doc_terms[doc_id] = term_counts
+            self._doc_lengths[doc_id] = len(tokens)
+            self._total_length += len(tokens)
+
+    def remove(self, doc_id: Hashable) -> bool:
+        """
+        删除文档
+
+        Args:
+            doc_id: 文档ID
+
+        Returns:
+            文档是否存在
+        """
+        with self._lock:
+            return self._remove(doc_id)
+
+    def _remove(self, doc_id: Hashable) -> bool:
+        term_counts = self._doc_terms.pop(doc_id, None)
+        if term_counts is None:
+            return False
+
+        for term in term_counts:
+            posting = self._postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        return True
+
+    def clear(self) -> None:
+        """清空索引"""
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_lengths.clear()
+            self._total_length = 0
+
+    def idf_sum(self, query: str) -> float:
+        """
+        计算查询中出现在索引里的词的IDF之和
+
+        即每个词在平均长度的文档中各出现一次时的BM25得分之和，可用于归一化检索得分
+
+        Args:
+            query: 查询文本
+
+        Returns:
+            IDF之和，没有词出现在索引中时为0
+        """
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            total = 0.0
+            for term in set(self.tokenizer(query)):
+                posting = self._postings.get(term)
+                if posting:
+                    df = len(posting)
+                    total += math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            return total
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        accept: Optional[Callable[[Hashable], bool]] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """
+        检索与查询最相关的文档
+
+        Args:
+            query: 查询文本
+            limit: 返回数量限制
+            accept: 文档过滤函数，返回False的文档不参与排序
+
+        Returns:
+            按得分降序排列的(文档ID, 得分)列表
+        """
+        query_terms = set(self.tokenizer(query))
+        if not query_terms or limit <= 0:
+            return []
+
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count or 1.0
+
+            # 按得分上界从高到低处理查询词（稀有词在前）
+            terms = []
+            for term in query_terms:
+                posting = self._postings.get(term)
+                if posting:
+                    df = len(posting)
+                    idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                    terms.append((idf * (self.k1 + 1), idf, posting))
+            terms.sort(key=lambda item: item[0], reverse=True)
+
+            # remaining[i] 为第i个及之后的查询词能贡献的最大得分
+            remaining = [0.0] * (len(terms) + 1)
+            for i in range(len(terms) - 1, -1, -1):
+                remaining[i] = remaining[i + 1] + terms[i][0]
+
+            scores: Dict[Hashable, float] = {}
+            rejected = set()
+            threshold = 0.0
+            k1, b = self.k1, self.b
+            doc_lengths = self._doc_lengths
+
+            for i, (_, idf, posting) in enumerate(terms):
+                if len(scores) >= limit and remaining[i] <= threshold:
+                    # 剩余查询词不足以让新文档进入前k，只更新已有候选
+                    docs = [(doc_id, posting[doc_id]) for doc_id in scores if doc_id in posting]
+                else:
+                    docs = posting.items()
+
+                for doc_id, tf in docs:
+                    if doc_id not in scores:
+                        if doc_id in rejected:
+                            continue
+                        if accept is not None and not accept(doc_id):
+                            rejected.add(doc_id)
+                            continue
+                    norm = k1 * (1 - b + b * doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+                if len(scores) >= limit:
+                    threshold = heapq.nlargest(limit, scores.values())[-1]
+                    # 即使命中剩余所有查询词也无法进入前k的候选可以丢弃
+                    bound = remaining[i + 1]
+                    if bound < threshold:
+                        pruned = [doc_id for doc_id, score in scores.items() if score + bound < threshold]
+                        for doc_id in pruned:
+                            del scores[doc_id]
+                        rejected.update(pruned)
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
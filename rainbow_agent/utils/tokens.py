@@ -0,0 +1,158 @@
+"""
+Token计数工具
+
+按模型缓存分词器，并缓存最近计数过的文本。对话历史和记忆在每次请求中都会
+被重复计数，缓存后只有新出现的文本需要分词。
+tiktoken 不可用（未安装或无法加载编码文件）时使用按字符估算的近似计数。
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import tiktoken
+    TIKTOKEN_SUPPORT = True
+except ImportError:
+    TIKTOKEN_SUPPORT = False
+
+# 每条消息的格式开销（角色和分隔符）以及回复的起始开销，与 OpenAI 的计数方式一致
+MESSAGE_OVERHEAD = 4
+REPLY_OVERHEAD = 2
+
+_encodings: Dict[str, Any] = {}
+_encodings_lock = threading.Lock()
+
+
+def _get_encoding(model: str) -> Optional[Any]:
+    """获取（并缓存）模型的分词器，无法加载时返回None"""
+    with _encodings_lock:
+        if model in _encodings:
+            return _encodings[model]
+
+        encoding = None
+        if TIKTOKEN_SUPPORT:
+            try:
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.warning(f"无法加载模型 {model} 的分词器，使用近似计数: {e}")
+        _encodings[model] = encoding
+        return encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    近似计算文本的token数
+
+    CJK字符按每字一个token计算，其余字符按每4个字符一个token计算。
+
+    Args:
+        text: 文本
+
+    Returns:
+        近似token数
+    """
+    wide = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return wide + (len(text) - wide + 3) // 4
+
+
+class TokenCounter:
+    """带缓存的token计数器"""
+
+    def __init__(self, model: str = "gpt-3.5-turbo", cache_size: int = 4096):
+        """
+        初始化token计数器
+
+        Args:
+            model: 模型名称，用于选择分词器
+            cache_size: 缓存的文本数量
+        """
+        self.model = model
+        self.cache_size = cache_size
+        self._encoding = _get_encoding(model)
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def exact(self) -> bool:
+        """是否使用真实的分词器计数"""
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        """
+        计算文本的token数
+
+        Args:
+            text: 文本
+
+        Returns:
+            token数
+        """
+        if not text:
+            return 0
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                self.hits += 1
+                return cached
+
+        tokens = len(self._encoding.encode(text)) if self._encoding is not None else estimate_tokens(text)
+        with self._lock:
+            self.misses += 1
+            self._cache[text] = tokens
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def count_message(self, message: Dict[str, str]) -> int:
+        """计算单条消息的token数（包含格式开销）"""
+        return MESSAGE_OVERHEAD + self.count(message.get("content") or "")
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        """
+        计算消息列表的token数
+
+        Args:
+            messages: 消息列表
+
+        Returns:
+            包含每条消息格式开销和回复起始开销的token数
+        """
+        return sum(self.count_message(message) for message in messages) + REPLY_OVERHEAD
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        截断文本，使其不超过指定的token数
+
+        Args:
+            text: 文本
+            max_tokens: 最大token数
+
+        Returns:
+            截断后的文本
+        """
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        if self._encoding is not None:
+            return self._encoding.decode(self._encoding.encode(text)[:max_tokens])
+
+        # 近似计数时二分查找最长的前缀
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if estimate_tokens(text[:mid]) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        return text[:low]
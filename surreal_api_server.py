@@ -34,10 +34,15 @@ load_config()
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 
+try:
+    from flask_socketio import SocketIO
+except ImportError:
+    SocketIO = None
+
 from rainbow_agent.storage.config import get_surreal_config
 from rainbow_agent.storage.unified_dialogue_storage import UnifiedDialogueStorage
 from rainbow_agent.core.dialogue_manager import DialogueManager
-from rainbow_agent.api.unified_routes import api as unified_blueprint
+from rainbow_agent.api.unified_routes import api as unified_blueprint, register_socketio_events
 
 # Custom JSON encoder for handling special types
 class CustomJSONEncoder(JSONEncoder):
@@ -64,6 +69,14 @@ dialogue_manager = DialogueManager(storage)
 # Register blueprints
 app.register_blueprint(unified_blueprint, url_prefix='/api/v1')
 
+# Streaming dialogue over Socket.IO (dialogue_input -> dialogue_token/dialogue_error/dialogue_done)
+if SocketIO is not None:
+    socketio = SocketIO(app, cors_allowed_origins=config.app.cors_origins)
+    register_socketio_events(socketio)
+else:
+    socketio = None
+    logger.warning("flask_socketio is not installed, the dialogue_input WebSocket event is disabled")
+
 # Root endpoint
 @app.route('/')
 def index():
@@ -93,4 +106,7 @@ if __name__ == '__main__':
     debug = config.app.debug
     
     logger.info(f"Starting server on {host}:{port} (debug={debug})")
-    app.run(host=host, port=port, debug=debug)
+    if socketio is not None:
+        socketio.run(app, host=host, port=port, debug=debug)
+    else:
+        app.run(host=host, port=port, debug=debug)
@@ -0,0 +1,196 @@
+"""
+缓存管理器测试
+
+测试统一LRU+TTL缓存的过期堆、数量和内存上限、按标签失效和统计计数，
+以及人类对话管理器在消息标记已读后失效相关缓存
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.human_chat.cache_manager import CacheManager
+from rainbow_agent.human_chat.chat_manager import HumanChatManager
+
+
+class FakeStorage:
+    """只实现对话管理器用到的异步方法的内存存储"""
+
+    def __init__(self):
+        self.sessions = {}
+        self.turns = {}
+        self.list_calls = 0
+
+    async def get_session_async(self, session_id):
+        return self.sessions.get(session_id)
+
+    async def get_turn_async(self, turn_id):
+        return self.turns.get(turn_id)
+
+    async def list_turns_async(self, session_id):
+        self.list_calls += 1
+        return [t for t in self.turns.values() if t["session_id"] == session_id]
+
+    async def update_turn_async(self, turn_id, updates):
+        for path, value in updates.items():
+            target = self.turns[turn_id]
+            *parents, leaf = path.split(".")
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = value
+        return True
+
+
+class TestCacheManager(unittest.TestCase):
+    """缓存管理器测试类"""
+
+    def test_ttl_expiry(self):
+        """测试缓存项按各自的TTL过期，过期项从堆中清理"""
+        cache = CacheManager(ttl_seconds=0.05)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=10)
+        cache.set("c", 3, ttl=0)
+        self.assertEqual(cache.get("a"), 1)
+
+        time.sleep(0.08)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.get_stats()["expirations"], 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_lru_eviction(self):
+        """测试超出数量上限时淘汰最久未访问的项"""
+        cache = CacheManager(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.get_stats()["evictions"], 1)
+
+    def test_memory_budget(self):
+        """测试超出内存预算时淘汰旧项，单个超大的值不缓存"""
+        cache = CacheManager(max_bytes=100, size_estimator=len)
+        cache.set("a", "x" * 40)
+        cache.set("b", "x" * 40)
+        cache.set("c", "x" * 40)
+        self.assertEqual(cache.get("a"), None)
+        self.assertEqual(cache.get_stats()["bytes"], 80)
+
+        cache.set("huge", "x" * 200)
+        self.assertNotIn("huge", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_invalidate_tag(self):
+        """测试按标签和前缀失效缓存项，标签索引同步更新"""
+        cache = CacheManager()
+        cache.set("session_messages:s1:None:20", [1], tags=["session:s1"])
+        cache.set("session_messages:s1:m5:20", [2], tags=["session:s1"])
+        cache.set("last_message:s1", {"id": "m1"}, tags=["session:s1"])
+        cache.set("unread_count:s1:u1", 3, tags=["session:s1"])
+        cache.set("user_sessions:u1", [{"id": "s1"}, {"id": "s2"}], tags=["user:u1", "session:s1", "session:s2"])
+        cache.set("last_message:s2", {"id": "m2"}, tags=["session:s2"])
+
+        self.assertEqual(cache.invalidate_tag("session:s1"), 5)
+        self.assertEqual(len(cache), 1)
+        self.assertIn("last_message:s2", cache)
+        self.assertEqual(cache.invalidate_tag("user:u1"), 0)
+        self.assertEqual(cache.get_stats()["tags"], 1)
+
+        cache.set("unread_count:s2:u1", 1)
+        self.assertEqual(cache.invalidate_prefix("unread_count:s2:"), 1)
+
+    def test_overwrite_and_stats(self):
+        """测试覆盖写入不会因旧的过期记录被提前删除，并统计命中率"""
+        cache = CacheManager(ttl_seconds=0.05)
+        cache.set("a", 1)
+        cache.set("a", 2, ttl=10)
+        time.sleep(0.08)
+        self.assertEqual(cache.get("a"), 2)
+        self.assertIsNone(cache.get("missing"))
+
+        stats = cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+        self.assertEqual(stats["expirations"], 0)
+
+    def test_compatibility_methods(self):
+        """测试按类型的兼容接口共享同一缓存并分别统计数量"""
+        cache = CacheManager()
+        cache.set_session("s1", {"id": "s1"})
+        cache.set_session_messages("s1", [{"id": "m1"}])
+        cache.set_user_sessions("u1", [{"id": "s1"}])
+        cache.set_message("m1", {"id": "m1", "session_id": "s1"})
+
+        stats = cache.get_stats()
+        self.assertEqual(stats["session_cache_size"], 1)
+        self.assertEqual(stats["session_messages_cache_size"], 1)
+        self.assertEqual(stats["entries"], 4)
+
+        cache.invalidate_tag("session:s1")
+        self.assertIsNone(cache.get_session_messages("s1"))
+        self.assertIsNone(cache.get_message("m1"))
+        self.assertEqual(cache.get_user_sessions("u1"), [{"id": "s1"}])
+
+        cache.invalidate_all()
+        self.assertEqual(cache.get_stats()["entries"], 0)
+
+    def test_concurrent_access(self):
+        """测试多个线程同时读写时计数和大小保持一致"""
+        cache = CacheManager(max_entries=50, size_estimator=lambda value: 1)
+
+        def worker(offset):
+            for i in range(500):
+                key = f"k{(offset + i) % 80}"
+                cache.set(key, i, tags=[f"t{i % 5}"])
+                cache.get(key)
+                if i % 50 == 0:
+                    cache.invalidate_tag(f"t{i % 5}")
+
+        threads = [threading.Thread(target=worker, args=(n * 7,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = cache.get_stats()
+        self.assertLessEqual(stats["entries"], 50)
+        self.assertEqual(stats["bytes"], stats["entries"])
+        self.assertEqual(stats["hits"] + stats["misses"], 2000)
+
+
+class TestChatManagerCache(unittest.TestCase):
+    """对话管理器缓存失效测试类"""
+
+    def test_mark_as_read_invalidates_session(self):
+        """测试标记已读后未读数和最后一条消息缓存失效"""
+        storage = FakeStorage()
+        storage.sessions["s1"] = {"id": "s1", "metadata": {"participants": ["u1", "u2"]}}
+        storage.turns["m1"] = {"id": "m1", "session_id": "s1", "created_at": "1",
+                               "metadata": {"human_chat": True, "sender_id": "u2"}}
+        manager = HumanChatManager(storage=storage)
+
+        async def scenario():
+            before = await manager._count_unread_messages("s1", "u1")
+            cached = await manager._count_unread_messages("s1", "u1")
+            calls = storage.list_calls
+            await manager.mark_as_read("m1", "u1")
+            after = await manager._count_unread_messages("s1", "u1")
+            return before, cached, calls, after
+
+        before, cached, calls, after = asyncio.run(scenario())
+        self.assertEqual((before, cached, after), (1, 1, 0))
+        self.assertEqual(calls, 1)
+        self.assertEqual(storage.list_calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
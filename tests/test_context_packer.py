@@ -0,0 +1,117 @@
+"""
+上下文打包器测试
+
+测试按token预算打包提示词：保留最近轮次、滚动摘要、按得分填充记忆，
+以及对话管理器记录每次请求的token数
+"""
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.core.context_packer import ContextPacker, history_items
+from rainbow_agent.core.dialogue_manager import DialogueManager
+from rainbow_agent.utils.tokens import TokenCounter
+
+
+def make_turns(start, end, text="这是一条比较长的对话内容，用来占用上下文预算。"):
+    return [
+        {"id": f"t{i:03d}", "role": "human" if i % 2 == 0 else "ai", "content": f"第{i}轮 {text}"}
+        for i in range(start, end)
+    ]
+
+
+class TestContextPacker(unittest.TestCase):
+    """上下文打包器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.system = [{"role": "system", "content": "你是一个助手"}]
+        self.user = {"role": "user", "content": "现在的问题"}
+
+    def test_budget_keeps_newest_turns(self):
+        """测试预算不足时从最新的轮次开始保留"""
+        packer = ContextPacker(max_tokens=200, recent_turns=20)
+        messages, stats = packer.pack("s1", self.system, history_items(make_turns(0, 20)), self.user)
+
+        self.assertLessEqual(stats["total"], 200)
+        self.assertEqual(stats["total"], packer.counter.count_messages(messages))
+        self.assertGreater(stats["turns_dropped"], 0)
+        self.assertEqual(messages[-1], self.user)
+        self.assertTrue(messages[-2]["content"].startswith("第19轮"))
+        self.assertEqual(len(messages), len(self.system) + stats["turns_included"] + 1)
+
+    def test_rolling_summary(self):
+        """测试移出最近窗口的轮次进入滚动摘要"""
+        packer = ContextPacker(max_tokens=2000, recent_turns=4)
+        packer.pack("s1", self.system, history_items(make_turns(0, 6)), self.user)
+        messages, stats = packer.pack("s1", self.system, history_items(make_turns(4, 10)), self.user)
+
+        summary = [m["content"] for m in messages if m["content"].startswith("此前对话摘要")]
+        self.assertEqual(len(summary), 1)
+        for i in range(6):
+            self.assertIn(f"第{i}轮", summary[0])
+        self.assertEqual(stats["turns_summarized"], 6)
+        self.assertEqual(stats["turns_included"], 4)
+        self.assertEqual(packer.history_limit("s1"), 7)
+        self.assertEqual(packer.history_limit("new"), packer.seed_turns)
+
+    def test_memories_ranked_by_score(self):
+        """测试按得分填充记忆，放不下的记忆被丢弃"""
+        packer = ContextPacker(max_tokens=60, recent_turns=2)
+        memories = [
+            {"content": "低分记忆", "score": 0.1},
+            {"content": "高分记忆", "score": 0.9},
+            {"content": "很长的记忆" * 50, "score": 0.95},
+        ]
+        messages, stats = packer.pack(None, self.system, [], self.user, memories)
+
+        self.assertEqual(stats["memories_included"], 2)
+        self.assertEqual(stats["memories_dropped"], 1)
+        memory_text = messages[1]["content"]
+        self.assertLess(memory_text.index("高分记忆"), memory_text.index("低分记忆"))
+
+    def test_token_counter_cache(self):
+        """测试token计数缓存和截断"""
+        counter = TokenCounter()
+        first = counter.count("重复出现的对话内容")
+        self.assertEqual(counter.count("重复出现的对话内容"), first)
+        self.assertEqual(counter.hits, 1)
+        self.assertLessEqual(counter.count(counter.truncate("很长的文本" * 100, 10)), 10)
+
+
+class TestDialogueManagerBudget(unittest.TestCase):
+    """对话管理器上下文预算测试类"""
+
+    def test_group_chat_records_context_tokens(self):
+        """测试群聊只读取最近的轮次，并在响应元数据中记录token数"""
+        storage = AsyncMock()
+        storage.create_turn_async.side_effect = lambda session_id, role, content, metadata=None: {
+            "id": "current", "session_id": session_id, "role": role, "content": content
+        }
+        storage.get_session_async.return_value = {
+            "id": "g1", "metadata": {"dialogue_type": "human_ai_group", "participants": ["u1", "u2"]}
+        }
+        storage.get_recent_turns_async.return_value = make_turns(0, 30) + [{"id": "current", "role": "human", "content": "你好"}]
+        ai_service = AsyncMock()
+        ai_service.generate_response_async.return_value = "收到"
+        manager = DialogueManager(storage=storage, ai_service=ai_service,
+                                  context_packer=ContextPacker(max_tokens=500, recent_turns=6))
+
+        result = asyncio.run(manager.process_input("g1", "u1", "你好"))
+
+        storage.get_recent_turns_async.assert_awaited_with("g1", limit=manager.context_packer.seed_turns)
+        messages = ai_service.generate_response_async.await_args.args[0]
+        self.assertEqual(sum("你好" in m["content"] for m in messages), 1)
+        tokens = result["metadata"]["context_tokens"]
+        self.assertLessEqual(tokens["total"], 500)
+        self.assertEqual(tokens["turns_included"], 6)
+        self.assertEqual(tokens["turns_summarized"], 24)
+        self.assertEqual(manager.context_packer.get_stats()["requests"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+共享LLM客户端测试
+
+在本地启动模拟的 OpenAI 兼容服务（HTTP/1.1 keep-alive），测试客户端共享、
+按模型的并发限制、相同请求合并和连接复用统计
+"""
+import gc
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.utils.llm_pool import SingleFlight, close_shared_clients, get_pool_stats, get_shared_client
+
+
+class FakeOpenAIServer:
+    """模拟补全服务，记录请求数和最大并发数"""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake.lock:
+                    fake.requests += 1
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                time.sleep(fake.latency)
+                with fake.lock:
+                    fake.in_flight -= 1
+
+                content = body["messages"][-1]["content"]
+                if body.get("stream"):
+                    payload = "".join(
+                        "data: " + json.dumps({
+                            "id": "c", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                            "choices": [{"index": 0, "delta": {"content": part}, "finish_reason": None}]
+                        }) + "\n\n" for part in content.split()
+                    ) + "data: [DONE]\n\n"
+                    self._send(payload.encode(), "text/event-stream")
+                else:
+                    self._send(json.dumps({
+                        "id": "c", "object": "chat.completion", "created": 0, "model": body["model"],
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": f"回复: {content}"}}]
+                    }).encode(), "application/json")
+
+            def _send(self, payload, content_type):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestSharedLLMClient(unittest.TestCase):
+    """共享LLM客户端测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.server = FakeOpenAIServer()
+
+    def tearDown(self):
+        """测试后清理"""
+        close_shared_clients()
+        self.server.shutdown()
+
+    def client(self, **kwargs):
+        return get_shared_client("test-key", base_url=self.server.base_url, max_retries=0, **kwargs)
+
+    def ask(self, client, content, model="gpt-test"):
+        response = client.chat.completions.create(model=model, messages=[{"role": "user", "content": content}])
+        return response.choices[0].message.content
+
+    def test_same_config_shares_client(self):
+        """测试相同配置返回同一个客户端"""
+        self.assertIs(self.client(), self.client())
+        self.assertIsNot(self.client(), get_shared_client("other-key", base_url=self.server.base_url))
+
+    def test_identical_in_flight_requests_are_coalesced(self):
+        """测试相同的并发请求只发送一次"""
+        client = self.client()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            replies = list(executor.map(lambda _: self.ask(client, "选择工具"), range(8)))
+
+        self.assertEqual(replies, ["回复: 选择工具"] * 8)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(client.get_stats()["coalesced"], 7)
+
+    def test_model_concurrency_is_bounded(self):
+        """测试每个模型的并发请求数受限"""
+        client = self.client(model_concurrency=2)
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(lambda i: self.ask(client, f"问题{i}"), range(6)))
+
+        self.assertEqual(self.server.requests, 6)
+        self.assertEqual(self.server.max_in_flight, 2)
+
+    def test_connections_are_reused(self):
+        """测试连续请求复用 keep-alive 连接"""
+        client = self.client()
+        for i in range(5):
+            self.ask(client, f"问题{i}")
+
+        stats = client.get_stats()
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["connections_reused"], 4)
+        self.assertEqual(get_pool_stats()["requests"], 5)
+
+    def test_stream_holds_slot_until_consumed(self):
+        """测试流式请求在消费完之前占用并发名额"""
+        client = self.client(model_concurrency=1)
+        stream = client.chat.completions.create(
+            model="gpt-test", messages=[{"role": "user", "content": "你好 世界"}], stream=True
+        )
+        self.assertEqual(client.get_stats()["in_flight"], {"gpt-test": 1})
+        parts = [chunk.choices[0].delta.content for chunk in stream if chunk.choices]
+        self.assertEqual(parts, ["你好", "世界"])
+        self.assertEqual(client.get_stats()["in_flight"], {})
+
+    def test_unconsumed_streams_release_slots(self):
+        """测试从未迭代的流在关闭或回收后释放并发名额"""
+        client = self.client(model_concurrency=2)
+        request = {"model": "m", "messages": [{"role": "user", "content": "你好"}], "stream": True}
+        first = client.chat.completions.create(**request)
+        second = client.chat.completions.create(**request)
+        self.assertEqual(client.get_stats()["in_flight"], {"m": 2})
+        self.assertEqual(first.response.status_code, 200)
+
+        with first:
+            pass
+        del second
+        gc.collect()
+        self.assertEqual(client.get_stats()["in_flight"], {})
+        self.assertEqual(self.ask(client, "再见", model="m"), "回复: 再见")
+
+    def test_single_flight_shares_errors(self):
+        """测试合并的调用共享同一个异常"""
+        flight = SingleFlight()
+        started = threading.Event()
+
+        def fail():
+            started.set()
+            time.sleep(0.05)
+            raise RuntimeError("调用失败")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(flight.do, "key", fail)
+            started.wait()
+            follower = executor.submit(flight.do, "key", fail)
+            for future in (leader, follower):
+                with self.assertRaises(RuntimeError):
+                    future.result()
+
+
+if __name__ == "__main__":
+    unittest.main()
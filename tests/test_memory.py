@@ -17,7 +17,17 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from rainbow_agent.memory.base import Memory, SimpleMemory, BufferedMemory
 from rainbow_agent.memory.conversation import ConversationMemory, Conversation, Message
 from rainbow_agent.memory.vector_store import VectorMemory, VECTOR_SUPPORT
+from rainbow_agent.memory.vector_index import (
+    ExactVectorIndex, IVFVectorIndex, HNSW_SUPPORT, create_vector_index
+)
 from rainbow_agent.memory.manager import MemoryManager, StandardMemoryManager
+from rainbow_agent.memory.embedding_service import (
+    EmbeddingService, EmbeddingCache, FakeEmbeddingBackend
+)
+from rainbow_agent.memory.relevance_retrieval import RelevanceRetrieval
+from rainbow_agent.memory.sqlite_pool import get_connection_manager, close_connection_manager
+from rainbow_agent.memory.memory_compression import MemoryCompression
+from rainbow_agent.memory.compaction_worker import MemoryCompactionWorker
 
 
 class TestBaseMemory(unittest.TestCase):
@@ -238,6 +248,547 @@ class TestVectorMemory(unittest.TestCase):
         self.assertEqual(len(new_memory.memories), 2)
 
 
+class TestVectorIndex(unittest.TestCase):
+    """向量索引测试类"""
+    
+    def setUp(self):
+        """测试前准备"""
+        import numpy as np
+        rng = np.random.default_rng(42)
+        self.vectors = rng.standard_normal((500, 16)).astype("float32")
+        self.query = rng.standard_normal(16).astype("float32")
+        
+        # 暴力计算的期望结果
+        normalized = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        scores = normalized @ (self.query / np.linalg.norm(self.query))
+        self.expected = [f"m{i}" for i in np.argsort(-scores)[:5]]
+    
+    def _fill(self, index):
+        for i, vector in enumerate(self.vectors):
+            index.add(f"m{i}", vector)
+        return index
+    
+    def test_exact_search_matches_brute_force(self):
+        """测试精确索引（含分块）的结果与暴力计算一致"""
+        index = self._fill(ExactVectorIndex(initial_capacity=8, block_size=64))
+        results = index.search(self.query, 5)
+        
+        self.assertEqual([key for key, _ in results], self.expected)
+        self.assertTrue(all(results[i][1] >= results[i + 1][1] for i in range(4)))
+    
+    def test_exact_remove_keeps_matrix_contiguous(self):
+        """测试删除后矩阵保持连续且结果正确"""
+        index = self._fill(ExactVectorIndex())
+        removed = self.expected[0]
+        
+        self.assertTrue(index.remove(removed))
+        self.assertFalse(index.remove(removed))
+        self.assertEqual(len(index), 499)
+        self.assertEqual(index.vectors.shape, (499, 16))
+        self.assertNotIn(removed, index)
+        self.assertEqual([key for key, _ in index.search(self.query, 4)], self.expected[1:5])
+    
+    def test_ivf_search_recall(self):
+        """测试IVF索引在探测全部聚类时与精确结果一致"""
+        index = self._fill(IVFVectorIndex(n_lists=8, n_probe=8, train_threshold=100))
+        
+        self.assertTrue(index.is_trained)
+        self.assertEqual([key for key, _ in index.search(self.query, 5)], self.expected)
+    
+    def test_ivf_lists_follow_removals(self):
+        """测试删除和替换后每个聚类的行号列表与各行所属聚类一致"""
+        import numpy as np
+        index = self._fill(IVFVectorIndex(n_lists=8, n_probe=8, train_threshold=100))
+        for i in range(0, 500, 3):
+            index.remove(f"m{i}")
+        index.add("m1", self.vectors[2])
+        
+        rows = sorted(row for members in index._lists for row in members)
+        self.assertEqual(rows, list(range(len(index))))
+        for list_id, members in enumerate(index._lists):
+            self.assertTrue(all(index._assignments[row] == list_id for row in members))
+            self.assertEqual([index._slots[row] for row in members], list(range(len(members))))
+        
+        remaining = [key for key in self.expected if int(key[1:]) % 3]
+        self.assertEqual([key for key, _ in index.search(self.query, len(remaining))][:len(remaining)],
+                         remaining)
+    
+    def test_hnsw_search(self):
+        """测试HNSW索引"""
+        if not HNSW_SUPPORT:
+            self.skipTest("缺少hnswlib库")
+        index = self._fill(create_vector_index("hnsw", initial_capacity=64))
+        results = index.search(self.query, 5)
+        
+        self.assertEqual(results[0][0], self.expected[0])
+        index.remove(self.expected[0])
+        self.assertNotIn(self.expected[0], [key for key, _ in index.search(self.query, 5)])
+        
+        # 标记删除的空位被复用，容量占满后反复删除和添加也不会扩容
+        capacity = index._index.get_max_elements()
+        for i in range(capacity - len(index)):
+            index.add(f"x{i}", self.vectors[i])
+        for i in range(200):
+            index.remove(f"m{i + 1}")
+            index.add(f"n{i}", self.vectors[i])
+        self.assertEqual(index._index.get_max_elements(), capacity)
+    
+    def test_unknown_backend(self):
+        """测试未知后端"""
+        with self.assertRaises(ValueError):
+            create_vector_index("unknown")
+
+
+class TestEmbeddingService(unittest.TestCase):
+    """嵌入向量服务测试类"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.backend = FakeEmbeddingBackend(dimension=8)
+    
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_embed_many_batches_and_dedupes(self):
+        """测试批量嵌入只发起一次请求并对相同文本去重"""
+        service = EmbeddingService(self.backend)
+        vectors = service.embed_many(["你好", "世界", "你好"])
+        
+        self.assertEqual(len(vectors), 3)
+        self.assertEqual(self.backend.request_count, 1)
+        self.assertEqual(self.backend.text_count, 2)
+        self.assertTrue((vectors[0] == vectors[2]).all())
+        
+        # 再次请求全部命中缓存
+        service.embed_many(["世界"])
+        self.assertEqual(self.backend.request_count, 1)
+    
+    def test_disk_cache_survives_restart(self):
+        """测试磁盘缓存在新服务实例中仍然有效"""
+        cache_path = os.path.join(self.temp_dir, "embedding_cache.db")
+        EmbeddingService(self.backend, EmbeddingCache(db_path=cache_path)).embed_many(["持久化"])
+        
+        backend = FakeEmbeddingBackend(dimension=8)
+        service = EmbeddingService(backend, EmbeddingCache(db_path=cache_path))
+        service.embed_many(["持久化"])
+        
+        self.assertEqual(backend.request_count, 0)
+        self.assertEqual(service.get_stats()["disk_hits"], 1)
+    
+    def test_submit_coalesces_concurrent_texts(self):
+        """测试时间窗口内提交的文本被合并为一次请求"""
+        service = EmbeddingService(self.backend, max_wait=0.2)
+        futures = [service.submit(f"文本 {i}") for i in range(5)]
+        results = [future.result(timeout=5) for future in futures]
+        service.close()
+        
+        self.assertEqual(len(results), 5)
+        self.assertEqual(self.backend.request_count, 1)
+    
+    def test_save_embeddings_single_request(self):
+        """测试RelevanceRetrieval批量保存嵌入向量"""
+        import sqlite3
+        db_path = os.path.join(self.temp_dir, "memory.db")
+        retrieval = RelevanceRetrieval(
+            db_path=db_path,
+            llm_client=MagicMock(),
+            embedding_service=EmbeddingService(self.backend)
+        )
+        retrieval.save_embeddings(1, [("问题", "user_input"), ("回答", "assistant_response")], "2024-01-01T00:00:00")
+        
+        conn = sqlite3.connect(db_path)
+        count = conn.execute("SELECT COUNT(*) FROM memory_embeddings WHERE memory_id = 1").fetchone()[0]
+        conn.close()
+        
+        self.assertEqual(count, 2)
+        self.assertEqual(self.backend.request_count, 1)
+
+
+class TestRelevanceRetrieval(unittest.TestCase):
+    """相关性检索测试类"""
+    
+    def setUp(self):
+        """测试前准备"""
+        from rainbow_agent.memory.hierarchical_memory import HierarchicalMemory
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "memory.db")
+        self.hierarchical = HierarchicalMemory(db_path=self.db_path)
+        self.retrieval = RelevanceRetrieval(
+            db_path=self.db_path,
+            llm_client=MagicMock(),
+            relevance_threshold=0.5,
+            embedding_service=EmbeddingService(FakeEmbeddingBackend(dimension=32))
+        )
+        
+        self.texts = ["北京天气", "科幻小说", "人工智能", "上海景点"]
+        for memory_id, text in enumerate(self.texts, 1):
+            self.hierarchical.save(text, f"关于{text}的回答", importance=0.8, metadata={"topic": text})
+            self.retrieval.save_embeddings(
+                memory_id, [(text, "user_input")], self._timestamp_of(memory_id)
+            )
+    
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir)
+    
+    def _timestamp_of(self, memory_id):
+        import sqlite3
+        conn = sqlite3.connect(self.db_path)
+        timestamp = conn.execute("SELECT timestamp FROM long_term_memories WHERE id = ?", (memory_id,)).fetchone()[0]
+        conn.close()
+        return timestamp
+    
+    def test_retrieve_exact_match(self):
+        """测试检索结果与综合评分"""
+        results = self.retrieval.retrieve_relevant_memories("人工智能", limit=2)
+        
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["user_input"], "人工智能")
+        self.assertEqual(results[0]["metadata"], {"topic": "人工智能"})
+        self.assertAlmostEqual(results[0]["similarity"], 1.0, places=5)
+        self.assertAlmostEqual(results[0]["score"], 0.6 + 0.8 * 0.2 + 0.2, places=3)
+    
+    def test_index_tracks_inserts_and_deletes(self):
+        """测试常驻索引在加载后同步新增和删除"""
+        import sqlite3
+        self.retrieval.retrieve_relevant_memories("北京天气")
+        
+        self.hierarchical.save("深度学习", "回答", importance=0.9)
+        self.retrieval.save_embeddings(5, [("深度学习", "user_input")], self._timestamp_of(5))
+        self.assertEqual(self.retrieval.index.size, 5)
+        self.assertEqual(self.retrieval.retrieve_relevant_memories("深度学习")[0]["memory_id"], 5)
+        
+        # 其他组件直接删除的记忆会在检索时被剔除
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DELETE FROM long_term_memories WHERE id = 5")
+        conn.commit()
+        conn.close()
+        
+        self.assertEqual(self.retrieval.retrieve_relevant_memories("深度学习"), [])
+        self.assertEqual(self.retrieval.index.size, 4)
+    
+    def test_content_type_filter(self):
+        """测试内容类型过滤"""
+        self.assertEqual(self.retrieval.retrieve_relevant_memories("科幻小说", content_type="assistant_response"), [])
+        self.assertEqual(len(self.retrieval.retrieve_relevant_memories("科幻小说", content_type="user_input")), 1)
+
+
+class TestSQLiteConnectionManager(unittest.TestCase):
+    """SQLite连接管理器测试类"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "memory.db")
+        self.db = get_connection_manager(self.db_path)
+        self.db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT)")
+    
+    def tearDown(self):
+        """测试后清理"""
+        close_connection_manager(self.db_path)
+        shutil.rmtree(self.temp_dir)
+    
+    def test_shared_manager_and_wal(self):
+        """测试同一数据库共享管理器并启用WAL模式"""
+        self.assertIs(get_connection_manager(self.db_path), self.db)
+        self.assertEqual(self.db.query_one("PRAGMA journal_mode")[0], "wal")
+    
+    def test_insert_returns_row_id(self):
+        """测试插入直接返回新行ID"""
+        first = self.db.insert("INSERT INTO items (name) VALUES (?)", ("a",))
+        second = self.db.insert("INSERT INTO items (name) VALUES (?)", ("b",))
+        self.assertEqual(second, first + 1)
+    
+    def test_transaction_batches_and_rolls_back(self):
+        """测试事务批量写入与回滚"""
+        with self.db.transaction() as cursor:
+            cursor.executemany("INSERT INTO items (name) VALUES (?)", [("a",), ("b",)])
+            self.db.insert("INSERT INTO items (name) VALUES (?)", ("c",))
+        
+        with self.assertRaises(ValueError):
+            with self.db.transaction() as cursor:
+                cursor.execute("INSERT INTO items (name) VALUES (?)", ("d",))
+                raise ValueError("回滚")
+        
+        self.assertEqual(self.db.query_one("SELECT COUNT(*) FROM items")[0], 3)
+    
+    def test_per_thread_connections(self):
+        """测试每个线程使用独立的长连接"""
+        import threading
+        connections = []
+        thread = threading.Thread(target=lambda: connections.append(self.db.connection))
+        thread.start()
+        thread.join()
+        
+        self.assertIs(self.db.connection, self.db.connection)
+        self.assertIsNot(connections[0], self.db.connection)
+
+    def test_finished_thread_connections_are_closed(self):
+        """测试线程结束后其连接被关闭而不是一直累积"""
+        import sqlite3
+        import threading
+        connections = []
+        for _ in range(5):
+            thread = threading.Thread(target=lambda: connections.append(self.db.connection))
+            thread.start()
+            thread.join()
+        self.db.connection
+
+        self.assertLessEqual(self.db.connection_count, 2)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connections[0].execute("SELECT 1")
+
+    def test_memory_database_is_shared_between_threads(self):
+        """测试内存数据库在同一管理器的各个线程之间共享"""
+        import threading
+        close_connection_manager(":memory:")
+        db = get_connection_manager(":memory:")
+        self.addCleanup(close_connection_manager, ":memory:")
+        db.execute("CREATE TABLE items (name TEXT)")
+        thread = threading.Thread(target=lambda: db.execute("INSERT INTO items (name) VALUES ('a')"))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(db.query("SELECT name FROM items"), [("a",)])
+
+    def test_missing_file_does_not_close_existing_manager(self):
+        """测试数据库文件被删除后不关闭其他组件仍在使用的管理器"""
+        self.db.connection
+        os.remove(self.db_path)
+
+        replacement = get_connection_manager(self.db_path)
+        self.assertIsNot(replacement, self.db)
+        self.assertEqual(self.db.query_one("SELECT COUNT(*) FROM items")[0], 0)
+        self.db.close()
+
+    def test_async_facade(self):
+        """测试异步外观"""
+        import asyncio
+        
+        async def run():
+            row_id = await self.db.insert_async("INSERT INTO items (name) VALUES (?)", ("async",))
+            rows = await self.db.query_async("SELECT name FROM items WHERE id = ?", (row_id,))
+            return rows
+        
+        self.assertEqual(asyncio.run(run()), [("async",)])
+
+
+class TestMemoryCompaction(unittest.TestCase):
+    """记忆增量压缩测试类"""
+    
+    def setUp(self):
+        """测试前准备"""
+        from datetime import datetime, timedelta
+        from rainbow_agent.memory.hierarchical_memory import HierarchicalMemory
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "memory.db")
+        HierarchicalMemory(db_path=self.db_path)
+        
+        llm_client = MagicMock()
+        llm_client.chat.completions.create.return_value.choices[0].message.content = "摘要"
+        self.compression = MemoryCompression(db_path=self.db_path, llm_client=llm_client, importance_threshold=0.6)
+        
+        # 10条30天前的记忆，偶数条重要性较低
+        db = get_connection_manager(self.db_path)
+        base = datetime.now() - timedelta(days=30)
+        db.executemany(
+            "INSERT INTO long_term_memories (timestamp, user_input, assistant_response, importance) VALUES (?, ?, ?, ?)",
+            [
+                ((base + timedelta(minutes=i)).isoformat(), f"问题{i}", f"回答{i}", 0.5 if i % 2 == 0 else 0.9)
+                for i in range(10)
+            ]
+        )
+    
+    def tearDown(self):
+        """测试后清理"""
+        close_connection_manager(self.db_path)
+        shutil.rmtree(self.temp_dir)
+    
+    def test_chunked_compression_with_checkpoint(self):
+        """测试分块压缩、检查点和层级摘要"""
+        result = self.compression.compress_long_term_memories(
+            days=7, min_count=5, chunk_size=3, rollup_fanout=2
+        )
+        
+        self.assertEqual(result["status"], "completed")
+        self.assertEqual(result["chunk_count"], 4)
+        self.assertEqual(result["deleted_count"], 5)
+        self.assertEqual(result["retained_count"], 5)
+        self.assertEqual(len(self.compression.get_summaries(level=1)), 4)
+        self.assertEqual(result["rollup_count"], 3)
+        self.assertEqual(len(self.compression.get_summaries(level=3)), 1)
+        
+        # 保留下来的记忆不会被重复压缩
+        again = self.compression.compress_long_term_memories(days=7, min_count=1)
+        self.assertEqual(again["status"], "skipped")
+    
+    def test_chunk_failure_keeps_memories(self):
+        """测试摘要生成失败时不删除记忆也不推进检查点"""
+        self.compression.llm_client.chat.completions.create.side_effect = RuntimeError("API错误")
+        result = self.compression.compress_long_term_memories(days=7, min_count=1, chunk_size=3)
+        
+        self.assertEqual(result["status"], "failed")
+        self.assertIsNone(self.compression.get_checkpoint())
+        self.assertEqual(get_connection_manager(self.db_path).query_one("SELECT COUNT(*) FROM long_term_memories")[0], 10)
+    
+    def test_worker_runs_in_background(self):
+        """测试后台压缩任务和吞吐量指标"""
+        deleted = []
+        worker = MemoryCompactionWorker(
+            self.compression, days=7, min_count=1, chunk_size=4,
+            on_chunk=lambda chunk_result: deleted.extend(chunk_result["deleted_ids"])
+        )
+        worker.trigger()
+        for _ in range(100):
+            if worker.metrics["runs"]:
+                break
+            time.sleep(0.05)
+        worker.stop(timeout=5)
+        
+        metrics = worker.get_metrics()
+        self.assertEqual(metrics["chunks"], 3)
+        self.assertEqual(metrics["memories_processed"], 10)
+        self.assertEqual(len(deleted), 5)
+        self.assertGreater(metrics["memories_per_second"], 0)
+        self.assertFalse(metrics["is_running"])
+
+
+class TestMemoryLayer(unittest.TestCase):
+    """分层记忆的记忆层测试类"""
+    
+    def test_capacity_evicts_oldest(self):
+        """测试超出容量时淘汰最旧的记忆"""
+        from rainbow_agent.memory.hierarchical_memory import MemoryLayer
+        layer = MemoryLayer(name="working", capacity=3)
+        for i in range(5):
+            layer.add({"id": f"m{i}", "content": i})
+        
+        self.assertEqual(len(layer), 3)
+        self.assertEqual([m["content"] for m in layer.get()], [2, 3, 4])
+        self.assertEqual([m["content"] for m in layer.get(2)], [3, 4])
+        self.assertNotIn("m0", layer)
+        self.assertIn("m4", layer)
+    
+    def test_ttl_expiry(self):
+        """测试按单调时钟过期"""
+        from rainbow_agent.memory.hierarchical_memory import MemoryLayer
+        layer = MemoryLayer(name="short_term", capacity=10, ttl=60)
+        with patch("rainbow_agent.memory.hierarchical_memory.time.monotonic", return_value=1000.0):
+            layer.add({"id": "old"})
+        with patch("rainbow_agent.memory.hierarchical_memory.time.monotonic", return_value=1030.0):
+            layer.add({"id": "new"})
+        with patch("rainbow_agent.memory.hierarchical_memory.time.monotonic", return_value=1070.0):
+            self.assertEqual([m["id"] for m in layer.get()], ["new"])
+            self.assertEqual(len(layer), 1)
+    
+    def test_same_id_replaces_entry(self):
+        """测试同一ID的记忆项替换旧条目且不占用额外容量"""
+        from rainbow_agent.memory.hierarchical_memory import MemoryLayer
+        layer = MemoryLayer(name="working", capacity=2)
+        layer.add({"id": "a", "content": 1})
+        layer.add({"id": "b", "content": 2})
+        layer.add({"id": "a", "content": 3})
+        
+        self.assertEqual(len(layer), 2)
+        self.assertEqual([m["content"] for m in layer.get()], [2, 3])
+
+
+class TestHierarchicalMemoryRetrieval(unittest.TestCase):
+    """分层记忆检索测试类"""
+    
+    def setUp(self):
+        """测试前准备"""
+        from rainbow_agent.memory.hierarchical_memory import HierarchicalMemory
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "memory.db")
+        self.memory = HierarchicalMemory(working_memory_capacity=2, short_term_capacity=3, db_path=self.db_path,
+                                         ranked_retrieval=True)
+    
+    def tearDown(self):
+        """测试后清理"""
+        close_connection_manager(self.db_path)
+        shutil.rmtree(self.temp_dir)
+    
+    def test_recent_retrieval_dedupes_across_layers(self):
+        """测试按时间检索时跨层按记忆ID去重"""
+        self.memory.save("普通问题", "普通回答", importance=0.3)
+        self.memory.save("重要问题", "重要回答", importance=0.9)
+        
+        results = self.memory.retrieve("问题", limit=10, ranked=False)
+        self.assertEqual([m["user_input"] for m in results], ["普通问题", "重要问题"])
+        
+        # 默认按时间检索
+        from rainbow_agent.memory.hierarchical_memory import HierarchicalMemory
+        memory = HierarchicalMemory(db_path=self.db_path)
+        self.assertFalse(memory.ranked_retrieval)
+        self.assertNotIn("score", memory.retrieve("重要问题")[0])
+    
+    def test_ranked_retrieval(self):
+        """测试按相关性检索，已进入长期记忆的对话只返回一次"""
+        self.memory.save("北京今天天气怎么样", "北京今天晴朗", importance=0.9)
+        self.memory.save("推荐一本科幻小说", "推荐《三体》", importance=0.3)
+        self.memory.save("Python如何处理JSON", "使用json模块", importance=0.3)
+        
+        results = self.memory.retrieve("北京天气", limit=5)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["user_input"], "北京今天天气怎么样")
+        self.assertEqual(results[0]["layer"], "short_term")
+        self.assertGreater(results[0]["score"], 0)
+        
+        self.assertEqual(self.memory.retrieve("科幻小说 json", limit=1)[0]["layer"], "working")
+        self.assertEqual(len(self.memory.retrieve_by_layer("天气", layer="long_term")), 1)
+        self.assertEqual(self.memory.retrieve_by_layer("天气", layer="working"), [])
+    
+    def test_evicted_items_remain_searchable_from_long_term(self):
+        """测试移出内存层的重要记忆改由长期记忆提供，普通记忆不再返回"""
+        self.memory.save("北京今天天气怎么样", "北京今天晴朗", importance=0.9)
+        self.memory.save("上海今天天气怎么样", "上海今天下雨", importance=0.3)
+        for i in range(3):
+            self.memory.save(f"闲聊{i}", "好的", importance=0.3)
+        
+        results = self.memory.retrieve("天气", limit=5)
+        self.assertEqual([m["user_input"] for m in results], ["北京今天天气怎么样"])
+        self.assertEqual(results[0]["layer"], "long_term")
+    
+    def test_deleted_long_term_memories_are_dropped(self):
+        """测试外部删除的长期记忆在检索时被移出索引"""
+        from rainbow_agent.memory.hierarchical_memory import HierarchicalMemory
+        self.memory.save("北京今天天气怎么样", "北京今天晴朗", importance=0.9)
+        
+        # 新实例从数据库加载长期记忆
+        memory = HierarchicalMemory(db_path=self.db_path, ranked_retrieval=True)
+        self.assertEqual(len(memory.retrieve("天气")), 1)
+        
+        get_connection_manager(self.db_path).execute("DELETE FROM long_term_memories")
+        self.assertEqual(memory.retrieve("天气"), [])
+        self.assertEqual(len(memory.text_index), 0)
+    
+    def test_concurrent_compaction_updates(self):
+        """测试后台线程移除长期记忆时与保存和检索并发执行不出错"""
+        import threading
+        memory_ids = [self.memory.save(f"天气问题{i}", "回答", importance=0.9) for i in range(50)]
+        errors = []
+        
+        def compact():
+            try:
+                for memory_id in memory_ids:
+                    self.memory.remove_long_term_memories([memory_id])
+            except Exception as e:
+                errors.append(e)
+        
+        thread = threading.Thread(target=compact)
+        thread.start()
+        for i in range(50):
+            self.memory.save(f"闲聊{i}", "好的", importance=0.9)
+            self.memory.retrieve("天气", limit=3)
+        thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertFalse(set(memory_ids) & set(self.memory._promoted))
+
+
 class TestMemoryManager(unittest.TestCase):
     """记忆管理器测试类"""
     
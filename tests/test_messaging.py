@@ -0,0 +1,139 @@
+"""
+消息总线测试
+
+测试按接收者和任务索引的查询、有界保留、代理收件箱的游标读取，
+以及异步等待新消息和订阅回调
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.collaboration.messaging import Message, MessageBus, MessageType
+
+
+def message(content, recipient_id=None, msg_type=MessageType.TASK_ASSIGNMENT, task_id=None):
+    return Message(content=content, msg_type=msg_type, sender_id="system",
+                   recipient_id=recipient_id, related_task_id=task_id)
+
+
+class TestMessageBus(unittest.TestCase):
+    """消息总线测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.bus = MessageBus()
+        self.bus.subscribe("agent1", [MessageType.TASK_ASSIGNMENT, MessageType.SYSTEM])
+        self.bus.subscribe("agent2")
+
+    def test_messages_for_agent(self):
+        """测试按接收者、订阅类型和时间戳获取消息，广播消息按发布顺序合并"""
+        self.bus.publish(message("任务1", "agent1"))
+        self.bus.publish(message("广播", msg_type=MessageType.SYSTEM))
+        self.bus.publish(message("查询", "agent1", MessageType.QUERY))
+        self.bus.publish(message("给agent2", "agent2"))
+        since = self.bus.messages[-1].timestamp
+        time.sleep(0.01)
+        self.bus.publish(message("任务2", "agent1"))
+
+        contents = [m.content for m in self.bus.get_messages_for_agent("agent1")]
+        self.assertEqual(contents, ["任务1", "广播", "任务2"])
+        self.assertEqual([m.content for m in self.bus.get_messages_for_agent("agent2")], ["广播", "给agent2"])
+        self.assertEqual([m.content for m in self.bus.get_messages_for_agent("agent1", since)], ["任务2"])
+        self.assertEqual(self.bus.get_messages_for_agent("unknown"), [])
+
+    def test_messages_by_task(self):
+        """测试按任务获取消息"""
+        self.bus.publish(message("a", "agent1", task_id="t1"))
+        self.bus.publish(message("b", "agent2", task_id="t2"))
+        self.bus.publish(message("c", task_id="t1"))
+        self.assertEqual([m.content for m in self.bus.get_messages_by_task("t1")], ["a", "c"])
+
+    def test_bounded_retention(self):
+        """测试超出数量或保留时间的消息被移除，索引同步更新"""
+        bus = MessageBus(max_messages=3)
+        bus.subscribe("agent1")
+        for i in range(5):
+            bus.publish(message(f"m{i}", "agent1", task_id="t1"))
+
+        self.assertEqual([m.content for m in bus.messages], ["m2", "m3", "m4"])
+        self.assertEqual([m.content for m in bus.get_messages_for_agent("agent1")], ["m2", "m3", "m4"])
+        self.assertEqual(len(bus.get_messages_by_task("t1")), 3)
+        self.assertEqual(bus.get_stats()["evicted"], 2)
+
+        bus = MessageBus(retention_seconds=60)
+        old = message("旧消息", task_id="old")
+        old.timestamp -= 120
+        bus.publish(old)
+        bus.publish(message("新消息"))
+        self.assertEqual([m.content for m in bus.messages], ["新消息"])
+        self.assertEqual(bus.get_messages_by_task("old"), [])
+
+    def test_clear_messages(self):
+        """测试清除早于指定时间的消息"""
+        self.bus.publish(message("旧", "agent1", task_id="t1"))
+        cutoff = time.time() + 0.001
+        time.sleep(0.01)
+        self.bus.publish(message("新", "agent1", task_id="t1"))
+
+        self.bus.clear_messages(older_than=cutoff)
+        self.assertEqual([m.content for m in self.bus.get_messages_by_task("t1")], ["新"])
+        self.assertEqual([m.content for m in self.bus.read_messages("agent1")[0]], ["新"])
+
+        self.bus.clear_messages()
+        self.assertEqual(len(self.bus.messages), 0)
+        self.assertEqual(self.bus.get_messages_for_agent("agent1"), [])
+
+    def test_inbox_cursor_reads(self):
+        """测试收件箱按游标增量读取，溢出时丢弃最早的消息"""
+        bus = MessageBus(inbox_size=3)
+        bus.subscribe("agent1")
+        for i in range(2):
+            bus.publish(message(f"m{i}", "agent1"))
+
+        first, cursor = bus.read_messages("agent1")
+        self.assertEqual([m.content for m in first], ["m0", "m1"])
+        self.assertEqual(bus.read_messages("agent1", cursor), ([], cursor))
+
+        for i in range(2, 6):
+            bus.publish(message(f"m{i}", "agent1"))
+        batch, next_cursor = bus.read_messages("agent1", cursor, limit=2)
+        self.assertEqual([m.content for m in batch], ["m3", "m4"])
+        self.assertEqual([m.content for m in bus.read_messages("agent1", next_cursor)[0]], ["m5"])
+        self.assertEqual(bus.get_stats()["inboxes"]["agent1"]["dropped"], 3)
+
+    def test_wait_for_messages(self):
+        """测试异步等待其他线程发布的新消息"""
+        async def scenario():
+            _, cursor = self.bus.read_messages("agent1")
+            timer = threading.Timer(0.05, lambda: self.bus.publish(message("来自线程", "agent1")))
+            timer.start()
+            messages, cursor = await self.bus.wait_for_messages("agent1", cursor, timeout=2)
+            timed_out = await self.bus.wait_for_messages("agent1", cursor, timeout=0.05)
+            return messages, timed_out, cursor
+
+        messages, timed_out, cursor = asyncio.run(scenario())
+        self.assertEqual([m.content for m in messages], ["来自线程"])
+        self.assertEqual(timed_out, ([], cursor))
+
+    def test_async_callback(self):
+        """测试协程回调在订阅时的事件循环中执行"""
+        async def scenario():
+            received = asyncio.Queue()
+
+            async def on_message(msg):
+                await received.put(msg.content)
+
+            self.bus.subscribe("agent3", callback=on_message)
+            threading.Thread(target=self.bus.publish, args=(message("你好", "agent3"),)).start()
+            return await asyncio.wait_for(received.get(), timeout=2)
+
+        self.assertEqual(asyncio.run(scenario()), "你好")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+"""
+OpenAI服务异步接口测试
+
+使用 httpx.MockTransport 模拟 OpenAI 兼容的补全服务，不访问网络
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import unittest
+from unittest.mock import AsyncMock
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.ai.openai_service import OpenAIService, OpenAIServiceError
+from rainbow_agent.core.dialogue_manager import DialogueManager
+
+
+class FakeCompletionServer:
+    """模拟补全服务：每个请求等待 latency 秒，并记录最大并发数和创建的HTTP客户端"""
+
+    def __init__(self, latency=0.05, chunks=("你好", "，", "世界"), status=200):
+        self.latency = latency
+        self.chunks = chunks
+        self.status = status
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.http_clients = []
+
+    async def handle(self, request):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        if self.status != 200:
+            return httpx.Response(self.status, json={"error": {"message": "服务不可用"}})
+        body = json.loads(request.content)
+        if body.get("stream"):
+            events = "".join(
+                "data: " + json.dumps({
+                    "id": "chunk", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]
+                }) + "\n\n"
+                for text in self.chunks
+            ) + "data: [DONE]\n\n"
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=events.encode())
+
+        return httpx.Response(200, json={
+            "id": "completion", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "".join(self.chunks)}}]
+        })
+
+    def http_client(self):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        self.http_clients.append(client)
+        return client
+
+    def service(self, **kwargs):
+        return OpenAIService(
+            api_key="test-key",
+            base_url="http://fake-llm/v1",
+            http_client_factory=self.http_client,
+            **kwargs
+        )
+
+
+class TestAsyncOpenAIService(unittest.TestCase):
+    """OpenAI服务异步接口测试类"""
+
+    def test_concurrent_calls_overlap(self):
+        """测试并发调用不会相互阻塞"""
+        server = FakeCompletionServer(latency=0.1)
+        service = server.service(max_concurrency=8)
+
+        async def run():
+            start = time.perf_counter()
+            replies = await asyncio.gather(*[
+                service.generate_response_async([{"role": "user", "content": f"问题{i}"}]) for i in range(8)
+            ])
+            return replies, time.perf_counter() - start
+
+        replies, elapsed = asyncio.run(run())
+        self.assertEqual(replies, ["你好，世界"] * 8)
+        self.assertEqual(server.max_in_flight, 8)
+        self.assertLess(elapsed, 0.5)
+
+    def test_concurrency_is_bounded(self):
+        """测试并发请求数不超过上限"""
+        server = FakeCompletionServer(latency=0.02)
+        service = server.service(max_concurrency=2)
+
+        async def run():
+            await asyncio.gather(*[
+                service.generate_response_async([{"role": "user", "content": "问题"}]) for i in range(6)
+            ])
+
+        asyncio.run(run())
+        self.assertEqual(server.requests, 6)
+        self.assertEqual(server.max_in_flight, 2)
+
+    def test_timeout_and_cancellation(self):
+        """测试单次调用超时和取消"""
+        server = FakeCompletionServer(latency=1.0)
+        service = server.service()
+
+        async def run():
+            reply = await service.generate_response_async([{"role": "user", "content": "问题"}], timeout=0.05)
+            task = asyncio.create_task(service.generate_response_async([{"role": "user", "content": "问题"}]))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return reply
+
+        self.assertIn("took too long", asyncio.run(run()))
+        self.assertEqual(server.in_flight, 0)
+
+    def test_stream_response(self):
+        """测试流式输出逐段返回文本"""
+        service = FakeCompletionServer(latency=0.01).service()
+
+        async def run():
+            return [delta async for delta in service.stream_response([{"role": "user", "content": "问题"}])]
+
+        self.assertEqual(asyncio.run(run()), ["你好", "，", "世界"])
+
+    def test_stream_errors_are_raised(self):
+        """测试流式输出失败和超时时抛出异常而不是把错误信息当作文本返回"""
+        service = FakeCompletionServer(latency=0.01, status=503).service()
+
+        async def run(timeout=None):
+            return [delta async for delta in service.stream_response([{"role": "user", "content": "问题"}],
+                                                                     timeout=timeout)]
+
+        with self.assertRaises(OpenAIServiceError):
+            asyncio.run(run())
+        service = FakeCompletionServer(latency=1.0).service()
+        with self.assertRaisesRegex(OpenAIServiceError, "timed out"):
+            asyncio.run(run(timeout=0.05))
+
+    def test_clients_closed_with_loop(self):
+        """测试事件循环结束时关闭该循环的HTTP客户端"""
+        server = FakeCompletionServer(latency=0.01)
+        service = server.service()
+
+        async def run():
+            return await service.generate_response_async([{"role": "user", "content": "问题"}])
+
+        asyncio.run(run())
+        asyncio.run(run())
+        self.assertEqual(len(server.http_clients), 2)
+        self.assertTrue(all(client.is_closed for client in server.http_clients))
+
+        async def close_explicitly():
+            await run()
+            await service.aclose()
+            return server.http_clients[-1].is_closed
+
+        self.assertTrue(asyncio.run(close_explicitly()))
+
+
+class TestDialogueManagerStreaming(unittest.TestCase):
+    """对话管理器流式处理测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.storage = AsyncMock()
+        self.storage.create_turn_async.side_effect = lambda session_id, role, content, metadata=None: {
+            "id": f"{role}-turn", "session_id": session_id, "role": role, "content": content
+        }
+        self.storage.get_session_async.return_value = {"id": "s1", "metadata": {"dialogue_type": "human_ai_private"}}
+        self.storage.get_recent_turns_async.return_value = []
+        self.manager = DialogueManager(storage=self.storage, ai_service=FakeCompletionServer(latency=0.01).service())
+
+    def test_process_input_uses_async_service(self):
+        """测试 process_input 使用异步AI服务"""
+        result = asyncio.run(self.manager.process_input("s1", "u1", "你好"))
+        self.assertEqual(result["response"], "你好，世界")
+
+    def test_process_input_stream(self):
+        """测试 process_input_stream 先返回文本片段再返回完整结果"""
+        async def run():
+            return [event async for event in self.manager.process_input_stream("s1", "u1", "你好")]
+
+        events = asyncio.run(run())
+        self.assertEqual([e["content"] for e in events if e["type"] == "token"], ["你好", "，", "世界"])
+        self.assertEqual(events[-1]["type"], "done")
+        self.assertEqual(events[-1]["response"], "你好，世界")
+        self.storage.create_turn_async.assert_any_call("s1", "ai", "你好，世界", metadata=events[-1]["metadata"])
+
+    def test_process_input_stream_error_event(self):
+        """测试流式生成失败时返回 error 事件，done 事件带有错误信息"""
+        self.manager.ai_service = FakeCompletionServer(latency=0.01, status=503).service()
+
+        async def run():
+            return [event async for event in self.manager.process_input_stream("s1", "u1", "你好")]
+
+        events = asyncio.run(run())
+        self.assertEqual([e["type"] for e in events], ["error", "token", "done"])
+        self.assertIn("error", events[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
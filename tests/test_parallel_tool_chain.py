@@ -0,0 +1,317 @@
+"""
+并行工具链测试
+
+测试按数据依赖并发执行步骤、扇出/扇入、步骤超时和失败时跳过下游步骤、
+步骤之间的流式传递，以及分支工具链并发执行满足条件的分支
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.tools.base import BaseTool, CachePolicy
+from rainbow_agent.tools.file_tools import FileReadTool
+from rainbow_agent.tools.tool_chain import BranchingToolChain, ParallelToolChain, ToolChain
+
+
+class DelayTool(BaseTool):
+    """等待指定时间后返回带标记参数的测试工具"""
+    cache_policy = CachePolicy.NEVER
+
+    def __init__(self, name, delay=0.0, fail=False):
+        super().__init__(name=name, description="测试工具")
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def run(self, args):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ValueError(f"{self.name}执行失败")
+        return f"{self.name}({args})"
+
+
+class ChunkTool(BaseTool):
+    """逐块产生数据的测试工具，记录产生每个数据块的时间"""
+    cache_policy = CachePolicy.NEVER
+
+    def __init__(self, name, chunks, delay=0.0, fail_at=None):
+        super().__init__(name=name, description="流式测试工具")
+        self.chunks = chunks
+        self.delay = delay
+        self.fail_at = fail_at
+        self.produced = []
+
+    def run(self, args):
+        return "".join(self.run_stream(args))
+
+    def run_stream(self, args):
+        for i in range(self.chunks):
+            if i == self.fail_at:
+                raise IOError("读取中断")
+            time.sleep(self.delay)
+            self.produced.append(time.time())
+            yield f"{i}\n"
+
+
+class CollectTool(BaseTool):
+    """读取输入迭代器的测试工具，记录收到第一个数据块的时间"""
+    cache_policy = CachePolicy.NEVER
+
+    def __init__(self, name="collect"):
+        super().__init__(name=name, description="收集测试工具")
+        self.first_chunk_at = None
+
+    def run(self, args):
+        lines = []
+        for chunk in args:
+            if self.first_chunk_at is None:
+                self.first_chunk_at = time.time()
+            lines.append(chunk.strip())
+        return ",".join(lines)
+
+
+class FirstChunkTool(BaseTool):
+    """只读取输入流第一个数据块的测试工具"""
+    cache_policy = CachePolicy.NEVER
+
+    def __init__(self):
+        super().__init__(name="first_chunk", description="只读第一块")
+
+    def run(self, args):
+        return next(iter(args)).strip()
+
+
+class RelayTool(BaseTool):
+    """把输入流的每个数据块原样转发的测试工具"""
+    cache_policy = CachePolicy.NEVER
+
+    def __init__(self, name):
+        super().__init__(name=name, description="转发测试工具")
+
+    def run(self, args):
+        return "".join(self.run_stream(args))
+
+    def run_stream(self, args):
+        for chunk in args:
+            yield chunk
+
+
+class PolicyTool(BaseTool):
+    """按指定缓存策略缓存结果、记录执行次数的测试工具"""
+
+    def __init__(self, name, policy, ttl=None):
+        super().__init__(name=name, description="缓存策略测试工具")
+        self.cache_policy = policy
+        self.cache_ttl = ttl
+        self.calls = 0
+
+    def run(self, args):
+        self.calls += 1
+        return f"{self.name}({args})#{self.calls}"
+
+
+class TestParallelToolChain(unittest.TestCase):
+    """并行工具链测试类"""
+
+    def test_sequential_compatibility(self):
+        """测试按工具列表创建时与顺序工具链的结果相同"""
+        tools = [DelayTool("a"), DelayTool("b"), DelayTool("a")]
+        result = ParallelToolChain("seq", "顺序执行", tools=tools).execute("x")
+        expected = ToolChain("seq", "顺序执行", tools=tools).execute("x")
+        self.assertEqual(result["final_result"], expected["final_result"])
+        self.assertEqual([step["step_id"] for step in result["steps"]], ["a", "b", "a_2"])
+        self.assertNotIn("error", result)
+
+    def test_fan_out_fan_in(self):
+        """测试互不依赖的步骤并发执行，扇入步骤收到所有依赖的输出"""
+        chain = ParallelToolChain("dag", "扇出扇入")
+        chain.add_step("load", DelayTool("load", 0.1))
+        for name in ("stats", "head", "chart"):
+            chain.add_step(name, DelayTool(name, 0.2), depends_on=["load"])
+        chain.add_step("report", DelayTool("report", 0.1), depends_on=["stats", "head", "chart"],
+                       input_builder=lambda outputs, data: "+".join(sorted(outputs)))
+
+        start = time.time()
+        result = chain.execute("data")
+        elapsed = time.time() - start
+
+        self.assertEqual(result["final_result"], "report(chart+head+stats)")
+        self.assertLess(elapsed, 0.55)
+        self.assertTrue(all(step["status"] == "completed" for step in result["steps"]))
+
+        multi_sink = ParallelToolChain("sinks", "多个出口")
+        multi_sink.add_step("x", DelayTool("x"))
+        multi_sink.add_step("y", DelayTool("y"))
+        self.assertEqual(multi_sink.execute(1)["final_result"], {"x": "x(1)", "y": "y(1)"})
+
+    def test_add_step_validation(self):
+        """测试重复的步骤ID和不存在的依赖会被拒绝"""
+        chain = ParallelToolChain("invalid", "校验")
+        chain.add_step("a", DelayTool("a"))
+        with self.assertRaises(ValueError):
+            chain.add_step("a", DelayTool("a"))
+        with self.assertRaises(ValueError):
+            chain.add_step("b", DelayTool("b"), depends_on=["missing"])
+        self.assertEqual(ParallelToolChain("empty", "空").execute("x"), {"error": "工具链为空"})
+
+    def test_timeout_and_failure_skip_dependents(self):
+        """测试超时和失败的步骤不阻塞其他分支，其下游步骤被跳过"""
+        chain = ParallelToolChain("partial", "部分失败")
+        chain.add_step("slow", DelayTool("slow", 1.0), timeout=0.1)
+        chain.add_step("broken", DelayTool("broken", fail=True))
+        chain.add_step("fast", DelayTool("fast", 0.05))
+        chain.add_step("after_slow", DelayTool("after_slow"), depends_on=["slow"])
+        chain.add_step("after_broken", DelayTool("after_broken"), depends_on=["broken"])
+
+        start = time.time()
+        result = chain.execute("x")
+        self.assertLess(time.time() - start, 0.5)
+
+        status = {step["step_id"]: step["status"] for step in result["steps"]}
+        self.assertEqual(status, {"slow": "timeout", "broken": "failed", "fast": "completed",
+                                  "after_slow": "skipped", "after_broken": "skipped"})
+        self.assertEqual(result["final_result"]["fast"], "fast(x)")
+        self.assertIn("error", result)
+
+        chain = ParallelToolChain("bounded", "整体超时", tools=[DelayTool("a", 0.3), DelayTool("b")], timeout=0.1)
+        result = chain.execute("x")
+        self.assertEqual([step["status"] for step in result["steps"]], ["timeout", "skipped"])
+
+    def test_streaming_hand_off(self):
+        """测试流式步骤与下游步骤同时执行，下游步骤在生产者结束前收到数据"""
+        producer = ChunkTool("produce", chunks=5, delay=0.05)
+        consumer = CollectTool()
+        chain = ParallelToolChain("stream", "流式传递", stream_buffer=2)
+        chain.add_step("produce", producer, stream=True)
+        chain.add_step("collect", consumer, depends_on=["produce"])
+
+        result = chain.execute("x")
+        self.assertEqual(result["final_result"], "0,1,2,3,4")
+        self.assertEqual(result["steps"][0]["chunks"], 5)
+        self.assertLess(consumer.first_chunk_at, producer.produced[-1])
+
+        fan_out = ParallelToolChain("tee", "一个生产者多个消费者")
+        fan_out.add_step("produce", ChunkTool("produce", chunks=3), stream=True)
+        fan_out.add_step("first", CollectTool("first"), depends_on=["produce"])
+        fan_out.add_step("slow", DelayTool("slow", 0.1))
+        fan_out.add_step("second", CollectTool("second"), depends_on=["produce", "slow"],
+                         input_builder=lambda outputs, data: outputs["produce"])
+        self.assertEqual(fan_out.execute("x")["final_result"], {"first": "0,1,2", "second": "0,1,2"})
+
+    def test_partial_read_stops_producer(self):
+        """测试下游步骤没有读完输入流就完成时生产者随即停止"""
+        producer = ChunkTool("produce", chunks=100)
+        chain = ParallelToolChain("partial_read", "只读一部分", stream_buffer=2)
+        chain.add_step("produce", producer, stream=True, timeout=3)
+        chain.add_step("first", FirstChunkTool(), depends_on=["produce"])
+
+        start = time.time()
+        result = chain.execute("x")
+        self.assertLess(time.time() - start, 1.0)
+        self.assertEqual(result["final_result"], "0")
+        self.assertEqual([step["status"] for step in result["steps"]], ["completed", "completed"])
+        self.assertLess(len(producer.produced), 100)
+
+    def test_long_stream_pipeline(self):
+        """测试流式步骤数量超过共享线程池大小时也不会死锁，超过上限时添加步骤直接失败"""
+        chain = ParallelToolChain("pipeline", "多级流式管道", timeout=10)
+        chain.add_step("stage_0", ChunkTool("produce", chunks=500), stream=True)
+        for i in range(1, 7):
+            chain.add_step(f"stage_{i}", RelayTool(f"relay_{i}"), depends_on=[f"stage_{i - 1}"], stream=True)
+        chain.add_step("collect", CollectTool(), depends_on=["stage_6"])
+
+        result = chain.execute("x")
+        self.assertNotIn("error", result)
+        self.assertEqual(len(result["final_result"].split(",")), 500)
+
+        limited = ParallelToolChain("limited", "线程上限", max_stream_workers=2)
+        limited.add_step("produce", ChunkTool("produce", chunks=1), stream=True)
+        limited.add_step("first", CollectTool("first"), depends_on=["produce"])
+        with self.assertRaises(ValueError):
+            limited.add_step("second", CollectTool("second"), depends_on=["produce"])
+        self.assertNotIn("second", limited.steps)
+
+    def test_stream_failure_propagates(self):
+        """测试流式步骤中途失败时下游步骤也失败而不是一直等待"""
+        chain = ParallelToolChain("broken_stream", "流式失败")
+        chain.add_step("produce", ChunkTool("produce", chunks=5, fail_at=2), stream=True)
+        chain.add_step("collect", CollectTool(), depends_on=["produce"], timeout=2)
+        result = chain.execute("x")
+        status = {step["step_id"]: step["status"] for step in result["steps"]}
+        self.assertEqual(status, {"produce": "failed", "collect": "failed"})
+        self.assertIn("读取中断", result["steps"][1]["error"])
+
+    def test_stream_file(self):
+        """测试文件读取工具按块流式传递文件内容"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        path = os.path.join(temp_dir, "data.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("a,b\n" + "".join(f"{i},{i * 2}\n" for i in range(1000)))
+
+        reader = FileReadTool()
+        chain = ParallelToolChain("file", "流式读取文件")
+        chain.add_step("read", reader, stream=True)
+        chain.add_step("count", CollectTool("count"), depends_on=["read"],
+                       input_builder=lambda outputs, data: [str("".join(outputs["read"]).count("\n"))])
+        with open(path, encoding="utf-8") as f:
+            expected = f.read()
+        self.assertEqual("".join(reader.run_stream(path)), expected)
+        self.assertGreater(len(list(reader.run_stream(path, chunk_size=100))), 1)
+        self.assertEqual(chain.execute(path)["final_result"], "1001")
+
+        missing = chain.execute(os.path.join(temp_dir, "missing.csv"))
+        self.assertEqual(missing["steps"][0]["status"], "failed")
+
+
+    def test_steps_use_tool_policies(self):
+        """测试步骤按工具的缓存策略缓存：按用户隔离、遵守工具的有效期、不缓存NEVER工具"""
+        profile = PolicyTool("profile", CachePolicy.PER_USER)
+        search = PolicyTool("search", CachePolicy.TTL, ttl=0.05)
+        execute = PolicyTool("execute", CachePolicy.NEVER)
+        chain = ParallelToolChain("policies", "缓存策略", cache_max_entries=10)
+        chain.add_step("profile", profile)
+        chain.add_step("search", search)
+        chain.add_step("execute", execute)
+
+        first = chain.execute("x", {"user_id": "u1"})["final_result"]
+        self.assertEqual(chain.execute("x", {"user_id": "u1"})["final_result"]["profile"], first["profile"])
+        self.assertEqual(chain.execute("x", {"user_id": "u2"})["final_result"]["profile"], "profile(x)#2")
+        self.assertEqual((search.calls, execute.calls), (1, 3))
+
+        time.sleep(0.1)
+        chain.execute("x")
+        self.assertEqual((profile.calls, search.calls), (3, 2))
+        self.assertLessEqual(len(chain.results_cache), 10)
+
+
+class TestParallelBranching(unittest.TestCase):
+    """分支工具链并发执行测试类"""
+
+    def test_parallel_branches(self):
+        """测试并发执行所有满足条件的分支，默认仍只执行第一个分支"""
+        def build(parallel):
+            branching = BranchingToolChain("branches", "分支", parallel=parallel)
+            branching.add_branch("a", lambda data, context: True, ToolChain("a", "a", tools=[DelayTool("a", 0.2)]))
+            branching.add_branch("b", lambda data, context: True, ToolChain("b", "b", tools=[DelayTool("b", 0.2)]))
+            branching.add_branch("c", lambda data, context: False, ToolChain("c", "c", tools=[DelayTool("c")]))
+            return branching
+
+        start = time.time()
+        result = build(True).execute("x")
+        self.assertLess(time.time() - start, 0.35)
+        self.assertEqual(result["branches"], ["a", "b"])
+        self.assertEqual(result["results"]["b"]["final_result"], "b(x)")
+
+        result = build(False).execute("x")
+        self.assertEqual(result["branch"], "a")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+关系索引测试
+
+测试关系管理器的实体对索引、实体邻接表和RIS缓存/范围索引，
+以及相似关系查找和任务可执行检查使用索引的结果
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.relationship.models import RelationshipManager
+from rainbow_agent.relationship.tasks import RelationshipTask
+from rainbow_agent.relationship.utils import find_similar_relationships
+
+
+class TestRelationshipIndex(unittest.TestCase):
+    """关系索引测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.manager = RelationshipManager()
+        self.ab = self.manager.create_relationship("a", "AI", "b", "Human")
+        self.ac = self.manager.create_relationship("a", "AI", "c", "Human")
+        self.bc = self.manager.create_relationship("b", "Human", "c", "Human")
+
+    def test_find_relationship_either_direction(self):
+        """测试按实体对查找关系，与方向无关"""
+        self.assertEqual(self.manager.find_relationship("a", "b"), self.ab)
+        self.assertEqual(self.manager.find_relationship("b", "a"), self.ab)
+        self.assertIsNone(self.manager.find_relationship("a", "d"))
+
+    def test_entity_relationships(self):
+        """测试获取实体参与的关系"""
+        self.assertEqual(self.manager.get_entity_relationship_ids("c"), [self.ac, self.bc])
+        rels = self.manager.get_all_relationships(entity_id="b")
+        self.assertEqual([r["relationship_id"] for r in rels], [self.ab, self.bc])
+        self.assertEqual(len(self.manager.get_all_relationships()), 3)
+
+    def test_ris_cache_invalidated_on_update(self):
+        """测试更新互动和协作后RIS缓存和范围索引同步更新"""
+        self.assertEqual(self.manager.get_ris(self.ab), 0.0)
+        self.manager.update_interaction(self.ab, rounds=100)
+        self.assertEqual(self.manager.get_ris(self.ab), 0.2)
+        self.manager.update_collaboration(self.ab, diary_count=4)
+        self.assertEqual(self.manager.get_ris(self.ab), 0.25)
+
+        self.assertEqual(self.manager.find_by_ris(0.2, 0.3), [self.ab])
+        self.assertEqual(sorted(self.manager.find_by_ris(0.0, 0.0)), sorted([self.ac, self.bc]))
+
+    def test_find_similar_relationships(self):
+        """测试相似关系查找只返回RIS在阈值范围内的关系"""
+        self.manager.update_interaction(self.ab, rounds=100)  # RIS 0.2
+        self.manager.update_interaction(self.ac, rounds=60)   # RIS 0.12
+
+        similar = find_similar_relationships(self.manager, self.ab, threshold=0.9)
+        self.assertEqual([r["relationship_id"] for r in similar], [self.ac])
+        self.assertEqual(similar[0]["similarity"], 0.92)
+
+        similar = find_similar_relationships(self.manager, self.ab, threshold=0.8)
+        self.assertEqual([r["relationship_id"] for r in similar], [self.ac, self.bc])
+
+    def test_task_can_execute_uses_cached_ris(self):
+        """测试关系任务按缓存的RIS判断是否可执行"""
+        task = RelationshipTask(title="问候", description="", relationship_id=self.ab,
+                                relationship_intensity_threshold=0.2)
+        self.assertFalse(task.can_execute(self.manager))
+        self.manager.update_interaction(self.ab, rounds=100)
+        self.assertTrue(task.can_execute(self.manager))
+
+    def test_indexes_rebuilt_after_load(self):
+        """测试从文件加载后重建索引"""
+        self.manager.update_interaction(self.bc, rounds=200)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "relationships.json")
+            self.manager.save_to_file(path)
+            loaded = RelationshipManager.load_from_file(path)
+
+        self.assertEqual(loaded.find_relationship("c", "b"), self.bc)
+        self.assertEqual(loaded.find_by_ris(0.4, 0.4), [self.bc])
+        loaded.update_collaboration(self.bc, gift_count=5)
+        self.assertEqual(loaded.find_by_ris(0.4, 0.4), [])
+        self.assertEqual(loaded.find_by_ris(0.5, 0.6), [self.bc])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+关系数据存储测试
+
+测试关系系统的增量保存、按需读取关系、旧版JSON导入、
+在写入线程中保存，以及JSON文件的原子写入
+"""
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.relationship.integration import RelationshipSystem
+from rainbow_agent.relationship.models import RelationshipManager
+from rainbow_agent.relationship.store import atomic_write_json
+
+
+class TestRelationshipStore(unittest.TestCase):
+    """关系数据存储测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.data_dir = tempfile.mkdtemp()
+        self.system = RelationshipSystem(data_dir=self.data_dir, auto_save=False)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.system.close()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def reopen(self):
+        self.system.close()
+        self.system = RelationshipSystem(data_dir=self.data_dir, auto_save=False)
+        return self.system.relationship_manager
+
+    def test_saves_only_changed_records(self):
+        """测试每次只保存变更过的记录"""
+        manager = self.system.relationship_manager
+        ids = [manager.create_relationship("ai", "AI", f"user{i}", "Human") for i in range(5)]
+        self.assertEqual(self.system.save_data(), 5 + 1)  # 5个关系和团队信息
+        self.assertEqual(self.system.save_data(), 0)
+
+        manager.update_interaction(ids[2], rounds=100)
+        with patch.object(self.system.store, "write", wraps=self.system.store.write) as write:
+            self.assertEqual(self.system.save_data(), 1)
+        self.assertEqual(list(write.call_args.args[0].records["relationships"]), [ids[2]])
+
+    def test_lazy_loading(self):
+        """测试重新启动后只读取被访问的关系"""
+        manager = self.system.relationship_manager
+        for i in range(5):
+            manager.create_relationship("ai", "AI", f"user{i}", "Human")
+        rel_id = manager.find_relationship("ai", "user3")
+        manager.update_interaction(rel_id, rounds=100)
+        self.system.save_data()
+
+        manager = self.reopen()
+        self.assertEqual(manager.relationships, {})
+        self.assertEqual(manager.find_relationship("user3", "ai"), rel_id)
+        self.assertEqual(list(manager.relationships), [rel_id])
+        self.assertEqual(manager.get_ris(rel_id), 0.2)
+        self.assertEqual(len(manager.find_by_ris(0.0, 0.0)), 4)
+        self.assertEqual(len(manager.relationships), 1)
+
+        self.assertEqual(len(manager.get_entity_relationship_ids("ai")), 5)
+        self.assertEqual(len(manager.get_all_relationships()), 5)
+
+    def test_tasks_and_agents_persist(self):
+        """测试任务和代理的新增、修改和删除被保存"""
+        self.system.register_agent("agent1", "助手", "assistant")
+        task_manager = self.system.task_manager
+        kept = task_manager.create_task(title="保留的任务")
+        removed = task_manager.create_task(title="删除的任务")
+        self.system.save_data()
+
+        task_manager.complete_task(kept)
+        task_manager.delete_task(removed)
+        self.system.save_data()
+
+        self.reopen()
+        self.assertEqual(list(self.system.task_manager.tasks), [kept])
+        self.assertEqual(self.system.task_manager.get_task(kept).status, "completed")
+        self.assertEqual(list(self.system.agent_team.agents), ["agent1"])
+
+    def test_imports_legacy_json_once(self):
+        """测试存储不存在时导入旧版JSON文件"""
+        legacy_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, legacy_dir, True)
+        legacy = RelationshipManager()
+        rel_id = legacy.create_relationship("ai", "AI", "user", "Human")
+        legacy.save_to_file(os.path.join(legacy_dir, "relationships.json"))
+
+        system = RelationshipSystem(data_dir=legacy_dir, auto_save=False)
+        self.assertTrue(system.store.exists())
+        system.close()
+
+        reopened = RelationshipSystem(data_dir=legacy_dir, auto_save=False)
+        self.assertEqual(reopened.relationship_manager.relationships, {})
+        self.assertEqual(reopened.relationship_manager.find_relationship("ai", "user"), rel_id)
+        reopened.close()
+
+    def test_async_save_runs_off_loop(self):
+        """测试异步保存在共享运行时的IO线程中提交"""
+        self.system.relationship_manager.create_relationship("ai", "AI", "user", "Human")
+        threads = []
+        original = self.system.store.write
+
+        def write(changes):
+            threads.append(threading.current_thread().name)
+            return original(changes)
+
+        with patch.object(self.system.store, "write", side_effect=write):
+            written = asyncio.run(self.system.save_data_async())
+
+        self.assertEqual(written, 2)
+        self.assertTrue(threads[0].startswith("rainbow-io"))
+
+    def test_failed_write_is_retried(self):
+        """测试写入失败后变更在下一次保存时重试"""
+        self.system.relationship_manager.create_relationship("ai", "AI", "user", "Human")
+        with patch.object(self.system.store, "write", side_effect=OSError("磁盘已满")):
+            with self.assertRaises(OSError):
+                self.system.save_data()
+        self.assertEqual(self.system.save_data(), 2)
+
+    def test_atomic_write_json(self):
+        """测试写入失败时保留原文件且不留下临时文件"""
+        path = os.path.join(self.data_dir, "export.json")
+        atomic_write_json(path, {"version": 1})
+        with self.assertRaises(TypeError):
+            atomic_write_json(path, {"version": object()})
+
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"version": 1})
+        self.assertEqual([name for name in os.listdir(self.data_dir) if name.startswith(".tmp-")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+"""
+共享执行运行时测试
+
+测试独立的线程池、按所属方的并发限制和排队顺序、异步接口、
+借用的Executor、关闭行为，以及工具调用器不再各自创建线程池
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import CancelledError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.relationship.agent_team import EnhancedAgentTeam
+from rainbow_agent.tools.tool_invoker import ToolInvoker
+from rainbow_agent.utils.runtime import ExecutionRuntime, PoolType, RuntimeExecutor, get_runtime
+
+
+class TestExecutionRuntime(unittest.TestCase):
+    """共享执行运行时测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.runtime = ExecutionRuntime(pool_sizes={"llm": 4, "tool": 4, "io": 2})
+        self.addCleanup(self.runtime.shutdown, False)
+
+    def test_separate_pools(self):
+        """测试不同类型的任务在各自的线程池中执行"""
+        names = {pool: self.runtime.submit(pool, lambda: threading.current_thread().name).result(timeout=5)
+                 for pool in PoolType}
+        self.assertTrue(names[PoolType.LLM].startswith("rainbow-llm"))
+        self.assertTrue(names[PoolType.TOOL].startswith("rainbow-tool"))
+        self.assertTrue(names[PoolType.IO].startswith("rainbow-io"))
+
+        stats = self.runtime.get_stats()["pools"]
+        self.assertEqual(stats["tool"]["completed"], 1)
+        self.assertEqual(stats["io"]["workers"], 2)
+        with self.assertRaises(ZeroDivisionError):
+            self.runtime.submit("tool", lambda: 1 / 0).result(timeout=5)
+        self.assertEqual(self.runtime.get_stats()["pools"]["tool"]["failed"], 1)
+
+    def test_owner_limit(self):
+        """测试所属方的并发数不超过限制，超出的任务排队且不阻塞提交者"""
+        self.runtime.set_limit("agent:a", 2)
+        release = threading.Event()
+        lock = threading.Lock()
+        active = [0, 0]
+
+        def work():
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            release.wait(5)
+            with lock:
+                active[0] -= 1
+
+        futures = [self.runtime.submit("llm", work, owner="agent:a") for _ in range(6)]
+        other = self.runtime.submit("llm", lambda: "b", owner="agent:b")
+        self.assertEqual(other.result(timeout=5), "b")
+
+        owner_stats = self.runtime.get_stats()["owners"]["agent:a"]
+        self.assertEqual((owner_stats["running"], owner_stats["waiting"], owner_stats["limit"]), (2, 4, 2))
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(active[1], 2)
+        self.assertTrue(self.runtime.wait_idle("agent:a", timeout=5))
+
+    def test_limit_one_preserves_order(self):
+        """测试并发限制为1时按提交顺序执行"""
+        self.runtime.set_limit("writer", 1)
+        order = []
+        futures = [self.runtime.submit("io", order.append, i, owner="writer") for i in range(20)]
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(order, list(range(20)))
+
+    def test_async_and_executor(self):
+        """测试异步接口和借用的Executor，关闭Executor只影响它自己"""
+        executor = self.runtime.executor("tool", owner="agent:c", limit=1)
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            direct = await self.runtime.run_async("llm", lambda x: x * 2, 21)
+            borrowed = await loop.run_in_executor(executor, lambda: "ok")
+            return direct, borrowed
+
+        self.assertEqual(asyncio.run(main()), (42, "ok"))
+        self.assertEqual(list(executor.map(lambda x: x + 1, [1, 2, 3])), [2, 3, 4])
+
+        slow = executor.submit(time.sleep, 0.1)
+        executor.shutdown(wait=True)
+        self.assertTrue(slow.done())
+        with self.assertRaises(RuntimeError):
+            executor.submit(lambda: None)
+        self.assertEqual(self.runtime.submit("tool", lambda: 1).result(timeout=5), 1)
+
+    def test_shutdown(self):
+        """测试关闭时等待排队的任务完成，或取消尚未开始的任务"""
+        self.runtime.set_limit("slow", 1)
+        futures = [self.runtime.submit("tool", time.sleep, 0.05, owner="slow") for _ in range(3)]
+        self.runtime.shutdown(wait=True)
+        self.assertTrue(all(future.done() and not future.cancelled() for future in futures))
+        with self.assertRaises(RuntimeError):
+            self.runtime.submit("tool", lambda: None)
+
+        runtime = ExecutionRuntime()
+        runtime.set_limit("slow", 1)
+        started = threading.Event()
+
+        def work():
+            started.set()
+            time.sleep(0.1)
+            return "done"
+
+        futures = [runtime.submit("tool", work, owner="slow") for _ in range(3)]
+        started.wait(5)
+        runtime.shutdown(wait=False)
+        self.assertTrue(futures[2].cancelled())
+        with self.assertRaises(CancelledError):
+            futures[1].result(timeout=5)
+        self.assertEqual(futures[0].result(timeout=5), "done")
+
+
+class TestSharedRuntimeUsage(unittest.TestCase):
+    """组件借用共享运行时测试类"""
+
+    def test_invokers_share_threads(self):
+        """测试创建大量工具调用器不会创建新的线程"""
+        get_runtime().submit("tool", lambda: None).result(timeout=5)
+        threads_before = threading.active_count()
+        invokers = [ToolInvoker(tools=[], llm_client=object(), owner=f"agent:{i}") for i in range(50)]
+        self.assertTrue(all(isinstance(invoker.executor, RuntimeExecutor) for invoker in invokers))
+        self.assertTrue(all(invoker.executor.runtime is get_runtime() for invoker in invokers))
+        results = [invoker.executor.submit(lambda i=i: i) for i, invoker in enumerate(invokers)]
+        self.assertEqual([future.result(timeout=5) for future in results], list(range(50)))
+        self.assertLessEqual(threading.active_count(), threads_before + get_runtime().pool_sizes[PoolType.TOOL])
+
+    def test_teams_release_their_owner(self):
+        """测试团队关闭或被回收后运行时不再保留其所属方的限制和统计"""
+        import gc
+        runtime = get_runtime()
+
+        team = EnhancedAgentTeam()
+        owner = f"team:{team.team_id}"
+        team.executor.submit(lambda: None).result(timeout=5)
+        self.assertEqual(runtime.get_stats()["owners"][owner]["limit"], 10)
+        team.close()
+        self.assertNotIn(owner, runtime.get_stats()["owners"])
+        with self.assertRaises(RuntimeError):
+            team.executor.submit(lambda: None)
+
+        owners = [f"team:{EnhancedAgentTeam().team_id}" for _ in range(20)]
+        gc.collect()
+        stats = runtime.get_stats()["owners"]
+        self.assertFalse(set(owners) & set(stats))
+        self.assertEqual(runtime.pool_sizes[PoolType.TOOL], 32)
+
+
+if __name__ == "__main__":
+    unittest.main()
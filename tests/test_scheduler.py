@@ -0,0 +1,242 @@
+"""
+子任务调度器测试
+
+测试按依赖关系并发执行子任务、每个代理的并发上限、全局截止时间，
+以及团队管理器和代理团队的并行执行
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.agent import RainbowAgent
+from rainbow_agent.collaboration.result_aggregator import ResultAggregator
+from rainbow_agent.collaboration.scheduler import SubtaskOutcome, SubtaskScheduler
+from rainbow_agent.collaboration.task_decomposer import TaskDecomposer
+from rainbow_agent.collaboration.team import AgentTeam, TaskStatus
+from rainbow_agent.collaboration.team_manager import TeamManager
+
+
+def sleeper(delay):
+    """返回一个等待 delay 秒后返回子任务ID的执行函数"""
+    def execute(spec, dependency_results):
+        time.sleep(spec.get("delay", delay))
+        return spec["id"]
+    return execute
+
+
+def slow_agent(name, delay, release=None):
+    """返回一个执行耗时 delay 秒的模拟代理；设置 release 事件时提前返回"""
+    release = release or threading.Event()
+    agent = MagicMock(spec=RainbowAgent)
+    agent.name = name
+    agent.run = MagicMock(side_effect=lambda prompt: release.wait(delay) and "" or f"{name}: {prompt}")
+    return agent
+
+
+class TestSubtaskScheduler(unittest.TestCase):
+    """子任务调度器测试类"""
+
+    def test_independent_subtasks_run_concurrently(self):
+        """测试没有依赖的子任务并发执行"""
+        scheduler = SubtaskScheduler(max_workers=4)
+        start = time.time()
+        outcomes = list(scheduler.run([{"id": i, "agent": f"a{i}"} for i in range(4)], sleeper(0.1)))
+
+        self.assertLess(time.time() - start, 0.3)
+        self.assertEqual(sorted(o.result for o in outcomes), [0, 1, 2, 3])
+        self.assertEqual(scheduler.peak_concurrency, 4)
+
+    def test_per_agent_concurrency_cap(self):
+        """测试同一代理的子任务不超过并发上限"""
+        scheduler = SubtaskScheduler(max_workers=4, max_concurrency_per_agent=1)
+        active = {"now": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def execute(spec, dependency_results):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            time.sleep(0.02)
+            with lock:
+                active["now"] -= 1
+
+        list(scheduler.run([{"id": i, "agent": "same"} for i in range(3)] + [{"id": 3, "agent": "other"}], execute))
+        self.assertEqual(active["peak"], 2)
+
+    def test_dependencies_receive_results(self):
+        """测试子任务在依赖完成后执行并收到依赖的结果"""
+        received = {}
+
+        def execute(spec, dependency_results):
+            received[spec["id"]] = dependency_results
+            return spec["id"] * 10
+
+        outcomes = list(SubtaskScheduler().run([
+            {"id": 1}, {"id": 2}, {"id": 3, "depends_on": [1, 2]}
+        ], execute))
+
+        self.assertEqual(outcomes[-1].subtask_id, 3)
+        self.assertEqual(received[3], {1: 10, 2: 20})
+
+    def test_deadline_marks_unfinished_subtasks(self):
+        """测试到达截止时间后不再等待未完成的子任务"""
+        start = time.time()
+        outcomes = {o.subtask_id: o for o in SubtaskScheduler().run(
+            [{"id": "fast", "delay": 0.01}, {"id": "slow", "delay": 1.0}, {"id": "after", "depends_on": ["slow"]}],
+            sleeper(0), deadline=time.time() + 0.1
+        )}
+
+        self.assertLess(time.time() - start, 0.5)
+        self.assertTrue(outcomes["fast"].ok)
+        self.assertEqual(outcomes["slow"].status, SubtaskOutcome.TIMEOUT)
+        self.assertEqual(outcomes["after"].status, SubtaskOutcome.TIMEOUT)
+
+    def test_failure_skips_dependents(self):
+        """测试失败的子任务使依赖它的子任务被跳过"""
+        def execute(spec, dependency_results):
+            if spec["id"] == "a":
+                raise RuntimeError("出错了")
+            return spec["id"]
+
+        outcomes = {o.subtask_id: o.status for o in SubtaskScheduler().run(
+            [{"id": "a"}, {"id": "b", "depends_on": ["a"]}, {"id": "c", "depends_on": ["b"]}, {"id": "d"}], execute
+        )}
+        self.assertEqual(outcomes, {"a": "failed", "b": "skipped", "c": "skipped", "d": "completed"})
+
+    def test_cycle_is_rejected(self):
+        """测试依赖关系中有环时报错"""
+        with self.assertRaises(ValueError):
+            list(SubtaskScheduler().run([{"id": 1, "depends_on": [2]}, {"id": 2, "depends_on": [1]}], sleeper(0)))
+
+
+class TestParallelTeamManager(unittest.TestCase):
+    """团队管理器并行执行测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        coordinator = MagicMock(spec=RainbowAgent)
+        coordinator.name = "协调者"
+        coordinator.run = MagicMock(return_value="协调者响应")
+        self.team_manager = TeamManager("测试团队", coordinator, max_execution_time=5)
+        for skill in ("分析", "写作", "检索"):
+            self.team_manager.add_agent(slow_agent(f"{skill}代理", 0.2), [skill])
+
+    @patch.object(ResultAggregator, "aggregate", return_value={"final_result": "最终结果"})
+    @patch.object(TaskDecomposer, "decompose")
+    def test_subtasks_run_in_parallel(self, mock_decompose, mock_aggregate):
+        """测试不同代理的子任务并行执行，依赖的子任务收到前置结果"""
+        mock_decompose.return_value = [
+            {"description": "分析数据", "skills": ["分析"]},
+            {"description": "检索资料", "skills": ["检索"]},
+            {"description": "撰写报告", "skills": ["写作"], "depends_on": [1, 2]},
+        ]
+
+        result = self.team_manager.execute_task("测试任务")
+
+        # 两个独立子任务并行，依赖它们的子任务随后执行：约2个子任务的耗时而不是3个
+        self.assertLess(result["execution_time"], 0.55)
+        self.assertEqual([r["task_description"] for r in result["subtask_results"]], ["分析数据", "检索资料", "撰写报告"])
+        self.assertIn("前置子任务结果", result["subtask_results"][2]["result"])
+        self.assertIsNone(mock_aggregate.call_args.kwargs["missing_subtasks"])
+
+    @patch.object(ResultAggregator, "aggregate", return_value={"final_result": "部分结果"})
+    @patch.object(TaskDecomposer, "decompose")
+    def test_deadline_aggregates_partial_results(self, mock_decompose, mock_aggregate):
+        """测试到达截止时间后聚合已完成的部分结果"""
+        self.team_manager.max_execution_time = 0.3
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self.team_manager.add_agent(slow_agent("慢代理", 2.0, release), ["慢任务"])
+        mock_decompose.return_value = [
+            {"description": "分析数据", "skills": ["分析"]},
+            {"description": "很慢的任务", "skills": ["慢任务"]},
+        ]
+
+        start = time.time()
+        result = self.team_manager.execute_task("测试任务")
+
+        self.assertLess(time.time() - start, 1.0)
+        self.assertEqual(len(result["subtask_results"]), 1)
+        self.assertEqual(result["missing_subtasks"], [{"task_description": "很慢的任务", "reason": "执行超时"}])
+        self.assertEqual(mock_aggregate.call_args.kwargs["missing_subtasks"], result["missing_subtasks"])
+
+
+class TestAgentTeamScheduling(unittest.TestCase):
+    """代理团队子任务调度测试类"""
+
+    QUERY = "请分解并完成这个任务：整理销售数据并写一份报告"
+
+    def build_team(self, decomposition, delay=0.2, release=None, max_execution_time=5):
+        coordinator = MagicMock(spec=RainbowAgent)
+        coordinator.name = "协调者"
+        coordinator.run = MagicMock(side_effect=lambda prompt: decomposition if "子任务1" in prompt else "汇总")
+        team = AgentTeam("测试团队", coordinator, max_execution_time=max_execution_time)
+        self.analyst = slow_agent("分析代理", delay, release)
+        self.writer = slow_agent("写作代理", delay, release)
+        team.add_agent(self.analyst, ["分析"])
+        team.add_agent(self.writer, ["写作"])
+        return team
+
+    def subtasks(self, team):
+        return [task for task in team.tasks.values() if task.parent_id]
+
+    def test_dependencies_are_respected(self):
+        """测试声明的依赖按顺序执行并传递结果，未声明依赖时保持原来的顺序执行"""
+        team = self.build_team("子任务1: 统计销售数据\n所需技能: 分析\n依赖: 无\n\n"
+                               "子任务2: 撰写销售报告\n所需技能: 写作\n依赖: 1")
+        start = time.time()
+        team.run(self.QUERY)
+        self.assertGreaterEqual(time.time() - start, 0.4)
+        first, second = self.subtasks(team)
+        self.assertEqual(second.dependencies, [first.task_id])
+        self.assertIn("统计销售数据", self.writer.run.call_args.args[0])
+
+        team = self.build_team("子任务1: 统计销售数据\n所需技能: 分析\n\n子任务2: 撰写销售报告\n所需技能: 写作")
+        start = time.time()
+        team.run(self.QUERY)
+        self.assertGreaterEqual(time.time() - start, 0.4)
+
+        team = self.build_team("子任务1: 统计销售数据\n所需技能: 分析\n依赖: 无\n\n"
+                               "子任务2: 撰写销售报告\n所需技能: 写作\n依赖: 无")
+        start = time.time()
+        team.run(self.QUERY)
+        self.assertLess(time.time() - start, 0.35)
+        self.assertTrue(all(task.status == TaskStatus.COMPLETED for task in self.subtasks(team)))
+
+    def test_failed_subtask_skips_dependents(self):
+        """测试子任务执行出错时依赖它的子任务被跳过，不会在缺少其结果的情况下执行"""
+        team = self.build_team("子任务1: 统计销售数据\n所需技能: 分析\n依赖: 无\n\n"
+                               "子任务2: 撰写销售报告\n所需技能: 写作\n依赖: 1", delay=0.0)
+        self.analyst.run.side_effect = RuntimeError("数据源不可用")
+        team.run(self.QUERY)
+
+        first, second = self.subtasks(team)
+        self.assertEqual(first.status, TaskStatus.FAILED)
+        self.assertIn("数据源不可用", first.result["error"])
+        self.assertEqual(second.status, TaskStatus.FAILED)
+        self.assertIn("未完成", second.result["error"])
+        self.writer.run.assert_not_called()
+
+    def test_late_results_are_ignored(self):
+        """测试超时的子任务之后返回的结果不会覆盖失败状态"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        team = self.build_team("子任务1: 统计销售数据\n所需技能: 分析\n依赖: 无", delay=5.0,
+                               release=release, max_execution_time=0.3)
+        team.run(self.QUERY)
+        subtask = self.subtasks(team)[0]
+        self.assertEqual(subtask.status, TaskStatus.FAILED)
+
+        release.set()
+        time.sleep(0.2)
+        self.assertEqual(self.analyst.run.call_count, 1)
+        self.assertEqual(subtask.status, TaskStatus.FAILED)
+
+
+if __name__ == "__main__":
+    unittest.main()
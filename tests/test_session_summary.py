@@ -0,0 +1,200 @@
+"""
+会话摘要测试
+
+测试按参与者索引的会话摘要在创建会话、发送消息和标记已读时的增量更新，
+会话列表第一次查询时从存储重建，以及之后只核对有更新的会话
+"""
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.human_chat.chat_manager import HumanChatManager
+from rainbow_agent.human_chat.session_summary import SessionSummary, SessionSummaryIndex
+from tests.test_cache_manager import FakeStorage as CacheTestStorage
+
+
+class FakeStorage(CacheTestStorage):
+    """在缓存测试的内存存储上增加创建和更新会话"""
+
+    async def create_session_async(self, user_id, title, metadata):
+        session = {"id": f"s{len(self.sessions) + 1}", "title": title, "metadata": dict(metadata)}
+        self.sessions[session["id"]] = session
+        return session
+
+    async def update_session_async(self, session_id, updates):
+        for path, value in updates.items():
+            self.sessions[session_id]["metadata"][path.split(".")[-1]] = value
+        return self.sessions[session_id]
+
+
+class FakeDBOptimizer:
+    """按存储直接读写的查询优化器"""
+
+    async def create_message(self, storage, session_id, role, content, metadata):
+        turn_id = f"m{len(storage.turns) + 1}"
+        storage.turns[turn_id] = {"id": turn_id, "session_id": session_id, "role": role, "content": content,
+                                  "created_at": f"2026-01-01T00:00:{len(storage.turns):02d}",
+                                  "metadata": dict(metadata)}
+        return storage.turns[turn_id]
+
+    async def get_sessions(self, storage):
+        return list(storage.sessions.values())
+
+
+class TestSessionSummaryIndex(unittest.TestCase):
+    """会话摘要索引测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.index = SessionSummaryIndex()
+        for session_id, updated_at in (("s1", "1"), ("s2", "2")):
+            self.index.add_session({"id": session_id, "title": session_id,
+                                    "metadata": {"participants": ["u1", "u2"], "updated_at": updated_at}})
+
+    def test_order_and_unread(self):
+        """测试新消息把会话移到最前，只增加其他参与者的未读数"""
+        self.assertEqual([s["id"] for s in self.index.get_user_sessions("u1")], ["s2", "s1"])
+
+        session = {"id": "s1", "metadata": {"participants": ["u1", "u2"]}}
+        self.index.record_message(session, {"id": "m1", "content": "你好"}, "u2", "3")
+        self.index.record_message(session, {"id": "m2", "content": "在吗"}, "u2", "4")
+
+        u1 = self.index.get_user_sessions("u1")
+        self.assertEqual([s["id"] for s in u1], ["s1", "s2"])
+        self.assertEqual((u1[0]["unread_count"], u1[0]["last_message"]["id"]), (2, "m2"))
+        self.assertEqual(self.index.get_user_sessions("u2")[0]["unread_count"], 0)
+
+        self.index.record_read("s1", "u1")
+        self.index.record_read("s1", "u1", count=5)
+        self.assertEqual(self.index.get_user_sessions("u1")[0]["unread_count"], 0)
+
+    def test_pagination(self):
+        """测试按偏移和数量分页"""
+        self.assertEqual([s["id"] for s in self.index.get_user_sessions("u1", limit=1)], ["s2"])
+        self.assertEqual([s["id"] for s in self.index.get_user_sessions("u1", limit=1, offset=1)], ["s1"])
+        self.assertEqual(self.index.get_user_sessions("unknown"), [])
+
+    def test_sync(self):
+        """测试核对时以存储数据为准，删除已不存在的会话，保留核对期间的增量更新"""
+        snapshot = self.index.begin_sync("u1")
+        session = {"id": "s3", "title": "s3", "metadata": {"participants": ["u1", "u2"], "updated_at": "3"}}
+        self.index.add_session(session)
+        self.index.record_message({"id": "s2", "metadata": {"participants": ["u1", "u2"]}},
+                                  {"id": "m1", "content": "核对期间"}, "u2", "4")
+        stored = [SessionSummary("s1", updated_at="5", unread_count=7), SessionSummary("s2", updated_at="2")]
+        self.index.finish_sync("u1", ["s1", "s2"], stored, snapshot)
+
+        sessions = self.index.get_user_sessions("u1")
+        self.assertEqual([s["id"] for s in sessions], ["s1", "s2", "s3"])
+        self.assertEqual(sessions[0]["unread_count"], 7)
+        self.assertEqual((sessions[1]["unread_count"], sessions[1]["last_message"]["id"]), (1, "m1"))
+        self.assertTrue(self.index.is_loaded("u1"))
+        self.assertFalse(self.index.is_loaded("u2"))
+
+        self.index.finish_sync("u1", ["s1"], [], self.index.begin_sync("u1"))
+        self.assertEqual([s["id"] for s in self.index.get_user_sessions("u1")], ["s1"])
+
+    def test_reconcile_and_lru_bound(self):
+        """测试到达核对间隔后只需重建有更新的会话，超出用户数上限时淘汰最久未访问的用户"""
+        index = SessionSummaryIndex(max_users=2, reconcile_seconds=0.05)
+        self.assertTrue(index.needs_sync("u1"))
+        index.finish_sync("u1", ["s1", "s2"], [SessionSummary("s1", updated_at="1"),
+                                               SessionSummary("s2", updated_at="1")], {})
+        self.assertFalse(index.needs_sync("u1"))
+        time.sleep(0.06)
+        self.assertTrue(index.needs_sync("u1"))
+        sessions = [{"id": "s1", "metadata": {"updated_at": "1"}}, {"id": "s2", "metadata": {"updated_at": "2"}},
+                    {"id": "s3", "metadata": {"updated_at": "1"}}]
+        self.assertEqual([s["id"] for s in index.sessions_to_rebuild("u1", sessions)], ["s2", "s3"])
+        self.assertEqual(len(index.sessions_to_rebuild("u9", sessions)), 3)
+
+        index.finish_sync("u2", ["s2"], [SessionSummary("s2", updated_at="1")], {})
+        index.get_user_sessions("u1")
+        index.finish_sync("u3", ["s3"], [SessionSummary("s3", updated_at="1")], {})
+        self.assertEqual(len(index), 2)
+        self.assertTrue(index.is_loaded("u1"))
+        self.assertFalse(index.is_loaded("u2"))
+        self.assertEqual(index.get_user_sessions("u2"), [])
+
+
+class TestChatManagerSummaries(unittest.TestCase):
+    """对话管理器会话列表测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.storage = FakeStorage()
+        self.manager = HumanChatManager(storage=self.storage)
+        self.manager.db_optimizer = FakeDBOptimizer()
+
+    def test_inbox_maintained_incrementally(self):
+        """测试第一次加载后会话列表由发送消息和标记已读增量维护，不再读取会话消息"""
+        async def scenario():
+            s1 = await self.manager.create_private_chat("u1", "u2")
+            s2 = await self.manager.create_group_chat("u2", ["u1", "u3"], title="群聊")
+            await self.manager.get_user_sessions("u1")
+            loaded_calls = self.storage.list_calls
+            await self.manager.send_message(s1["id"], "u2", "你好")
+            message = await self.manager.send_message(s2["id"], "u3", "大家好")
+            await self.manager.send_message(s1["id"], "u1", "你好呀")
+            await self.manager.mark_as_read(message["id"], "u1")
+            await self.manager.mark_as_read(message["id"], "u1")
+            return await self.manager.get_user_sessions("u1"), loaded_calls
+
+        inbox, loaded_calls = asyncio.run(scenario())
+        self.assertEqual([s["title"] for s in inbox], ["与 u2 的私聊", "群聊"])
+        self.assertEqual(inbox[0]["last_message"]["content"], "你好呀")
+        self.assertEqual([s["unread_count"] for s in inbox], [1, 0])
+        self.assertTrue(inbox[1]["is_group"])
+        self.assertEqual(self.storage.list_calls, loaded_calls)
+
+    def test_rebuild_from_storage(self):
+        """测试新的管理器第一次查询时从存储重建摘要"""
+        async def scenario():
+            s1 = await self.manager.create_private_chat("u1", "u2")
+            await self.manager.send_message(s1["id"], "u2", "一")
+            await self.manager.send_message(s1["id"], "u2", "二")
+
+            manager = HumanChatManager(storage=self.storage)
+            manager.db_optimizer = FakeDBOptimizer()
+            first = await manager.get_user_sessions("u1")
+            calls = self.storage.list_calls
+            await manager.send_message(s1["id"], "u2", "三")
+            return first, calls, await manager.get_user_sessions("u1")
+
+        first, calls, second = asyncio.run(scenario())
+        self.assertEqual((first[0]["unread_count"], first[0]["last_message"]["content"]), (2, "二"))
+        self.assertEqual((second[0]["unread_count"], second[0]["last_message"]["content"]), (3, "三"))
+        self.assertEqual(self.storage.list_calls, calls)
+
+    def test_reconcile_reads_only_changed_sessions(self):
+        """测试核对时只读取其他进程有更新的会话的消息，并删除已不存在的会话"""
+        self.manager.session_summaries.reconcile_seconds = 0
+
+        async def scenario():
+            s1 = await self.manager.create_private_chat("u1", "u2")
+            s2 = await self.manager.create_private_chat("u1", "u3")
+            s3 = await self.manager.create_private_chat("u1", "u4")
+            await self.manager.get_user_sessions("u1")
+
+            # 另一个进程在 s1 中发送了消息，并删除了 s3
+            other = HumanChatManager(storage=self.storage)
+            other.db_optimizer = FakeDBOptimizer()
+            await other.send_message(s1["id"], "u2", "其他进程")
+            del self.storage.sessions[s3["id"]]
+
+            calls = self.storage.list_calls
+            inbox = await self.manager.get_user_sessions("u1")
+            return inbox, self.storage.list_calls - calls, s1, s2
+
+        inbox, reads, s1, s2 = asyncio.run(scenario())
+        self.assertEqual([s["id"] for s in inbox], [s1["id"], s2["id"]])
+        self.assertEqual((inbox[0]["unread_count"], inbox[0]["last_message"]["content"]), (1, "其他进程"))
+        self.assertEqual(reads, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
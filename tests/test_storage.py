@@ -0,0 +1,334 @@
+"""
+存储模块测试
+
+使用进程内的模拟SurrealDB服务测试连接池和统一管理器的异步接口
+"""
+import asyncio
+import os
+import sys
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.storage.memory_storage import MemoryStorage
+from rainbow_agent.storage.surreal.connection_pool import (
+    SurrealConnectionLostError, SurrealConnectionPool, SurrealPoolError
+)
+from rainbow_agent.storage.surreal.mock_server import MockSurrealServer
+from rainbow_agent.storage.surreal.unified_client import UnifiedSurrealClient
+from rainbow_agent.storage.unified_dialogue_storage import UnifiedDialogueStorage
+from rainbow_agent.storage.unified_session_manager import UnifiedSessionManager
+from rainbow_agent.storage.unified_turn_manager import UnifiedTurnManager
+from rainbow_agent.storage.write_behind import TurnWriteBuffer
+
+
+class TestSurrealConnectionPool(unittest.TestCase):
+    """SurrealDB连接池测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.server = MockSurrealServer()
+        self.client = UnifiedSurrealClient(
+            "ws://mock/rpc", "test", "test", "root", "root",
+            pool_size=4, connection_factory=self.server.connect
+        )
+        self.turns = UnifiedTurnManager(client=self.client)
+        self.sessions = UnifiedSessionManager(client=self.client)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.client.close()
+
+    def test_connections_are_reused(self):
+        """测试连续写入复用同一个已认证连接"""
+        for i in range(20):
+            self.assertIsNotNone(self.turns.create_turn("s1", "human", f"消息{i}"))
+
+        self.assertEqual(self.server.handshakes, 1)
+        self.assertEqual(self.turns.count_turns("s1"), 20)
+        self.assertEqual(len(self.turns.get_turns("s1", limit=5)), 5)
+
+    def test_async_methods_share_bounded_pool(self):
+        """测试异步接口并发使用连接池且连接数不超过上限"""
+        self.server.query_latency = 0.01
+
+        async def write_turns():
+            session = await self.sessions.create_session_async("u1", "测试会话")
+            await asyncio.gather(*[
+                self.turns.create_turn_async(session["id"], "human", f"消息{i}")
+                for i in range(16)
+            ])
+            return session, await self.turns.get_turns_async(session["id"])
+
+        session, turns = asyncio.run(write_turns())
+
+        self.assertEqual(len(turns), 16)
+        self.assertLessEqual(self.server.handshakes, 4)
+        self.assertEqual(self.client.pool.get_stats()["size"], self.server.handshakes)
+        self.assertEqual(asyncio.run(self.sessions.get_session_async(session["id"]))["user_id"], "u1")
+
+    def test_reconnects_after_dropped_connection(self):
+        """测试连接断开后重新建立连接并重试"""
+        self.turns.create_turn("s1", "human", "第一条")
+        self.server.fail_next_requests = 1
+
+        self.assertIsNotNone(self.turns.create_turn("s1", "human", "第二条"))
+        self.assertEqual(self.server.handshakes, 2)
+        self.assertEqual(self.client.pool.get_stats()["retries"], 1)
+        self.assertEqual(self.turns.count_turns("s1"), 2)
+
+    def test_health_check_replaces_stale_connection(self):
+        """测试空闲连接在复用前进行健康检查"""
+        pool = SurrealConnectionPool(
+            "ws://mock/rpc", "test", "test", "root", "root",
+            health_check_interval=0, connection_factory=self.server.connect
+        )
+        handshakes = self.server.handshakes
+        try:
+            pool.run(lambda db: db.query("RETURN 1;"))
+            self.server.fail_next_requests = 1
+            pool.run(lambda db: db.query("RETURN 1;"))
+
+            stats = pool.get_stats()
+            self.assertEqual(stats["health_check_failures"], 1)
+            self.assertEqual(stats["retries"], 0)
+            self.assertEqual(self.server.handshakes - handshakes, 2)
+        finally:
+            pool.close()
+
+    def test_sent_operations_are_only_retried_when_idempotent(self):
+        """测试发送后断开的操作只有标记为幂等时才重试"""
+        self.turns.create_turn("s1", "human", "第一条")
+        inserts = []
+
+        async def insert(db):
+            inserts.append(True)
+            return await db.query("INSERT INTO turns $turns;", {"turns": [{"id": "t1", "session_id": "s1"}]})
+
+        self.server.fail_next_requests = 1
+        with self.assertRaises(SurrealConnectionLostError):
+            self.client.pool.run(insert)
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.client.pool.get_stats()["retries"], 0)
+
+        self.server.fail_next_requests = 1
+        self.assertEqual(self.turns.count_turns("s1"), 1)
+        self.assertEqual(self.client.pool.get_stats()["retries"], 1)
+
+    def test_unreachable_server_raises_pool_error(self):
+        """测试无法连接时在重试后抛出连接池错误"""
+        def refuse(url):
+            raise ConnectionRefusedError("连接被拒绝")
+
+        pool = SurrealConnectionPool(
+            "ws://mock/rpc", "test", "test", "root", "root",
+            max_retries=2, backoff_base=0.001, connection_factory=refuse
+        )
+        try:
+            with self.assertRaises(SurrealPoolError):
+                pool.run(lambda db: db.query("RETURN 1;"))
+        finally:
+            pool.close()
+
+
+
+class TestTurnWriteBuffer(unittest.TestCase):
+    """轮次写入缓冲测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.server = MockSurrealServer()
+        self.client = UnifiedSurrealClient(
+            "ws://mock/rpc", "test", "test", "root", "root",
+            pool_size=2, connection_factory=self.server.connect
+        )
+        self.failed = []
+        self.buffer = TurnWriteBuffer(self.client, max_batch_size=8, max_delay=5.0, on_failure=self.failed.extend)
+        self.turns = UnifiedTurnManager(client=self.client, write_buffer=self.buffer)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.buffer.close(timeout=5)
+        self.client.close()
+
+    def stored_turns(self):
+        return self.server.tables.get("turns", {})
+
+    def test_batch_is_written_in_one_request(self):
+        """测试一批轮次合并为一次请求写入"""
+        self.client.execute_sql("RETURN true;")
+        requests = self.server.requests
+
+        for i in range(5):
+            self.turns.create_turn("s1", "human", f"消息{i}")
+        self.assertTrue(self.buffer.flush(timeout=5))
+
+        self.assertEqual(self.server.requests - requests, 1)
+        self.assertEqual(len(self.stored_turns()), 5)
+        self.assertEqual(self.buffer.get_stats()["pending"], 0)
+
+    def test_reads_see_pending_turns(self):
+        """测试尚未写入的轮次对同进程读取可见"""
+        turn = self.turns.create_turn("s1", "human", "你好")
+        self.turns.create_turn("s2", "human", "其他会话")
+
+        self.assertEqual(self.stored_turns(), {})
+        turns = self.turns.get_turns("s1")
+        self.assertEqual([t["id"] for t in turns], [turn["id"]])
+        self.assertEqual(self.turns.get_turn(turn["id"])["content"], "你好")
+        self.assertEqual(len(asyncio.run(self.turns.get_turns_async("s1"))), 1)
+
+        # 计数前会先写入缓冲中的轮次
+        self.assertEqual(self.turns.count_turns("s1"), 1)
+        self.assertEqual([t["id"] for t in self.turns.get_turns("s1")], [turn["id"]])
+
+    def test_full_batch_is_flushed_without_waiting(self):
+        """测试达到批大小时立即写入"""
+        for i in range(8):
+            self.turns.create_turn("s1", "human", f"消息{i}")
+
+        for _ in range(100):
+            if len(self.stored_turns()) == 8:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(len(self.stored_turns()), 8)
+
+    def test_failed_batch_is_handed_to_callback(self):
+        """测试重试失败后的批次交给失败回调"""
+        def refuse(url):
+            raise ConnectionRefusedError("连接被拒绝")
+
+        client = UnifiedSurrealClient(
+            "ws://mock/rpc", "test", "test", "root", "root", connection_factory=refuse
+        )
+        client.pool.backoff_base = 0.001
+        buffer = TurnWriteBuffer(client, max_delay=0.01, max_retries=1, on_failure=self.failed.extend)
+        try:
+            buffer.add_turn({"id": "t1", "session_id": "s1", "content": "丢失"})
+            self.assertTrue(buffer.flush(timeout=30))
+        finally:
+            buffer.close(timeout=5)
+            client.close()
+
+        self.assertEqual([t["id"] for t in self.failed], ["t1"])
+        self.assertEqual(buffer.get_stats()["turns_failed"], 1)
+
+    def test_failed_batch_backs_off_instead_of_disabling_database(self):
+        """测试批次写入失败后暂时改用内存存储，退避时间过后重新使用数据库"""
+        with patch("requests.get", side_effect=ConnectionError("不可用")):
+            storage = UnifiedDialogueStorage(client=self.client)
+        self.assertIsNone(storage.write_buffer)
+        storage.db_available = True
+        storage._db_backoff = 0.05
+
+        storage._on_turn_batch_failed([{"id": "backoff-t1", "session_id": "backoff-s1", "content": "保留",
+                                        "created_at": datetime.now()}])
+        self.assertFalse(storage.db_available)
+        self.assertEqual([t["id"] for t in storage.memory_storage.get_turns("backoff-s1")], ["backoff-t1"])
+        threading.Event().wait(0.06)
+        self.assertTrue(storage.db_available)
+        self.assertEqual(storage._db_backoff, 0.1)
+
+
+
+class TestTurnQueries(unittest.TestCase):
+    """轮次有序查询和游标分页测试类"""
+
+    def setUp(self):
+        """测试前准备：按乱序写入同一会话的20条轮次"""
+        self.server = MockSurrealServer()
+        self.client = UnifiedSurrealClient(
+            "ws://mock/rpc", "test", "test", "root", "root", connection_factory=self.server.connect
+        )
+        self.turns = UnifiedTurnManager(client=self.client)
+        self.memory = MemoryStorage()
+
+        start = datetime(2026, 1, 1)
+        records = [
+            {"id": f"t{i:02d}", "session_id": "s1", "role": "human", "content": f"消息{i}",
+             "created_at": start + timedelta(seconds=i)}
+            for i in range(20)
+        ]
+        records.append({"id": "other", "session_id": "s2", "role": "human", "content": "其他",
+                        "created_at": start})
+        for record in reversed(records):
+            self.server.create("turns", record)
+        self.memory.store_turns(list(reversed(records)))
+        self.expected = [f"t{i:02d}" for i in range(20)]
+
+    def tearDown(self):
+        """测试后清理"""
+        self.client.close()
+
+    def assertIds(self, turns, expected):
+        self.assertEqual([turn["id"] for turn in turns], expected)
+
+    def test_turns_are_ordered_by_creation_time(self):
+        """测试按创建时间有序返回"""
+        self.assertIds(self.turns.get_turns("s1", limit=5), self.expected[:5])
+        self.assertIds(self.memory.get_turns("s1", limit=5), self.expected[:5])
+        self.assertEqual(self.memory.count_turns("s1"), 20)
+
+    def test_forward_keyset_pagination(self):
+        """测试 after_created_at 游标向后翻页恰好覆盖全部轮次"""
+        for storage in (self.turns, self.memory):
+            seen, cursor = [], None
+            while True:
+                page = storage.get_turns("s1", limit=6, after_created_at=cursor)
+                if not page:
+                    break
+                seen.extend(turn["id"] for turn in page)
+                cursor = page[-1]["created_at"]
+            self.assertEqual(seen, self.expected)
+
+    def test_pagination_with_equal_timestamps(self):
+        """测试时间相同的轮次按 (created_at, id) 翻页，不会被跳过"""
+        tied = datetime(2026, 2, 1)
+        records = [{"id": f"x{i}", "session_id": "s3", "role": "human", "content": f"同一时刻{i}",
+                    "created_at": tied} for i in range(5)]
+        for record in records:
+            self.server.create("turns", record)
+        self.memory.store_turns(records)
+        expected = [record["id"] for record in records]
+
+        for storage in (self.turns, self.memory):
+            seen, cursor = [], None
+            while True:
+                page = storage.get_turns("s3", limit=2, after_created_at=cursor and cursor["created_at"],
+                                         after_id=cursor and cursor["id"])
+                if not page:
+                    break
+                seen.extend(turn["id"] for turn in page)
+                cursor = page[-1]
+            self.assertEqual(seen, expected)
+            self.assertIds(storage.get_turns("s3", limit=2, before_id="x3"), ["x1", "x2"])
+
+    def test_before_id_and_recent_turns(self):
+        """测试 before_id 游标和最近N条轮次"""
+        for storage in (self.turns, self.memory):
+            self.assertIds(storage.get_recent_turns("s1", limit=3), self.expected[-3:])
+            self.assertIds(storage.get_turns("s1", limit=4, before_id="t10"), self.expected[6:10])
+            self.assertIds(storage.get_turns("s1", limit=4, before_id="t02"), self.expected[:2])
+            self.assertEqual(storage.get_turns("s1", before_id="missing"), [])
+
+        self.assertIds(asyncio.run(self.turns.get_recent_turns_async("s1", limit=2)), self.expected[-2:])
+        self.assertIds(asyncio.run(self.turns.get_turns_async("s1", limit=2, before_id="t05")), ["t03", "t04"])
+
+    def test_recent_turns_include_pending_writes(self):
+        """测试最近轮次包含写缓冲中尚未写入的轮次"""
+        buffer = TurnWriteBuffer(self.client, max_delay=5.0)
+        turns = UnifiedTurnManager(client=self.client, write_buffer=buffer)
+        try:
+            turn = turns.create_turn("s1", "ai", "新回复")
+            self.assertIds(turns.get_recent_turns("s1", limit=2), [self.expected[-1], turn["id"]])
+            self.assertIds(turns.get_turns("s1", after_created_at=datetime(2026, 1, 1, 0, 0, 18)),
+                           [self.expected[-1], turn["id"]])
+        finally:
+            buffer.close(timeout=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
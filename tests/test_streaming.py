@@ -0,0 +1,150 @@
+"""
+端到端流式响应测试
+
+使用 httpx.MockTransport 模拟 OpenAI 兼容的流式补全服务，测试 LLMCaller 的逐段输出、
+统一对话处理器的同步事件流和 /api/dialogue/input/stream 接口
+"""
+import json
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from flask import Flask
+from openai import OpenAI
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.api import unified_routes
+from rainbow_agent.api.unified_dialogue_processor import UnifiedDialogueProcessor
+from rainbow_agent.core.dialogue_manager import DialogueManager
+from rainbow_agent.core.llm_caller import LLMCaller, LLMStreamError
+from tests.test_openai_service import FakeCompletionServer
+
+
+def sync_stream_client(chunks, status=200, break_after=None):
+    """返回一个同步OpenAI客户端，流式请求按 chunks 逐段返回
+
+    status 不为200时请求直接失败；break_after 为整数时发送该数量的片段后连接中断
+    """
+    def handle(request):
+        body = json.loads(request.content)
+        if status != 200:
+            return httpx.Response(status, json={"error": {"message": "服务不可用"}})
+        events = [
+            "data: " + json.dumps({
+                "id": "chunk", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]
+            }) + "\n\n"
+            for text in chunks
+        ] + ["data: [DONE]\n\n"]
+
+        def content():
+            for i, event in enumerate(events):
+                if i == break_after:
+                    raise httpx.ReadError("连接中断")
+                yield event.encode()
+
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=content())
+
+    return OpenAI(api_key="test-key", base_url="http://fake-llm/v1", max_retries=0,
+                  http_client=httpx.Client(transport=httpx.MockTransport(handle)))
+
+
+class TestLLMCallerStream(unittest.TestCase):
+    """LLMCaller 流式调用测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.caller = LLMCaller(model="gpt-test", llm_client=sync_stream_client(["你好", "，", "世界"]))
+        self.context = {"messages": [{"role": "user", "content": "问题"}]}
+
+    def test_stream_yields_deltas(self):
+        """测试 stream 逐段返回文本并记录首个片段延迟"""
+        self.assertEqual(list(self.caller.stream(self.context)), ["你好", "，", "世界"])
+        self.assertEqual(self.caller.last_chunk_count, 3)
+        self.assertGreater(self.caller.last_first_token_time, 0)
+        self.assertLessEqual(self.caller.last_first_token_time, self.caller.last_processing_time)
+
+    def test_call_with_stream_joins_deltas(self):
+        """测试 call(stream=True) 返回拼接后的完整文本"""
+        self.assertEqual(self.caller.call(self.context, stream=True), "你好，世界")
+
+    def test_stream_errors_are_raised(self):
+        """测试重试用尽和流中断时抛出 LLMStreamError，而不是把错误信息当作模型输出或返回不完整的文本"""
+        caller = LLMCaller(model="gpt-test", retry_attempts=0, llm_client=sync_stream_client(["你好"], status=503))
+        with self.assertRaises(LLMStreamError):
+            list(caller.stream(self.context))
+        self.assertIn("技术问题", caller.call(self.context, stream=True))
+
+        caller = LLMCaller(model="gpt-test", llm_client=sync_stream_client(["你好", "，", "世界"], break_after=1))
+        received = []
+        with self.assertRaisesRegex(LLMStreamError, "中断"):
+            for delta in caller.stream(self.context):
+                received.append(delta)
+        self.assertEqual(received, ["你好"])
+        with self.assertRaises(LLMStreamError):
+            caller.call(self.context, stream=True)
+
+
+class TestStreamingEndpoint(unittest.TestCase):
+    """流式对话接口测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.storage = AsyncMock()
+        self.storage.create_turn_async.side_effect = lambda session_id, role, content, metadata=None: {
+            "id": f"{role}-turn", "session_id": session_id, "role": role, "content": content
+        }
+        self.storage.get_session_async.return_value = {"id": "s1", "metadata": {"dialogue_type": "human_ai_private"}}
+        self.storage.get_recent_turns_async.return_value = []
+        manager = DialogueManager(storage=self.storage, ai_service=FakeCompletionServer(latency=0.01).service())
+        self.processor = UnifiedDialogueProcessor(storage=self.storage, dialogue_manager=manager)
+
+        app = Flask(__name__)
+        app.register_blueprint(unified_routes.api)
+        self.client = app.test_client()
+
+    def ai_turns(self):
+        return [c for c in self.storage.create_turn_async.call_args_list if c.args[1] == "ai"]
+
+    def test_process_input_stream_flag(self):
+        """测试 DialogueManager.process_input(stream=True) 返回事件流"""
+        events = list(self.processor.iter_input_stream("你好", user_id="u1", session_id="s1"))
+        self.assertEqual([e["content"] for e in events if e["type"] == "token"], ["你好", "，", "世界"])
+        self.assertEqual(events[-1]["response"], "你好，世界")
+        self.assertEqual(len(self.ai_turns()), 1)
+
+    def test_sse_endpoint(self):
+        """测试 SSE 接口逐段发送片段，并且只保存一次AI轮次"""
+        with patch.object(unified_routes, "get_unified_processor", return_value=self.processor):
+            response = self.client.post("/api/dialogue/input/stream",
+                                        json={"input": "你好", "userId": "u1", "sessionId": "s1"})
+            self.assertEqual(response.mimetype, "text/event-stream")
+            body = response.get_data(as_text=True)
+
+        events = [block.split("\n") for block in body.strip().split("\n\n")]
+        self.assertEqual([lines[0] for lines in events], ["event: token"] * 3 + ["event: done"])
+        done = json.loads(events[-1][1][len("data: "):])
+        self.assertEqual(done["response"], "你好，世界")
+        self.assertEqual(len(self.ai_turns()), 1)
+
+    def test_sse_endpoint_error_event(self):
+        """测试AI服务流式生成失败时 SSE 接口发送 error 事件"""
+        self.processor.dialogue_manager.ai_service = FakeCompletionServer(latency=0.01, status=503).service()
+        with patch.object(unified_routes, "get_unified_processor", return_value=self.processor):
+            body = self.client.post("/api/dialogue/input/stream",
+                                    json={"input": "你好", "userId": "u1", "sessionId": "s1"}).get_data(as_text=True)
+
+        names = [block.split("\n")[0] for block in body.strip().split("\n\n")]
+        self.assertEqual(names, ["event: error", "event: token", "event: done"])
+
+    def test_sse_endpoint_requires_input(self):
+        """测试缺少输入内容时返回400"""
+        response = self.client.post("/api/dialogue/input/stream", json={"userId": "u1"})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+工具调用解析测试
+
+测试预编译的工具调用解析器对各种格式的解析、结构化调用的快速路径，
+以及工具执行器在工具或注册表变化后重建解析器
+"""
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.tools.base import BaseTool
+from rainbow_agent.tools.registry import ToolRegistry
+from rainbow_agent.tools.tool_call_parser import ToolCallParser
+from rainbow_agent.tools.tool_executor import ToolExecutor
+
+
+class EchoTool(BaseTool):
+    """返回参数的测试工具"""
+
+    def __init__(self, name):
+        super().__init__(name=name, description="返回参数", usage=f"{name} <args>")
+
+    def run(self, args):
+        return args
+
+
+class TestToolCallParser(unittest.TestCase):
+    """工具调用解析器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.parser = ToolCallParser(["search", "search_web", "calc", "Weather"])
+
+    def call(self, name, args):
+        return {"tool_name": name, "tool_args": args}
+
+    def test_direct_format(self):
+        """测试直接指示格式，工具名不区分大小写，最长的词才算工具名"""
+        self.assertEqual(self.parser.parse("我需要使用工具：search_web 彩虹"), self.call("search_web", "彩虹"))
+        self.assertEqual(self.parser.parse("Use tool: SEARCH  rainbow agent"), self.call("search", "rainbow agent"))
+        self.assertEqual(self.parser.parse("调用工具 weather 北京"), self.call("Weather", "北京"))
+        self.assertEqual(self.parser.parse("工具 unknown 然后使用工具 calc 1+1"), self.call("calc", "1+1"))
+        self.assertIsNone(self.parser.parse("我需要使用工具：search_webx 彩虹"))
+
+    def test_function_and_simple_format(self):
+        """测试函数式格式和简单文本格式"""
+        self.assertEqual(self.parser.parse("计算 calc( 1 + 2 )"), self.call("calc", "1 + 2"))
+        self.assertIsNone(self.parser.parse("print(1)"))
+        self.assertEqual(self.parser.parse("工具调用：search：彩虹"), self.call("search", "彩虹"))
+
+    def test_json_format(self):
+        """测试文本中的JSON调用，支持嵌套参数，不把参数里的对象当作调用"""
+        text = '好的 {"name": "calc", "args": {"expr": {"op": "+", "values": [1, 2]}}} 完成'
+        self.assertEqual(self.parser.parse(text),
+                         self.call("calc", '{"expr": {"op": "+", "values": [1, 2]}}'))
+        self.assertIsNone(self.parser.parse('{"name": "other", "args": {"name": "calc"}}'))
+        self.assertEqual(self.parser.parse('{坏的} {"name": "search"}'), self.call("search", ""))
+
+    def test_structured_calls(self):
+        """测试结构化调用直接读取，包括OpenAI的function_call和tool_calls"""
+        self.assertEqual(self.parser.parse_structured({"name": "calc", "args": {"x": 1}}),
+                         self.call("calc", '{"x": 1}'))
+        self.assertEqual(self.parser.parse_structured({"function_call": {"name": "search", "arguments": '{"q": "a"}'}}),
+                         self.call("search", '{"q": "a"}'))
+        tool_calls = {"tool_calls": [{"id": "1", "type": "function",
+                                      "function": {"name": "calc", "arguments": "{}"}}]}
+        self.assertEqual(self.parser.parse_structured(tool_calls), self.call("calc", "{}"))
+        self.assertIsNone(self.parser.parse_structured({"name": "missing"}))
+        self.assertIsNone(self.parser.parse_structured("calc"))
+
+
+class TestToolExecutorParser(unittest.TestCase):
+    """工具执行器解析器重建测试类"""
+
+    def test_rebuild_after_add_tool(self):
+        """测试添加工具后解析器重建，未变化时复用"""
+        executor = ToolExecutor([EchoTool("calc")])
+        parser = executor.parser
+        self.assertIs(executor.parser, parser)
+        self.assertIsNone(executor.parse_tool_call("使用工具 echo 你好"))
+
+        executor.add_tool(EchoTool("echo"))
+        self.assertIsNot(executor.parser, parser)
+        self.assertEqual(executor.parse_tool_call("使用工具 echo 你好"), {"tool_name": "echo", "tool_args": "你好"})
+        self.assertEqual(executor.parse_tool_call({"name": "calc", "arguments": "1+1"}),
+                         {"tool_name": "calc", "tool_args": "1+1"})
+
+    def test_registry_changes(self):
+        """测试执行器从注册表读取工具，注册表变化后同步"""
+        registry = ToolRegistry()
+        name = "parser_test_tool"
+        self.addCleanup(registry.available_tools.pop, name, None)
+        executor = ToolExecutor(registry)
+        self.assertIsNone(executor.parse_tool_call(f"使用工具 {name} 参数"))
+
+        registry.register_tool(EchoTool(name))
+        self.assertEqual(executor.parse_tool_call(f"使用工具 {name} 参数"), {"tool_name": name, "tool_args": "参数"})
+        self.assertEqual(executor.execute_tool({"tool_name": name, "tool_args": "参数"}), (True, "参数"))
+
+
+if __name__ == "__main__":
+    unittest.main()
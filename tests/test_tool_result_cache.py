@@ -0,0 +1,223 @@
+"""
+工具结果缓存测试
+
+测试按工具缓存策略缓存结果、按条目数和字节数淘汰、磁盘缓存、
+相同调用并发时只执行一次，以及工具调用器的命中率统计
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.tools.base import BaseTool, CachePolicy
+from rainbow_agent.tools.result_cache import ToolResultCache
+from rainbow_agent.tools.tool_chain import ToolChain
+from rainbow_agent.tools.tool_invoker import ToolInvoker
+
+
+class CountingTool(BaseTool):
+    """记录执行次数的测试工具"""
+
+    def __init__(self, name, policy=CachePolicy.TTL, ttl=None, persistent=False, version="1.0", delay=0.0):
+        super().__init__(name=name, description="测试工具", version=version)
+        self.cache_policy = policy
+        self.cache_ttl = ttl
+        self.persistent_cache = persistent
+        self.delay = delay
+        self.calls = 0
+
+    def run(self, args):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if args == "fail":
+            raise ValueError("执行失败")
+        return f"{self.name}:{args}:{self.calls}"
+
+
+class TestToolResultCache(unittest.TestCase):
+    """工具结果缓存测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+
+    def compute(self, tool, args, user_id=None, cache=None):
+        cache = cache if cache is not None else self.cache
+        key = cache.make_key(tool, args, user_id)
+        if key is None:
+            return tool.run(args)
+        return cache.get_or_compute(tool, key, lambda: (tool.run(args), True))
+
+    def test_policies(self):
+        """测试不缓存、TTL、确定性和按用户缓存策略"""
+        self.cache = ToolResultCache()
+        never = CountingTool("never", CachePolicy.NEVER)
+        self.assertEqual(self.compute(never, "a"), "never:a:1")
+        self.assertEqual(self.compute(never, "a"), "never:a:2")
+
+        ttl = CountingTool("ttl", CachePolicy.TTL, ttl=0.05)
+        self.assertEqual(self.compute(ttl, "a"), "ttl:a:1")
+        self.assertEqual(self.compute(ttl, "a"), "ttl:a:1")
+        time.sleep(0.1)
+        self.assertEqual(self.compute(ttl, "a"), "ttl:a:2")
+
+        deterministic = CountingTool("det", CachePolicy.DETERMINISTIC)
+        self.assertEqual(self.compute(deterministic, {"x": 1, "y": 2}), "det:{'x': 1, 'y': 2}:1")
+        self.assertEqual(self.compute(deterministic, {"y": 2, "x": 1}), "det:{'x': 1, 'y': 2}:1")
+
+        per_user = CountingTool("user", CachePolicy.PER_USER)
+        self.assertEqual(self.compute(per_user, "a", "u1"), "user:a:1")
+        self.assertEqual(self.compute(per_user, "a", "u2"), "user:a:2")
+        self.assertEqual(self.compute(per_user, "a", "u1"), "user:a:1")
+        self.assertIsNone(self.cache.make_key(per_user, "a"))
+
+    def test_bounded_lru(self):
+        """测试按条目数和字节数淘汰最久未使用的结果"""
+        self.cache = ToolResultCache(max_entries=3, max_bytes=100)
+        tool = CountingTool("lru", CachePolicy.DETERMINISTIC)
+        keys = [self.cache.make_key(tool, i) for i in range(4)]
+        for key in keys[:3]:
+            self.cache.put(tool, key, "x" * 10)
+        self.cache.get(tool, keys[0])
+        self.cache.put(tool, keys[3], "x" * 10)
+        self.assertFalse(self.cache.get(tool, keys[1])[0])
+        self.assertTrue(self.cache.get(tool, keys[0])[0])
+
+        self.cache.put(tool, keys[1], "y" * 90)
+        stats = self.cache.get_stats()
+        self.assertLessEqual(stats["bytes"], 100)
+        self.assertEqual(stats["tools"]["lru"]["evictions"], 3)
+        self.cache.put(tool, keys[2], "z" * 200)
+        self.assertFalse(self.cache.get(tool, keys[2])[0])
+
+    def test_disk_tier(self):
+        """测试磁盘缓存在新实例中仍然有效，工具版本变化后失效"""
+        tool = CountingTool("expensive", CachePolicy.DETERMINISTIC, persistent=True)
+        first = ToolResultCache(cache_dir=self.cache_dir)
+        self.assertEqual(self.compute(tool, "q", cache=first), "expensive:q:1")
+
+        restarted = ToolResultCache(cache_dir=self.cache_dir)
+        self.assertEqual(self.compute(tool, "q", cache=restarted), "expensive:q:1")
+        self.assertEqual(restarted.get_stats()["tools"]["expensive"]["disk_hits"], 1)
+
+        upgraded = CountingTool("expensive", CachePolicy.DETERMINISTIC, persistent=True, version="2.0")
+        self.assertEqual(self.compute(upgraded, "q", cache=restarted), "expensive:q:1")
+        self.assertEqual(upgraded.calls, 1)
+
+        memory_only = CountingTool("cheap", CachePolicy.DETERMINISTIC)
+        self.compute(memory_only, "q", cache=first)
+        self.assertEqual(self.compute(memory_only, "q", cache=ToolResultCache(cache_dir=self.cache_dir)),
+                         "cheap:q:2")
+
+    def test_single_flight(self):
+        """测试相同调用并发时只执行一次"""
+        self.cache = ToolResultCache()
+        tool = CountingTool("slow", CachePolicy.TTL, delay=0.2)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.compute(tool, "q"))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(tool.calls, 1)
+        self.assertEqual(results, ["slow:q:1"] * 5)
+        stats = self.cache.get_stats()["tools"]["slow"]
+        self.assertEqual(stats["misses"] + stats["shared"] + stats["hits"], 5)
+        self.assertEqual(stats["misses"], 1)
+
+
+    def test_failed_disk_write_removes_temp_file(self):
+        """测试写入磁盘缓存失败时不留下临时文件"""
+        cache = ToolResultCache(cache_dir=self.cache_dir)
+        tool = CountingTool("expensive", CachePolicy.DETERMINISTIC, persistent=True)
+        with patch("rainbow_agent.tools.result_cache.os.replace", side_effect=OSError("磁盘已满")):
+            self.assertEqual(self.compute(tool, "q", cache=cache), "expensive:q:1")
+        leftovers = [name for _, _, files in os.walk(self.cache_dir) for name in files]
+        self.assertEqual(leftovers, [])
+
+
+class TestToolInvokerCache(unittest.TestCase):
+    """工具调用器缓存测试类"""
+
+    def test_invoker_uses_tool_policies(self):
+        """测试工具调用器按工具策略缓存，失败的结果不缓存，并统计命中率"""
+        cached = CountingTool("search", CachePolicy.TTL)
+        uncached = CountingTool("execute", CachePolicy.NEVER)
+        per_user = CountingTool("profile", CachePolicy.PER_USER)
+        invoker = ToolInvoker(tools=[cached, uncached, per_user], llm_client=object())
+
+        for _ in range(3):
+            invoker.invoke_tool({"tool_name": "search", "tool_args": "彩虹"})
+            invoker.invoke_tool({"tool_name": "execute", "tool_args": "print(1)"})
+        self.assertEqual((cached.calls, uncached.calls), (1, 3))
+
+        self.assertIn("执行失败", invoker.invoke_tool({"tool_name": "search", "tool_args": "fail"}))
+        invoker.invoke_tool({"tool_name": "search", "tool_args": "fail"})
+        self.assertEqual(cached.calls, 3)
+
+        invoker.invoke_tool({"tool_name": "profile", "tool_args": "", "user_id": "u1"})
+        invoker.invoke_tool({"tool_name": "profile", "tool_args": ""}, user_id="u1")
+        self.assertEqual(per_user.calls, 1)
+
+        stats = invoker.get_cache_stats()["tools"]
+        self.assertAlmostEqual(stats["search"]["hit_rate"], 2 / 5)
+        self.assertNotIn("execute", stats)
+
+        invoker.results_cache.clear()
+        invoker.invoke_tool({"tool_name": "search", "tool_args": "彩虹"})
+        self.assertEqual(cached.calls, 4)
+
+
+class DefaultPolicyTool(BaseTool):
+    """未声明缓存策略的测试工具"""
+
+    def __init__(self):
+        super().__init__(name="create", description="有副作用的测试工具")
+        self.calls = 0
+
+    def run(self, args):
+        self.calls += 1
+        return f"成功创建{args}"
+
+
+class TestToolChainCache(unittest.TestCase):
+    """工具链缓存测试类"""
+
+    def test_default_policy_is_never(self):
+        """测试未声明缓存策略的工具默认不缓存"""
+        tool = DefaultPolicyTool()
+        self.assertEqual(tool.cache_policy, CachePolicy.NEVER)
+        invoker = ToolInvoker(tools=[tool], llm_client=object())
+        for _ in range(2):
+            invoker.invoke_tool({"tool_name": "create", "tool_args": "关系"})
+        self.assertEqual(tool.calls, 2)
+
+    def test_chain_uses_tool_policies(self):
+        """测试顺序工具链按工具的缓存策略缓存，不缓存声明了NEVER的工具"""
+        cached = CountingTool("search", CachePolicy.TTL)
+        uncached = CountingTool("execute", CachePolicy.NEVER)
+        chain = ToolChain("chain", "缓存策略", tools=[cached, uncached])
+        for _ in range(3):
+            chain.execute("彩虹")
+        self.assertEqual((cached.calls, uncached.calls), (1, 3))
+
+        per_user = CountingTool("profile", CachePolicy.PER_USER)
+        chain = ToolChain("per_user", "按用户缓存", tools=[per_user], cache_max_entries=10)
+        chain.execute("", {"user_id": "u1"})
+        chain.execute("", {"user_id": "u1"})
+        self.assertEqual(chain.execute("", {"user_id": "u2"})["final_result"], "profile::2")
+        chain.execute("")
+        self.assertEqual(per_user.calls, 3)
+        self.assertEqual(chain.results_cache.max_entries, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+工具检索测试
+
+测试支持中文的工具检索、置信度计算、可选的向量融合，
+以及优化工具选择器在检索置信度足够高时跳过LLM、调用LLM时只列出候选工具
+"""
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rainbow_agent.core.optimized_tool_selector import OptimizedToolSelector, SelectionStrategy
+from rainbow_agent.core.tool_retriever import ToolRetriever, NUMPY_SUPPORT
+from rainbow_agent.tools.base import BaseTool
+
+
+class DescribedTool(BaseTool):
+    """只有名称和描述的测试工具"""
+
+    def __init__(self, name, description):
+        super().__init__(name=name, description=description, usage=f"{name} <args>")
+
+    def run(self, args):
+        return args
+
+
+class FakeLLMClient:
+    """记录调用次数和提示词的LLM客户端"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, temperature):
+        self.prompts.append(messages[0]["content"])
+        message = SimpleNamespace(content=self.reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def make_tools():
+    return [
+        DescribedTool("weather", "查询城市的天气预报和气温 weather forecast"),
+        DescribedTool("calculator", "执行数学计算 calculate math expressions"),
+        DescribedTool("translate", "在中文和英文之间翻译文本 translate text"),
+        DescribedTool("web_search", "在互联网上搜索信息和新闻 search the web"),
+    ]
+
+
+class TestToolRetriever(unittest.TestCase):
+    """工具检索器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.retriever = ToolRetriever(make_tools())
+
+    def test_chinese_and_english_queries(self):
+        """测试中文和英文查询都能检索到正确的工具"""
+        for query, expected in [("北京明天天气怎么样", "weather"),
+                                ("帮我计算一下 3 乘以 7", "calculator"),
+                                ("把这句话翻译成英文", "translate"),
+                                ("search the web for news", "web_search")]:
+            candidates, confidence = self.retriever.retrieve(query, 2)
+            self.assertEqual(candidates[0][0].name, expected, query)
+            self.assertGreater(confidence, 0)
+            self.assertTrue(all(0 < score <= 1 for _, score in candidates))
+
+    def test_confidence(self):
+        """测试无关查询没有候选，同时命中多个工具的查询置信度较低"""
+        self.assertEqual(self.retriever.retrieve("完全无关的内容 xyz"), ([], 0.0))
+        _, clear = self.retriever.retrieve("查询天气预报和气温")
+        _, vague = self.retriever.retrieve("天气预报还是翻译文本")
+        self.assertGreater(clear, vague)
+
+    def test_add_and_remove_tool(self):
+        """测试添加和删除工具后索引同步更新"""
+        self.retriever.add_tool(DescribedTool("send_email", "给联系人发送电子邮件"))
+        candidates, _ = self.retriever.retrieve("发一封邮件给他")
+        self.assertEqual(candidates[0][0].name, "send_email")
+
+        self.assertTrue(self.retriever.remove_tool("send_email"))
+        self.assertFalse(self.retriever.remove_tool("send_email"))
+        candidates, _ = self.retriever.retrieve("发一封邮件给他")
+        self.assertNotIn("send_email", [tool.name for tool, _ in candidates])
+        self.assertEqual(len(self.retriever), 4)
+
+    @unittest.skipUnless(NUMPY_SUPPORT, "需要numpy")
+    def test_embedding_fusion(self):
+        """测试向量相似度与BM25得分融合，向量能找回没有关键词重叠的工具"""
+        topics = {"weather": [1.0, 0.0, 0.0], "calculator": [0.0, 1.0, 0.0]}
+        calls = []
+
+        def embed(texts):
+            calls.append(len(texts))
+            vectors = []
+            for text in texts:
+                if "天气" in text or "下雨" in text:
+                    vectors.append(topics["weather"])
+                elif "计算" in text:
+                    vectors.append(topics["calculator"])
+                else:
+                    vectors.append([0.0, 0.0, 1.0])
+            return vectors
+
+        retriever = ToolRetriever(make_tools(), embedder=embed, embedding_weight=0.5)
+        self.assertEqual(calls, [4])
+        candidates, _ = retriever.retrieve("明天会下雨吗", 1)
+        self.assertEqual(candidates[0][0].name, "weather")
+        self.assertAlmostEqual(candidates[0][1], 0.5, places=5)
+
+
+class TestSelectorRetrieval(unittest.TestCase):
+    """优化工具选择器检索测试类"""
+
+    def make_selector(self, reply="选择工具: none\n置信度: 0\n理由: 无", tools=None, **kwargs):
+        self.llm = FakeLLMClient(reply)
+        return OptimizedToolSelector(tools=tools or make_tools(), strategy=SelectionStrategy.HYBRID,
+                                     llm_client=self.llm, **kwargs)
+
+    def test_confident_retrieval_skips_llm(self):
+        """测试检索置信度足够高时不调用LLM"""
+        selector = self.make_selector()
+        tool, confidence, _ = selector.select_tool("北京明天天气预报怎么样")
+        self.assertEqual(tool.name, "weather")
+        self.assertGreaterEqual(confidence, selector.retrieval_threshold)
+        self.assertEqual(self.llm.prompts, [])
+        self.assertEqual(selector.stats, {"retrieval_selections": 1, "llm_selections": 0})
+
+        results = selector.select_tools("把这句话翻译成英文", top_k=2)
+        self.assertEqual(results[0][0].name, "translate")
+        self.assertEqual(self.llm.prompts, [])
+
+    def test_llm_prompt_uses_shortlist(self):
+        """测试检索置信度不足时调用LLM，提示词中只列出候选工具"""
+        padding = [DescribedTool(f"plugin_{i}", f"插件 {i} 的专用操作") for i in range(20)]
+        selector = self.make_selector(reply="选择工具: weather\n置信度: 0.9\n理由: 查询天气",
+                                      tools=make_tools() + padding, shortlist_size=5,
+                                      retrieval_threshold=1.1)
+        tool, _, _ = selector.select_tool("查询一下天气")
+        self.assertEqual(tool.name, "weather")
+        self.assertEqual(len(self.llm.prompts), 1)
+        self.assertIn("weather:", self.llm.prompts[0])
+        self.assertNotIn("plugin_19", self.llm.prompts[0])
+        self.assertEqual(selector.stats["llm_selections"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()